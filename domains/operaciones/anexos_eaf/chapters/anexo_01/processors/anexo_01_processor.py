@@ -43,13 +43,33 @@ except ImportError as e:
     import cv2
     import numpy as np
 
+# Batched tesseract runner shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from ocr_batch import TesseractBatch
+from raster_analysis import PageRaster
+from pdf_document_pool import get_text_provider
+from hourly_series_store import get_series_store
+
+# Row labels used to locate each metric row on the page for region-level OCR
+METRIC_ROW_LABELS = {
+    "generacion_total": r"Generaci[óo]n\s+Total",
+    "costos_operacion": r"Costos?\s+Operaci[óo]n",
+    "costos_encendido_detencion": r"Costos?\s+Encendido",
+    "costos_totales": r"Costos?\s+Totales",
+    "costo_marginal": r"Costo\s+Marginal",
+    "indisponibilidad_forzada": r"Indisponibilidad\s+Forzada",
+    "indisponibilidad_programada": r"Indisponibilidad\s+Programada",
+    "factor_planta_bruto": r"Factor\s+de?\s+Planta\s+Bruto",
+    "factor_planta_neto": r"Factor\s+de?\s+Planta\s+Neto",
+    "horas_servicio": r"Horas?\s+de?\s+Servicio"
+}
+
 def extract_page_text(document_path: str, page_num: int) -> str:
-    """Extract text from single page (1-indexed) using PyPDF2"""
+    """Extract text from single page (1-indexed) using PyPDF2 (pooled reader, memoized per page)"""
     try:
-        reader = PdfReader(document_path)
-        if 1 <= page_num <= len(reader.pages):
-            page = reader.pages[page_num - 1]
-            return page.extract_text().strip()
+        provider = get_text_provider(document_path, engine='pypdf2')
+        if 1 <= page_num <= provider.page_count:
+            return provider.text(page_num).strip()
         return ""
     except Exception as e:
         print(f"Error extracting page {page_num}: {e}")
@@ -63,21 +83,10 @@ def extract_ocr_text(document_path: str, page_num: int) -> str:
             page = doc[page_num - 1]
             
             # High DPI for better OCR accuracy
-            mat = fitz.Matrix(2, 2)  # 144 DPI (72*2)
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to PIL Image
-            img_data = pix.tobytes("ppm")
-            pil_image = Image.open(io.BytesIO(img_data))
-            
-            # Convert to numpy array for OpenCV processing
-            opencv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-            gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
+            raster = PageRaster.from_page(page, zoom=2)  # 144 DPI (72*2)
             
             # Apply adaptive thresholding for better text clarity
-            processed = cv2.adaptiveThreshold(
-                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-            )
+            processed = raster.adaptive_threshold(11, 2)
             
             # Convert back to PIL for pytesseract
             processed_pil = Image.fromarray(processed)
@@ -98,6 +107,46 @@ def extract_ocr_text(document_path: str, page_num: int) -> str:
         print(f"⚠️  OCR extraction failed: {e}")
         return ""
 
+def extract_ocr_row_texts(document_path: str, page_num: int, metric_keys: List[str]) -> Dict[str, str]:
+    """OCR only the metric rows of a page, all rows in a single tesseract run.
+
+    Each metric label is located with PyMuPDF, its row band is cropped across the
+    full page width and the crops are submitted together through TesseractBatch.
+    Metrics whose label is not found on the page are left out of the result.
+    """
+    try:
+        batch = TesseractBatch(lang='spa+eng', config='--psm 6')
+        with fitz.open(document_path) as doc:
+            if not 0 <= page_num - 1 < len(doc):
+                return {}
+
+            page = doc[page_num - 1]
+            # Group words into PDF text lines: (block, line) -> words
+            lines = {}
+            for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words"):
+                lines.setdefault((block_no, line_no), []).append((x0, y0, x1, y1, word))
+
+            for metric_key in metric_keys:
+                label = METRIC_ROW_LABELS.get(metric_key)
+                if not label:
+                    continue
+
+                for words in lines.values():
+                    if re.search(label, " ".join(w[4] for w in words), re.IGNORECASE):
+                        top = min(w[1] for w in words) - 2
+                        bottom = max(w[3] for w in words) + 2
+                        clip = fitz.Rect(page.rect.x0, top, page.rect.x1, bottom)
+                        # Same preprocessing as the full-page OCR (144 DPI, adaptive threshold)
+                        row = PageRaster.from_page(page, zoom=2, clip=clip)
+                        batch.add(metric_key, row.adaptive_threshold(11, 2))
+                        break
+
+        results = batch.run()
+        return {key: TesseractBatch.data_to_text(data) for key, data in results.items()}
+    except Exception as e:
+        print(f"⚠️  Row OCR extraction failed: {e}")
+        return {}
+
 def find_ocr_row_for_metric(ocr_text: str, metric_pattern: str, raw_line: str) -> Optional[Dict]:
     """Find the corresponding OCR line for a metric"""
     
@@ -241,16 +290,10 @@ def extract_enhanced_with_ocr(document_path: str, page_num: int) -> Dict:
     print("📄 Extracting RAW PDF text...")
     raw_text = extract_page_text(document_path, page_num)
     
-    print("🔎 Extracting OCR text...")
-    ocr_text = extract_ocr_text(document_path, page_num)
-    
     if not raw_text:
         print(f"❌ No text extracted from page {page_num}")
         return {}
     
-    print(f"📊 RAW text length: {len(raw_text)} chars")
-    print(f"📊 OCR text length: {len(ocr_text)} chars")
-    
     # Define system metric patterns
     metric_patterns = {
         "generacion_total": r"Generaci[óo]n\s+Total[^\n]*\[MWh\][^\n]*",
@@ -265,6 +308,19 @@ def extract_enhanced_with_ocr(document_path: str, page_num: int) -> Dict:
         "horas_servicio": r"Horas?\s+de?\s+Servicio[^\n]*"
     }
     
+    # OCR only the metric rows (one tesseract process for all of them);
+    # fall back to full-page OCR when no row could be located
+    print("🔎 Extracting OCR text (metric rows, batched)...")
+    row_ocr_texts = extract_ocr_row_texts(document_path, page_num, list(metric_patterns.keys()))
+    if row_ocr_texts:
+        ocr_text = "\n".join(row_ocr_texts.values())
+    else:
+        print("🔎 No metric rows located, extracting full-page OCR text...")
+        ocr_text = extract_ocr_text(document_path, page_num)
+    
+    print(f"📊 RAW text length: {len(raw_text)} chars")
+    print(f"📊 OCR text length: {len(ocr_text)} chars")
+    
     # Extract system metrics with OCR per row
     system_metrics = {}
     total_ocr_validations = 0
@@ -283,7 +339,7 @@ def extract_enhanced_with_ocr(document_path: str, page_num: int) -> Dict:
             ocr_data = None
             if ocr_text:
                 total_ocr_validations += 1
-                ocr_data = find_ocr_row_for_metric(ocr_text, pattern, raw_line)
+                ocr_data = find_ocr_row_for_metric(row_ocr_texts.get(metric_key, ocr_text), pattern, raw_line)
                 if ocr_data:
                     successful_ocr_matches += 1
                     print(f"      ✅ OCR match found (confidence: {ocr_data['match_confidence']})")
@@ -440,6 +496,10 @@ def main():
         json.dump(result, f, ensure_ascii=False, indent=2)
     
     print(f"\n💾 Results saved to: {output_file}")
+
+    # Hourly metrics into the day-partitioned series store
+    stored = get_series_store().append_anexo_01(result)
+    print(f"📈 Series store: {stored} hourly metrics")
     
     # Print summary
     ocr_summary = result["ocr_validation_summary"]
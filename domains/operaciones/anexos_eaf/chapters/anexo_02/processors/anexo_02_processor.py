@@ -47,6 +47,27 @@ except ImportError as e:
     import cv2
     import numpy as np
 
+# Vectorized raster analysis shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from raster_analysis import PageRaster
+from pdf_document_pool import get_text_provider
+from hourly_series_store import get_series_store
+
+# Chart color per plant type
+PLANT_COLOR_SCHEME = {
+    "SOLAR_PV": "#FFD700",              # Gold - Large Scale Solar PV
+    "DISTRIBUTED_SOLAR_PV": "#FFA500",  # Orange - Distributed Solar PV
+    "DISTRIBUTED_THERMAL": "#FF6347",   # Tomato Red - Distributed Thermal
+    "DISTRIBUTED_DIESEL": "#8B4513",    # Saddle Brown - Distributed Diesel
+    "DISTRIBUTED_GENERATION": "#32CD32", # Lime Green - Other Distributed
+    "HYDROELECTRIC": "#1E90FF",         # Dodger Blue - Hydroelectric
+    "WIND": "#87CEEB",                  # Sky Blue - Wind Power
+    "COAL": "#2F4F4F",                  # Dark Slate Gray - Coal
+    "NATURAL_GAS": "#4169E1",           # Royal Blue - Natural Gas
+    "NUCLEAR": "#FF1493",               # Deep Pink - Nuclear
+    "UNKNOWN": "#808080"                # Gray - Unknown/Unclassified
+}
+
 def extract_date_info(raw_text: str) -> Dict:
     """Extract comprehensive metadata from the document header"""
     # Look for date patterns like "25-02-2025" or "RESUMEN DIARIO DE OPERACION DEL SEN"
@@ -62,19 +83,7 @@ def extract_date_info(raw_text: str) -> Dict:
             "anexo_description": "Real Generation Data - Actual vs Programmed Generation Comparison",
             "data_source": "EAF-089-2025 Power System Report"
         },
-        "plant_color_scheme": {
-            "SOLAR_PV": "#FFD700",              # Gold - Large Scale Solar PV
-            "DISTRIBUTED_SOLAR_PV": "#FFA500",  # Orange - Distributed Solar PV
-            "DISTRIBUTED_THERMAL": "#FF6347",   # Tomato Red - Distributed Thermal
-            "DISTRIBUTED_DIESEL": "#8B4513",    # Saddle Brown - Distributed Diesel
-            "DISTRIBUTED_GENERATION": "#32CD32", # Lime Green - Other Distributed
-            "HYDROELECTRIC": "#1E90FF",         # Dodger Blue - Hydroelectric
-            "WIND": "#87CEEB",                  # Sky Blue - Wind Power
-            "COAL": "#2F4F4F",                  # Dark Slate Gray - Coal
-            "NATURAL_GAS": "#4169E1",           # Royal Blue - Natural Gas
-            "NUCLEAR": "#FF1493",               # Deep Pink - Nuclear
-            "UNKNOWN": "#808080"                # Gray - Unknown/Unclassified
-        },
+        "plant_color_scheme": dict(PLANT_COLOR_SCHEME),
         "color_scheme_notes": "Colors assigned based on plant type and energy source for visual differentiation in charts and dashboards"
     }
 
@@ -140,12 +149,11 @@ def find_pdf_file():
     return None
 
 def extract_page_text(document_path: str, page_num: int) -> str:
-    """Extract text from single page using PyPDF2"""
+    """Extract text from single page using PyPDF2 (pooled reader, memoized per page)"""
     try:
-        reader = PdfReader(document_path)
-        if 1 <= page_num <= len(reader.pages):
-            page = reader.pages[page_num - 1]
-            return page.extract_text().strip()
+        provider = get_text_provider(document_path, engine='pypdf2')
+        if 1 <= page_num <= provider.page_count:
+            return provider.text(page_num).strip()
         return ""
     except Exception as e:
         print(f"Error extracting page {page_num}: {e}")
@@ -482,50 +490,26 @@ def extract_colors_from_page(document_path: str, page_num: int) -> Dict:
             page = doc[page_num - 1]
 
             # High resolution for color detection
-            mat = fitz.Matrix(3, 3)  # 216 DPI
-            pix = page.get_pixmap(matrix=mat)
-
-            # Convert to numpy array for color analysis
-            # Handle both RGB and RGBA formats
-            if pix.n == 4:  # RGBA
-                img_data = np.frombuffer(pix.tobytes(), dtype=np.uint8).reshape(pix.height, pix.width, 4)
-                # Convert RGBA to RGB by dropping alpha channel
-                img_data = img_data[:, :, :3]
-            elif pix.n == 3:  # RGB
-                img_data = np.frombuffer(pix.tobytes(), dtype=np.uint8).reshape(pix.height, pix.width, 3)
-            else:
-                print(f"⚠️  Unsupported color format: {pix.n} channels")
+            raster = PageRaster.from_page(page, zoom=3)  # 216 DPI
+            if raster.channels < 3:
+                print(f"⚠️  Unsupported color format: {raster.channels} channels")
+                doc.close()
                 return {}
 
-            # Find dominant colors (excluding white/near-white background)
-            unique_colors = {}
-            h, w, _ = img_data.shape
-
-            # Sample colors from the image, focusing on non-white areas
-            for y in range(0, h, 20):  # Sample every 20 pixels
-                for x in range(0, w, 20):
-                    r, g, b = img_data[y, x]
+            # Sample every 20 pixels, skipping near-white (background) and
+            # near-black (text) pixels; colors counted with np.unique
+            colors, counts = raster.color_histogram(step=20, white_threshold=240, black_threshold=20)
+            dominant_colors = raster.dominant_colors(top=10, min_count=50, histogram=(colors, counts))
 
-                    # Skip near-white colors (likely background)
-                    if r > 240 and g > 240 and b > 240:
-                        continue
-
-                    # Skip near-black colors (likely text)
-                    if r < 20 and g < 20 and b < 20:
-                        continue
-
-                    color_hex = f"#{r:02x}{g:02x}{b:02x}"
-                    unique_colors[color_hex] = unique_colors.get(color_hex, 0) + 1
-
-            # Get the most common non-text colors
-            sorted_colors = sorted(unique_colors.items(), key=lambda x: x[1], reverse=True)
-            dominant_colors = [color for color, count in sorted_colors[:10] if count > 50]
+            # Pixel coverage of each plant-type legend color on the chart
+            plant_type_coverage = raster.legend_coverage(PLANT_COLOR_SCHEME, step=4)
 
             doc.close()
             return {
                 "page_colors": dominant_colors,
+                "plant_type_coverage": {k: v for k, v in plant_type_coverage.items() if v > 0},
                 "color_analysis": "extracted_from_pdf_visuals",
-                "total_unique_colors": len(unique_colors)
+                "total_unique_colors": int(len(colors))
             }
 
         doc.close()
@@ -623,6 +607,9 @@ def extract_real_generation_data(page_text: str, ocr_text: str, page_num: int, d
     # Combine raw and OCR text for better coverage
     combined_text = page_text + "\n" + ocr_text
     lines = combined_text.split('\n')
+
+    # Rendered-page colors are the same for every plant on the page; compute once
+    page_colors = None
     
     def convert_to_float(value_str):
         """Convert comma decimal to float"""
@@ -713,7 +700,8 @@ def extract_real_generation_data(page_text: str, ocr_text: str, page_num: int, d
 
                     # Fourth priority: Fallback to PDF visual colors
                     if color_source == "default":
-                        page_colors = extract_colors_from_page(document_path, page_num)
+                        if page_colors is None:
+                            page_colors = extract_colors_from_page(document_path, page_num)
                         detected_colors = page_colors.get('page_colors', [])
 
                         if detected_colors:
@@ -945,12 +933,16 @@ def process_page(page_num: int, document_path: str) -> Dict:
     
     # Extract actual colors from PDF graphics and text
     actual_pdf_colors = extract_actual_pdf_colors(document_path, page_num)
-    page_colors = extract_colors_from_page(document_path, page_num)
     text_colors = extract_colors_via_text_analysis(raw_text + "\n" + ocr_text)
 
     # Extract generation data (which includes comprehensive metadata)
     extracted_data = extract_real_generation_data(raw_text, ocr_text, page_num, document_path)
 
+    # Plant and system hourly series into the day-partitioned series store
+    stored = get_series_store().append_anexo_02(extracted_data)
+    if stored:
+        print(f"   📈 Series store: {stored} hourly series")
+
     # Reorganize: Move document_metadata to top and simplify color analysis
     if 'document_metadata' in extracted_data:
         document_metadata = extracted_data.pop('document_metadata')
@@ -965,6 +957,8 @@ def process_page(page_num: int, document_path: str) -> Dict:
             'extraction_quality': extracted_data.get('extraction_quality', {}),
             'data_type': extracted_data.get('data_type')
         }
+        if extracted_data.get('system_summary_data'):
+            reordered_data['system_summary_data'] = extracted_data['system_summary_data']
         extracted_data = reordered_data
 
     # Add simplified color information (only essential data)
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+INFORME DIARIO Table Tokenizer Benchmark
+========================================
+
+Parity check and timing of the compiled tokenizer + state machine
+(informe_diario_tokenizer.py) against the previous line-by-line regex parser
+of detect_table_structure, over the 34 daily report pages (101-134).
+
+Compares power_plants, left_table, right_table and detected_headers page by
+page. A synthetic page covering every token kind (known prefixes, PMGD,
+general names, markers, (*) percentages, blanks, boundaries, > 25 plants) is
+always checked, so the script also runs without the source PDF.
+
+Usage:
+    python benchmark_table_tokenizer.py              # synthetic page + PDF pages 101-134
+    python benchmark_table_tokenizer.py --repeat 50  # more timing iterations
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from informe_diario_tokenizer import tokenize_lines, parse_plant_tables, detect_headers
+
+PAGES = list(range(101, 135))
+
+
+def legacy_table_structure(raw_text: str) -> Dict:
+    """Reference copy of the line-by-line regex parser that the tokenizer replaced"""
+    tables = {
+        "power_plants": [],
+        "left_table": [],
+        "right_table": []
+    }
+
+    lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
+
+    # Process multi-line power plant data structure
+    i = 0
+    current_table_side = "left"  # Track which table we're processing
+    plant_count = 0  # Count plants to help detect table switch
+
+    while i < len(lines):
+        line = lines[i]
+
+        # Look for plant name pattern - flexible approach with PMGD support
+        # First try known prefixes (for better classification)
+        known_prefix_match = re.match(r'^(PE|PFV|PEO|CTM|CTH|CTA|TER|U)\s+(.+)$', line)
+
+        # Try PMGD pattern (Pequeños Medios de Generación Distribuida)
+        pmgd_match = re.match(r'^(PMGD\s+[A-Z]+)\s+(.+)$', line, re.IGNORECASE)
+
+        # Also try general plant name pattern (any capitalized name followed by data)
+        general_plant_match = None
+        if not known_prefix_match and not pmgd_match:
+            # Look for potential plant names: starts with capital, not just a code, has substance
+            if (re.match(r'^[A-Z]', line) and
+                len(line) > 4 and
+                not re.match(r'^[A-Z]{1,3}$', line) and  # Not estado codes like RO, GNP
+                not line in ['Centrales', 'Prog.', 'Desv %', 'Estado', 'Real'] and  # Not headers
+                not re.match(r'^\(\*\)', line) and  # Not markers
+                not re.match(r'^[\+\-]?\d+\.?\d*\s*%?$', line)):  # Not percentages
+
+                # Check if followed by numerical data (indicates it's a plant)
+                if i + 1 < len(lines) and re.match(r'^\d+\.?\d*$', lines[i + 1]):
+                    general_plant_match = re.match(r'^(.+)$', line)
+
+        plant_match = known_prefix_match or pmgd_match or general_plant_match
+        if plant_match:
+            if known_prefix_match:
+                # Extract type and name from known prefix pattern
+                plant_type = known_prefix_match.group(1)
+                plant_name = known_prefix_match.group(2).strip()
+            elif pmgd_match:
+                # Extract PMGD type and name
+                pmgd_full_type = pmgd_match.group(1).upper()  # e.g., "PMGD PFV"
+                plant_name = pmgd_match.group(2).strip()
+
+                # Extract the actual plant type from PMGD designation
+                if 'PFV' in pmgd_full_type:
+                    plant_type = "PFV"  # Solar
+                elif 'PE' in pmgd_full_type or 'PEO' in pmgd_full_type:
+                    plant_type = "PEO"  # Wind
+                elif 'HID' in pmgd_full_type:
+                    plant_type = "HID"  # Hydro
+                else:
+                    plant_type = "PMGD"  # Generic PMGD
+
+                # Add PMGD designation to name for clarity
+                plant_name = f"PMGD {plant_name}"
+            else:
+                # General plant - try to extract type from name or use "UNKNOWN"
+                full_name = general_plant_match.group(1).strip()
+                # Try to infer type from name patterns
+                if any(word in full_name.upper() for word in ['SOLAR', 'FOTOVOLTAICA', 'PV']):
+                    plant_type = "PFV"
+                    plant_name = full_name
+                elif any(word in full_name.upper() for word in ['EOLICA', 'WIND', 'VIENTO']):
+                    plant_type = "PEO"
+                    plant_name = full_name
+                elif any(word in full_name.upper() for word in ['TERMICA', 'THERMAL', 'GAS', 'DIESEL', 'CARBON']):
+                    plant_type = "TER"
+                    plant_name = full_name
+                elif any(word in full_name.upper() for word in ['HIDRO', 'HYDRO']):
+                    plant_type = "HID"
+                    plant_name = full_name
+                else:
+                    plant_type = "UNKNOWN"
+                    plant_name = full_name
+
+            plant_count += 1
+
+            # Detect table side based on plant type and position
+            # TER plants typically appear in the right table
+            # Also use plant count as heuristic (after ~25 plants, likely right table)
+            if plant_type == "TER" or plant_count > 25:
+                current_table_side = "right"
+
+            # Initialize plant data
+            plant_data = {
+                "plant_type": plant_type,
+                "plant_name": plant_name,
+                "programmed_mwh": None,
+                "real_mwh": None,
+                "percentage_diff": None,
+                "estado": None,
+                "table_side": current_table_side,
+                "special_markers": [],
+                "comments": [],
+                "raw_lines": [line]
+            }
+
+            # Look ahead for the data values (programmed, real, percentage, estado)
+            j = i + 1
+            values_found = []
+
+            while j < len(lines) and j < i + 6:  # Look at next 5 lines max
+                next_line = lines[j]
+
+                # Check if this is another plant (stop processing current plant)
+                if (re.match(r'^(PE|PFV|PEO|CTM|CTH|CTA|TER|U)\s+(.+)$', next_line) or
+                    re.match(r'^(PMGD\s+[A-Z]+)\s+(.+)$', next_line, re.IGNORECASE)):
+                    break
+
+                # Check for programmed value (number with possible markers)
+                number_with_marker = re.match(r'^(\d+\.?\d*)([*†‡§¶#@]+)?$', next_line)
+                if number_with_marker:
+                    value = float(number_with_marker.group(1))
+                    marker = number_with_marker.group(2)
+                    if marker:
+                        plant_data["special_markers"].append({
+                            "type": "programmed_value",
+                            "marker": marker,
+                            "position": "after_number"
+                        })
+                        plant_data["comments"].append(f"Programmed value has marker: {marker}")
+
+                    values_found.append(('number', value, next_line))
+                    plant_data["raw_lines"].append(next_line)
+
+                # Check for percentage with possible markers - including (*) format
+                elif re.match(r'^(\(\*\))?\s*([\+\-]?\d+\.?\d*)\s*%?([*†‡§¶#@]+)?$', next_line):
+                    percentage_match = re.match(r'^(\(\*\))?\s*([\+\-]?\d+\.?\d*)\s*%?([*†‡§¶#@]+)?$', next_line)
+                    prefix_marker = percentage_match.group(1)  # (*) at beginning
+                    percentage = float(re.sub(r'[%\s*†‡§¶#@()]', '', percentage_match.group(2)))
+                    suffix_marker = percentage_match.group(3)  # markers after percentage
+
+                    if prefix_marker:
+                        plant_data["special_markers"].append({
+                            "type": "percentage",
+                            "marker": prefix_marker,
+                            "position": "before_percentage"
+                        })
+                        plant_data["comments"].append(f"Percentage has prefix marker: {prefix_marker}")
+
+                    if suffix_marker:
+                        plant_data["special_markers"].append({
+                            "type": "percentage",
+                            "marker": suffix_marker,
+                            "position": "after_percentage"
+                        })
+                        plant_data["comments"].append(f"Percentage has suffix marker: {suffix_marker}")
+
+                    values_found.append(('percentage', percentage, next_line))
+                    plant_data["raw_lines"].append(next_line)
+
+                # Check for standard percentage without special markers
+                elif re.match(r'^([\+\-]?\d+\.?\d*)\s*%?$', next_line):
+                    percentage = float(re.sub(r'[%\s]', '', next_line))
+                    values_found.append(('percentage', percentage, next_line))
+                    plant_data["raw_lines"].append(next_line)
+
+                # Check for special marker lines (just symbols)
+                elif re.match(r'^[*†‡§¶#@]+$', next_line):
+                    plant_data["special_markers"].append({
+                        "type": "standalone_marker",
+                        "marker": next_line,
+                        "position": "separate_line"
+                    })
+                    plant_data["comments"].append(f"Has special marker: {next_line}")
+                    plant_data["raw_lines"].append(next_line)
+
+                # Check for Estado (state codes like RO, FU, etc.)
+                elif re.match(r'^[A-Z]{2,3}$', next_line) and len(next_line) <= 3:
+                    plant_data["estado"] = next_line
+                    plant_data["raw_lines"].append(next_line)
+
+                # Check for blank/empty lines or dashes (missing data)
+                elif next_line in ['-', '--', '', 'N/A', 'n/a', '*']:
+                    if next_line == '*':
+                        plant_data["special_markers"].append({
+                            "type": "missing_data",
+                            "marker": "*",
+                            "position": "replacement"
+                        })
+                        plant_data["comments"].append("Data replaced with * (missing/unavailable)")
+                    elif next_line == '-':
+                        plant_data["comments"].append("Data marked as unavailable with -")
+
+                    values_found.append(('blank', None, next_line))
+                    plant_data["raw_lines"].append(next_line)
+
+                j += 1
+
+            # Process the found values
+            numbers = [v for v in values_found if v[0] == 'number']
+            percentages = [v for v in values_found if v[0] == 'percentage']
+            blanks = [v for v in values_found if v[0] == 'blank']
+
+            # Assign values based on what we found
+            if len(numbers) >= 2:
+                plant_data["programmed_mwh"] = numbers[0][1]
+                plant_data["real_mwh"] = numbers[1][1]
+            elif len(numbers) == 1:
+                # Only one number found, could be programmed or real
+                plant_data["programmed_mwh"] = numbers[0][1]
+                # Check if there's a blank indicating missing real value
+                if blanks:
+                    plant_data["real_mwh"] = None
+
+            if percentages:
+                plant_data["percentage_diff"] = percentages[0][1]
+
+            # Calculate efficiency ratio if we have both values
+            if plant_data["programmed_mwh"] and plant_data["real_mwh"]:
+                plant_data["efficiency_ratio"] = plant_data["real_mwh"] / plant_data["programmed_mwh"]
+            else:
+                plant_data["efficiency_ratio"] = None
+
+            # Add source_type classification to plant_data
+            plant_data["source_type"] = (
+                "solar" if plant_type == "PFV" else
+                "wind" if plant_type in ["PE", "PEO"] else
+                "hydro" if plant_type == "HID" else
+                "thermal" if plant_type in ["CTM", "CTH", "CTA", "TER"] else
+                "distributed" if plant_type == "PMGD" else
+                "unknown"
+            )
+
+            # Add to appropriate table
+            tables["power_plants"].append(plant_data)
+            if current_table_side == "left":
+                tables["left_table"].append(plant_data)
+            else:
+                tables["right_table"].append(plant_data)
+
+            # Skip the processed lines
+            i = j
+            continue
+
+        # Check for table boundary indicators (might help detect left vs right)
+        elif line in ['TABLA IZQUIERDA', 'TABLA DERECHA', '|', '||'] or len(line) > 50:
+            current_table_side = "right" if "derecha" in line.lower() or current_table_side == "left" else "left"
+
+        i += 1
+
+    # Look for table headers and summary sections
+    potential_headers = []
+    for i, line in enumerate(lines):
+        # Detect potential table headers
+        if any(keyword in line.lower() for keyword in
+               ['programado', 'real', 'diferencia', 'porcentaje', '%', 'mwh', 'mw', 'total', 'subtotal']):
+
+            # Check if it's not just a percentage value
+            if not re.match(r'^[\+\-]?\d+\.?\d*\s*%?$', line.strip()):
+                potential_headers.append({
+                    "line_number": i,
+                    "header_text": line,
+                    "columns": line.split()
+                })
+
+    tables["detected_headers"] = potential_headers
+    return tables
+
+
+def tokenized_table_structure(raw_text: str) -> Dict:
+    """Same fields as legacy_table_structure, built with the tokenizer"""
+    lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
+    tokens = tokenize_lines(lines)
+    power_plants, left_table, right_table = parse_plant_tables(tokens)
+    return {
+        "power_plants": power_plants,
+        "left_table": left_table,
+        "right_table": right_table,
+        "detected_headers": detect_headers(tokens)
+    }
+
+
+def synthetic_page() -> str:
+    """Section 1 page exercising every token kind and state transition"""
+    lines = [
+        "1DESVIACIONES DE LA PROGRAMACION",
+        "Centrales", "Prog.", "Real", "Desv %", "Estado",
+        "Total programado MWh",
+        "PFV EL ROMERO", "120.5", "98.2", "-18.5%", "RO",
+        "PE CANELA II", "45*", "50.1", "(*) 11.3", "FU",
+        "PMGD PFV LAS PALMAS", "3.2", "-", "*",
+        "pmgd hid los lirios", "1.5", "1.4", "-6.7 %", "GNP",
+        "PMGD XYZ ALTO", "N/A", "--",
+        "Parque Solar Atacama", "80", "79.5", "-0.6", "RO",
+        "CENTRAL VIENTO SUR", "12.0", "0", "+3.0%†",
+        "Central Hidro Maule", "7.7", "7.7", "0.0",
+        "Planta Diesel Norte", "4", "", "RO",
+        "LA CONFLUENCIA", "15.0", "14.1", "‡",
+        "Comentario sin datos",
+        "U 16 RENCA", "100", "101", "1%", "RO", "extra", "PE OTRA",
+        "RO", "|",
+        "CTM TOCOPILLA", "200.0", "190.0", "-5.0", "RO",
+        "TABLA IZQUIERDA",
+        "CTA ANGAMOS", "300", "3", "PE", "X"
+    ]
+    lines.append("Linea muy larga que supera los cincuenta caracteres y marca un limite de tabla")
+    lines += ["TER NEHUENCO", "350.5", "340.1", "-3.0", "RO", "TABLA DERECHA"]
+    for n in range(30):
+        lines += [f"PFV SOLAR {n}", f"{n}.5", f"{n + 1}", f"{n % 7 - 3}%", "RO"]
+    return "\n".join(lines)
+
+
+def find_pdf() -> Path:
+    """Source PDF, same locations as informe_diario_processor.main()"""
+    project_root = Path(__file__).parent.parent.parent.parent.parent
+    candidates = [
+        project_root / "data" / "documents" / "anexos_EAF" / "raw" / "Anexos-EAF-089-2025.pdf",
+        project_root / "data" / "documents" / "power_system_reports" / "anexos_EAF" / "Anexos-EAF-089-2025.pdf"
+    ]
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def load_pages(pdf_path: Path) -> Dict[int, str]:
+    """Raw text of pages 101-134 as process_pdf_page reads it"""
+    import fitz  # PyMuPDF
+    doc = fitz.open(str(pdf_path))
+    try:
+        return {page: doc.load_page(page - 1).get_text() for page in PAGES if page <= len(doc)}
+    finally:
+        doc.close()
+
+
+def check_parity(name: str, raw_text: str) -> List[str]:
+    """Differences between both parsers for one page (empty list = identical)"""
+    legacy = legacy_table_structure(raw_text)
+    tokenized = tokenized_table_structure(raw_text)
+
+    problems = []
+    for key in ["power_plants", "left_table", "right_table", "detected_headers"]:
+        if legacy[key] != tokenized[key]:
+            problems.append(f"{name}: {key} differs ({len(legacy[key])} legacy vs {len(tokenized[key])} tokenized)")
+    return problems
+
+
+def time_parser(parser, texts: List[str], repeat: int) -> float:
+    """Best wall time in seconds for one pass over all texts"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            parser(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeat = 20
+    if "--repeat" in sys.argv:
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1])
+
+    print("🔬 INFORME DIARIO TABLE TOKENIZER BENCHMARK")
+    print("=" * 60)
+
+    pages = {"synthetic": synthetic_page()}
+    pdf_path = find_pdf()
+    if pdf_path:
+        print(f"📄 PDF: {pdf_path.name}")
+        pages.update({f"page {page}": text for page, text in load_pages(pdf_path).items()})
+    else:
+        print("⚠️  Source PDF not found, checking the synthetic page only")
+
+    problems = []
+    total_plants = 0
+    for name, raw_text in pages.items():
+        problems += check_parity(name, raw_text)
+        total_plants += len(tokenized_table_structure(raw_text)["power_plants"])
+
+    print(f"📊 Pages checked: {len(pages)}  |  Plants parsed: {total_plants}")
+    if problems:
+        print(f"❌ Parity FAILED on {len(problems)} check(s):")
+        for problem in problems:
+            print(f"   - {problem}")
+    else:
+        print("✅ Parity OK: power_plants, left_table, right_table and detected_headers identical")
+
+    texts = list(pages.values())
+    legacy_time = time_parser(legacy_table_structure, texts, repeat)
+    tokenized_time = time_parser(tokenized_table_structure, texts, repeat)
+
+    print(f"\n⏱️  Best of {repeat} passes over {len(texts)} page(s):")
+    print(f"   Legacy regex parser: {legacy_time * 1000:8.2f} ms")
+    print(f"   Tokenizer + state machine: {tokenized_time * 1000:8.2f} ms")
+    if tokenized_time > 0:
+        print(f"   Speedup: {legacy_time / tokenized_time:.2f}x")
+
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
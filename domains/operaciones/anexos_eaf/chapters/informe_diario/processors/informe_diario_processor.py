@@ -51,6 +51,14 @@ except ImportError as e:
     import cv2
     import numpy as np
 
+# Vectorized raster analysis shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from raster_analysis import PageRaster
+
+# Compiled line tokenizer for section 1-8 parsing (same directory)
+sys.path.append(str(Path(__file__).parent))
+from informe_diario_tokenizer import SECTION_PATTERNS, tokenize_lines, parse_plant_tables, detect_headers
+
 def extract_date_info(raw_text: str) -> Dict:
     """Extract date and time information from the daily report"""
     date_info = {
@@ -145,7 +153,7 @@ def detect_abbreviations(raw_text: str) -> Dict:
             for i in range(max(0, abbrev_line_index - 20), abbrev_line_index):
                 line = lines[i]
                 # Pattern: ABC:Definition (with colon) - allow single character codes too
-                abbrev_match = re.match(r'^([A-Z]{1,4}):(.+)$', line)
+                abbrev_match = SECTION_PATTERNS["abbreviation"].match(line)
                 if abbrev_match:
                     abbrev_code = abbrev_match.group(1)
                     definition = abbrev_match.group(2).strip()
@@ -158,7 +166,7 @@ def detect_abbreviations(raw_text: str) -> Dict:
         # Also try general abbreviation extraction for any page
         for line in lines:
             # Pattern: ABC:Definition (with colon) - allow single character codes too
-            abbrev_match = re.match(r'^([A-Z]{1,4}):(.+)$', line)
+            abbrev_match = SECTION_PATTERNS["abbreviation"].match(line)
             if abbrev_match:
                 abbrev_code = abbrev_match.group(1)
                 definition = abbrev_match.group(2).strip()
@@ -175,7 +183,7 @@ def detect_abbreviations(raw_text: str) -> Dict:
     for line in lines:
         if 'pmgd' in line.lower():
             # Extract PMGD plant information
-            pmgd_match = re.match(r'^(PMGD\s+[A-Z]+)\s+(.+)$', line, re.IGNORECASE)
+            pmgd_match = SECTION_PATTERNS["pmgd_plant"].match(line)
             if pmgd_match:
                 pmgd_type = pmgd_match.group(1).upper()
                 pmgd_name = pmgd_match.group(2).strip()
@@ -200,263 +208,17 @@ def detect_table_structure(raw_text: str) -> Dict:
 
     lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
 
-    # Process multi-line power plant data structure
-    i = 0
-    current_table_side = "left"  # Track which table we're processing
-    plant_count = 0  # Count plants to help detect table switch
-
-    while i < len(lines):
-        line = lines[i]
-
-        # Look for plant name pattern - flexible approach with PMGD support
-        # First try known prefixes (for better classification)
-        known_prefix_match = re.match(r'^(PE|PFV|PEO|CTM|CTH|CTA|TER|U)\s+(.+)$', line)
-
-        # Try PMGD pattern (Pequeños Medios de Generación Distribuida)
-        pmgd_match = re.match(r'^(PMGD\s+[A-Z]+)\s+(.+)$', line, re.IGNORECASE)
-
-        # Also try general plant name pattern (any capitalized name followed by data)
-        general_plant_match = None
-        if not known_prefix_match and not pmgd_match:
-            # Look for potential plant names: starts with capital, not just a code, has substance
-            if (re.match(r'^[A-Z]', line) and
-                len(line) > 4 and
-                not re.match(r'^[A-Z]{1,3}$', line) and  # Not estado codes like RO, GNP
-                not line in ['Centrales', 'Prog.', 'Desv %', 'Estado', 'Real'] and  # Not headers
-                not re.match(r'^\(\*\)', line) and  # Not markers
-                not re.match(r'^[\+\-]?\d+\.?\d*\s*%?$', line)):  # Not percentages
-
-                # Check if followed by numerical data (indicates it's a plant)
-                if i + 1 < len(lines) and re.match(r'^\d+\.?\d*$', lines[i + 1]):
-                    general_plant_match = re.match(r'^(.+)$', line)
-
-        plant_match = known_prefix_match or pmgd_match or general_plant_match
-        if plant_match:
-            if known_prefix_match:
-                # Extract type and name from known prefix pattern
-                plant_type = known_prefix_match.group(1)
-                plant_name = known_prefix_match.group(2).strip()
-            elif pmgd_match:
-                # Extract PMGD type and name
-                pmgd_full_type = pmgd_match.group(1).upper()  # e.g., "PMGD PFV"
-                plant_name = pmgd_match.group(2).strip()
-
-                # Extract the actual plant type from PMGD designation
-                if 'PFV' in pmgd_full_type:
-                    plant_type = "PFV"  # Solar
-                elif 'PE' in pmgd_full_type or 'PEO' in pmgd_full_type:
-                    plant_type = "PEO"  # Wind
-                elif 'HID' in pmgd_full_type:
-                    plant_type = "HID"  # Hydro
-                else:
-                    plant_type = "PMGD"  # Generic PMGD
-
-                # Add PMGD designation to name for clarity
-                plant_name = f"PMGD {plant_name}"
-            else:
-                # General plant - try to extract type from name or use "UNKNOWN"
-                full_name = general_plant_match.group(1).strip()
-                # Try to infer type from name patterns
-                if any(word in full_name.upper() for word in ['SOLAR', 'FOTOVOLTAICA', 'PV']):
-                    plant_type = "PFV"
-                    plant_name = full_name
-                elif any(word in full_name.upper() for word in ['EOLICA', 'WIND', 'VIENTO']):
-                    plant_type = "PEO"
-                    plant_name = full_name
-                elif any(word in full_name.upper() for word in ['TERMICA', 'THERMAL', 'GAS', 'DIESEL', 'CARBON']):
-                    plant_type = "TER"
-                    plant_name = full_name
-                elif any(word in full_name.upper() for word in ['HIDRO', 'HYDRO']):
-                    plant_type = "HID"
-                    plant_name = full_name
-                else:
-                    plant_type = "UNKNOWN"
-                    plant_name = full_name
-
-            plant_count += 1
-
-            # Detect table side based on plant type and position
-            # TER plants typically appear in the right table
-            # Also use plant count as heuristic (after ~25 plants, likely right table)
-            if plant_type == "TER" or plant_count > 25:
-                current_table_side = "right"
-
-            # Initialize plant data
-            plant_data = {
-                "plant_type": plant_type,
-                "plant_name": plant_name,
-                "programmed_mwh": None,
-                "real_mwh": None,
-                "percentage_diff": None,
-                "estado": None,
-                "table_side": current_table_side,
-                "special_markers": [],
-                "comments": [],
-                "raw_lines": [line]
-            }
-
-            # Look ahead for the data values (programmed, real, percentage, estado)
-            j = i + 1
-            values_found = []
-
-            while j < len(lines) and j < i + 6:  # Look at next 5 lines max
-                next_line = lines[j]
-
-                # Check if this is another plant (stop processing current plant)
-                if (re.match(r'^(PE|PFV|PEO|CTM|CTH|CTA|TER|U)\s+(.+)$', next_line) or
-                    re.match(r'^(PMGD\s+[A-Z]+)\s+(.+)$', next_line, re.IGNORECASE)):
-                    break
-
-                # Check for programmed value (number with possible markers)
-                number_with_marker = re.match(r'^(\d+\.?\d*)([*†‡§¶#@]+)?$', next_line)
-                if number_with_marker:
-                    value = float(number_with_marker.group(1))
-                    marker = number_with_marker.group(2)
-                    if marker:
-                        plant_data["special_markers"].append({
-                            "type": "programmed_value",
-                            "marker": marker,
-                            "position": "after_number"
-                        })
-                        plant_data["comments"].append(f"Programmed value has marker: {marker}")
-
-                    values_found.append(('number', value, next_line))
-                    plant_data["raw_lines"].append(next_line)
-
-                # Check for percentage with possible markers - including (*) format
-                elif re.match(r'^(\(\*\))?\s*([\+\-]?\d+\.?\d*)\s*%?([*†‡§¶#@]+)?$', next_line):
-                    percentage_match = re.match(r'^(\(\*\))?\s*([\+\-]?\d+\.?\d*)\s*%?([*†‡§¶#@]+)?$', next_line)
-                    prefix_marker = percentage_match.group(1)  # (*) at beginning
-                    percentage = float(re.sub(r'[%\s*†‡§¶#@()]', '', percentage_match.group(2)))
-                    suffix_marker = percentage_match.group(3)  # markers after percentage
-
-                    if prefix_marker:
-                        plant_data["special_markers"].append({
-                            "type": "percentage",
-                            "marker": prefix_marker,
-                            "position": "before_percentage"
-                        })
-                        plant_data["comments"].append(f"Percentage has prefix marker: {prefix_marker}")
-
-                    if suffix_marker:
-                        plant_data["special_markers"].append({
-                            "type": "percentage",
-                            "marker": suffix_marker,
-                            "position": "after_percentage"
-                        })
-                        plant_data["comments"].append(f"Percentage has suffix marker: {suffix_marker}")
-
-                    values_found.append(('percentage', percentage, next_line))
-                    plant_data["raw_lines"].append(next_line)
-
-                # Check for standard percentage without special markers
-                elif re.match(r'^([\+\-]?\d+\.?\d*)\s*%?$', next_line):
-                    percentage = float(re.sub(r'[%\s]', '', next_line))
-                    values_found.append(('percentage', percentage, next_line))
-                    plant_data["raw_lines"].append(next_line)
-
-                # Check for special marker lines (just symbols)
-                elif re.match(r'^[*†‡§¶#@]+$', next_line):
-                    plant_data["special_markers"].append({
-                        "type": "standalone_marker",
-                        "marker": next_line,
-                        "position": "separate_line"
-                    })
-                    plant_data["comments"].append(f"Has special marker: {next_line}")
-                    plant_data["raw_lines"].append(next_line)
-
-                # Check for Estado (state codes like RO, FU, etc.)
-                elif re.match(r'^[A-Z]{2,3}$', next_line) and len(next_line) <= 3:
-                    plant_data["estado"] = next_line
-                    plant_data["raw_lines"].append(next_line)
-
-                # Check for blank/empty lines or dashes (missing data)
-                elif next_line in ['-', '--', '', 'N/A', 'n/a', '*']:
-                    if next_line == '*':
-                        plant_data["special_markers"].append({
-                            "type": "missing_data",
-                            "marker": "*",
-                            "position": "replacement"
-                        })
-                        plant_data["comments"].append("Data replaced with * (missing/unavailable)")
-                    elif next_line == '-':
-                        plant_data["comments"].append("Data marked as unavailable with -")
-
-                    values_found.append(('blank', None, next_line))
-                    plant_data["raw_lines"].append(next_line)
-
-                j += 1
-
-            # Process the found values
-            numbers = [v for v in values_found if v[0] == 'number']
-            percentages = [v for v in values_found if v[0] == 'percentage']
-            blanks = [v for v in values_found if v[0] == 'blank']
-
-            # Assign values based on what we found
-            if len(numbers) >= 2:
-                plant_data["programmed_mwh"] = numbers[0][1]
-                plant_data["real_mwh"] = numbers[1][1]
-            elif len(numbers) == 1:
-                # Only one number found, could be programmed or real
-                plant_data["programmed_mwh"] = numbers[0][1]
-                # Check if there's a blank indicating missing real value
-                if blanks:
-                    plant_data["real_mwh"] = None
-
-            if percentages:
-                plant_data["percentage_diff"] = percentages[0][1]
-
-            # Calculate efficiency ratio if we have both values
-            if plant_data["programmed_mwh"] and plant_data["real_mwh"]:
-                plant_data["efficiency_ratio"] = plant_data["real_mwh"] / plant_data["programmed_mwh"]
-            else:
-                plant_data["efficiency_ratio"] = None
-
-            # Add source_type classification to plant_data
-            plant_data["source_type"] = (
-                "solar" if plant_type == "PFV" else
-                "wind" if plant_type in ["PE", "PEO"] else
-                "hydro" if plant_type == "HID" else
-                "thermal" if plant_type in ["CTM", "CTH", "CTA", "TER"] else
-                "distributed" if plant_type == "PMGD" else
-                "unknown"
-            )
-
-            # Add to appropriate table
-            tables["power_plants"].append(plant_data)
-            if current_table_side == "left":
-                tables["left_table"].append(plant_data)
-            else:
-                tables["right_table"].append(plant_data)
-
-            # Skip the processed lines
-            i = j
-            continue
-
-        # Check for table boundary indicators (might help detect left vs right)
-        elif line in ['TABLA IZQUIERDA', 'TABLA DERECHA', '|', '||'] or len(line) > 50:
-            current_table_side = "right" if "derecha" in line.lower() or current_table_side == "left" else "left"
-
-        i += 1
+    # Classify every line once, then walk the tokens with the table state machine
+    # (known prefix / PMGD / general plant names, value look-ahead, left/right side)
+    tokens = tokenize_lines(lines)
+    tables["power_plants"], tables["left_table"], tables["right_table"] = parse_plant_tables(tokens)
 
     # Extract abbreviations information
     abbreviations_data = detect_abbreviations(raw_text)
     tables["abbreviations"] = abbreviations_data
 
     # Look for table headers and summary sections
-    potential_headers = []
-    for i, line in enumerate(lines):
-        # Detect potential table headers
-        if any(keyword in line.lower() for keyword in
-               ['programado', 'real', 'diferencia', 'porcentaje', '%', 'mwh', 'mw', 'total', 'subtotal']):
-
-            # Check if it's not just a percentage value
-            if not re.match(r'^[\+\-]?\d+\.?\d*\s*%?$', line.strip()):
-                potential_headers.append({
-                    "line_number": i,
-                    "header_text": line,
-                    "columns": line.split()
-                })
+    potential_headers = detect_headers(tokens)
 
     tables["detected_headers"] = potential_headers
 
@@ -655,7 +417,7 @@ def detect_section_info(raw_text: str, page_number: int) -> Dict:
 
     for line in lines[:20]:  # Check first 20 lines for section headers
         # Main sections: "1TITLE", "2TITLE", etc. - allow uppercase letters and symbols
-        main_section_match = re.match(r'^([0-9]+)([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s\(\)\*]+)$', line)
+        main_section_match = SECTION_PATTERNS["main_section"].match(line)
         if main_section_match:
             section_info["section_number"] = main_section_match.group(1)
             section_info["section_title"] = main_section_match.group(2).strip()
@@ -663,7 +425,7 @@ def detect_section_info(raw_text: str, page_number: int) -> Dict:
             break
 
         # Subsections: "1.1. Title", "3.2. Title", etc.
-        sub_section_match = re.match(r'^([0-9]+\.[0-9]+\.)\s*([A-Za-záéíóúñ\s]+)$', line)
+        sub_section_match = SECTION_PATTERNS["sub_section"].match(line)
         if sub_section_match:
             section_info["subsection_number"] = sub_section_match.group(1)
             section_info["subsection_title"] = sub_section_match.group(2).strip()
@@ -700,7 +462,7 @@ def extract_section_2_justifications(raw_text: str) -> Dict:
         line = lines[i]
 
         # Look for plant names (patterns like "HE Plant", "PE Plant", "PFV Plant", "TER Plant")
-        plant_match = re.match(r'^(HE|HP|PE|PEO|PFV|TER|CTM|CTH|CTA)\s+(.+)$', line)
+        plant_match = SECTION_PATTERNS["justification_plant"].match(line)
         if plant_match:
             plant_type = plant_match.group(1)
             plant_name = plant_match.group(2).strip()
@@ -742,7 +504,7 @@ def extract_section_3_status(raw_text: str) -> Dict:
 
     # Detect subsection
     for line in lines[:10]:
-        if re.match(r'^3\.[0-9]+\.', line):
+        if SECTION_PATTERNS["subsection_3"].match(line):
             status_data["subsection"] = line
             break
 
@@ -751,7 +513,7 @@ def extract_section_3_status(raw_text: str) -> Dict:
         line = lines[i]
 
         # Look for plant names
-        plant_match = re.match(r'^(HE|HP|PE|PEO|PFV|TER|CTM|CTH|CTA|PMGD)\s+(.+)$', line)
+        plant_match = SECTION_PATTERNS["status_plant"].match(line)
         if plant_match:
             plant_type = plant_match.group(1)
             plant_name = plant_match.group(2).strip()
@@ -765,11 +527,11 @@ def extract_section_3_status(raw_text: str) -> Dict:
                 next_line = lines[j]
 
                 # Stop if we hit another plant
-                if re.match(r'^(HE|HP|PE|PEO|PFV|TER|CTM|CTH|CTA|PMGD)\s+', next_line):
+                if SECTION_PATTERNS["status_plant_start"].match(next_line):
                     break
 
                 # Look for availability percentage (e.g., "100.0", "85.0")
-                if re.match(r'^[0-9]+\.[0-9]+$', next_line) and availability is None:
+                if SECTION_PATTERNS["availability"].match(next_line) and availability is None:
                     availability = float(next_line)
 
                 # Collect observation text (longer descriptive lines)
@@ -811,7 +573,7 @@ def extract_section_4_operations(raw_text: str) -> Dict:
 
     # Detect subsection
     for line in lines[:10]:
-        if re.match(r'^4\.[0-9]+\.', line):
+        if SECTION_PATTERNS["subsection_4"].match(line):
             operations_data["subsection"] = line
             break
 
@@ -823,14 +585,14 @@ def extract_section_4_operations(raw_text: str) -> Dict:
         line = lines[i]
 
         # Look for time patterns (HH:MM)
-        time_match = re.match(r'^([0-9]{1,2}:[0-9]{2})$', line)
+        time_match = SECTION_PATTERNS["time"].match(line)
         if time_match:
             current_time = time_match.group(1)
             i += 1
             continue
 
         # Look for control center names (short lines that could be centers)
-        if len(line) <= 30 and not re.match(r'^[0-9]', line) and current_time:
+        if len(line) <= 30 and not SECTION_PATTERNS["starts_with_digit"].match(line) and current_time:
             current_control_center = line
             i += 1
             continue
@@ -867,7 +629,7 @@ def extract_section_5_8_system_tables(raw_text: str, section_number: str) -> Dic
 
         # Look for control center names (typically company names)
         if (len(line) > 5 and len(line) < 50 and
-            not re.match(r'^[0-9]', line) and
+            not SECTION_PATTERNS["starts_with_digit"].match(line) and
             not line in ['Centro de Control', 'Instalación', 'Fecha F/S', 'Hora F/S', 'Fecha E/S', 'Hora E/S']):
 
             control_center = line
@@ -885,7 +647,7 @@ def extract_section_5_8_system_tables(raw_text: str, section_number: str) -> Dic
 
                 # Stop if we hit another control center
                 if (len(next_line) > 5 and len(next_line) < 50 and
-                    not re.match(r'^[0-9]', next_line) and j > i + 3):
+                    not SECTION_PATTERNS["starts_with_digit"].match(next_line) and j > i + 3):
                     break
 
                 # Look for installation description (longer text)
@@ -893,14 +655,14 @@ def extract_section_5_8_system_tables(raw_text: str, section_number: str) -> Dic
                     installation = next_line
 
                 # Look for dates (DD/MM/YYYY format)
-                elif re.match(r'^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$', next_line):
+                elif SECTION_PATTERNS["date"].match(next_line):
                     if fecha_fs is None:
                         fecha_fs = next_line
                     elif fecha_es is None:
                         fecha_es = next_line
 
                 # Look for times (HH:MM format)
-                elif re.match(r'^[0-9]{1,2}:[0-9]{2}$', next_line):
+                elif SECTION_PATTERNS["time"].match(next_line):
                     if hora_fs is None:
                         hora_fs = next_line
                     elif hora_es is None:
@@ -940,25 +702,12 @@ def process_pdf_page(pdf_path: str, page_number: int) -> Dict:
         image_list = page.get_images()
 
         if len(raw_text.strip()) < 100 and image_list:
-            # Use OCR for image-heavy pages
-            pix = page.get_pixmap()
-            img_data = pix.tobytes("png")
-            image = Image.open(io.BytesIO(img_data))
-
-            # Convert to numpy array for OpenCV processing
-            img_array = np.array(image)
-
-            # Preprocess image for better OCR
-            if len(img_array.shape) == 3:
-                gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            else:
-                gray = img_array
-
-            # Apply threshold to get better contrast
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            # Use OCR for image-heavy pages: zero-copy view of the pixmap,
+            # grayscale + Otsu threshold for better contrast
+            raster = PageRaster(page.get_pixmap())
 
             # Use pytesseract for OCR
-            raw_text = pytesseract.image_to_string(thresh, lang='spa')
+            raw_text = pytesseract.image_to_string(raster.otsu_binary, lang='spa')
 
         doc.close()
 
@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
 """
 Phase 1: Interactive Chapter Mapper
-- Scans full document for chapter boundaries  
-- Shows you each potential chapter in real-time
-- You validate: y/n for each chapter boundary
-- Saves validated structure to profiles/anexos_eaf/
+- Detects chapter boundaries with the shared engine (PDF outline, or
+  large/bold ANEXO / INFORME DIARIO titles at the top of each page)
+- Shows you each detected boundary
+- You validate: y/n for each chapter boundary (or --auto to accept all)
+- Saves validated structure to profiles/anexos_eaf/ and the report registry
 """
 import os
 import sys
 import json
-import re
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
@@ -26,6 +26,13 @@ except ImportError:
     os.system("pip install PyPDF2")
     from PyPDF2 import PdfReader
 
+# Chapter boundary engine + report registry shared across operaciones
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from chapter_boundaries import (
+    ANEXOS_PATTERNS, ChapterBoundaryDetector, HeadingCandidate, DetectionResult,
+    build_chapter_ranges, get_report_registry
+)
+
 @dataclass
 class ChapterCandidate:
     page: int
@@ -35,6 +42,7 @@ class ChapterCandidate:
     preview_text: str
     validated: bool = False
     chapter_type: str = "unknown"
+    number: Optional[int] = None
 
 class InteractiveChapterMapper:
     def __init__(self, document_path: str):
@@ -46,33 +54,8 @@ class InteractiveChapterMapper:
         self.total_pages = 0
         self.chapter_candidates: List[ChapterCandidate] = []
         self.validated_chapters: List[ChapterCandidate] = []
-        
-        # Enhanced chapter detection patterns
-        self.chapter_patterns = {
-            # Anexos sections
-            r"ANEXO\s*N[º°ªo]?\s*\d+": "anexo_section",
-            
-            # Main EAF report sections
-            r"(?:RESUMEN\s*EJECUTIVO|SÍNTESIS\s*EJECUTIVA)": "executive_summary",
-            r"(?:CRONOLOGÍA|SECUENCIA|TIMELINE|DESARROLLO\s*CRONOLÓGICO)": "chronology",
-            r"(?:EMPRESA|INFORME\s*DE\s*LA\s*EMPRESA|COMPAÑÍAS?\s*AFECTADAS)": "company_reports",
-            r"(?:ANÁLISIS\s*TÉCNICO|EVALUACIÓN\s*TÉCNICA|ESPECIFICACIONES\s*TÉCNICAS)": "technical_analysis",
-            r"(?:EQUIPOS?\s*DE\s*PROTECCIÓN|ELEMENTOS?\s*FALLADOS?)": "equipment_analysis",
-            r"(?:CAUSAS?\s*DE\s*LA\s*FALLA|ANÁLISIS\s*DE\s*CAUSAS?)": "root_cause_analysis",
-            r"(?:RECOMENDACIONES|MEDIDAS\s*CORRECTIVAS|PROPUESTAS)": "recommendations",
-            r"(?:CONCLUSIONES|SÍNTESIS\s*FINAL)": "conclusions",
-            r"(?:ANTECEDENTES|INFORMACIÓN\s*GENERAL)": "background",
-            
-            # Technical content indicators
-            r"(?:SISTEMA\s*ELÉCTRICO|RED\s*DE\s*TRANSMISIÓN)": "electrical_system",
-            r"(?:GENERACIÓN|UNIDADES?\s*GENERADORAS?)": "generation_units",
-            r"(?:DEMANDA|CONSUMO\s*ELÉCTRICO)": "demand_analysis",
-            r"(?:COORDINACIÓN|COORDINADOR\s*ELÉCTRICO)": "coordination",
-            
-            # Data sections
-            r"(?:TABLA|CUADRO|LISTADO)": "data_table",
-            r"(?:GRÁFICO|DIAGRAMA|ESQUEMA)": "diagram",
-        }
+
+        self.detection_source = None
 
     def load_document(self) -> bool:
         """Load document and prepare for scanning"""
@@ -101,104 +84,64 @@ class InteractiveChapterMapper:
         except:
             return ""
 
-    def scan_for_chapters(self, batch_size: int = 10) -> None:
-        """Scan document in batches for chapter boundaries"""
-        print(f"🔍 Scanning {self.total_pages} pages for chapters...")
-        print(f"📦 Processing in batches of {batch_size} pages")
+    def scan_for_chapters(self, batch_size: int = 10, auto: bool = False) -> None:
+        """Detect chapter boundaries once, then validate them in batches"""
+        print(f"🔍 Detecting chapter boundaries in {self.total_pages} pages...")
+        print("   (PDF outline first, then large/bold titles at the top of each page)")
         print("=" * 70)
-        
-        for batch_start in range(1, self.total_pages + 1, batch_size):
-            batch_end = min(batch_start + batch_size - 1, self.total_pages)
-            
-            print(f"\n📦 BATCH: Pages {batch_start}-{batch_end}")
+
+        result = ChapterBoundaryDetector(str(self.document_path), patterns=ANEXOS_PATTERNS).detect()
+        self.detection_source = result.source
+        self.chapter_candidates = [self.candidate_from_range(chapter, result.source)
+                                   for chapter in result.chapters]
+
+        print(f"📑 Source: {result.source}  |  {len(self.chapter_candidates)} boundaries found")
+
+        if auto:
+            for candidate in self.chapter_candidates:
+                candidate.validated = True
+            self.validated_chapters = list(self.chapter_candidates)
+            print(f"✅ Accepted all {len(self.validated_chapters)} boundaries (--auto)")
+            return
+
+        for batch_start in range(0, len(self.chapter_candidates), batch_size):
+            batch_candidates = self.chapter_candidates[batch_start:batch_start + batch_size]
+            batch_end = batch_start + len(batch_candidates)
+
+            print(f"\n📦 BATCH: Candidates {batch_start + 1}-{batch_end}")
             print("-" * 40)
-            
-            batch_candidates = []
-            
-            for page_num in range(batch_start, batch_end + 1):
-                candidates = self.analyze_page_for_chapters(page_num)
-                batch_candidates.extend(candidates)
-            
-            if batch_candidates:
-                print(f"\n🎯 Found {len(batch_candidates)} potential chapters in this batch:")
-                self.validate_batch_candidates(batch_candidates)
-            else:
-                print("📝 No chapter boundaries detected in this batch")
-            
+            self.validate_batch_candidates(batch_candidates)
+
             # Ask to continue
-            if batch_end < self.total_pages:
-                print(f"\n📊 Progress: {batch_end}/{self.total_pages} pages scanned")
+            if batch_end < len(self.chapter_candidates):
+                print(f"\n📊 Progress: {batch_end}/{len(self.chapter_candidates)} candidates reviewed")
                 continue_scan = input("➡️  Continue to next batch? (y/n/save): ").strip().lower()
-                
+
                 if continue_scan == 'n':
-                    print("⏹️  Stopping scan at your request")
+                    print("⏹️  Stopping review at your request")
                     break
                 elif continue_scan == 'save':
                     self.save_progress()
-                    print("💾 Progress saved. Continue scanning? (y/n): ", end="")
+                    print("💾 Progress saved. Continue reviewing? (y/n): ", end="")
                     if input().strip().lower() != 'y':
                         break
 
-    def analyze_page_for_chapters(self, page_num: int) -> List[ChapterCandidate]:
-        """Analyze single page for chapter indicators"""
-        text = self.extract_page_text(page_num)
-        candidates = []
-        
-        # Look for chapter patterns
-        for pattern, chapter_type in self.chapter_patterns.items():
-            matches = list(re.finditer(pattern, text, re.IGNORECASE))
-            
-            for match in matches:
-                # Extract title context (surrounding text)
-                start = max(0, match.start() - 30)
-                end = min(len(text), match.end() + 100)
-                context = text[start:end].replace('\n', ' ').strip()
-                
-                # Get preview of page content
-                preview = text[:200].replace('\n', ' ').strip()
-                if len(text) > 200:
-                    preview += "..."
-                
-                # Determine confidence based on context
-                confidence = self.calculate_confidence(text, match, chapter_type)
-                
-                candidate = ChapterCandidate(
-                    page=page_num,
-                    title=match.group(0),
-                    pattern_matched=pattern,
-                    confidence=confidence,
-                    preview_text=preview,
-                    chapter_type=chapter_type
-                )
-                
-                candidates.append(candidate)
-        
-        return candidates
+    def candidate_from_range(self, chapter, source: str) -> ChapterCandidate:
+        """Wrap a detected chapter range for validation"""
+        text = self.extract_page_text(chapter.start_page)
+        preview = text[:200].replace('\n', ' ').strip()
+        if len(text) > 200:
+            preview += "..."
 
-    def calculate_confidence(self, text: str, match, chapter_type: str) -> str:
-        """Calculate confidence level for chapter detection"""
-        # Factors that increase confidence
-        factors = []
-        
-        # Position-based confidence
-        if match.start() < 200:  # Near beginning of page
-            factors.append("start_of_page")
-        
-        # Formatting indicators
-        if re.search(r'\n\s*' + re.escape(match.group(0)) + r'\s*\n', text):
-            factors.append("standalone_line")
-        
-        # Content length (chapters usually have substantial content)
-        if len(text.split()) > 100:
-            factors.append("substantial_content")
-        
-        # Calculate confidence
-        if len(factors) >= 3:
-            return "HIGH"
-        elif len(factors) >= 2:
-            return "MEDIUM"
-        else:
-            return "LOW"
+        return ChapterCandidate(
+            page=chapter.start_page,
+            title=chapter.title,
+            pattern_matched=chapter.kind,
+            confidence="HIGH" if source == "outline" else "MEDIUM",
+            preview_text=preview,
+            chapter_type=chapter.kind,
+            number=chapter.number
+        )
 
     def validate_batch_candidates(self, candidates: List[ChapterCandidate]) -> None:
         """Interactive validation of chapter candidates"""
@@ -276,6 +219,26 @@ class InteractiveChapterMapper:
         
         print(f"📋 Summary saved to: {summary_file}")
 
+        self.register_validated()
+
+    def register_validated(self) -> None:
+        """Store the validated boundaries in the shared report registry"""
+        if not self.validated_chapters:
+            return
+
+        headings = [
+            HeadingCandidate(page=ch.page, kind=ch.chapter_type, number=ch.number,
+                             title=ch.title, size=0.0, bold=False, y0=0.0)
+            for ch in self.validated_chapters
+        ]
+        source = self.detection_source if len(self.validated_chapters) == len(self.chapter_candidates) else "validated"
+        result = DetectionResult(self.total_pages, source or "validated",
+                                 build_chapter_ranges(headings, self.total_pages))
+
+        report_id = self.document_path.stem
+        get_report_registry().register(report_id, str(self.document_path), result)
+        print(f"📚 Registered {len(result.chapters)} chapter ranges for {report_id} in the report registry")
+
     def show_final_summary(self) -> None:
         """Show final chapter mapping results"""
         print("\n" + "=" * 70)
@@ -309,7 +272,8 @@ def main():
     
     parser = argparse.ArgumentParser(description="Phase 1: Interactive Chapter Mapper")
     parser.add_argument("document", help="Path to PDF document")
-    parser.add_argument("--batch-size", type=int, default=10, help="Pages per batch")
+    parser.add_argument("--batch-size", type=int, default=10, help="Candidates per batch")
+    parser.add_argument("--auto", action="store_true", help="Accept all detected boundaries without prompting")
     
     args = parser.parse_args()
     
@@ -328,7 +292,7 @@ def main():
         print("Your validated chapters will be saved to profiles/anexos_eaf/")
         print("")
         
-        mapper.scan_for_chapters(args.batch_size)
+        mapper.scan_for_chapters(args.batch_size, auto=args.auto)
         mapper.show_final_summary()
         
     except KeyboardInterrupt:
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 True Interactive Title Detector
-- Scans for pages that START with "Anexo" or "INFORME DIARIO" 
+- Finds pages that START with "Anexo" or "INFORME DIARIO" with the shared
+  chapter boundary engine (outline / large-bold titles, parallel page scan)
 - Shows you each page with minimal content (title only)
 - You validate each title in real-time with y/n
 - Saves validated titles to profiles/anexos_eaf/
@@ -25,6 +26,10 @@ except ImportError:
     os.system("pip install PyPDF2")
     from PyPDF2 import PdfReader
 
+# Chapter boundary engine shared across operaciones
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from chapter_boundaries import ANEXOS_PATTERNS, ChapterBoundaryDetector
+
 @dataclass
 class TitlePage:
     page_number: int
@@ -111,9 +116,12 @@ class InteractiveTitleDetector:
         print("=" * 60)
         
         title_candidates = []
-        
-        # Scan all pages for potential titles
-        for page_num in range(1, self.total_pages + 1):
+
+        # Only pages where the engine found an ANEXO / INFORME DIARIO title
+        result = ChapterBoundaryDetector(str(self.document_path), patterns=ANEXOS_PATTERNS).detect()
+        print(f"📑 Boundary source: {result.source}  |  {len(result.chapters)} title pages to check")
+
+        for page_num in sorted({chapter.start_page for chapter in result.chapters}):
             text = self.extract_page_text(page_num)
             is_title, title_text = self.is_title_page(text)
             
@@ -0,0 +1,526 @@
+"""
+Anexos EAF MCP Server
+Read-only MCP access to the EAF databases over stdio (PDF → JSON → SQLite → MCP → AI).
+
+Serves two SQLite files produced by the pipeline:
+
+    data/layout.db      layout_database.py (+ layout_chunks.py): reports,
+                        chapters, sections, tables, full-text search and
+                        token-budgeted context chunks
+    eaf_data.db         eaf_database_ingestion.py: documents and entities
+                        (attached as schema "eaf" when present)
+
+Tools:
+    list_reports, get_report, get_chapter, get_section, get_table,
+    search, retrieve_context, list_documents, list_entities
+
+Access path:
+    - Connection pool of read-only connections (mode=ro, query_only), each
+      with a large prepared-statement cache; every tool runs fixed SQL with
+      bound parameters, so statements are compiled once per connection
+    - Large results (table rows, entities, sections) use keyset cursors:
+      pass back next_cursor to get the following page; a cursor stays valid
+      when data is re-ingested
+    - Responses are kept in an LRU cache keyed by tool and arguments, and the
+      whole cache is dropped when the ingestion version changes
+      (PRAGMA data_version: bumped by any commit from another connection)
+
+Everything runs locally; the MCP transport is stdio.
+
+Usage:
+    python anexos_eaf_server.py                          # MCP server on stdio
+    python anexos_eaf_server.py --call list_reports
+    python anexos_eaf_server.py --call get_table \\
+        --args '{"report_id": "EAF-089-2025", "chapter": "capitulo_03", "table_ref": "#/tables/0"}'
+
+Client configuration (e.g. claude_desktop_config.json):
+    {"mcpServers": {"anexos-eaf": {"command": "python",
+                                   "args": [".../mcp_servers/anexos_eaf_server.py"]}}}
+"""
+
+import base64
+import binascii
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Shared utilities (layout database, chunk store)
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from layout_database import DEFAULT_DB_PATH as DEFAULT_LAYOUT_DB_PATH, LayoutDatabase
+from layout_chunks import LayoutChunkStore
+
+DEFAULT_EAF_DB_PATH = Path(__file__).parent.parent.parent.parent / "eaf" / "shared" / "database" / "eaf_data.db"
+
+SERVER_NAME = "anexos-eaf"
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CACHE_SIZE = 256
+MAX_PAGE_SIZE = 500
+
+# stdout carries the MCP protocol: log to stderr
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+logger = logging.getLogger(SERVER_NAME)
+
+
+def encode_cursor(key: Any) -> str:
+    """Opaque pagination cursor for the last key of a page"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str], default: Any) -> Any:
+    if not cursor:
+        return default
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def _page_size(limit: int) -> int:
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def _page(rows: List[sqlite3.Row], limit: int, key: Callable[[Dict], Any]) -> Dict:
+    """First `limit` rows (queries fetch limit + 1) and the cursor of the next page"""
+    items = [dict(row) for row in rows[:limit]]
+    return {
+        'items': items,
+        'next_cursor': encode_cursor(key(items[-1])) if len(rows) > limit else None,
+    }
+
+
+class ReadOnlyConnectionPool:
+    """Bounded pool of read-only SQLite connections (layout DB, EAF DB attached as 'eaf')"""
+
+    def __init__(self, layout_db_path: Path, eaf_db_path: Optional[Path] = None,
+                 size: int = DEFAULT_POOL_SIZE):
+        self.layout_db_path = Path(layout_db_path)
+        if not self.layout_db_path.exists():
+            raise FileNotFoundError(
+                f"Layout database not found: {self.layout_db_path} (run layout_database.py first)"
+            )
+        self.eaf_db_path = Path(eaf_db_path) if eaf_db_path and Path(eaf_db_path).exists() else None
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self.layout_db_path.resolve().as_uri()}?mode=ro", uri=True,
+            check_same_thread=False, cached_statements=512
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        if self.eaf_db_path:
+            conn.execute("ATTACH DATABASE ? AS eaf", (f"{self.eaf_db_path.resolve().as_uri()}?mode=ro",))
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; blocks when all `size` connections are in use"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                conn = None
+                if len(self._all) < self.size:
+                    conn = self.open()
+                    self._all.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+        self._idle = queue.LifoQueue()
+
+
+class ResponseCache:
+    """LRU cache of tool responses, emptied whenever the ingestion version changes"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version: Optional[Tuple] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: Tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, version: Tuple, value: Any) -> None:
+        with self._lock:
+            if version != self.version or self.maxsize <= 0:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class EAFDataService:
+    """Query layer behind the MCP tools (usable without the MCP runtime)"""
+
+    TOOLS = (
+        'list_reports', 'get_report', 'get_chapter', 'get_section', 'get_table',
+        'search', 'retrieve_context', 'list_documents', 'list_entities',
+    )
+
+    def __init__(self, layout_db_path: Optional[str] = None, eaf_db_path: Optional[str] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.pool = ReadOnlyConnectionPool(
+            Path(layout_db_path) if layout_db_path else DEFAULT_LAYOUT_DB_PATH,
+            Path(eaf_db_path) if eaf_db_path else DEFAULT_EAF_DB_PATH,
+            size=pool_size
+        )
+        self.cache = ResponseCache(cache_size)
+        # Dedicated connection: data_version only moves for commits made by others
+        self._version_conn = self.pool.open()
+        self._version_lock = threading.Lock()
+
+    def ingestion_version(self) -> Tuple[int, ...]:
+        with self._version_lock:
+            version = [self._version_conn.execute("PRAGMA main.data_version").fetchone()[0]]
+            if self.pool.eaf_db_path:
+                version.append(self._version_conn.execute("PRAGMA eaf.data_version").fetchone()[0])
+        return tuple(version)
+
+    def call(self, tool: str, **kwargs) -> Any:
+        """Run a tool through the response cache"""
+        if tool not in self.TOOLS:
+            raise ValueError(f"Unknown tool: {tool}")
+        key = json.dumps([tool, kwargs], sort_keys=True, default=str)
+        version = self.ingestion_version()
+        found, value = self.cache.get(key, version)
+        if found:
+            return value
+        with self.pool.connection() as conn:
+            value = getattr(self, f"_{tool}")(conn, **kwargs)
+        self.cache.put(key, version, value)
+        return value
+
+    def close(self) -> None:
+        self._version_conn.close()
+        self.pool.close()
+
+    # ========== Tools ==========
+
+    def list_reports(self, cursor: Optional[str] = None, limit: int = 50) -> Dict:
+        """Reports in the layout database (chapter and item counts), paginated by report ID."""
+        return self.call('list_reports', cursor=cursor, limit=limit)
+
+    def get_report(self, report_id: str) -> Dict:
+        """Chapters of one report with their page offsets and failure date/time."""
+        return self.call('get_report', report_id=report_id)
+
+    def get_chapter(self, report_id: str, chapter: str) -> Dict:
+        """Section outline and table list of a chapter (chapter key like "capitulo_03")."""
+        return self.call('get_chapter', report_id=report_id, chapter=chapter)
+
+    def get_section(self, report_id: str, chapter: str, section_ref: Optional[str] = None,
+                    cursor: Optional[str] = None, limit: int = 5) -> Dict:
+        """Markdown chunks of one section (section_ref from get_chapter; omit for the preamble)."""
+        return self.call('get_section', report_id=report_id, chapter=chapter, section_ref=section_ref,
+                         cursor=cursor, limit=limit)
+
+    def get_table(self, report_id: str, chapter: str, table_ref: str,
+                  cursor: Optional[str] = None, limit: int = 100) -> Dict:
+        """Headers and a page of rows of one table (table_ref like "#/tables/0")."""
+        return self.call('get_table', report_id=report_id, chapter=chapter, table_ref=table_ref,
+                         cursor=cursor, limit=limit)
+
+    def search(self, query: str, report_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Full-text search over texts and table rows (all terms required), best first."""
+        return self.call('search', query=query, report_id=report_id, limit=limit)
+
+    def retrieve_context(self, query: str, token_budget: int = 2000, report_id: Optional[str] = None,
+                         chapter: Optional[str] = None) -> Dict:
+        """Best section chunks for a question, packed into a token budget, as markdown."""
+        return self.call('retrieve_context', query=query, token_budget=token_budget,
+                         report_id=report_id, chapter=chapter)
+
+    def list_documents(self, document_type: Optional[str] = None, cursor: Optional[str] = None,
+                       limit: int = 50) -> Dict:
+        """Ingested universal JSON documents with chapter and entity counts."""
+        return self.call('list_documents', document_type=document_type, cursor=cursor, limit=limit)
+
+    def list_entities(self, entity_type: Optional[str] = None, canonical_id: Optional[str] = None,
+                      document_id: Optional[int] = None, cursor: Optional[str] = None,
+                      limit: int = 100) -> Dict:
+        """Ingested entities, filtered by type, canonical catalog ID or document."""
+        return self.call('list_entities', entity_type=entity_type, canonical_id=canonical_id,
+                         document_id=document_id, cursor=cursor, limit=limit)
+
+    # ========== Queries ==========
+
+    @staticmethod
+    def _chapter_pk(conn: sqlite3.Connection, report_id: str, chapter: str) -> int:
+        row = conn.execute(
+            "SELECT id FROM layout_chapters WHERE report_id = ? AND chapter = ?", (report_id, chapter)
+        ).fetchone()
+        if not row:
+            raise ValueError(f"Chapter not found: {report_id} {chapter}")
+        return row['id']
+
+    @staticmethod
+    def _has_table(conn: sqlite3.Connection, name: str, schema: str = "main") -> bool:
+        return conn.execute(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    def _require_chunks(self, conn: sqlite3.Connection) -> None:
+        if not self._has_table(conn, 'layout_chunks'):
+            raise ValueError("No chunks in the layout database (run layout_chunks.py --build)")
+
+    def _require_eaf(self, conn: sqlite3.Connection) -> None:
+        if not self.pool.eaf_db_path or not self._has_table(conn, 'documents', 'eaf'):
+            raise ValueError(f"EAF database not available: {DEFAULT_EAF_DB_PATH.name} "
+                             f"(run eaf_database_ingestion.py first)")
+
+    def _list_reports(self, conn: sqlite3.Connection, cursor: Optional[str], limit: int) -> Dict:
+        limit = _page_size(limit)
+        rows = conn.execute("""
+            SELECT report_id, COUNT(*) AS chapters, SUM(item_count) AS items,
+                   MAX(fecha_falla) AS fecha_falla, MAX(ingested_at) AS ingested_at
+            FROM layout_chapters
+            WHERE report_id > :after
+            GROUP BY report_id
+            ORDER BY report_id
+            LIMIT :limit
+        """, {'after': decode_cursor(cursor, ""), 'limit': limit + 1}).fetchall()
+        return _page(rows, limit, lambda item: item['report_id'])
+
+    def _get_report(self, conn: sqlite3.Connection, report_id: str) -> Dict:
+        chapters = conn.execute("""
+            SELECT chapter, chapter_number, page_offset, document_name, fecha_emision,
+                   fecha_falla, hora_falla, item_count, ingested_at
+            FROM layout_chapters
+            WHERE report_id = ?
+            ORDER BY chapter
+        """, (report_id,)).fetchall()
+        if not chapters:
+            raise ValueError(f"Report not found: {report_id}")
+        return {'report_id': report_id, 'chapters': [dict(row) for row in chapters]}
+
+    def _get_chapter(self, conn: sqlite3.Connection, report_id: str, chapter: str) -> Dict:
+        chapter_pk = self._chapter_pk(conn, report_id, chapter)
+        if self._has_table(conn, 'layout_chunks'):
+            sections = conn.execute("""
+                SELECT section_ref, heading_path, depth, COUNT(*) AS chunks,
+                       SUM(token_count) AS tokens, MIN(page_start) AS page_start, MAX(page_end) AS page_end,
+                       MIN(report_page_start) AS report_page_start, MAX(report_page_end) AS report_page_end
+                FROM layout_chunks
+                WHERE chapter_pk = ?
+                GROUP BY section_ref
+                ORDER BY MIN(seq)
+            """, (chapter_pk,)).fetchall()
+        else:
+            sections = conn.execute("""
+                SELECT i.self_ref AS section_ref, i.text AS heading_path,
+                       p.page_no AS page_start, p.report_page AS report_page_start
+                FROM layout_items i
+                LEFT JOIN layout_prov p ON p.item_id = i.id AND p.prov_idx = 0
+                WHERE i.chapter_pk = ? AND i.label = 'section_header'
+                ORDER BY i.collection, i.seq
+            """, (chapter_pk,)).fetchall()
+        tables = conn.execute("""
+            SELECT i.self_ref AS table_ref, t.num_rows, t.num_cols, t.extractor,
+                   p.page_no, p.report_page
+            FROM layout_tables t
+            JOIN layout_items i ON i.id = t.item_id
+            LEFT JOIN layout_prov p ON p.item_id = i.id AND p.prov_idx = 0
+            WHERE i.chapter_pk = ?
+            ORDER BY i.seq
+        """, (chapter_pk,)).fetchall()
+        return {
+            'report_id': report_id,
+            'chapter': chapter,
+            'sections': [dict(row) for row in sections],
+            'tables': [dict(row) for row in tables],
+        }
+
+    def _get_section(self, conn: sqlite3.Connection, report_id: str, chapter: str,
+                     section_ref: Optional[str], cursor: Optional[str], limit: int) -> Dict:
+        self._require_chunks(conn)
+        chapter_pk = self._chapter_pk(conn, report_id, chapter)
+        limit = _page_size(limit)
+        rows = conn.execute("""
+            SELECT seq, part, heading_path, text, token_count, has_table, item_refs,
+                   page_start, page_end, report_page_start, report_page_end
+            FROM layout_chunks
+            WHERE chapter_pk = :chapter_pk AND section_ref IS :section_ref AND seq > :after
+            ORDER BY seq
+            LIMIT :limit
+        """, {
+            'chapter_pk': chapter_pk, 'section_ref': section_ref,
+            'after': decode_cursor(cursor, -1), 'limit': limit + 1
+        }).fetchall()
+        if not rows and not cursor:
+            raise ValueError(f"Section not found: {report_id} {chapter} {section_ref}")
+        page = _page(rows, limit, lambda item: item['seq'])
+        for item in page['items']:
+            item['item_refs'] = json.loads(item['item_refs'])
+            item['has_table'] = bool(item['has_table'])
+        return page
+
+    def _get_table(self, conn: sqlite3.Connection, report_id: str, chapter: str, table_ref: str,
+                   cursor: Optional[str], limit: int) -> Dict:
+        chapter_pk = self._chapter_pk(conn, report_id, chapter)
+        table = conn.execute("""
+            SELECT t.item_id, t.extractor, t.num_rows, t.num_cols
+            FROM layout_tables t
+            JOIN layout_items i ON i.id = t.item_id
+            WHERE i.chapter_pk = ? AND i.self_ref = ?
+        """, (chapter_pk, table_ref)).fetchone()
+        if not table:
+            raise ValueError(f"Table not found: {report_id} {chapter} {table_ref}")
+
+        limit = _page_size(limit)
+        headers = [row['text'] for row in conn.execute(
+            "SELECT text FROM layout_table_cells WHERE item_id = ? AND row_idx = 0 ORDER BY col_idx",
+            (table['item_id'],)
+        )]
+        row_ids = [row['row_idx'] for row in conn.execute("""
+            SELECT DISTINCT row_idx FROM layout_table_cells
+            WHERE item_id = :item_id AND row_idx > :after
+            ORDER BY row_idx
+            LIMIT :limit
+        """, {'item_id': table['item_id'], 'after': decode_cursor(cursor, 0), 'limit': limit + 1})]
+
+        grid: Dict[int, List[str]] = {}
+        if row_ids:
+            last = row_ids[min(limit, len(row_ids)) - 1]
+            for cell in conn.execute("""
+                SELECT row_idx, text FROM layout_table_cells
+                WHERE item_id = ? AND row_idx BETWEEN ? AND ?
+                ORDER BY row_idx, col_idx
+            """, (table['item_id'], row_ids[0], last)):
+                grid.setdefault(cell['row_idx'], []).append(cell['text'])
+
+        page_rows = row_ids[:limit]
+        return {
+            'table_ref': table_ref,
+            'extractor': table['extractor'],
+            'num_rows': table['num_rows'],
+            'num_cols': table['num_cols'],
+            'headers': headers,
+            'rows': [grid.get(row_idx, []) for row_idx in page_rows],
+            'first_row': page_rows[0] if page_rows else None,
+            'next_cursor': encode_cursor(page_rows[-1]) if len(row_ids) > limit else None,
+        }
+
+    def _search(self, conn: sqlite3.Connection, query: str, report_id: Optional[str], limit: int) -> List[Dict]:
+        return LayoutDatabase.search_with(conn, query, limit=_page_size(limit), report_id=report_id)
+
+    def _retrieve_context(self, conn: sqlite3.Connection, query: str, token_budget: int,
+                          report_id: Optional[str], chapter: Optional[str]) -> Dict:
+        self._require_chunks(conn)
+        result = LayoutChunkStore.retrieve_with(conn, query, token_budget=token_budget,
+                                                report_id=report_id, chapter=chapter)
+        result['context'] = LayoutChunkStore.to_context(result)
+        return result
+
+    def _list_documents(self, conn: sqlite3.Connection, document_type: Optional[str],
+                        cursor: Optional[str], limit: int) -> Dict:
+        self._require_eaf(conn)
+        limit = _page_size(limit)
+        rows = conn.execute("""
+            SELECT id, title, document_type, total_pages, source_file, processing_date,
+                   chapters_count, entities_count, updated_at
+            FROM eaf.documents
+            WHERE id > :after AND (:document_type IS NULL OR document_type = :document_type)
+            ORDER BY id
+            LIMIT :limit
+        """, {'after': decode_cursor(cursor, 0), 'document_type': document_type, 'limit': limit + 1}).fetchall()
+        return _page(rows, limit, lambda item: item['id'])
+
+    def _list_entities(self, conn: sqlite3.Connection, entity_type: Optional[str], canonical_id: Optional[str],
+                       document_id: Optional[int], cursor: Optional[str], limit: int) -> Dict:
+        self._require_eaf(conn)
+        limit = _page_size(limit)
+        rows = conn.execute("""
+            SELECT e.id, e.name, e.type, e.category, e.canonical_id,
+                   c.chapter_id, c.document_id
+            FROM eaf.entities e
+            JOIN eaf.chapters c ON c.id = e.chapter_id
+            WHERE e.id > :after
+              AND (:entity_type IS NULL OR e.type = :entity_type)
+              AND (:canonical_id IS NULL OR e.canonical_id = :canonical_id)
+              AND (:document_id IS NULL OR c.document_id = :document_id)
+            ORDER BY e.id
+            LIMIT :limit
+        """, {
+            'after': decode_cursor(cursor, 0), 'entity_type': entity_type,
+            'canonical_id': canonical_id, 'document_id': document_id, 'limit': limit + 1
+        }).fetchall()
+        return _page(rows, limit, lambda item: item['id'])
+
+
+def build_server(service: EAFDataService):
+    """FastMCP server exposing the service's tools"""
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP(SERVER_NAME)
+    for tool in EAFDataService.TOOLS:
+        server.add_tool(getattr(service, tool), name=tool)
+    return server
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MCP server (stdio) over the EAF layout and ingestion databases")
+    parser.add_argument("--layout-db", default=None, help=f"Layout SQLite file (default: {DEFAULT_LAYOUT_DB_PATH})")
+    parser.add_argument("--eaf-db", default=None, help=f"Ingestion SQLite file (default: {DEFAULT_EAF_DB_PATH})")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help="Read-only connections")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="Cached responses (LRU)")
+    parser.add_argument("--call", default=None, choices=EAFDataService.TOOLS,
+                        help="Run one tool and print its JSON result instead of serving")
+    parser.add_argument("--args", default="{}", help="JSON arguments for --call")
+    args = parser.parse_args()
+
+    service = EAFDataService(args.layout_db, args.eaf_db, pool_size=args.pool_size, cache_size=args.cache_size)
+    try:
+        if args.call:
+            result = getattr(service, args.call)(**json.loads(args.args))
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+            return
+
+        logger.info(f"Serving {len(EAFDataService.TOOLS)} tools on stdio "
+                    f"(layout: {service.pool.layout_db_path}, eaf: {service.pool.eaf_db_path or 'not found'})")
+        build_server(service).run()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Catálogo de Documentos Universales - Sistema Eléctrico Chileno
+Catálogo SQLite de documentos universales y sus referencias cruzadas
+
+El extractor integrado buscaba documentos existentes con glob + json.load de
+cada *_universal.json y reescribía el JSON de cada documento que ganaba una
+referencia. El catálogo guarda por documento su ID, fecha, dominio y claves de
+entidades (más el resumen que usa el índice de referencias), y las
+referencias como filas independientes: agregar una referencia es un INSERT,
+no una reescritura de archivo.
+
+Varias instancias del extractor pueden registrar documentos en paralelo: el
+registro ocurre dentro de una transacción de escritura (BEGIN IMMEDIATE) y
+los archivos JSON se escriben de forma atómica (archivo temporal + os.replace).
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from domains.operaciones.anexos_eaf.shared.schemas.indice_referencias import (
+    VERSION_INDICE, VOCABULARIO_PALABRAS_CLAVE, resumir_documento
+)
+
+NOMBRE_CATALOGO = "catalogo_universal.db"
+
+ESQUEMA_CATALOGO = """
+CREATE TABLE IF NOT EXISTS catalogo_meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+
+CREATE TABLE IF NOT EXISTS documentos (
+    secuencia INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_id TEXT NOT NULL UNIQUE,
+    dominio TEXT,
+    fecha_creacion TEXT,
+    tipo_documento TEXT,
+    titulo TEXT,
+    ruta_archivo TEXT,
+    resumen TEXT NOT NULL,
+    registrado_en TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_documentos_fecha ON documentos(fecha_creacion);
+CREATE INDEX IF NOT EXISTS idx_documentos_dominio ON documentos(dominio);
+
+-- Claves de entidades por documento (central, empresa, palabra_clave)
+CREATE TABLE IF NOT EXISTS claves_documento (
+    tipo TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    doc_id TEXT NOT NULL REFERENCES documentos(doc_id) ON DELETE CASCADE,
+    PRIMARY KEY (tipo, valor, doc_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_claves_documento_doc ON claves_documento(doc_id);
+
+-- Referencias cruzadas como filas (origen → objetivo), sin duplicados por tipo
+CREATE TABLE IF NOT EXISTS referencias (
+    id INTEGER PRIMARY KEY,
+    origen TEXT NOT NULL,
+    objetivo TEXT NOT NULL,
+    tipo_relacion TEXT NOT NULL,
+    dominio_objetivo TEXT,
+    confianza REAL,
+    datos TEXT NOT NULL,
+    creado_en TEXT NOT NULL,
+    UNIQUE (origen, objetivo, tipo_relacion)
+);
+
+CREATE INDEX IF NOT EXISTS idx_referencias_objetivo ON referencias(objetivo);
+"""
+
+TIPOS_CLAVE = (("central", "centrales"), ("empresa", "empresas"), ("palabra_clave", "palabras_clave"))
+
+
+def escribir_json_atomico(ruta: Path, datos: Dict):
+    """Escribir JSON en un temporal del mismo directorio y reemplazar el destino"""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=f".{ruta.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+
+class CatalogoDocumentosUniversales:
+    """Catálogo SQLite de documentos universales y referencias cruzadas"""
+
+    def __init__(self, ruta_db: Path, timeout: float = 30.0):
+        self.ruta_db = Path(ruta_db)
+        self.timeout = timeout
+        self._esquema_listo = False
+
+    def conectar(self) -> sqlite3.Connection:
+        """Conexión en modo autocommit; las escrituras usan transaccion()"""
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.ruta_db, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._esquema_listo:
+            conn.executescript(ESQUEMA_CATALOGO)
+            self._esquema_listo = True
+        return conn
+
+    @contextmanager
+    def transaccion(self, conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura exclusiva entre procesos (BEGIN IMMEDIATE)"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # ========== Documentos ==========
+
+    def registrar_documento(self, conn: sqlite3.Connection, documento: Dict,
+                            ruta_archivo: Optional[Path] = None,
+                            resumen: Optional[Dict] = None) -> Dict:
+        """Registrar (o re-registrar) un documento con sus claves; devuelve el resumen"""
+        resumen = resumen or resumir_documento(documento)
+        resumen = {clave: valor for clave, valor in resumen.items() if clave != "secuencia"}
+        metadatos = documento.get("metadatos_universales", {})
+        doc_id = resumen["@id"]
+
+        # Re-registrar = nueva secuencia, así los lectores incrementales lo ven
+        conn.execute("DELETE FROM documentos WHERE doc_id = ?", (doc_id,))
+        conn.execute(
+            """INSERT INTO documentos
+               (doc_id, dominio, fecha_creacion, tipo_documento, titulo, ruta_archivo, resumen, registrado_en)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (doc_id, resumen["dominio"], resumen["fecha_creacion"], metadatos.get("tipo_documento"),
+             metadatos.get("titulo"), str(ruta_archivo) if ruta_archivo else None,
+             json.dumps(resumen, ensure_ascii=False), datetime.now().isoformat())
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO claves_documento (tipo, valor, doc_id) VALUES (?, ?, ?)",
+            [(tipo, valor, doc_id) for tipo, campo in TIPOS_CLAVE for valor in resumen[campo]]
+        )
+        return resumen
+
+    def resumenes_desde(self, conn: sqlite3.Connection, secuencia: int = 0) -> List[Tuple[int, Dict]]:
+        """Resúmenes registrados después de la secuencia dada, en orden de registro"""
+        filas = conn.execute(
+            "SELECT secuencia, resumen FROM documentos WHERE secuencia > ? ORDER BY secuencia",
+            (secuencia,)
+        )
+        return [(fila["secuencia"], json.loads(fila["resumen"])) for fila in filas]
+
+    def total_documentos(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COUNT(*) FROM documentos").fetchone()[0]
+
+    def cargar_documento(self, conn: sqlite3.Connection, doc_id: str) -> Optional[Dict]:
+        """Documento universal desde su archivo, con todas sus referencias del catálogo"""
+        fila = conn.execute("SELECT ruta_archivo FROM documentos WHERE doc_id = ?", (doc_id,)).fetchone()
+        if not fila or not fila["ruta_archivo"] or not Path(fila["ruta_archivo"]).exists():
+            return None
+        with open(fila["ruta_archivo"], 'r', encoding='utf-8') as f:
+            documento = json.load(f)
+        documento["referencias_cruzadas"] = self.referencias_de(conn, doc_id)
+        return documento
+
+    def documentos_con_clave(self, conn: sqlite3.Connection, tipo: str, valor: str) -> List[str]:
+        """IDs de documentos con una clave (central, empresa o palabra_clave)"""
+        filas = conn.execute(
+            "SELECT doc_id FROM claves_documento WHERE tipo = ? AND valor = ?", (tipo, valor)
+        )
+        return [fila["doc_id"] for fila in filas]
+
+    # ========== Referencias ==========
+
+    def agregar_referencias(self, conn: sqlite3.Connection, origen: str, referencias: List[Dict]) -> int:
+        """Agregar referencias como filas (duplicados origen/objetivo/tipo se ignoran)"""
+        antes = conn.total_changes
+        ahora = datetime.now().isoformat()
+        conn.executemany(
+            """INSERT INTO referencias
+               (origen, objetivo, tipo_relacion, dominio_objetivo, confianza, datos, creado_en)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (origen, objetivo, tipo_relacion) DO NOTHING""",
+            [(origen, ref.get("documento_objetivo"), ref.get("tipo_relacion"), ref.get("dominio_objetivo"),
+              ref.get("confianza"), json.dumps(ref, ensure_ascii=False), ahora)
+             for ref in referencias]
+        )
+        return conn.total_changes - antes
+
+    def quitar_referencias(self, conn: sqlite3.Connection, origen: str) -> int:
+        """Quitar las referencias salientes de un documento (antes de regenerarlas)"""
+        return conn.execute("DELETE FROM referencias WHERE origen = ?", (origen,)).rowcount
+
+    def referencias_de(self, conn: sqlite3.Connection, doc_id: str) -> List[Dict]:
+        """Referencias salientes de un documento, por confianza descendente"""
+        filas = conn.execute(
+            "SELECT datos FROM referencias WHERE origen = ? ORDER BY confianza DESC, id",
+            (doc_id,)
+        )
+        return [json.loads(fila["datos"]) for fila in filas]
+
+    def referencias_hacia(self, conn: sqlite3.Connection, doc_id: str) -> List[Dict]:
+        """Referencias entrantes a un documento (con su origen)"""
+        filas = conn.execute(
+            "SELECT origen, datos FROM referencias WHERE objetivo = ? ORDER BY confianza DESC, id",
+            (doc_id,)
+        )
+        return [dict(json.loads(fila["datos"]), documento_origen=fila["origen"]) for fila in filas]
+
+    # ========== Mantenimiento ==========
+
+    def verificar_vocabulario(self, conn: sqlite3.Connection) -> bool:
+        """Recalcular resúmenes si cambió el vocabulario o la versión del índice; True si recalculó"""
+        vocabulario = json.dumps({"version": VERSION_INDICE, "palabras": VOCABULARIO_PALABRAS_CLAVE},
+                                 ensure_ascii=False)
+        fila = conn.execute("SELECT valor FROM catalogo_meta WHERE clave = 'vocabulario'").fetchone()
+        if fila and fila["valor"] == vocabulario:
+            return False
+
+        with self.transaccion(conn):
+            rutas = conn.execute("SELECT doc_id, ruta_archivo FROM documentos ORDER BY secuencia").fetchall()
+            for fila_doc in rutas:
+                ruta = fila_doc["ruta_archivo"]
+                if not ruta or not Path(ruta).exists():
+                    continue
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    self.registrar_documento(conn, json.load(f), Path(ruta))
+            conn.execute(
+                "INSERT INTO catalogo_meta (clave, valor) VALUES ('vocabulario', ?) "
+                "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor",
+                (vocabulario,)
+            )
+        return bool(rutas)
+
+    def importar_directorio(self, conn: sqlite3.Connection, directorio: Path) -> int:
+        """Registrar los *_universal.json de un directorio que no están en el catálogo"""
+        importados = 0
+        with self.transaccion(conn):
+            for archivo_json in Path(directorio).glob("**/*_universal.json"):
+                try:
+                    with open(archivo_json, 'r', encoding='utf-8') as f:
+                        documento = json.load(f)
+                except Exception as e:
+                    print(f"⚠️ Error leyendo {archivo_json}: {e}")
+                    continue
+                # Verificar que es documento universal
+                if "@context" not in documento or "@id" not in documento:
+                    continue
+                existe = conn.execute(
+                    "SELECT 1 FROM documentos WHERE doc_id = ?", (documento["@id"],)
+                ).fetchone()
+                if existe:
+                    continue
+                self.registrar_documento(conn, documento, archivo_json)
+                self.agregar_referencias(conn, documento["@id"], documento.get("referencias_cruzadas", []))
+                importados += 1
+        return importados
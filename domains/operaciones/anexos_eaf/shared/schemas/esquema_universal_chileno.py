@@ -5,10 +5,14 @@ Wrapper functions para convertir extracciones del sistema eléctrico chileno
 """
 
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from entity_gazetteer import get_gazetteer
+
 def crear_documento_universal_chile(datos_extraccion: dict,
                                   titulo_documento: str,
                                   fecha_documento: str,
@@ -82,7 +86,7 @@ def crear_documento_universal_chile(datos_extraccion: dict,
     return documento_universal
 
 def extraer_entidades_datos_chile(datos: dict) -> dict:
-    """Extraer entidades del sistema eléctrico chileno"""
+    """Extraer entidades del sistema eléctrico chileno (gazetteer, una pasada por celda)"""
 
     entidades = {
         "centrales_electricas": [],
@@ -91,37 +95,54 @@ def extraer_entidades_datos_chile(datos: dict) -> dict:
         "regulaciones": [],
         "equipos": []
     }
+    gazetteer = get_gazetteer()
 
     # Extraer de upper_table (estructura anexo)
     if "upper_table" in datos and "rows" in datos["upper_table"]:
-        for fila in datos["upper_table"]["rows"]:
-            # Buscar nombres de centrales
+        filas = datos["upper_table"]["rows"]
+        menciones_celda = {}
+        for mencion in gazetteer.find_in_rows(filas, types=["central", "empresa"]):
+            menciones_celda.setdefault((mencion.cell, mencion.entity_type), []).append(mencion)
+
+        for indice_fila, fila in enumerate(filas):
+            # Buscar nombres de centrales: nombre canónico del gazetteer, o heurística
+            # para centrales que aún no están en las listas
             nombre_central = None
+            texto_central = None
             for campo in ["central", "planta", "generador", "unidad", "nombre"]:
                 if campo in fila and fila[campo]:
                     nombre_candidato = fila[campo].strip()
+                    conocidas = menciones_celda.get(((indice_fila, campo), "central"))
+                    if conocidas:
+                        nombre_central, texto_central = conocidas[0].canonical, nombre_candidato
+                        break
                     if es_probable_nombre_central_chile(nombre_candidato):
-                        nombre_central = nombre_candidato
+                        nombre_central, texto_central = nombre_candidato, nombre_candidato
                         break
 
             if nombre_central:
                 entidades["centrales_electricas"].append({
                     "@id": f"cen:central:{normalizar_nombre_chile(nombre_central)}",
-                    "@type": determinar_tipo_central_chile(nombre_central),
+                    "@type": determinar_tipo_central_chile(texto_central),
                     "nombre": nombre_central,
                     "confianza": 0.9,
                     "metadatos": {
                         "fuente_anexo": "tabla_superior",
+                        "texto_original": texto_central,
                         "sistema_electrico": "chileno",
-                        "region_sistema": determinar_region_chile(nombre_central)
+                        "region_sistema": determinar_region_chile(texto_central)
                     }
                 })
 
-            # Buscar nombres de empresas chilenas
+            # Buscar nombres de empresas chilenas (gazetteer, o forma societaria del sector)
             nombre_empresa = None
             for campo in ["empresa", "compañia", "operador", "propietario"]:
                 if campo in fila and fila[campo]:
                     nombre_candidato = fila[campo].strip()
+                    conocidas = menciones_celda.get(((indice_fila, campo), "empresa"))
+                    if conocidas:
+                        nombre_empresa = conocidas[0].canonical
+                        break
                     if es_probable_nombre_empresa_chile(nombre_candidato):
                         nombre_empresa = nombre_candidato
                         break
@@ -139,11 +160,12 @@ def extraer_entidades_datos_chile(datos: dict) -> dict:
                     }
                 })
 
-    # Extraer ubicaciones chilenas
+    # Extraer ubicaciones chilenas (valores de texto de los datos, no sus claves)
     if "upper_table" in datos:
-        texto_completo = json.dumps(datos).lower()
-        regiones_chile = detectar_regiones_chile(texto_completo)
-        for region in regiones_chile:
+        regiones_chile = []
+        for texto in textos_datos(datos):
+            regiones_chile.extend(detectar_regiones_chile(texto))
+        for region in dict.fromkeys(regiones_chile):
             entidades["ubicaciones"].append({
                 "@id": f"cen:ubicacion:{normalizar_nombre_chile(region)}",
                 "@type": "RegionChile",
@@ -161,6 +183,19 @@ def extraer_entidades_datos_chile(datos: dict) -> dict:
 
     return entidades
 
+def textos_datos(datos) -> List[str]:
+    """Valores de texto de una estructura de extracción (dicts y listas anidados)"""
+    if isinstance(datos, str):
+        return [datos]
+    if isinstance(datos, dict):
+        datos = datos.values()
+    elif not isinstance(datos, (list, tuple)):
+        return []
+    textos = []
+    for valor in datos:
+        textos.extend(textos_datos(valor))
+    return textos
+
 def determinar_tipo_central_chile(nombre_central: str) -> str:
     """Determinar tipo de central del sistema eléctrico chileno"""
     nombre_lower = nombre_central.lower()
@@ -216,18 +251,15 @@ def es_probable_nombre_empresa_chile(texto: str) -> bool:
     if not isinstance(texto, str) or len(texto) < 3:
         return False
 
-    # Empresas conocidas del sector eléctrico chileno
-    empresas_chile = ["enel", "colbún", "aes", "engie", "statkraft", "acciona", "solarpack"]
+    # Empresas conocidas del sector eléctrico chileno (gazetteer)
+    if get_gazetteer().find(texto, types=["empresa"]):
+        return True
 
     # Formas societarias chilenas
     formas_societarias = ["s.a.", "spa", "ltda.", "limitada"]
 
     texto_lower = texto.lower()
 
-    # Verificar empresas conocidas
-    if any(empresa in texto_lower for empresa in empresas_chile):
-        return True
-
     # Verificar formas societarias + palabras clave del sector
     if any(forma in texto_lower for forma in formas_societarias):
         if any(palabra in texto_lower for palabra in ["energía", "energia", "eléctrica", "electrica", "generación", "generacion"]):
@@ -236,42 +268,14 @@ def es_probable_nombre_empresa_chile(texto: str) -> bool:
     return False
 
 def detectar_regiones_chile(texto: str) -> list:
-    """Detectar regiones de Chile mencionadas en el texto"""
-    regiones_chile = [
-        "Arica y Parinacota", "Tarapacá", "Antofagasta", "Atacama",
-        "Coquimbo", "Valparaíso", "Metropolitana", "O'Higgins",
-        "Maule", "Ñuble", "Biobío", "Araucanía", "Los Ríos",
-        "Los Lagos", "Aysén", "Magallanes"
-    ]
-
-    regiones_encontradas = []
-    for region in regiones_chile:
-        if region.lower() in texto:
-            regiones_encontradas.append(region)
-
-    return regiones_encontradas
+    """Detectar regiones de Chile mencionadas en el texto (sin distinguir mayúsculas ni acentos)"""
+    menciones = get_gazetteer().find(texto, types=["region"])
+    return list(dict.fromkeys(mencion.canonical for mencion in menciones))
 
 def determinar_region_chile(nombre_central: str) -> str:
     """Determinar región chilena basada en el nombre de la central"""
-    nombre_lower = nombre_central.lower()
-
-    mapeo_regiones = {
-        "atacama": "Atacama",
-        "antofagasta": "Antofagasta",
-        "tarapacá": "Tarapacá",
-        "coquimbo": "Coquimbo",
-        "valparaíso": "Valparaíso",
-        "santiago": "Metropolitana",
-        "maule": "Maule",
-        "biobío": "Biobío",
-        "araucanía": "Araucanía"
-    }
-
-    for indicador, region in mapeo_regiones.items():
-        if indicador in nombre_lower:
-            return region
-
-    return "No determinada"
+    regiones = detectar_regiones_chile(nombre_central)
+    return regiones[0] if regiones else "No determinada"
 
 def normalizar_nombre_chile(nombre: str) -> str:
     """Normalizar nombre chileno para ID de entidad"""
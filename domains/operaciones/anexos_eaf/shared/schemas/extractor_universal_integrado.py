@@ -4,11 +4,18 @@ Extractor Universal Integrado - Sistema Eléctrico Chileno
 Convierte automáticamente extracciones a esquema universal CON referencias integradas
 """
 
-import json
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set
 from domains.operaciones.anexos_eaf.shared.schemas.esquema_universal_chileno import crear_documento_universal_chile, extraer_entidades_datos_chile
+from domains.operaciones.anexos_eaf.shared.schemas.indice_referencias import IndiceReferenciasCruzadas
+from domains.operaciones.anexos_eaf.shared.schemas.catalogo_universal import (
+    CatalogoDocumentosUniversales, NOMBRE_CATALOGO, escribir_json_atomico
+)
+
+# Términos de las reglas automáticas de dominio (contenido en minúsculas)
+TERMINOS_ERNC = ["solar", "eólica", "biomasa"]
+TERMINOS_INCIDENTE = ["incidente", "falla", "interrupción"]
 
 class ExtractorUniversalIntegrado:
     """Convierte automáticamente extracciones a esquema universal con referencias integradas"""
@@ -17,6 +24,30 @@ class ExtractorUniversalIntegrado:
         self.directorio_documentos = self._get_chapter_extractions_path()
         self.directorio_documentos.mkdir(parents=True, exist_ok=True)
 
+        # Catálogo SQLite: documentos, claves de entidades y referencias como filas
+        self.catalogo = CatalogoDocumentosUniversales(self.directorio_documentos / NOMBRE_CATALOGO)
+
+        # Índices invertidos en memoria, alimentados incrementalmente desde el catálogo:
+        # las reglas consultan coincidencias en lugar de comparar contra cada documento
+        self.indice = IndiceReferenciasCruzadas()
+        self._secuencia_catalogo = 0
+
+        conn = self.catalogo.conectar()
+        try:
+            # Migrar documentos JSON anteriores al catálogo
+            if self.catalogo.total_documentos(conn) == 0:
+                self.catalogo.importar_directorio(conn, self.directorio_documentos)
+            self.catalogo.verificar_vocabulario(conn)
+        finally:
+            conn.close()
+
+    def _get_chapter_extractions_path(self, chapter_type: str = None) -> Path:
+        """Get extractions path for specific chapter"""
+        if chapter_type:
+            return Path(f"domains/operaciones/anexos_eaf/chapters/{chapter_type}/data/extractions")
+        else:
+            return Path("domains/operaciones/anexos_eaf/data/consolidated_extractions")
+
     def procesar_extraccion_completa(self, datos_extraccion: dict,
                                    titulo_documento: str,
                                    fecha_documento: str,
@@ -45,49 +76,47 @@ class ExtractorUniversalIntegrado:
             dominio=dominio
         )
 
-        # Paso 2: Buscar documentos existentes para referencias
-        documentos_existentes = self._buscar_documentos_existentes()
+        conn = self.catalogo.conectar()
+        try:
+            # Pasos 2-6 en una transacción de escritura: extractores concurrentes
+            # se serializan aquí y cada uno ve los documentos registrados por los demás
+            with self.catalogo.transaccion(conn):
+                # Paso 2: Cargar documentos existentes (resúmenes nuevos del catálogo)
+                self._buscar_documentos_existentes(conn)
 
-        # Paso 3: Generar referencias cruzadas automáticamente
-        referencias_cruzadas = self._generar_referencias_automaticas(
-            documento_universal,
-            documentos_existentes
-        )
+                # Paso 3: Generar referencias cruzadas automáticamente
+                referencias_cruzadas = self._generar_referencias_automaticas(documento_universal)
 
-        # Paso 4: Integrar referencias en el documento
-        documento_universal["referencias_cruzadas"] = referencias_cruzadas
+                # Paso 4: Integrar referencias en el documento
+                documento_universal["referencias_cruzadas"] = referencias_cruzadas
 
-        # Paso 5: Guardar documento con referencias integradas
-        ruta_guardado = self._guardar_documento_universal(documento_universal)
+                # Paso 5: Guardar documento con referencias integradas y registrarlo
+                ruta_guardado = self._guardar_documento_universal(documento_universal)
+                resumen = self.catalogo.registrar_documento(conn, documento_universal, ruta_guardado)
+                self.catalogo.quitar_referencias(conn, resumen["@id"])
+                self.catalogo.agregar_referencias(conn, resumen["@id"], referencias_cruzadas)
+                self.indice.agregar_resumen(resumen)
 
-        # Paso 6: Actualizar referencias de documentos existentes
-        self._actualizar_referencias_documentos_existentes(documento_universal, documentos_existentes)
+                # Paso 6: Actualizar referencias de documentos existentes (filas nuevas)
+                actualizados = self._actualizar_referencias_documentos_existentes(documento_universal, conn)
+        finally:
+            conn.close()
 
         print(f"✅ Documento universal procesado: {ruta_guardado}")
         print(f"📊 Referencias generadas: {len(referencias_cruzadas)}")
-        print(f"🔄 Documentos actualizados: {len(documentos_existentes)}")
+        print(f"🔄 Documentos actualizados: {actualizados}")
 
         return documento_universal
 
-    def _buscar_documentos_existentes(self) -> List[Dict]:
-        """Buscar todos los documentos universales existentes"""
-        documentos = []
-
-        # Buscar en el directorio de extracciones
-        for archivo_json in self.directorio_documentos.glob("**/*.json"):
-            if archivo_json.name.endswith("_universal.json"):
-                try:
-                    with open(archivo_json, 'r', encoding='utf-8') as f:
-                        documento = json.load(f)
-                        # Verificar que es documento universal
-                        if "@context" in documento and "@id" in documento:
-                            documentos.append(documento)
-                except Exception as e:
-                    print(f"⚠️ Error leyendo {archivo_json}: {e}")
-
-        return documentos
-
-    def _generar_referencias_automaticas(self, documento: Dict, otros_documentos: List[Dict]) -> List[Dict]:
+    def _buscar_documentos_existentes(self, conn) -> int:
+        """Indexar los documentos registrados en el catálogo desde la última lectura"""
+        for secuencia, resumen in self.catalogo.resumenes_desde(conn, self._secuencia_catalogo):
+            self.indice.agregar_resumen(resumen)
+            self._secuencia_catalogo = secuencia
+
+        return len(self.indice.documentos)
+
+    def _generar_referencias_automaticas(self, documento: Dict, otros_documentos: Optional[List[Dict]] = None) -> List[Dict]:
         """Generar referencias cruzadas automáticamente usando reglas del sistema chileno"""
 
         referencias = []
@@ -102,23 +131,46 @@ class ExtractorUniversalIntegrado:
 
         return referencias_unicas
 
+    def _ids_candidatos(self, documento: Dict, otros_documentos: Optional[List[Dict]]) -> Optional[Set[str]]:
+        """IDs de otros_documentos (None = todo el índice), sin el propio documento"""
+        if otros_documentos is None:
+            return None
+        self.indice.sincronizar(otros_documentos)
+        ids = {d.get("@id") for d in otros_documentos}
+        ids.discard(documento.get("@id"))
+        return ids
+
+    def _filtrar(self, ids: Set[str], permitidos: Optional[Set[str]], documento: Dict) -> List[str]:
+        ids = ids - {documento.get("@id")}
+        if permitidos is not None:
+            ids &= permitidos
+        return self.indice.ordenar(ids)
+
     def _reglas_temporales_chile(self, documento: Dict, otros_documentos: List[Dict]) -> List[Dict]:
         """Aplicar reglas temporales del sistema eléctrico chileno"""
         referencias = []
-        fecha_doc = documento.get("metadatos_universales", {}).get("fecha_creacion")
+        permitidos = self._ids_candidatos(documento, otros_documentos)
+        resumen = self.indice.resumen(documento)
+        fecha_doc = resumen["fecha_creacion"]
 
         if not fecha_doc:
             return referencias
 
-        for otro_doc in otros_documentos:
-            otra_fecha = otro_doc.get("metadatos_universales", {}).get("fecha_creacion")
-            otro_dominio = otro_doc.get("metadatos_universales", {}).get("dominio")
+        if resumen["fecha"]:
+            candidatos = self.indice.con_fecha(datetime.fromisoformat(resumen["fecha"]))
+        else:
+            # Fecha no ISO: sin clave en el índice, se compara el texto como antes
+            candidatos = {otro_id for otro_id, otro in self.indice.documentos.items()
+                          if otro["fecha_creacion"] == fecha_doc}
+
+        for otro_id in self._filtrar(candidatos, permitidos, documento):
+            otro = self.indice.documentos[otro_id]
 
             # Misma fecha operativa del SEN
-            if fecha_doc == otra_fecha and otro_dominio != documento.get("metadatos_universales", {}).get("dominio"):
+            if fecha_doc == otro["fecha_creacion"] and otro["dominio"] != resumen["dominio"]:
                 referencias.append({
-                    "documento_objetivo": otro_doc.get("@id"),
-                    "dominio_objetivo": otro_dominio,
+                    "documento_objetivo": otro_id,
+                    "dominio_objetivo": otro["dominio"],
                     "tipo_relacion": "MISMA_FECHA_OPERATIVA_SEN",
                     "confianza": 1.0,
                     "contexto": f"Documentos operativos del SEN de la misma fecha: {fecha_doc}",
@@ -131,37 +183,44 @@ class ExtractorUniversalIntegrado:
     def _reglas_entidades_chile(self, documento: Dict, otros_documentos: List[Dict]) -> List[Dict]:
         """Aplicar reglas basadas en entidades del sistema chileno"""
         referencias = []
-        entidades_doc = self._extraer_nombres_entidades_documento(documento)
+        permitidos = self._ids_candidatos(documento, otros_documentos)
+        resumen = self.indice.resumen(documento)
+        centrales_doc = set(resumen["centrales"])
+        empresas_doc = set(resumen["empresas"])
 
-        for otro_doc in otros_documentos:
-            otras_entidades = self._extraer_nombres_entidades_documento(otro_doc)
+        candidatos = self.indice.con_centrales(centrales_doc) | self.indice.con_empresas(empresas_doc)
+
+        for otro_id in self._filtrar(candidatos, permitidos, documento):
+            otro = self.indice.documentos[otro_id]
 
             # Centrales eléctricas comunes
-            centrales_comunes = set(entidades_doc.get("centrales_electricas", [])) & set(otras_entidades.get("centrales_electricas", []))
+            centrales_comunes = centrales_doc & set(otro["centrales"])
 
             # Empresas comunes
-            empresas_comunes = set(entidades_doc.get("empresas", [])) & set(otras_entidades.get("empresas", []))
+            empresas_comunes = empresas_doc & set(otro["empresas"])
 
             if centrales_comunes:
                 referencias.append({
-                    "documento_objetivo": otro_doc.get("@id"),
-                    "dominio_objetivo": otro_doc.get("metadatos_universales", {}).get("dominio"),
+                    "documento_objetivo": otro_id,
+                    "dominio_objetivo": otro["dominio"],
                     "tipo_relacion": "REFERENCIA_CENTRAL_SEN",
                     "confianza": 0.85,
-                    "contexto": f"Ambos documentos mencionan centrales del SEN: {', '.join(list(centrales_comunes)[:3])}",
-                    "entidades_compartidas": list(centrales_comunes),
+                    "contexto": f"Ambos documentos mencionan centrales del SEN: {', '.join(resumen['nombres_entidades'][i] for i in sorted(centrales_comunes)[:3])}",
+                    "entidades_compartidas": [resumen['nombres_entidades'][i] for i in sorted(centrales_comunes)],
+                    "ids_entidades_compartidas": sorted(centrales_comunes),
                     "sistema": "chileno",
                     "automatico": True
                 })
 
             elif empresas_comunes:
                 referencias.append({
-                    "documento_objetivo": otro_doc.get("@id"),
-                    "dominio_objetivo": otro_doc.get("metadatos_universales", {}).get("dominio"),
+                    "documento_objetivo": otro_id,
+                    "dominio_objetivo": otro["dominio"],
                     "tipo_relacion": "REFERENCIA_EMPRESA_GENERADORA",
                     "confianza": 0.8,
-                    "contexto": f"Ambos documentos mencionan empresas generadoras: {', '.join(list(empresas_comunes)[:3])}",
-                    "entidades_compartidas": list(empresas_comunes),
+                    "contexto": f"Ambos documentos mencionan empresas generadoras: {', '.join(resumen['nombres_entidades'][i] for i in sorted(empresas_comunes)[:3])}",
+                    "entidades_compartidas": [resumen['nombres_entidades'][i] for i in sorted(empresas_comunes)],
+                    "ids_entidades_compartidas": sorted(empresas_comunes),
                     "sistema": "chileno",
                     "automatico": True
                 })
@@ -171,7 +230,9 @@ class ExtractorUniversalIntegrado:
     def _reglas_dominio_chile(self, documento: Dict, otros_documentos: List[Dict]) -> List[Dict]:
         """Aplicar reglas específicas de dominios del sistema chileno"""
         referencias = []
-        dominio_doc = documento.get("metadatos_universales", {}).get("dominio")
+        permitidos = self._ids_candidatos(documento, otros_documentos)
+        resumen = self.indice.resumen(documento)
+        dominio_doc = resumen["dominio"]
 
         # Reglas específicas por dominio
         reglas_chile = {
@@ -187,24 +248,36 @@ class ExtractorUniversalIntegrado:
 
         if dominio_doc in reglas_chile:
             for dominio_objetivo, funcion_reglas in reglas_chile[dominio_doc].items():
-                docs_objetivo = [d for d in otros_documentos
-                               if d.get("metadatos_universales", {}).get("dominio") == dominio_objetivo]
-                referencias.extend(funcion_reglas(documento, docs_objetivo))
+                referencias.extend(funcion_reglas(resumen, dominio_objetivo, permitidos))
 
         return referencias
 
-    def _reglas_operaciones_a_mercados_chile(self, doc_operaciones: Dict, docs_mercados: List[Dict]) -> List[Dict]:
+    def _candidatos_dominio(self, dominio: str, palabras: List[str], permitidos: Optional[Set[str]]) -> Set[str]:
+        ids = self.indice.con_palabras_clave(palabras, dominio)
+        return ids & permitidos if permitidos is not None else ids
+
+    def _reglas_operaciones_a_mercados_chile(self, resumen_operaciones: Dict, dominio_objetivo: str,
+                                            permitidos: Optional[Set[str]]) -> List[Dict]:
         """Reglas específicas: operaciones → mercados en sistema chileno"""
         referencias = []
-        contenido = self._obtener_contenido_documento(doc_operaciones)
+        contenido = set(resumen_operaciones["palabras_clave"])
+        es_solar = "solar" in contenido
+        es_incidente = any(palabra in contenido for palabra in TERMINOS_INCIDENTE)
 
-        for doc_mercado in docs_mercados:
-            contenido_mercado = self._obtener_contenido_documento(doc_mercado)
+        # Solo documentos de mercado que mencionan precio/spot (solar) o mercado (incidentes)
+        candidatos = set()
+        if es_solar:
+            candidatos |= self._candidatos_dominio(dominio_objetivo, ["precio", "spot"], permitidos)
+        if es_incidente:
+            candidatos |= self._candidatos_dominio(dominio_objetivo, ["mercado"], permitidos)
+
+        for doc_mercado_id in self.indice.ordenar(candidatos):
+            contenido_mercado = set(self.indice.documentos[doc_mercado_id]["palabras_clave"])
 
             # Solar afecta precios mediodía
-            if "solar" in contenido and ("precio" in contenido_mercado or "spot" in contenido_mercado):
+            if es_solar and ("precio" in contenido_mercado or "spot" in contenido_mercado):
                 referencias.append({
-                    "documento_objetivo": doc_mercado.get("@id"),
+                    "documento_objetivo": doc_mercado_id,
                     "dominio_objetivo": "mercados",
                     "tipo_relacion": "IMPACTA_PRECIO_MEDIODIA",
                     "confianza": 0.85,
@@ -215,9 +288,9 @@ class ExtractorUniversalIntegrado:
                 })
 
             # Incidentes afectan mercado
-            elif any(palabra in contenido for palabra in ["incidente", "falla", "interrupción"]) and "mercado" in contenido_mercado:
+            elif es_incidente and "mercado" in contenido_mercado:
                 referencias.append({
-                    "documento_objetivo": doc_mercado.get("@id"),
+                    "documento_objetivo": doc_mercado_id,
                     "dominio_objetivo": "mercados",
                     "tipo_relacion": "CAUSA_ALTERACION_MERCADO",
                     "confianza": 0.9,
@@ -229,72 +302,66 @@ class ExtractorUniversalIntegrado:
 
         return referencias
 
-    def _reglas_operaciones_a_legal_chile(self, doc_operaciones: Dict, docs_legal: List[Dict]) -> List[Dict]:
+    def _reglas_operaciones_a_legal_chile(self, resumen_operaciones: Dict, dominio_objetivo: str,
+                                         permitidos: Optional[Set[str]]) -> List[Dict]:
         """Reglas específicas: operaciones → legal en sistema chileno"""
         referencias = []
-        contenido = self._obtener_contenido_documento(doc_operaciones)
+        contenido = set(resumen_operaciones["palabras_clave"])
 
-        for doc_legal in docs_legal:
-            contenido_legal = self._obtener_contenido_documento(doc_legal)
+        # Centrales ERNC → normativa ERNC
+        if not any(palabra in contenido for palabra in TERMINOS_ERNC):
+            return referencias
 
-            # Centrales ERNC → normativa ERNC
-            if any(palabra in contenido for palabra in ["solar", "eólica", "biomasa"]) and "ernc" in contenido_legal:
-                referencias.append({
-                    "documento_objetivo": doc_legal.get("@id"),
-                    "dominio_objetivo": "legal",
-                    "tipo_relacion": "DEBE_CUMPLIR_NORMATIVA_ERNC",
-                    "confianza": 0.9,
-                    "contexto": "Centrales ERNC deben cumplir normativa de energías renovables",
-                    "regla_automatica": "ernc_cumple_normativa",
-                    "sistema": "chileno",
-                    "automatico": True
-                })
+        for doc_legal_id in self.indice.ordenar(self._candidatos_dominio(dominio_objetivo, ["ernc"], permitidos)):
+            referencias.append({
+                "documento_objetivo": doc_legal_id,
+                "dominio_objetivo": "legal",
+                "tipo_relacion": "DEBE_CUMPLIR_NORMATIVA_ERNC",
+                "confianza": 0.9,
+                "contexto": "Centrales ERNC deben cumplir normativa de energías renovables",
+                "regla_automatica": "ernc_cumple_normativa",
+                "sistema": "chileno",
+                "automatico": True
+            })
 
         return referencias
 
-    def _reglas_operaciones_a_planificacion_chile(self, doc_operaciones: Dict, docs_planificacion: List[Dict]) -> List[Dict]:
+    def _reglas_operaciones_a_planificacion_chile(self, resumen_operaciones: Dict, dominio_objetivo: str,
+                                                 permitidos: Optional[Set[str]]) -> List[Dict]:
         """Reglas específicas: operaciones → planificación en sistema chileno"""
         referencias = []
         # Implementar reglas específicas operaciones → planificación
         return referencias
 
-    def _reglas_mercados_a_planificacion_chile(self, doc_mercados: Dict, docs_planificacion: List[Dict]) -> List[Dict]:
+    def _reglas_mercados_a_planificacion_chile(self, resumen_mercados: Dict, dominio_objetivo: str,
+                                              permitidos: Optional[Set[str]]) -> List[Dict]:
         """Reglas específicas: mercados → planificación en sistema chileno"""
         referencias = []
         # Implementar reglas específicas mercados → planificación
         return referencias
 
-    def _extraer_nombres_entidades_documento(self, documento: Dict) -> Dict[str, List[str]]:
-        """Extraer nombres de entidades del documento"""
-        entidades = documento.get("entidades", {})
-        nombres = {}
-
-        for tipo_entidad, lista_entidades in entidades.items():
-            if isinstance(lista_entidades, list):
-                nombres[tipo_entidad] = [e.get("nombre", "") for e in lista_entidades if e.get("nombre")]
-
-        return nombres
-
-    def _obtener_contenido_documento(self, documento: Dict) -> str:
-        """Obtener contenido de texto para verificación de reglas"""
-        contenido = []
-
-        # De metadatos
-        metadatos = documento.get("metadatos_universales", {})
-        contenido.append(metadatos.get("titulo", ""))
-
-        # De etiquetas semánticas
-        etiquetas = documento.get("etiquetas_semanticas", [])
-        contenido.extend(etiquetas)
-
-        # De nombres de entidades
-        entidades = documento.get("entidades", {})
-        for lista_entidades in entidades.values():
-            if isinstance(lista_entidades, list):
-                for entidad in lista_entidades:
-                    contenido.append(entidad.get("nombre", ""))
-
-        return " ".join(contenido).lower()
+    def _documentos_afectados(self, nuevo_documento: Dict) -> Set[str]:
+        """Documentos indexados que pueden generar referencias hacia el nuevo documento"""
+        resumen = self.indice.resumen(nuevo_documento)
+        contenido = set(resumen["palabras_clave"])
+
+        afectados = set()
+        if resumen["fecha"]:
+            afectados |= self.indice.con_fecha(datetime.fromisoformat(resumen["fecha"]))
+        afectados |= self.indice.con_centrales(resumen["centrales"])
+        afectados |= self.indice.con_empresas(resumen["empresas"])
+
+        # Reglas de dominio en dirección inversa (operaciones → mercados/legal)
+        if resumen["dominio"] == "mercados":
+            if "precio" in contenido or "spot" in contenido:
+                afectados |= self.indice.con_palabras_clave(["solar"], "operaciones")
+            if "mercado" in contenido:
+                afectados |= self.indice.con_palabras_clave(TERMINOS_INCIDENTE, "operaciones")
+        elif resumen["dominio"] == "legal" and "ernc" in contenido:
+            afectados |= self.indice.con_palabras_clave(TERMINOS_ERNC, "operaciones")
+
+        afectados.discard(resumen["@id"])
+        return afectados
 
     def _limpiar_referencias(self, referencias: List[Dict]) -> List[Dict]:
         """Limpiar referencias: remover duplicados, ordenar por confianza"""
@@ -324,29 +391,30 @@ class ExtractorUniversalIntegrado:
         documento["metadatos_calidad"]["ruta_archivo"] = str(ruta_archivo)
         documento["metadatos_calidad"]["referencias_integradas"] = len(documento.get("referencias_cruzadas", []))
 
-        with open(ruta_archivo, 'w', encoding='utf-8') as f:
-            json.dump(documento, f, indent=2, ensure_ascii=False)
+        # Escritura atómica: otro extractor nunca ve un archivo a medio escribir
+        escribir_json_atomico(ruta_archivo, documento)
 
         return ruta_archivo
 
-    def _actualizar_referencias_documentos_existentes(self, nuevo_documento: Dict, documentos_existentes: List[Dict]):
-        """Actualizar referencias de documentos existentes para incluir el nuevo documento"""
-
-        for doc_existente in documentos_existentes:
-            referencias_nuevas = self._generar_referencias_hacia_nuevo_documento(doc_existente, nuevo_documento)
+    def _actualizar_referencias_documentos_existentes(self, nuevo_documento: Dict, conn) -> int:
+        """
+        Agregar referencias de documentos existentes hacia el nuevo documento
 
-            if referencias_nuevas:
-                # Añadir nuevas referencias al documento existente
-                if "referencias_cruzadas" not in doc_existente:
-                    doc_existente["referencias_cruzadas"] = []
+        Las referencias se agregan como filas del catálogo (sin reescribir el JSON
+        del documento existente); CatalogoDocumentosUniversales.cargar_documento
+        devuelve el documento con todas sus referencias.
+        """
+        # Solo los documentos que comparten fecha, entidades o palabras de regla con el nuevo
+        actualizados = 0
 
-                doc_existente["referencias_cruzadas"].extend(referencias_nuevas)
+        for doc_id in self.indice.ordenar(self._documentos_afectados(nuevo_documento)):
+            doc_existente = self.indice.documentos[doc_id]
+            referencias_nuevas = self._generar_referencias_hacia_nuevo_documento(doc_existente, nuevo_documento)
 
-                # Limpiar duplicados
-                doc_existente["referencias_cruzadas"] = self._limpiar_referencias(doc_existente["referencias_cruzadas"])
+            if referencias_nuevas and self.catalogo.agregar_referencias(conn, doc_id, referencias_nuevas):
+                actualizados += 1
 
-                # Guardar documento actualizado
-                self._guardar_documento_universal(doc_existente)
+        return actualizados
 
     def _generar_referencias_hacia_nuevo_documento(self, doc_existente: Dict, nuevo_documento: Dict) -> List[Dict]:
         """Generar referencias desde documento existente hacia nuevo documento"""
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Índice Invertido de Referencias Cruzadas - Sistema Eléctrico Chileno
+Índices persistentes fecha/central/empresa/palabra clave → documentos
+
+Las reglas de referencias cruzadas comparaban cada documento contra todos los
+demás, re-extrayendo fechas, entidades y contenido del otro lado cada vez
+(O(N²)). El índice guarda un resumen por documento (dominio, fecha, centrales,
+empresas y palabras clave de las reglas presentes en su contenido) y mantiene
+los índices invertidos al agregar o quitar documentos, de modo que agregar un
+documento cuesta en proporción a sus coincidencias y no al tamaño del corpus.
+
+Centrales y empresas se indexan por ID canónico del catálogo de entidades
+(cen:central:*, cen:empresa:*), así "PFV El Romero" y "EL ROMERO SOLAR" son la
+misma central aunque los documentos las escriban distinto.
+"""
+
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from entity_catalog import get_entity_catalog
+
+VERSION_INDICE = 2
+
+# Palabras clave de las condiciones de reglas de dominio (documento origen)
+CONDICIONES_CHILE = {
+    "generacion_solar_mencionada": ["solar", "fotovoltaica", "pv"],
+    "incidente_sistema": ["incidente", "falla", "interrupción", "emergencia", "desconexion"],
+    "incidente_seguridad": ["seguridad", "accidente", "peligro", "riesgo"],
+    "falla_equipo": ["falla", "avería", "defecto", "mal funcionamiento"],
+    "alta_demanda_pronosticada": ["alta demanda", "peak", "máximo", "pronóstico alto"]
+}
+
+# Palabras clave por tipo de documento objetivo
+TIPOS_OBJETIVO_CHILE = {
+    "datos_precio_solar": ["solar", "precio", "costo marginal"],
+    "alteracion_mercado": ["mercado", "interrupción", "alteración"],
+    "normativa_seguridad": ["seguridad", "normativa", "cne"],
+    "norma_tecnica": ["norma técnica", "especificación", "coordinador"],
+    "expansion_capacidad": ["expansión", "transmisión", "capacidad"]
+}
+
+# Términos usados por las reglas automáticas de ExtractorUniversalIntegrado
+TERMINOS_EXTRACTOR = ["solar", "precio", "spot", "incidente", "falla", "interrupción",
+                      "mercado", "eólica", "biomasa", "ernc"]
+
+VOCABULARIO_PALABRAS_CLAVE = sorted(
+    {palabra for palabras in CONDICIONES_CHILE.values() for palabra in palabras} |
+    {palabra for palabras in TIPOS_OBJETIVO_CHILE.values() for palabra in palabras} |
+    set(TERMINOS_EXTRACTOR)
+)
+
+PALABRAS_INFORME_DIARIO = ["diario", "daily", "informe_diario", "operacion_diaria"]
+
+
+def extraer_fecha_documento(documento: Dict) -> Optional[datetime]:
+    """Fecha de creación del documento (None si falta o no es ISO)"""
+    fecha_str = documento.get("metadatos_universales", {}).get("fecha_creacion")
+    if fecha_str:
+        try:
+            return datetime.fromisoformat(fecha_str)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def extraer_nombres_entidades(documento: Dict) -> Dict[str, List[str]]:
+    """Nombres de entidades por tipo de entidad"""
+    nombres = {}
+    for tipo_entidad, lista_entidades in documento.get("entidades", {}).items():
+        if isinstance(lista_entidades, list):
+            nombres[tipo_entidad] = [e.get("nombre", "") for e in lista_entidades if e.get("nombre")]
+    return nombres
+
+
+def obtener_contenido_documento(documento: Dict) -> str:
+    """Título, etiquetas semánticas y nombres de entidades, en minúsculas"""
+    metadatos = documento.get("metadatos_universales", {})
+    contenido = [metadatos.get("titulo", "")]
+    contenido.extend(documento.get("etiquetas_semanticas", []))
+    for lista_entidades in documento.get("entidades", {}).values():
+        if isinstance(lista_entidades, list):
+            contenido.extend(entidad.get("nombre", "") for entidad in lista_entidades)
+    return " ".join(contenido).lower()
+
+
+def es_informe_diario_sen(documento: Dict) -> bool:
+    """Verificar si es informe diario del SEN"""
+    metadatos = documento.get("metadatos_universales", {})
+    tipo_doc = metadatos.get("tipo_documento", "").lower()
+    titulo = metadatos.get("titulo", "").lower()
+    return any(palabra in tipo_doc or palabra in titulo for palabra in PALABRAS_INFORME_DIARIO)
+
+
+def resolver_entidades(nombres: List[str], tipo_entidad: str) -> Dict[str, str]:
+    """IDs canónicos (o provisionales si no están en el catálogo) → nombre a mostrar"""
+    catalogo = get_entity_catalog()
+    resueltas = {}
+    for nombre, resolucion in catalogo.resolve_many(nombres, tipo_entidad).items():
+        if resolucion.resolved:
+            resueltas[resolucion.entity_id] = resolucion.canonical_name
+        else:
+            resueltas.setdefault(catalogo.provisional_id(nombre, tipo_entidad), nombre)
+    return resueltas
+
+
+def _clave_fecha(fecha: datetime) -> str:
+    """Clave del índice por fecha: el día, sin la hora"""
+    return fecha.date().isoformat()
+
+
+def resumir_documento(documento: Dict) -> Dict:
+    """Resumen indexable de un documento universal (lo único que miran las reglas)"""
+    metadatos = documento.get("metadatos_universales", {})
+    fecha = extraer_fecha_documento(documento)
+    entidades = extraer_nombres_entidades(documento)
+    contenido = obtener_contenido_documento(documento)
+    centrales = resolver_entidades(entidades.get("centrales_electricas", []), "central")
+    empresas = resolver_entidades(entidades.get("empresas", []), "empresa")
+
+    return {
+        "@id": documento.get("@id"),
+        "dominio": metadatos.get("dominio"),
+        "fecha_creacion": metadatos.get("fecha_creacion"),
+        "fecha": fecha.isoformat() if fecha else None,
+        "informe_diario": es_informe_diario_sen(documento),
+        "centrales": sorted(centrales),
+        "empresas": sorted(empresas),
+        "nombres_entidades": {**centrales, **empresas},
+        # Misma semántica que las reglas: subcadena del contenido en minúsculas
+        "palabras_clave": [palabra for palabra in VOCABULARIO_PALABRAS_CLAVE if palabra in contenido]
+    }
+
+
+class IndiceReferenciasCruzadas:
+    """Índices invertidos persistentes para las reglas de referencias cruzadas"""
+
+    def __init__(self, ruta: Optional[Path] = None):
+        self.ruta = Path(ruta) if ruta else None
+        self.documentos: Dict[str, Dict] = {}
+        self._limpiar_indices()
+        if self.ruta and self.ruta.exists():
+            self.cargar()
+
+    def _limpiar_indices(self):
+        self.por_fecha: Dict[str, Set[str]] = defaultdict(set)
+        self.por_central: Dict[str, Set[str]] = defaultdict(set)
+        self.por_empresa: Dict[str, Set[str]] = defaultdict(set)
+        self.por_palabra_clave: Dict[str, Set[str]] = defaultdict(set)
+        self.por_dominio: Dict[str, Set[str]] = defaultdict(set)
+        self._secuencia = 0
+
+    # ========== Mantenimiento incremental ==========
+
+    def agregar_documento(self, documento: Dict) -> Optional[Dict]:
+        """Indexar (o re-indexar) un documento; devuelve su resumen"""
+        resumen = resumir_documento(documento)
+        if not resumen["@id"]:
+            return None
+        self.quitar_documento(resumen["@id"])
+        self._indexar(resumen)
+        return resumen
+
+    def agregar_resumen(self, resumen: Dict):
+        """Indexar un resumen ya calculado (p. ej. leído del catálogo)"""
+        self.quitar_documento(resumen["@id"])
+        self._indexar(dict(resumen))
+
+    def quitar_documento(self, doc_id: str):
+        """Quitar un documento de todos los índices"""
+        resumen = self.documentos.pop(doc_id, None)
+        if not resumen:
+            return
+        for indice, claves in self._claves(resumen):
+            for clave in claves:
+                indice[clave].discard(doc_id)
+                if not indice[clave]:
+                    del indice[clave]
+
+    def sincronizar(self, documentos: Iterable[Dict]) -> int:
+        """Indexar los documentos de la lista que aún no están (por @id)"""
+        agregados = 0
+        for documento in documentos:
+            doc_id = documento.get("@id")
+            if doc_id and doc_id not in self.documentos:
+                self.agregar_documento(documento)
+                agregados += 1
+        return agregados
+
+    def _indexar(self, resumen: Dict):
+        self._secuencia += 1
+        resumen["secuencia"] = self._secuencia
+        self.documentos[resumen["@id"]] = resumen
+        for indice, claves in self._claves(resumen):
+            for clave in claves:
+                indice[clave].add(resumen["@id"])
+
+    def _claves(self, resumen: Dict):
+        return [
+            (self.por_fecha, [_clave_fecha(datetime.fromisoformat(resumen["fecha"]))] if resumen["fecha"] else []),
+            (self.por_central, resumen["centrales"]),
+            (self.por_empresa, resumen["empresas"]),
+            (self.por_palabra_clave, resumen["palabras_clave"]),
+            (self.por_dominio, [resumen["dominio"]] if resumen["dominio"] else []),
+        ]
+
+    # ========== Consultas ==========
+
+    def resumen(self, documento: Dict) -> Dict:
+        """Resumen indexado del documento, o calculado si no está en el índice"""
+        return self.documentos.get(documento.get("@id")) or resumir_documento(documento)
+
+    def con_fecha(self, fecha: datetime) -> Set[str]:
+        """Documentos del mismo día (a cualquier hora)"""
+        return self.por_fecha.get(_clave_fecha(fecha), set())
+
+    def con_fechas_vecinas(self, fecha: datetime, dias: int = 1) -> Set[str]:
+        """Documentos del día fecha ± dias (a cualquier hora)"""
+        return (self.con_fecha(fecha - timedelta(days=dias)) |
+                self.con_fecha(fecha + timedelta(days=dias)))
+
+    def con_centrales(self, ids_entidad: Iterable[str]) -> Set[str]:
+        return set().union(*(self.por_central.get(id_entidad, set()) for id_entidad in ids_entidad))
+
+    def con_empresas(self, ids_entidad: Iterable[str]) -> Set[str]:
+        return set().union(*(self.por_empresa.get(id_entidad, set()) for id_entidad in ids_entidad))
+
+    def con_palabras_clave(self, palabras: Iterable[str], dominio: Optional[str] = None) -> Set[str]:
+        """Documentos cuyo contenido contiene alguna de las palabras (opcionalmente de un dominio)"""
+        ids = set().union(*(self.por_palabra_clave.get(palabra, set()) for palabra in palabras))
+        if dominio is not None:
+            ids &= self.por_dominio.get(dominio, set())
+        return ids
+
+    def ordenar(self, ids: Iterable[str]) -> List[str]:
+        """IDs en orden de indexación (orden estable de resultados)"""
+        return sorted(ids, key=lambda doc_id: self.documentos[doc_id]["secuencia"])
+
+    # ========== Persistencia ==========
+
+    def guardar(self, ruta: Optional[Path] = None) -> Path:
+        """Guardar los resúmenes (los índices se reconstruyen al cargar) de forma atómica"""
+        ruta = Path(ruta) if ruta else self.ruta
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        datos = {
+            "version": VERSION_INDICE,
+            "vocabulario": VOCABULARIO_PALABRAS_CLAVE,
+            "documentos": [self.documentos[doc_id] for doc_id in self.ordenar(self.documentos)]
+        }
+        temporal = ruta.with_suffix(ruta.suffix + ".tmp")
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+        return ruta
+
+    def cargar(self, ruta: Optional[Path] = None):
+        """Cargar resúmenes; un índice de otra versión o vocabulario se descarta"""
+        ruta = Path(ruta) if ruta else self.ruta
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+
+        self.documentos = {}
+        self._limpiar_indices()
+        if datos.get("version") != VERSION_INDICE or datos.get("vocabulario") != VOCABULARIO_PALABRAS_CLAVE:
+            return
+        for resumen in datos.get("documentos", []):
+            self._indexar(resumen)
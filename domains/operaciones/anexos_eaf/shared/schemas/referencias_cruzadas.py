@@ -7,13 +7,18 @@ Maneja las referencias cruzadas SEPARADAS de los documentos principales
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
+from domains.operaciones.anexos_eaf.shared.schemas.indice_referencias import (
+    IndiceReferenciasCruzadas, CONDICIONES_CHILE, TIPOS_OBJETIVO_CHILE
+)
 
 class GestorReferenciasCruzadas:
     """Gestiona referencias cruzadas entre documentos del sistema chileno"""
 
-    def __init__(self):
+    def __init__(self, indice: Optional[IndiceReferenciasCruzadas] = None):
         self.reglas_referencias = self._cargar_reglas_sistema_chileno()
+        # Índices invertidos fecha/central/empresa/palabra clave → documentos
+        self.indice = indice or IndiceReferenciasCruzadas()
 
     def _cargar_reglas_sistema_chileno(self) -> Dict:
         """Cargar reglas específicas del sistema eléctrico chileno"""
@@ -100,6 +105,7 @@ class GestorReferenciasCruzadas:
         Args:
             documento: Documento principal
             todos_documentos: Lista de todos los documentos para correlacionar
+                              (None = todos los documentos del índice)
 
         Returns:
             Diccionario con referencias cruzadas para guardar por separado
@@ -119,7 +125,10 @@ class GestorReferenciasCruzadas:
             }
         }
 
-        if todos_documentos:
+        if todos_documentos is not None:
+            self.indice.sincronizar(todos_documentos)
+
+        if todos_documentos or (todos_documentos is None and self.indice.documentos):
             # Referencias temporales
             refs_temporales = self._aplicar_reglas_temporales_chile(documento, todos_documentos)
             referencias["referencias_encontradas"].extend(refs_temporales)
@@ -139,30 +148,44 @@ class GestorReferenciasCruzadas:
 
         return referencias
 
+    def _ids_candidatos(self, documento: Dict, todos_documentos: Optional[List[Dict]]) -> Optional[Set[str]]:
+        """IDs a los que se puede referenciar (None = todo el índice), sin el propio documento"""
+        if todos_documentos is None:
+            return None
+        ids = {doc.get("@id") for doc in todos_documentos}
+        ids.discard(documento.get("@id"))
+        return ids
+
+    def _filtrar(self, ids: Set[str], permitidos: Optional[Set[str]], documento: Dict) -> List[str]:
+        ids = ids - {documento.get("@id")}
+        if permitidos is not None:
+            ids &= permitidos
+        return self.indice.ordenar(ids)
+
     def _aplicar_reglas_temporales_chile(self, documento: Dict, todos_documentos: List[Dict]) -> List[Dict]:
         """Aplicar reglas temporales específicas del sistema chileno"""
         referencias = []
+        resumen = self.indice.resumen(documento)
         fecha_doc = self._extraer_fecha_documento(documento)
 
         if not fecha_doc:
             return referencias
 
-        for otro_doc in todos_documentos:
-            if otro_doc.get("@id") == documento.get("@id"):
-                continue
+        # Candidatos: misma fecha y, si es informe diario, días vecinos
+        candidatos = set(self.indice.con_fecha(fecha_doc))
+        if resumen["informe_diario"]:
+            candidatos |= self.indice.con_fechas_vecinas(fecha_doc)
+        permitidos = self._ids_candidatos(documento, todos_documentos)
 
-            otra_fecha = self._extraer_fecha_documento(otro_doc)
-            if not otra_fecha:
-                continue
+        for otro_id in self._filtrar(candidatos, permitidos, documento):
+            otro = self.indice.documentos[otro_id]
+            otra_fecha = datetime.fromisoformat(otro["fecha"])
 
             # Misma fecha operativa (común en informes del Coordinador)
-            if (fecha_doc == otra_fecha and
-                otro_doc.get("metadatos_universales", {}).get("dominio") !=
-                documento.get("metadatos_universales", {}).get("dominio")):
-
+            if fecha_doc == otra_fecha and otro["dominio"] != resumen["dominio"]:
                 referencias.append({
-                    "documento_objetivo": otro_doc.get("@id"),
-                    "dominio_objetivo": otro_doc.get("metadatos_universales", {}).get("dominio"),
+                    "documento_objetivo": otro_id,
+                    "dominio_objetivo": otro["dominio"],
                     "tipo_relacion": "MISMA_FECHA_OPERATIVA",
                     "confianza": 1.0,
                     "contexto": f"Documentos operativos del SEN de la misma fecha: {fecha_doc}",
@@ -171,55 +194,58 @@ class GestorReferenciasCruzadas:
                 })
 
             # Días consecutivos (para informes diarios del SEN)
-            elif abs((fecha_doc - otra_fecha).days) == 1:
-                if self._es_informe_diario_sen(documento) and self._es_informe_diario_sen(otro_doc):
-                    relacion = "SIGUE_OPERACION_SEN" if fecha_doc > otra_fecha else "PRECEDE_OPERACION_SEN"
-                    referencias.append({
-                        "documento_objetivo": otro_doc.get("@id"),
-                        "dominio_objetivo": otro_doc.get("metadatos_universales", {}).get("dominio"),
-                        "tipo_relacion": relacion,
-                        "confianza": 0.9,
-                        "contexto": "Informes operativos diarios consecutivos del SEN",
-                        "sistema_origen": "chileno",
-                        "aplicable_coordinador": True
-                    })
+            elif abs((fecha_doc.date() - otra_fecha.date()).days) == 1 and otro["informe_diario"]:
+                relacion = "SIGUE_OPERACION_SEN" if fecha_doc > otra_fecha else "PRECEDE_OPERACION_SEN"
+                referencias.append({
+                    "documento_objetivo": otro_id,
+                    "dominio_objetivo": otro["dominio"],
+                    "tipo_relacion": relacion,
+                    "confianza": 0.9,
+                    "contexto": "Informes operativos diarios consecutivos del SEN",
+                    "sistema_origen": "chileno",
+                    "aplicable_coordinador": True
+                })
 
         return referencias
 
     def _aplicar_reglas_entidades_chile(self, documento: Dict, todos_documentos: List[Dict]) -> List[Dict]:
         """Aplicar reglas basadas en entidades del sistema chileno"""
         referencias = []
-        entidades_doc = self._extraer_nombres_entidades_chile(documento)
+        resumen = self.indice.resumen(documento)
+        centrales_doc = set(resumen["centrales"])
+        empresas_doc = set(resumen["empresas"])
 
-        for otro_doc in todos_documentos:
-            if otro_doc.get("@id") == documento.get("@id"):
-                continue
+        candidatos = self.indice.con_centrales(centrales_doc) | self.indice.con_empresas(empresas_doc)
+        permitidos = self._ids_candidatos(documento, todos_documentos)
 
-            otras_entidades = self._extraer_nombres_entidades_chile(otro_doc)
+        for otro_id in self._filtrar(candidatos, permitidos, documento):
+            otro = self.indice.documentos[otro_id]
 
             # Mismas centrales eléctricas
-            centrales_comunes = set(entidades_doc.get("centrales_electricas", [])) & set(otras_entidades.get("centrales_electricas", []))
-            empresas_comunes = set(entidades_doc.get("empresas", [])) & set(otras_entidades.get("empresas", []))
+            centrales_comunes = centrales_doc & set(otro["centrales"])
+            empresas_comunes = empresas_doc & set(otro["empresas"])
 
             if centrales_comunes:
                 referencias.append({
-                    "documento_objetivo": otro_doc.get("@id"),
-                    "dominio_objetivo": otro_doc.get("metadatos_universales", {}).get("dominio"),
+                    "documento_objetivo": otro_id,
+                    "dominio_objetivo": otro["dominio"],
                     "tipo_relacion": "REFERENCIA_CENTRAL_SEN",
                     "confianza": 0.85,
-                    "contexto": f"Ambos mencionan centrales del SEN: {', '.join(list(centrales_comunes)[:3])}",
-                    "entidades_compartidas": list(centrales_comunes),
+                    "contexto": f"Ambos mencionan centrales del SEN: {', '.join(resumen['nombres_entidades'][i] for i in sorted(centrales_comunes)[:3])}",
+                    "entidades_compartidas": [resumen['nombres_entidades'][i] for i in sorted(centrales_comunes)],
+                    "ids_entidades_compartidas": sorted(centrales_comunes),
                     "sistema_origen": "chileno"
                 })
 
             elif empresas_comunes:
                 referencias.append({
-                    "documento_objetivo": otro_doc.get("@id"),
-                    "dominio_objetivo": otro_doc.get("metadatos_universales", {}).get("dominio"),
+                    "documento_objetivo": otro_id,
+                    "dominio_objetivo": otro["dominio"],
                     "tipo_relacion": "REFERENCIA_EMPRESA_GENERADORA",
                     "confianza": 0.8,
-                    "contexto": f"Ambos mencionan empresas generadoras: {', '.join(list(empresas_comunes)[:3])}",
-                    "entidades_compartidas": list(empresas_comunes),
+                    "contexto": f"Ambos mencionan empresas generadoras: {', '.join(resumen['nombres_entidades'][i] for i in sorted(empresas_comunes)[:3])}",
+                    "entidades_compartidas": [resumen['nombres_entidades'][i] for i in sorted(empresas_comunes)],
+                    "ids_entidades_compartidas": sorted(empresas_comunes),
                     "sistema_origen": "chileno"
                 })
 
@@ -228,8 +254,11 @@ class GestorReferenciasCruzadas:
     def _aplicar_reglas_dominio_chile(self, documento: Dict, todos_documentos: List[Dict]) -> List[Dict]:
         """Aplicar reglas específicas de dominios del sistema chileno"""
         referencias = []
-        dominio_doc = documento.get("metadatos_universales", {}).get("dominio")
-        contenido_doc = self._obtener_contenido_documento_chile(documento)
+        resumen = self.indice.resumen(documento)
+        dominio_doc = resumen["dominio"]
+        if not dominio_doc:
+            return referencias
+        permitidos = self._ids_candidatos(documento, todos_documentos)
 
         # Obtener reglas aplicables para este dominio
         for clave_regla, reglas in self.reglas_referencias.get("reglas_dominio_chile", {}).items():
@@ -239,17 +268,17 @@ class GestorReferenciasCruzadas:
             dominio_objetivo = clave_regla.split("_a_")[1]
 
             for regla in reglas:
-                if self._verificar_condicion_regla_chile(regla["condicion"], contenido_doc):
+                if self._verificar_condicion_regla_chile(regla["condicion"], resumen["palabras_clave"]):
                     # Encontrar documentos que coincidan en el dominio objetivo
                     documentos_coincidentes = self._encontrar_documentos_coincidentes_chile(
                         regla["tipo_objetivo"],
                         dominio_objetivo,
-                        todos_documentos
+                        permitidos
                     )
 
-                    for doc_objetivo in documentos_coincidentes:
+                    for doc_objetivo_id in documentos_coincidentes:
                         referencias.append({
-                            "documento_objetivo": doc_objetivo.get("@id"),
+                            "documento_objetivo": doc_objetivo_id,
                             "dominio_objetivo": dominio_objetivo,
                             "tipo_relacion": regla["relacion"],
                             "confianza": regla["confianza"],
@@ -263,93 +292,20 @@ class GestorReferenciasCruzadas:
 
     def _extraer_fecha_documento(self, documento: Dict):
         """Extraer fecha del documento"""
-        from datetime import datetime
-        fecha_str = documento.get("metadatos_universales", {}).get("fecha_creacion")
-        if fecha_str:
-            try:
-                return datetime.fromisoformat(fecha_str)
-            except:
-                pass
-        return None
-
-    def _extraer_nombres_entidades_chile(self, documento: Dict) -> Dict[str, List[str]]:
-        """Extraer nombres de entidades chilenas del documento"""
-        entidades = documento.get("entidades", {})
-        resultado = {}
-
-        for tipo_entidad, lista_entidades in entidades.items():
-            if isinstance(lista_entidades, list):
-                resultado[tipo_entidad] = [entidad.get("nombre", "") for entidad in lista_entidades if entidad.get("nombre")]
-
-        return resultado
-
-    def _obtener_contenido_documento_chile(self, documento: Dict) -> str:
-        """Obtener contenido de texto del documento chileno para verificación de reglas"""
-        partes_contenido = []
-
-        # De metadatos universales
-        metadatos = documento.get("metadatos_universales", {})
-        partes_contenido.append(metadatos.get("titulo", ""))
-
-        # De etiquetas semánticas
-        etiquetas = documento.get("etiquetas_semanticas", [])
-        partes_contenido.extend(etiquetas)
-
-        # De entidades
-        entidades = documento.get("entidades", {})
-        for lista_entidades in entidades.values():
-            if isinstance(lista_entidades, list):
-                for entidad in lista_entidades:
-                    partes_contenido.append(entidad.get("nombre", ""))
-
-        return " ".join(partes_contenido).lower()
-
-    def _verificar_condicion_regla_chile(self, condicion: str, contenido: str) -> bool:
-        """Verificar si se cumple condición de regla para sistema chileno"""
-        mapeo_condiciones = {
-            "generacion_solar_mencionada": ["solar", "fotovoltaica", "pv"],
-            "incidente_sistema": ["incidente", "falla", "interrupción", "emergencia", "desconexion"],
-            "incidente_seguridad": ["seguridad", "accidente", "peligro", "riesgo"],
-            "falla_equipo": ["falla", "avería", "defecto", "mal funcionamiento"],
-            "alta_demanda_pronosticada": ["alta demanda", "peak", "máximo", "pronóstico alto"]
-        }
+        fecha = self.indice.resumen(documento)["fecha"]
+        return datetime.fromisoformat(fecha) if fecha else None
 
-        palabras_clave = mapeo_condiciones.get(condicion, [])
-        return any(palabra_clave in contenido for palabra_clave in palabras_clave)
+    def _verificar_condicion_regla_chile(self, condicion: str, palabras_clave_doc: List[str]) -> bool:
+        """Verificar si se cumple condición de regla para sistema chileno"""
+        return any(palabra_clave in palabras_clave_doc for palabra_clave in CONDICIONES_CHILE.get(condicion, []))
 
     def _encontrar_documentos_coincidentes_chile(self, tipo_objetivo: str, dominio_objetivo: str,
-                                               todos_documentos: List[Dict]) -> List[Dict]:
-        """Encontrar documentos chilenos que coincidan con el tipo objetivo"""
-        documentos_coincidentes = []
-
-        for doc in todos_documentos:
-            if doc.get("metadatos_universales", {}).get("dominio") != dominio_objetivo:
-                continue
-
-            contenido_doc = self._obtener_contenido_documento_chile(doc)
-
-            # Mapeo específico para sistema chileno
-            palabras_clave_tipo = {
-                "datos_precio_solar": ["solar", "precio", "costo marginal"],
-                "alteracion_mercado": ["mercado", "interrupción", "alteración"],
-                "normativa_seguridad": ["seguridad", "normativa", "cne"],
-                "norma_tecnica": ["norma técnica", "especificación", "coordinador"],
-                "expansion_capacidad": ["expansión", "transmisión", "capacidad"]
-            }
-
-            palabras_clave = palabras_clave_tipo.get(tipo_objetivo, [])
-            if any(palabra_clave in contenido_doc for palabra_clave in palabras_clave):
-                documentos_coincidentes.append(doc)
-
-        return documentos_coincidentes[:5]  # Limitar a 5 coincidencias
-
-    def _es_informe_diario_sen(self, documento: Dict) -> bool:
-        """Verificar si es informe diario del SEN"""
-        tipo_doc = documento.get("metadatos_universales", {}).get("tipo_documento", "").lower()
-        titulo = documento.get("metadatos_universales", {}).get("titulo", "").lower()
-
-        return any(palabra_clave in tipo_doc or palabra_clave in titulo
-                  for palabra_clave in ["diario", "daily", "informe_diario", "operacion_diaria"])
+                                               permitidos: Optional[Set[str]]) -> List[str]:
+        """Encontrar documentos chilenos que coincidan con el tipo objetivo (IDs)"""
+        ids = self.indice.con_palabras_clave(TIPOS_OBJETIVO_CHILE.get(tipo_objetivo, []), dominio_objetivo)
+        if permitidos is not None:
+            ids &= permitidos
+        return self.indice.ordenar(ids)[:5]  # Limitar a 5 coincidencias
 
     def _calcular_estadisticas_referencias(self, referencias: List[Dict]) -> Dict:
         """Calcular estadísticas de las referencias encontradas"""
@@ -11,7 +11,6 @@ import sqlite3
 import logging
 from pathlib import Path
 from typing import Dict, List
-import PyPDF2
 import re
 from datetime import datetime
 import sys
@@ -28,6 +27,12 @@ except ImportError as e:
 shared_path = Path(__file__).parent.parent.parent / "shared"
 sys.path.append(str(shared_path))
 
+# Pooled PDF handles and memoized page text shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from pdf_document_pool import get_text_provider
+from event_timeline import get_event_timeline
+from entity_gazetteer import get_gazetteer
+
 
 class Capitulo01Processor:
     """Procesador específico para Capítulo 1 - Descripción de la perturbación."""
@@ -36,6 +41,7 @@ class Capitulo01Processor:
         self.pdf_path = Path(pdf_path)
         self.chapter_dir = Path(__file__).parent.parent
         self.outputs_dir = self.chapter_dir / "outputs"
+        self.report_id = "EAF-089-2025"
 
         # Chapter specific info
         self.chapter_info = {
@@ -71,6 +77,9 @@ class Capitulo01Processor:
         # Paso 2: Procesar y estructurar datos
         processed_data = self._process_chapter_content(raw_text)
 
+        # Paso 2b: Cargar la secuencia temporal en el timeline de eventos
+        timeline_events = self._index_timeline(processed_data)
+
         # Paso 3: Guardar extracción raw
         raw_file = self._save_raw_extraction(raw_text)
 
@@ -94,7 +103,8 @@ class Capitulo01Processor:
             "stats": {
                 "raw_text_size": len(raw_text),
                 "entities_extracted": len(processed_data.get("entities", [])),
-                "records_count": len(processed_data.get("records", []))
+                "records_count": len(processed_data.get("records", [])),
+                "timeline_events": timeline_events
             },
             "database_ingestion": db_result,
             "status": "completed"
@@ -107,14 +117,12 @@ class Capitulo01Processor:
         """Extrae texto de las páginas 1-11 del PDF."""
         text_parts = []
 
-        with open(self.pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+        provider = get_text_provider(str(self.pdf_path), engine='pypdf2')
 
-            for page_num in range(self.chapter_info["start_page"], self.chapter_info["end_page"] + 1):
-                if page_num < len(reader.pages):
-                    page = reader.pages[page_num]
-                    text = page.extract_text()
-                    text_parts.append(f"=== PÁGINA {page_num + 1} ===\n{text}\n")
+        for page_num in range(self.chapter_info["start_page"], self.chapter_info["end_page"] + 1):
+            if page_num < provider.page_count:
+                text = provider.text(page_num + 1)
+                text_parts.append(f"=== PÁGINA {page_num + 1} ===\n{text}\n")
 
         return "\n".join(text_parts)
 
@@ -319,28 +327,19 @@ class Capitulo01Processor:
         return entities
 
     def _extract_companies(self, text: str) -> List[Dict]:
-        """Extrae nombres de empresas del texto."""
+        """Extrae empresas del texto con el gazetteer (nombre canónico y texto encontrado)."""
         entities = []
-
-        # Patrones de empresas típicas del sector eléctrico chileno
-        company_patterns = [
-            r'([A-Z][A-Z\s&\.]+(?:S\.A\.|SPA|LTDA))',
-            r'(Enel\s+\w+)',
-            r'(Colbún\s+\w*)',
-            r'(AES\s+\w+)',
-            r'(ENGIE\s+\w*)',
-            r'(Coordinador\s+Eléctrico\s+Nacional)'
-        ]
-
-        for pattern in company_patterns:
-            companies = re.findall(pattern, text, re.IGNORECASE)
-            for company in set(companies):
-                if len(company.strip()) > 3:  # Filter noise
-                    entities.append({
-                        "type": "company",
-                        "category": "organization",
-                        "name": company.strip()
-                    })
+        seen = set()
+        for mention in get_gazetteer().find(text, types=["empresa"]):
+            if mention.canonical in seen:
+                continue
+            seen.add(mention.canonical)
+            entities.append({
+                "type": "company",
+                "category": "organization",
+                "name": mention.canonical,
+                "text": mention.text
+            })
 
         return entities
 
@@ -496,6 +495,23 @@ class Capitulo01Processor:
 
         return entities
 
+    def _index_timeline(self, processed_data: Dict) -> int:
+        """Carga la secuencia temporal en el timeline de eventos (fechada con la hora exacta de la falla)."""
+        fault_info = next((entity["data"] for entity in processed_data.get("entities", [])
+                           if entity.get("type") == "fault_event"), {})
+        fault_day = fault_info.get("exact_fault_date") or fault_info.get("date")
+        if not fault_day:
+            self.logger.warning("⚠️ Fecha de la falla no encontrada - secuencia temporal sin indexar")
+            return 0
+
+        try:
+            return get_event_timeline().append_temporal_sequence(
+                self.report_id, processed_data["entities"], fault_day, fault_info.get("exact_fault_time")
+            )
+        except ValueError as e:
+            self.logger.warning(f"⚠️ No se pudo indexar la secuencia temporal: {e}")
+            return 0
+
     def _process_page_content(self, page_text: str) -> Dict:
         """Procesa el contenido de una página con análisis estructurado e inteligente."""
         lines = page_text.split('\n')
@@ -5,10 +5,18 @@ Captura TODA la información del raw text organizándola correctamente
 
 import json
 import re
+import sys
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 import logging
 
+# Gazetteer de entidades compartido por los procesadores de operaciones
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from entity_gazetteer import EntityMention, get_gazetteer
+
+# Tipos de equipo del gazetteer
+EQUIPMENT_TYPES = ("subestacion", "linea", "transformador", "interruptor", "circuito", "rele", "proteccion")
+
 
 class CompleteContentExtractor:
     """Extractor que NO pierde información del raw text."""
@@ -228,6 +236,9 @@ class CompleteContentExtractor:
     def _analyze_content_block_completely(self, block: str, block_id: int, page_num: int) -> Dict:
         """Analiza completamente un bloque de contenido."""
 
+        # Una sola pasada del gazetteer para empresas y equipos
+        mentions = get_gazetteer().find(block)
+
         block_analysis = {
             "block_id": f"page_{page_num}_block_{block_id}",
             "raw_text": block,
@@ -248,10 +259,10 @@ class CompleteContentExtractor:
                 "contains_technical_units": bool(re.search(r'\d+\s*(MW|kV|Hz|A|V)', block, re.IGNORECASE))
             },
             "extracted_entities": {
-                "companies": self._extract_companies(block),
+                "companies": self._extract_companies(block, mentions),
                 "technical_values": self._extract_technical_values(block),
                 "timestamps": self._extract_timestamps(block),
-                "equipment": self._extract_equipment(block)
+                "equipment": self._extract_equipment(block, mentions)
             }
         }
 
@@ -409,25 +420,10 @@ class CompleteContentExtractor:
 
         return list_indicators / len(lines) > 0.5
 
-    def _extract_companies(self, text: str) -> List[str]:
-        """Extrae nombres de empresas."""
-
-        companies = []
-
-        # Patrones de empresas
-        company_patterns = [
-            r'([A-ZÁÉÍÓÚ][A-ZÁÉÍÓÚ\s]+S\.A\.)',
-            r'([A-ZÁÉÍÓÚ][A-ZÁÉÍÓÚ\s]+SPA)',
-            r'([A-ZÁÉÍÓÚ][A-ZÁÉÍÓÚ\s]+LTDA)',
-            r'(EMPRESA\s+[A-ZÁÉÍÓÚ\s]+)',
-            r'([A-Z][A-Z\s&]+(?:CHILE|ENERGÍA|ELÉCTRICA|TRANSMISIÓN)[A-Z\s]*)',
-        ]
-
-        for pattern in company_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            companies.extend(matches)
-
-        return list(set(companies))  # Eliminar duplicados
+    def _extract_companies(self, text: str, mentions: Optional[List[EntityMention]] = None) -> List[str]:
+        """Extrae nombres canónicos de empresas (gazetteer; mentions evita otra pasada)."""
+        mentions = mentions if mentions is not None else get_gazetteer().find(text)
+        return list(dict.fromkeys(m.canonical for m in mentions if m.entity_type == "empresa"))
 
     def _extract_technical_values(self, text: str) -> List[Dict]:
         """Extrae valores técnicos con unidades."""
@@ -479,26 +475,10 @@ class CompleteContentExtractor:
 
         return timestamps
 
-    def _extract_equipment(self, text: str) -> List[str]:
-        """Extrae nombres de equipos."""
-
-        equipment = []
-
-        # Patrones de equipos
-        equipment_patterns = [
-            r'(52K\d+)',  # Interruptores
-            r'(S/E\s+[A-Za-z\s]+)',  # Subestaciones
-            r'(línea\s+\d+x\d+\s*kV[^.]*)',  # Líneas de transmisión
-            r'(circuito\s+N°?\d+)',  # Circuitos
-            r'(rel[eé]s?\s+[A-Za-z0-9]+)',  # Relés
-            r'(protecciones?\s+[A-Za-z0-9]+)',  # Protecciones
-        ]
-
-        for pattern in equipment_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            equipment.extend(matches)
-
-        return list(set(equipment))
+    def _extract_equipment(self, text: str, mentions: Optional[List[EntityMention]] = None) -> List[str]:
+        """Extrae menciones de equipos: subestaciones, líneas, transformadores, interruptores, circuitos, relés y protecciones."""
+        mentions = mentions if mentions is not None else get_gazetteer().find(text, EQUIPMENT_TYPES)
+        return list(dict.fromkeys(m.text for m in mentions if m.entity_type in EQUIPMENT_TYPES))
 
     def _consolidate_page_content(self, page_analysis: Dict, result: Dict) -> None:
         """Consolida el contenido de la página en la estructura general."""
@@ -14,6 +14,13 @@ import json
 from pathlib import Path
 import logging
 import io
+import sys
+
+# Batched tesseract runner shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from ocr_batch import TesseractBatch
+from raster_analysis import PageRaster
+from pdf_document_pool import get_document_pool
 
 
 class OCRStructureDetector:
@@ -21,43 +28,69 @@ class OCRStructureDetector:
 
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
-        self.pdf_doc = fitz.open(pdf_path)
         self.logger = logging.getLogger(__name__)
 
+        # Rasters de ocr_pages_batched, usados una vez por detect_page_structures
+        self._rasters: Dict[int, PageRaster] = {}
+
         # Configuración OCR
         self.tesseract_config = r'--oem 3 --psm 6 -c preserve_interword_spaces=1'
 
-    def detect_page_structures(self, page_num: int, start_page: int = 1, end_page: int = 11) -> Dict:
-        """Detecta estructuras visuales en una página específica."""
+    def _render_page(self, page_num: int) -> PageRaster:
+        """Renderiza una página (1-indexada) a 2x como vista NumPy sin copia."""
+        raster = self._rasters.pop(page_num, None)
+        if raster is not None:
+            return raster
+        with get_document_pool().lease(self.pdf_path) as doc:
+            page = doc[page_num - 1]  # fitz usa indexación 0
+            return PageRaster.from_page(page, zoom=2)  # Zoom 2x para mejor calidad
+
+    def _run_ocr(self, gray_image: np.ndarray, ocr_data: Optional[Dict] = None) -> Dict:
+        """Devuelve datos OCR por palabra, reutilizando los precalculados si existen."""
+        if ocr_data is not None:
+            return ocr_data
+        return pytesseract.image_to_data(gray_image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+
+    def ocr_pages_batched(self, page_nums: List[int]) -> Dict[int, Dict]:
+        """Ejecuta OCR de varias páginas en un único proceso tesseract."""
+        batch = TesseractBatch(lang='eng', config=self.tesseract_config, dpi=144)
+        for page_num in page_nums:
+            # El raster queda guardado para el análisis de la página (sin segundo render)
+            raster = self._render_page(page_num)
+            self._rasters[page_num] = raster
+            # Página completa sola en su página TIFF: la segmentación (--psm 6) ve una sola página
+            batch.add(page_num, raster.gray, own_page=True)
+        return batch.run()
+
+    def detect_page_structures(self, page_num: int, start_page: int = 1, end_page: int = 11,
+                               ocr_data: Optional[Dict] = None) -> Dict:
+        """Detecta estructuras visuales en una página específica.
+
+        Si se entrega ocr_data (columnas estilo image_to_data, p.ej. de
+        ocr_pages_batched) no se lanza tesseract para esta página.
+        """
         if page_num < start_page or page_num > end_page:
             return {"error": f"Página {page_num} fuera del rango {start_page}-{end_page}"}
 
         try:
-            page = self.pdf_doc[page_num - 1]  # fitz usa indexación 0
-
-            # Convertir página a imagen
-            mat = fitz.Matrix(2, 2)  # Zoom 2x para mejor calidad
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
+            # Gris, umbrales y líneas se calculan una vez y quedan en caché
+            raster = self._render_page(page_num)
 
-            # Cargar imagen con PIL
-            image = Image.open(io.BytesIO(img_data))
-
-            # Convertir a array numpy para OpenCV
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            # Un solo OCR por página, compartido por todos los análisis
+            ocr_data = self._run_ocr(raster.gray, ocr_data)
 
             # Detectar estructuras
             structures = {
                 "page_number": page_num,
                 "image_info": {
-                    "width": image.width,
-                    "height": image.height,
+                    "width": raster.width,
+                    "height": raster.height,
                     "dpi": 144  # 2x zoom
                 },
-                "detected_structures": self._analyze_visual_layout(cv_image),
-                "text_analysis": self._analyze_text_structure(cv_image),
-                "table_detection": self._detect_tables(cv_image),
-                "ocr_validation": self._validate_against_raw(cv_image, page_num)
+                "detected_structures": self._analyze_visual_layout(raster, ocr_data),
+                "text_analysis": self._analyze_text_structure(raster, ocr_data),
+                "table_detection": self._detect_tables(raster, ocr_data),
+                "ocr_validation": self._validate_against_raw(raster, page_num, ocr_data)
             }
 
             return structures
@@ -66,16 +99,14 @@ class OCRStructureDetector:
             self.logger.error(f"Error procesando página {page_num}: {str(e)}")
             return {"error": str(e)}
 
-    def _analyze_visual_layout(self, cv_image: np.ndarray) -> Dict:
+    def _analyze_visual_layout(self, raster: PageRaster, ocr_data: Optional[Dict] = None) -> Dict:
         """Analiza el layout visual de la página."""
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-
         # Detectar líneas horizontales y verticales
-        horizontal_lines = self._detect_horizontal_lines(gray)
-        vertical_lines = self._detect_vertical_lines(gray)
+        horizontal_lines = self._detect_horizontal_lines(raster)
+        vertical_lines = self._detect_vertical_lines(raster)
 
         # Detectar bloques de texto
-        text_blocks = self._detect_text_blocks(gray)
+        text_blocks = self._detect_text_blocks(raster.gray, ocr_data)
 
         # Detectar regiones tabulares
         table_regions = self._detect_table_regions(horizontal_lines, vertical_lines)
@@ -93,56 +124,28 @@ class OCRStructureDetector:
 
         return layout_analysis
 
-    def _detect_horizontal_lines(self, gray_image: np.ndarray) -> List[Tuple]:
+    def _detect_horizontal_lines(self, raster: PageRaster) -> List[Tuple]:
         """Detecta líneas horizontales que pueden indicar tablas."""
-        # Crear kernel horizontal
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
-
-        # Detectar líneas horizontales
-        horizontal_lines = cv2.morphologyEx(gray_image, cv2.MORPH_OPEN, horizontal_kernel)
+        # Apertura morfológica (kernel 40x1) sobre la máscara de tinta, en caché por página
+        return raster.horizontal_lines
 
-        # Encontrar contornos
-        contours, _ = cv2.findContours(horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        lines = []
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-            if w > 100 and h < 10:  # Filtrar líneas horizontales significativas
-                lines.append((x, y, x + w, y + h))
-
-        return lines
-
-    def _detect_vertical_lines(self, gray_image: np.ndarray) -> List[Tuple]:
+    def _detect_vertical_lines(self, raster: PageRaster) -> List[Tuple]:
         """Detecta líneas verticales que pueden indicar columnas de tablas."""
-        # Crear kernel vertical
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40))
-
-        # Detectar líneas verticales
-        vertical_lines = cv2.morphologyEx(gray_image, cv2.MORPH_OPEN, vertical_kernel)
+        # Apertura morfológica (kernel 1x40) sobre la máscara de tinta, en caché por página
+        return raster.vertical_lines
 
-        # Encontrar contornos
-        contours, _ = cv2.findContours(vertical_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        lines = []
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-            if h > 100 and w < 10:  # Filtrar líneas verticales significativas
-                lines.append((x, y, x + w, y + h))
-
-        return lines
-
-    def _detect_text_blocks(self, gray_image: np.ndarray) -> List[Dict]:
+    def _detect_text_blocks(self, gray_image: np.ndarray, ocr_data: Optional[Dict] = None) -> List[Dict]:
         """Detecta bloques de texto usando OCR."""
         try:
             # Usar pytesseract para detectar bloques de texto
-            data = pytesseract.image_to_data(gray_image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+            data = self._run_ocr(gray_image, ocr_data)
 
             blocks = []
             current_block = None
 
             for i in range(len(data['text'])):
                 text = data['text'][i].strip()
-                conf = int(data['conf'][i])
+                conf = int(float(data['conf'][i]))
 
                 if text and conf > 30:  # Filtrar texto con confianza > 30%
                     x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
@@ -252,13 +255,11 @@ class OCRStructureDetector:
 
         return min(confidence, 1.0)
 
-    def _analyze_text_structure(self, cv_image: np.ndarray) -> Dict:
+    def _analyze_text_structure(self, raster: PageRaster, ocr_data: Optional[Dict] = None) -> Dict:
         """Analiza la estructura del texto usando OCR."""
         try:
-            gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-
             # Extraer texto completo con coordenadas
-            ocr_data = pytesseract.image_to_data(gray, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+            ocr_data = self._run_ocr(raster.gray, ocr_data)
 
             # Organizar texto por líneas
             lines = self._organize_text_by_lines(ocr_data)
@@ -287,7 +288,7 @@ class OCRStructureDetector:
 
         for i in range(len(ocr_data['text'])):
             text = ocr_data['text'][i].strip()
-            if text and int(ocr_data['conf'][i]) > 20:
+            if text and int(float(ocr_data['conf'][i])) > 20:
                 y = ocr_data['top'][i]
 
                 # Si la diferencia en Y es mayor a 10 pixels, es una nueva línea
@@ -306,7 +307,7 @@ class OCRStructureDetector:
                     "bbox": (ocr_data['left'][i], ocr_data['top'][i],
                             ocr_data['left'][i] + ocr_data['width'][i],
                             ocr_data['top'][i] + ocr_data['height'][i]),
-                    "confidence": int(ocr_data['conf'][i])
+                    "confidence": int(float(ocr_data['conf'][i]))
                 }
                 current_line.append(word_info)
 
@@ -392,16 +393,14 @@ class OCRStructureDetector:
 
         return [index for index, _ in sorted_lines]
 
-    def _detect_tables(self, cv_image: np.ndarray) -> Dict:
+    def _detect_tables(self, raster: PageRaster, ocr_data: Optional[Dict] = None) -> Dict:
         """Detecta tablas usando análisis combinado visual + OCR."""
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-
         # Detectar líneas de tabla
-        horizontal_lines = self._detect_horizontal_lines(gray)
-        vertical_lines = self._detect_vertical_lines(gray)
+        horizontal_lines = self._detect_horizontal_lines(raster)
+        vertical_lines = self._detect_vertical_lines(raster)
 
         # Extraer texto con coordenadas
-        text_data = pytesseract.image_to_data(gray, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+        text_data = self._run_ocr(raster.gray, ocr_data)
 
         # Identificar regiones tabulares
         table_regions = self._identify_tabular_regions(horizontal_lines, vertical_lines, text_data)
@@ -481,12 +480,14 @@ class OCRStructureDetector:
 
         return min(confidence, 1.0)
 
-    def _validate_against_raw(self, cv_image: np.ndarray, page_num: int) -> Dict:
+    def _validate_against_raw(self, raster: PageRaster, page_num: int, ocr_data: Optional[Dict] = None) -> Dict:
         """Valida resultados OCR contra extracción raw existente."""
         try:
-            # Extraer texto OCR
-            gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-            ocr_text = pytesseract.image_to_string(gray, config=self.tesseract_config)
+            # Extraer texto OCR (reconstruido desde los datos por palabra si ya existen)
+            if ocr_data is not None:
+                ocr_text = TesseractBatch.data_to_text(ocr_data)
+            else:
+                ocr_text = pytesseract.image_to_string(raster.gray, config=self.tesseract_config)
 
             # Intentar cargar texto raw existente
             raw_file = Path(__file__).parent.parent / "outputs" / "raw_extractions" / "capitulo_01_raw.txt"
@@ -556,10 +557,19 @@ class OCRStructureDetector:
             "recommendations": []
         }
 
+        # OCR de todas las páginas en un único proceso tesseract
+        page_nums = list(range(start_page, end_page + 1))
+        try:
+            batched_ocr = self.ocr_pages_batched(page_nums)
+        except Exception as e:
+            self.logger.warning(f"OCR por lotes falló, se usará OCR por página: {str(e)}")
+            batched_ocr = {}
+
         # Analizar cada página
-        for page_num in range(start_page, end_page + 1):
+        for page_num in page_nums:
             self.logger.info(f"Analizando página {page_num}...")
-            page_analysis = self.detect_page_structures(page_num, start_page, end_page)
+            page_analysis = self.detect_page_structures(page_num, start_page, end_page,
+                                                        ocr_data=batched_ocr.get(page_num))
             document_analysis["pages"][page_num] = page_analysis
 
         # Análisis global
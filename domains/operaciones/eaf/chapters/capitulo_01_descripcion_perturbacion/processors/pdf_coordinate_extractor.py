@@ -8,6 +8,11 @@ import json
 from pathlib import Path
 from typing import Dict, List, Tuple
 import logging
+import sys
+
+# Pooled PDF handles and memoized page text shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from pdf_document_pool import get_text_provider
 
 
 class PDFCoordinateExtractor:
@@ -15,29 +20,28 @@ class PDFCoordinateExtractor:
 
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
-        self.pdf_doc = fitz.open(pdf_path)
+        self.text_provider = get_text_provider(pdf_path)
         self.logger = logging.getLogger(__name__)
 
     def extract_page_with_coordinates(self, page_num: int) -> Dict:
         """Extrae texto con coordenadas de una página específica."""
         try:
-            page = self.pdf_doc[page_num - 1]  # fitz usa indexación 0
-
             # Extraer texto con coordenadas
-            text_dict = page.get_text("dict")
-
-            # Procesar la estructura de texto
-            page_analysis = {
-                "page_number": page_num,
-                "page_size": {
-                    "width": page.rect.width,
-                    "height": page.rect.height
-                },
-                "blocks": self._process_text_blocks(text_dict["blocks"]),
-                "images": self._extract_images(page),
-                "drawings": self._extract_drawings(page),
-                "tables": self._detect_table_regions(text_dict["blocks"])
-            }
+            text_dict = self.text_provider.dict(page_num)
+
+            # Procesar la estructura de texto (documento prestado solo durante la lectura)
+            with self.text_provider.page(page_num) as page:
+                page_analysis = {
+                    "page_number": page_num,
+                    "page_size": {
+                        "width": page.rect.width,
+                        "height": page.rect.height
+                    },
+                    "blocks": self._process_text_blocks(text_dict["blocks"]),
+                    "images": self._extract_images(page),
+                    "drawings": self._extract_drawings(page),
+                    "tables": self._detect_table_regions(text_dict["blocks"])
+                }
 
             return page_analysis
 
@@ -10,6 +10,7 @@ Detecta el tipo de contenido ANTES de procesarlo:
 """
 
 import json
+import sys
 import fitz  # PyMuPDF
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
@@ -17,6 +18,10 @@ from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 
+# Pooled PDF handles and memoized page text shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from pdf_document_pool import get_text_provider
+
 
 class ContentType(Enum):
     """Tipos de contenido posibles."""
@@ -49,19 +54,21 @@ class SmartContentClassifier:
 
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
-        self.pdf_doc = fitz.open(pdf_path)
+        self.text_provider = get_text_provider(pdf_path)
 
     def classify_page_content(self, page_num: int) -> List[ContentBlock]:
         """Clasifica todo el contenido de una página."""
         print(f"📄 Analizando página {page_num}...")
 
-        page = self.pdf_doc[page_num - 1]
-        text_dict = page.get_text("dict")
+        text_dict = self.text_provider.dict(page_num)
 
-        # Extraer elementos con coordenadas
+        # Extraer elementos con coordenadas (la página solo mientras el documento está prestado)
         text_items = self._extract_text_items(text_dict["blocks"])
-        images = self._extract_images(page)
-        drawings = self._extract_drawings(page)
+        with self.text_provider.page(page_num) as page:
+            images = self._extract_images(page)
+            drawings = self._extract_drawings(page)
+            pymupdf_tables = self._detect_tables_with_pymupdf(page, page_num)
+            page_height = page.rect.height  # Get actual page height
 
         # Agrupar en filas
         rows = self._group_into_rows(text_items)
@@ -80,14 +87,12 @@ class SmartContentClassifier:
                 metadata={"image_info": img}
             ))
 
-        # PASO 1.5: Detectar tablas con PyMuPDF primero (más preciso)
-        pymupdf_tables = self._detect_tables_with_pymupdf(page, page_num)
+        # PASO 1.5: Tablas detectadas con PyMuPDF primero (más preciso)
         table_regions = [t.bbox for t in pymupdf_tables]
         content_blocks.extend(pymupdf_tables)
 
         # PASO 2: Clasificar texto por regiones (excluir regiones ya clasificadas como tablas)
         # IMPORTANTE: SIEMPRE usar PyMuPDF para tablas, nunca detección manual
-        page_height = page.rect.height  # Get actual page height
         i = 0
         while i < len(rows):
             # Skip rows that are inside table regions
@@ -3,10 +3,16 @@ Text Block Filler
 Detects text that was missed by the classifier and adds it as text/metadata blocks
 """
 
+import sys
+from pathlib import Path
 from typing import List, Tuple
 from smart_content_classifier import ContentBlock, ContentType
 import fitz
 
+# Pooled PDF handles and memoized page text shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent / "shared" / "utilities"))
+from pdf_document_pool import get_text_provider
+
 
 class TextBlockFiller:
     """
@@ -14,7 +20,7 @@ class TextBlockFiller:
     """
 
     def __init__(self, pdf_path: str):
-        self.pdf_doc = fitz.open(pdf_path)
+        self.text_provider = get_text_provider(pdf_path)
 
     def find_unclassified_text(
         self,
@@ -31,10 +37,8 @@ class TextBlockFiller:
         Returns:
             List of new text blocks for uncovered text
         """
-        page = self.pdf_doc[page_num - 1]
-
-        # Get all text blocks from PDF
-        text_dict = page.get_text("dict")
+        # Get all text blocks from PDF (memoized per page)
+        text_dict = self.text_provider.dict(page_num)
         all_text_items = []
 
         for block in text_dict["blocks"]:
@@ -5,12 +5,17 @@ Analyzes EAF PDF documents to identify logical chapters and sections
 for efficient processing of large documents.
 """
 
-import PyPDF2
 import re
+import sys
 from pathlib import Path
 from typing import List, Dict, Tuple
 import json
 
+# Pooled PDF handles and memoized page text shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from pdf_document_pool import get_text_provider, PageTextProvider
+from chapter_boundaries import get_report_registry
+
 
 class EAFChapterDetector:
     """Detects and segments EAF documents into logical processing chapters."""
@@ -20,21 +25,23 @@ class EAFChapterDetector:
         self.chapters = []
         self.metadata = {}
 
+        # PyPDF2 text, pooled and memoized so later chapter extraction reuses it
+        self.text_provider = get_text_provider(str(self.pdf_path), engine='pypdf2')
+
     def analyze_document(self) -> Dict:
         """Analyze the PDF and detect chapter structure."""
-        with open(self.pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            total_pages = len(reader.pages)
-
-            self.metadata = {
-                'total_pages': total_pages,
-                'document_title': self._extract_title(reader.pages[0]),
-                'document_type': 'EAF',
-                'processing_date': None
-            }
+        provider = self.text_provider
+        total_pages = provider.page_count
+
+        self.metadata = {
+            'total_pages': total_pages,
+            'document_title': self._extract_title(provider.text(1)),
+            'document_type': 'EAF',
+            'processing_date': None
+        }
 
-            # Detect chapters based on content patterns
-            self.chapters = self._detect_chapters(reader)
+        # Detect chapters based on content patterns
+        self.chapters = self._detect_chapters(provider)
 
         return {
             'metadata': self.metadata,
@@ -42,9 +49,8 @@ class EAFChapterDetector:
             'processing_strategy': self._recommend_processing_strategy()
         }
 
-    def _extract_title(self, first_page) -> str:
-        """Extract document title and metadata from first page."""
-        text = first_page.extract_text()
+    def _extract_title(self, text: str) -> str:
+        """Extract document title and metadata from first page text."""
         lines = text.split('\n')
 
         # Extract main title
@@ -88,78 +94,44 @@ class EAFChapterDetector:
 
         return main_title
 
-    def _detect_chapters(self, reader) -> List[Dict]:
-        """Detect logical chapters in the document."""
+    def _detect_chapters(self, provider: PageTextProvider) -> List[Dict]:
+        """Detect logical chapters in the document.
+
+        Chapter ranges come from the shared report registry: the PDF outline
+        when present, otherwise large/bold "N. Título" headings at the top of
+        each page. Ranges stored by split_pdf_chapters / chapter_boundaries
+        are reused; an unknown report is detected for this run only.
+        """
         chapters = []
 
-        # Scan ALL pages to find numbered chapters
-        found_chapters = []
-
-        for i in range(len(reader.pages)):
-            page = reader.pages[i]
-            text = page.extract_text()
-
-            # Look for main chapter pattern: number followed by title
-            # Pattern: \d+\.\s+[A-Z or lowercase start][text that continues for reasonable length]
-            chapter_pattern = r'^(\d+)\.\s+([A-Z][^.\n]{10,150})'
-
-            lines = text.split('\n')
-            for line_num, line in enumerate(lines):
-                line = line.strip()
-                match = re.match(chapter_pattern, line)
-                if match:
-                    chapter_num = int(match.group(1))
-                    chapter_title = match.group(2).strip()
-
-                    # Filter out obvious false positives
-                    if (chapter_num <= 20 and  # Reasonable chapter numbers
-                        len(chapter_title) > 10 and  # Meaningful titles (reduced from 15)
-                        not any(skip_word in chapter_title.lower()
-                               for skip_word in ['página', 'tabla', 'cuadro', 'figura'])):
-
-                        found_chapters.append({
-                            'number': chapter_num,
-                            'title': chapter_title,
-                            'page': i,
-                            'full_text': f"{chapter_num}. {chapter_title}"
-                        })
-
-                        print(f"Found chapter on page {i+1}: {chapter_num}. {chapter_title}")
-
-        # Sort by chapter number and remove duplicates
-        found_chapters.sort(key=lambda x: (x['number'], x['page']))
-
-        # Remove duplicates (same chapter number)
-        unique_chapters = []
-        seen_numbers = set()
-        for ch in found_chapters:
-            if ch['number'] not in seen_numbers:
-                unique_chapters.append(ch)
-                seen_numbers.add(ch['number'])
-
-        # Create chapter ranges
-        for i, chapter in enumerate(unique_chapters):
-            start_page = chapter['page']
-
-            # End page is start of next chapter - 1, or last page
-            if i + 1 < len(unique_chapters):
-                end_page = unique_chapters[i + 1]['page'] - 1
-            else:
-                end_page = len(reader.pages) - 1
+        entry = get_report_registry().resolve(str(self.pdf_path), report_id=self.pdf_path.stem)
+        found_chapters = sorted(
+            (chapter for chapter in entry["chapters"].values()
+             if chapter.get("kind", "chapter") == "chapter" and chapter.get("number") is not None),
+            key=lambda chapter: (chapter["start_page"], chapter["number"])
+        )
+
+        # Registry pages are 1-indexed, this detector reports 0-indexed pages
+        for chapter in found_chapters:
+            title = chapter.get("title") or f"Capítulo {chapter['number']}"
+            start_page = chapter["start_page"] - 1
+            end_page = chapter["end_page"] - 1
+
+            print(f"Found chapter on page {chapter['start_page']}: {chapter['number']}. {title}")
 
             chapters.append({
                 'number': chapter['number'],
-                'title': chapter['title'],
+                'title': title,
                 'start_page': start_page,
                 'end_page': end_page,
-                'content_type': self._classify_content_type_by_title(chapter['title']),
+                'content_type': self._classify_content_type_by_title(title),
                 'estimated_size': f"{end_page - start_page + 1} pages"
             })
 
         # If no numbered chapters found, fallback to original detection
         if not chapters:
             print("No numbered chapters found, using fallback detection...")
-            chapters = self._fallback_chapter_detection(reader)
+            chapters = self._fallback_chapter_detection(provider)
 
         return chapters
 
@@ -213,7 +185,7 @@ class EAFChapterDetector:
         else:
             return 'general'
 
-    def _fallback_chapter_detection(self, reader) -> List[Dict]:
+    def _fallback_chapter_detection(self, provider: PageTextProvider) -> List[Dict]:
         """Fallback to original chapter detection method."""
         chapters = []
         current_chapter = None
@@ -227,10 +199,11 @@ class EAFChapterDetector:
             r'(Recomendaciones|RECOMENDACIONES)' # Recommendations
         ]
 
+        total_pages = provider.page_count
+
         # Sample pages to detect structure
-        for i in range(0, len(reader.pages), max(1, len(reader.pages) // 50)):
-            page = reader.pages[i]
-            text = page.extract_text()
+        for i in range(0, total_pages, max(1, total_pages // 50)):
+            text = provider.text(i + 1)
 
             # Check for chapter markers
             for pattern in chapter_patterns:
@@ -252,12 +225,12 @@ class EAFChapterDetector:
 
         # Close last chapter
         if current_chapter:
-            current_chapter['end_page'] = len(reader.pages) - 1
+            current_chapter['end_page'] = total_pages - 1
             chapters.append(current_chapter)
 
         # If still no chapters detected, create page-based chunks
         if not chapters:
-            chapters = self._create_page_chunks(len(reader.pages))
+            chapters = self._create_page_chunks(total_pages)
 
         return chapters
 
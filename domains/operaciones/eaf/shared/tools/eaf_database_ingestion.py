@@ -9,7 +9,7 @@ import json
 import sqlite3
 import logging
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import sys
 from datetime import datetime
 
@@ -17,6 +17,15 @@ from datetime import datetime
 project_root = Path(__file__).parent.parent.parent.parent.parent
 sys.path.append(str(project_root))
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from entity_catalog import get_entity_catalog
+
+# Universal JSON entity type -> entity catalog type (canonical cen:* IDs)
+CATALOG_ENTITY_TYPES = {
+    'organization': 'empresa',
+    'power_plant': 'central',
+}
+
 
 class EAFDatabaseIngestion:
     """Handles ingestion of EAF data into the platform database."""
@@ -42,36 +51,90 @@ class EAFDatabaseIngestion:
 
         self.logger.info(f"Starting database ingestion for: {json_path.name}")
 
-        # Connect to database
-        with self._get_connection() as conn:
-            # Insert document metadata
-            doc_id = self._insert_document_metadata(conn, data['document_metadata'], str(json_path))
+        # ON CONFLICT needs the unique indexes, also on databases created before them
+        self.create_tables_if_not_exist()
 
-            # Insert chapters and entities
-            chapter_ids = []
-            total_entities = 0
+        # One transaction per document: every statement below is batched
+        with self._get_connection() as conn:
+            results = self._ingest_document(conn, data, str(json_path))
 
-            for chapter_data in data['chapters']:
-                chapter_id = self._insert_chapter(conn, doc_id, chapter_data)
-                chapter_ids.append(chapter_id)
+        self.logger.info(f"Database ingestion completed: {results}")
+        return results
 
-                # Insert entities for this chapter
-                entities_inserted = self._insert_chapter_entities(conn, chapter_id, chapter_data['entities'])
-                total_entities += entities_inserted
+    def ingest_directory(self, directory: str, pattern: str = "*_universal.json") -> Dict:
+        """Ingest every complete universal JSON file under a directory.
 
-            # Update processing statistics
-            self._update_processing_stats(conn, doc_id, len(chapter_ids), total_entities)
+        Per-chapter universal files (no document metadata) are skipped. All
+        documents are written in a single transaction; re-running over the
+        same directory inserts nothing new.
+        """
+        directory = Path(directory)
+        if not directory.is_dir():
+            raise NotADirectoryError(f"Not a directory: {directory}")
+
+        documents = []
+        skipped = []
+        for json_path in sorted(directory.rglob(pattern)):
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                self.logger.warning(f"Skipping unreadable file {json_path}: {e}")
+                skipped.append(str(json_path))
+                continue
+
+            if not isinstance(data, dict) or 'document_metadata' not in data or 'chapters' not in data:
+                skipped.append(str(json_path))
+                continue
+            documents.append((json_path, data))
+
+        self.logger.info(f"Ingesting {len(documents)} documents from {directory}")
+        self.create_tables_if_not_exist()
+
+        results = []
+        with self._get_connection() as conn:
+            for json_path, data in documents:
+                results.append(self._ingest_document(conn, data, str(json_path)))
+
+        summary = {
+            'documents_ingested': len(results),
+            'files_skipped': len(skipped),
+            'chapters_inserted': sum(r['chapters_inserted'] for r in results),
+            'entities_inserted': sum(r['entities_inserted'] for r in results),
+            'documents': results,
+            'status': 'completed'
+        }
 
-        results = {
+        self.logger.info(
+            f"Directory ingestion completed: {summary['documents_ingested']} documents, "
+            f"{summary['chapters_inserted']} chapters, {summary['entities_inserted']} entities"
+        )
+        return summary
+
+    def _ingest_document(self, conn: sqlite3.Connection, data: Dict, source_file: str) -> Dict:
+        """Insert one universal JSON document inside the caller's transaction."""
+        # Insert document metadata
+        doc_id = self._insert_document_metadata(conn, data['document_metadata'], source_file)
+
+        # Insert chapters, then all entities of the document in one batch
+        chapter_ids, chapters_inserted = self._insert_chapters(conn, doc_id, data['chapters'])
+        entities_inserted = self._insert_entities(conn, [
+            (chapter_ids[chapter_data['chapter_id']], entity)
+            for chapter_data in data['chapters']
+            for entity in chapter_data.get('entities', [])
+        ])
+
+        # Update processing statistics
+        self._update_processing_stats(conn, doc_id)
+
+        return {
             'document_id': doc_id,
-            'chapters_inserted': len(chapter_ids),
-            'entities_inserted': total_entities,
+            'source_file': source_file,
+            'chapters_inserted': chapters_inserted,
+            'entities_inserted': entities_inserted,
             'status': 'completed'
         }
 
-        self.logger.info(f"Database ingestion completed: {results}")
-        return results
-
     def _get_connection(self):
         """Get database connection with proper configuration."""
         # Ensure database directory exists
@@ -80,32 +143,24 @@ class EAFDatabaseIngestion:
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys = ON")
+        # WAL: readers (MCP servers) are not blocked while ingestion writes;
+        # NORMAL sync is durable at checkpoints and much cheaper per commit
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
         return conn
 
     def _insert_document_metadata(self, conn: sqlite3.Connection, metadata: Dict, source_file: str) -> int:
-        """Insert document metadata and return document ID."""
-        cursor = conn.cursor()
-
-        # Check if document already exists
-        cursor.execute("""
-            SELECT id FROM documents WHERE title = ? AND document_type = ?
-        """, (metadata['document_title'], metadata['document_type']))
-
-        existing = cursor.fetchone()
-        if existing:
-            self.logger.info(f"Document already exists with ID: {existing['id']}")
-            return existing['id']
+        """Insert document metadata (if new) and return document ID."""
+        now = datetime.now().isoformat()
 
-        # Insert new document
-        insert_sql = """
+        # UNIQUE (title, document_type): an existing document is left untouched
+        conn.execute("""
             INSERT INTO documents (
                 title, document_type, total_pages, source_file, processing_date,
                 created_at, updated_at
             ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """
-
-        now = datetime.now().isoformat()
-        cursor.execute(insert_sql, (
+            ON CONFLICT (title, document_type) DO NOTHING
+        """, (
             metadata['document_title'],
             metadata['document_type'],
             metadata['total_pages'],
@@ -115,103 +170,97 @@ class EAFDatabaseIngestion:
             now
         ))
 
-        doc_id = cursor.lastrowid
-        self.logger.info(f"Inserted document with ID: {doc_id}")
-        return doc_id
-
-    def _insert_chapter(self, conn: sqlite3.Connection, doc_id: int, chapter_data: Dict) -> int:
-        """Insert chapter data and return chapter ID."""
-        cursor = conn.cursor()
-
-        # Check if chapter already exists
-        cursor.execute("""
-            SELECT id FROM chapters WHERE document_id = ? AND chapter_id = ?
-        """, (doc_id, chapter_data['chapter_id']))
+        return conn.execute("""
+            SELECT id FROM documents WHERE title = ? AND document_type = ?
+        """, (metadata['document_title'], metadata['document_type'])).fetchone()['id']
 
-        existing = cursor.fetchone()
-        if existing:
-            self.logger.info(f"Chapter already exists with ID: {existing['id']}")
-            return existing['id']
+    def _insert_chapters(self, conn: sqlite3.Connection, doc_id: int, chapters: List[Dict]) -> Tuple[Dict[str, int], int]:
+        """Insert new chapters; return ({chapter_id: row id}, inserted count)."""
+        now = datetime.now().isoformat()
+        before = conn.total_changes
 
-        # Insert new chapter
-        insert_sql = """
+        conn.executemany("""
             INSERT INTO chapters (
                 document_id, chapter_id, title, content_type, page_range,
                 record_count, created_at, updated_at
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """
-
+            ON CONFLICT (document_id, chapter_id) DO NOTHING
+        """, [
+            (
+                doc_id,
+                chapter_data['chapter_id'],
+                chapter_data['title'],
+                chapter_data['content_type'],
+                chapter_data['page_range'],
+                chapter_data.get('metadata', {}).get('record_count', 0),
+                now,
+                now
+            )
+            for chapter_data in chapters
+        ])
+        inserted = conn.total_changes - before
+
+        chapter_ids = {
+            row['chapter_id']: row['id']
+            for row in conn.execute("SELECT id, chapter_id FROM chapters WHERE document_id = ?", (doc_id,))
+        }
+        return chapter_ids, inserted
+
+    def _resolve_canonical_ids(self, entities: List[Dict]) -> Dict[Tuple[str, str], str]:
+        """Canonical catalog IDs for (type, name) of organizations/plants, one batch per type."""
+        catalog = get_entity_catalog()
+        canonical_ids = {}
+        for entity_type, catalog_type in CATALOG_ENTITY_TYPES.items():
+            names = [entity['name'] for entity in entities if entity['type'] == entity_type]
+            if not names:
+                continue
+            # New names become catalog entities, so later documents resolve to the same ID
+            for name, resolution in catalog.resolve_many(names, catalog_type, create=True).items():
+                canonical_ids[(entity_type, name)] = resolution.entity_id
+        return canonical_ids
+
+    def _insert_entities(self, conn: sqlite3.Connection, chapter_entities: List[Tuple[int, Dict]]) -> int:
+        """Insert (chapter row id, entity) pairs and return how many were new."""
         now = datetime.now().isoformat()
-        record_count = chapter_data['metadata'].get('record_count', 0)
-
-        cursor.execute(insert_sql, (
-            doc_id,
-            chapter_data['chapter_id'],
-            chapter_data['title'],
-            chapter_data['content_type'],
-            chapter_data['page_range'],
-            record_count,
-            now,
-            now
-        ))
-
-        chapter_id = cursor.lastrowid
-        self.logger.info(f"Inserted chapter '{chapter_data['title']}' with ID: {chapter_id}")
-        return chapter_id
-
-    def _insert_chapter_entities(self, conn: sqlite3.Connection, chapter_id: int, entities: List[Dict]) -> int:
-        """Insert entities for a chapter and return count."""
-        cursor = conn.cursor()
-        inserted_count = 0
+        before = conn.total_changes
+        canonical_ids = self._resolve_canonical_ids([entity for _, entity in chapter_entities])
 
-        for entity in entities:
-            # Check if entity already exists
-            cursor.execute("""
-                SELECT id FROM entities WHERE chapter_id = ? AND name = ? AND type = ?
-            """, (chapter_id, entity['name'], entity['type']))
-
-            if cursor.fetchone():
-                continue  # Skip existing entity
-
-            # Insert new entity
-            insert_sql = """
-                INSERT INTO entities (
-                    chapter_id, name, type, category, metadata, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """
-
-            now = datetime.now().isoformat()
-            metadata_json = json.dumps(entity) if isinstance(entity, dict) else '{}'
-
-            cursor.execute(insert_sql, (
+        # UNIQUE (chapter_id, name, type) replaces the per-entity existence query
+        conn.executemany("""
+            INSERT INTO entities (
+                chapter_id, name, type, category, canonical_id, metadata, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (chapter_id, name, type) DO NOTHING
+        """, [
+            (
                 chapter_id,
                 entity['name'],
                 entity['type'],
                 entity.get('category', ''),
-                metadata_json,
+                canonical_ids.get((entity['type'], entity['name'])),
+                json.dumps(entity, ensure_ascii=False),
                 now,
                 now
-            ))
-
-            inserted_count += 1
+            )
+            for chapter_id, entity in chapter_entities
+        ])
 
-        self.logger.info(f"Inserted {inserted_count} entities for chapter ID: {chapter_id}")
-        return inserted_count
-
-    def _update_processing_stats(self, conn: sqlite3.Connection, doc_id: int, chapter_count: int, entity_count: int):
-        """Update document processing statistics."""
-        cursor = conn.cursor()
-
-        update_sql = """
-            UPDATE documents
-            SET chapters_count = ?, entities_count = ?, updated_at = ?
-            WHERE id = ?
-        """
+        return conn.total_changes - before
 
+    def _update_processing_stats(self, conn: sqlite3.Connection, doc_id: int):
+        """Update document processing statistics from the stored rows."""
         now = datetime.now().isoformat()
-        cursor.execute(update_sql, (chapter_count, entity_count, now, doc_id))
-
-        self.logger.info(f"Updated processing stats for document ID {doc_id}: {chapter_count} chapters, {entity_count} entities")
+        conn.execute("""
+            UPDATE documents
+            SET chapters_count = (SELECT COUNT(*) FROM chapters WHERE document_id = :doc_id),
+                entities_count = (
+                    SELECT COUNT(*) FROM entities e
+                    JOIN chapters c ON e.chapter_id = c.id
+                    WHERE c.document_id = :doc_id
+                ),
+                updated_at = :now
+            WHERE id = :doc_id
+        """, {'doc_id': doc_id, 'now': now})
 
     def create_tables_if_not_exist(self):
         """Create necessary tables if they don't exist."""
@@ -258,6 +307,7 @@ class EAFDatabaseIngestion:
                     name TEXT NOT NULL,
                     type TEXT NOT NULL,
                     category TEXT,
+                    canonical_id TEXT,
                     metadata TEXT,
                     created_at TEXT NOT NULL,
                     updated_at TEXT NOT NULL,
@@ -265,15 +315,77 @@ class EAFDatabaseIngestion:
                 )
             """)
 
+            # Databases created before entity resolution lack canonical_id
+            entity_columns = {row['name'] for row in cursor.execute("PRAGMA table_info(entities)")}
+            if 'canonical_id' not in entity_columns:
+                cursor.execute("ALTER TABLE entities ADD COLUMN canonical_id TEXT")
+
+            # Natural keys: ingestion relies on these for ON CONFLICT DO NOTHING
+            # (unique indexes rather than table constraints so existing databases get them too)
+            has_unique_keys = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_entities_chapter_name_type'"
+            ).fetchone()
+            if not has_unique_keys:
+                self._deduplicate_natural_keys(cursor)
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_documents_title_type ON documents (title, document_type)")
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_chapters_document_chapter ON chapters (document_id, chapter_id)")
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_entities_chapter_name_type ON entities (chapter_id, name, type)")
+
             # Create indexes for better query performance
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_type ON documents (document_type)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_document ON chapters (document_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_chapter ON entities (chapter_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_type ON entities (type)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_canonical ON entities (canonical_id)")
 
             conn.commit()
             self.logger.info("Database tables created/verified successfully")
 
+    def _deduplicate_natural_keys(self, cursor: sqlite3.Cursor):
+        """Merge rows sharing a natural key (databases ingested before the unique indexes)."""
+        removed = 0
+
+        # Chapters of duplicate documents move to the kept (lowest id) document
+        cursor.execute("""
+            UPDATE chapters SET document_id = (
+                SELECT MIN(d2.id) FROM documents d1
+                JOIN documents d2 ON d2.title = d1.title AND d2.document_type = d1.document_type
+                WHERE d1.id = chapters.document_id
+            )
+            WHERE document_id IN (SELECT id FROM documents)
+              AND document_id NOT IN (SELECT MIN(id) FROM documents GROUP BY title, document_type)
+        """)
+        cursor.execute("DELETE FROM documents WHERE id NOT IN (SELECT MIN(id) FROM documents GROUP BY title, document_type)")
+        removed += cursor.rowcount
+
+        # Entities of duplicate chapters move to the kept chapter
+        cursor.execute("""
+            UPDATE entities SET chapter_id = (
+                SELECT MIN(c2.id) FROM chapters c1
+                JOIN chapters c2 ON c2.document_id = c1.document_id AND c2.chapter_id = c1.chapter_id
+                WHERE c1.id = entities.chapter_id
+            )
+            WHERE chapter_id IN (SELECT id FROM chapters)
+              AND chapter_id NOT IN (SELECT MIN(id) FROM chapters GROUP BY document_id, chapter_id)
+        """)
+        cursor.execute("DELETE FROM chapters WHERE id NOT IN (SELECT MIN(id) FROM chapters GROUP BY document_id, chapter_id)")
+        removed += cursor.rowcount
+
+        cursor.execute("DELETE FROM entities WHERE id NOT IN (SELECT MIN(id) FROM entities GROUP BY chapter_id, name, type)")
+        removed += cursor.rowcount
+
+        if removed:
+            cursor.execute("""
+                UPDATE documents
+                SET chapters_count = (SELECT COUNT(*) FROM chapters WHERE document_id = documents.id),
+                    entities_count = (
+                        SELECT COUNT(*) FROM entities e
+                        JOIN chapters c ON e.chapter_id = c.id
+                        WHERE c.document_id = documents.id
+                    )
+            """)
+            self.logger.info(f"Merged {removed} duplicate rows before creating unique keys")
+
     def verify_ingestion(self, doc_id: int) -> Dict:
         """Verify the ingestion was successful."""
         with self._get_connection() as conn:
@@ -308,7 +420,7 @@ def main():
     import argparse
 
     parser = argparse.ArgumentParser(description='Ingest EAF universal JSON into database')
-    parser.add_argument('json_file', help='Path to universal JSON file')
+    parser.add_argument('json_file', help='Path to universal JSON file, or a directory of them')
     parser.add_argument('--db-path', help='Path to SQLite database file')
     parser.add_argument('--verify', action='store_true', help='Verify ingestion after completion')
 
@@ -320,6 +432,21 @@ def main():
     # Create tables if needed
     ingestion.create_tables_if_not_exist()
 
+    # Batch mode: a whole directory of reports in one transaction
+    if Path(args.json_file).is_dir():
+        summary = ingestion.ingest_directory(args.json_file)
+
+        print("\n" + "="*60)
+        print("EAF DATABASE BATCH INGESTION SUMMARY")
+        print("="*60)
+        print(f"Documents Ingested: {summary['documents_ingested']}")
+        print(f"Files Skipped: {summary['files_skipped']}")
+        print(f"Chapters Inserted: {summary['chapters_inserted']}")
+        print(f"Entities Inserted: {summary['entities_inserted']}")
+        print(f"Status: {summary['status']}")
+        print("="*60)
+        return
+
     # Perform ingestion
     results = ingestion.ingest_universal_json(args.json_file)
 
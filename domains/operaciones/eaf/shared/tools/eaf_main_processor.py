@@ -10,8 +10,8 @@ import logging
 import sqlite3
 from pathlib import Path
 from typing import Dict, List
-import PyPDF2
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
 import sys
 
 # Add project root to path
@@ -24,15 +24,24 @@ sys.path.append(str(eaf_root))
 
 from chapter_detection.eaf_chapter_detector import EAFChapterDetector
 
+# Pooled PDF handles and memoized page text shared across operaciones processors
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from pdf_document_pool import get_text_provider
+from page_text_store import PageTextStore
+
 
 class EAFMainProcessor:
     """Main processor for EAF documents with chapter-based processing."""
 
-    def __init__(self, pdf_path: str, output_dir: str = None):
+    def __init__(self, pdf_path: str, output_dir: str = None, max_workers: int = None):
         self.pdf_path = Path(pdf_path)
         self.output_dir = Path(output_dir) if output_dir else self.pdf_path.parent / "processed"
         self.project_root = project_root
         self.db_path = self.project_root / "platform_data" / "database" / "dark_data.db"
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+
+        # Page texts extracted once for all chapters (built in process_document)
+        self.page_store = None
 
         # Setup logging
         logging.basicConfig(level=logging.INFO)
@@ -49,6 +58,16 @@ class EAFMainProcessor:
             'processing_stats': {}
         }
 
+        # Universal JSON chapters and running totals, filled as chapter results stream in
+        self.universal_chapters = []
+        self.total_records = 0
+
+    def __getstate__(self):
+        """Chapter workers get a copy without the detector (open PDF handles)"""
+        state = self.__dict__.copy()
+        state['detector'] = None
+        return state
+
     def process_document(self) -> Dict:
         """Process the complete EAF document."""
         self.logger.info(f"Starting EAF document processing: {self.pdf_path.name}")
@@ -62,15 +81,16 @@ class EAFMainProcessor:
         self.logger.info("Step 2: Setting up output directories...")
         self._setup_output_directories()
 
-        # Step 3: Process chapters
-        self.logger.info("Step 3: Processing chapters...")
+        # Step 3: Extract page text once (parallel page shards -> shared store)
+        self.logger.info("Step 3: Extracting page text...")
+        self._build_page_store()
+
+        # Step 4: Process chapters; each result is transformed to universal JSON as it arrives
+        self.logger.info("Step 4: Processing chapters...")
         if self.chapters_info['processing_strategy']['strategy'] == 'parallel_chunks':
             self._process_chapters_parallel()
         else:
             self._process_chapters_sequential()
-
-        # Step 4: Transform to universal JSON
-        self.logger.info("Step 4: Transforming to universal JSON...")
         self._transform_to_universal_json()
 
         # Step 5: Ingest to database
@@ -99,23 +119,36 @@ class EAFMainProcessor:
             (chapter_dir / "validated_extractions").mkdir(exist_ok=True)
             (chapter_dir / "universal_json").mkdir(exist_ok=True)
 
+    def _build_page_store(self):
+        """Extract every page once into a memory-mapped store shared by chapter workers."""
+        store_dir = self.output_dir / ".page_text"
+        self.page_store = PageTextStore.open_or_build(
+            str(self.pdf_path), str(store_dir), engine='pypdf2', max_workers=self.max_workers
+        )
+        self.logger.info(f"Page text store ready: {self.page_store.page_count} pages")
+
     def _process_chapters_parallel(self):
-        """Process chapters in parallel."""
-        max_workers = min(4, len(self.chapters_info['chapters']))
+        """Process chapters in worker processes, consuming results as they complete."""
+        chapters = self.chapters_info['chapters']
+        max_workers = min(self.max_workers, len(chapters))
+
+        # Largest chapters first so a long chapter does not start last
+        order = sorted(range(len(chapters)),
+                       key=lambda i: chapters[i]['end_page'] - chapters[i]['start_page'],
+                       reverse=True)
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all chapter processing tasks
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Submit all chapter processing tasks (workers read pages from the shared store)
             future_to_chapter = {
-                executor.submit(self._process_single_chapter, i, chapter): (i, chapter)
-                for i, chapter in enumerate(self.chapters_info['chapters'])
+                executor.submit(self._process_single_chapter, i, chapters[i]): (i, chapters[i])
+                for i in order
             }
 
             # Collect results as they complete
             for future in as_completed(future_to_chapter):
                 chapter_idx, chapter_info = future_to_chapter[future]
                 try:
-                    result = future.result()
-                    self.results['chapters'].append(result)
+                    self._on_chapter_result(future.result())
                     self.logger.info(f"Completed chapter {chapter_idx + 1}: {chapter_info['title']}")
                 except Exception as exc:
                     self.logger.error(f"Chapter {chapter_idx + 1} generated an exception: {exc}")
@@ -124,12 +157,19 @@ class EAFMainProcessor:
         """Process chapters sequentially."""
         for i, chapter in enumerate(self.chapters_info['chapters']):
             try:
-                result = self._process_single_chapter(i, chapter)
-                self.results['chapters'].append(result)
+                self._on_chapter_result(self._process_single_chapter(i, chapter))
                 self.logger.info(f"Completed chapter {i + 1}: {chapter['title']}")
             except Exception as exc:
                 self.logger.error(f"Chapter {i + 1} failed: {exc}")
 
+    def _on_chapter_result(self, result: Dict):
+        """Record a finished chapter and write its universal JSON right away."""
+        # Transform first: a failing chapter must not leave the two lists out of step
+        universal_chapter = self._transform_chapter(result)
+        self.results['chapters'].append(result)
+        self.universal_chapters.append(universal_chapter)
+        self.total_records += result['record_count']
+
     def _process_single_chapter(self, chapter_idx: int, chapter_info: Dict) -> Dict:
         """Process a single chapter."""
         chapter_name = f"chapter_{chapter_idx+1}_{chapter_info['title'].lower().replace(' ', '_')}"
@@ -168,13 +208,12 @@ class EAFMainProcessor:
         """Extract text from specific page range."""
         text_parts = []
 
-        with open(self.pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+        # Shared page store when built (also in worker processes), else the pooled reader
+        provider = self.page_store or get_text_provider(str(self.pdf_path), engine='pypdf2')
 
-            for page_num in range(start_page, min(end_page + 1, len(reader.pages))):
-                page = reader.pages[page_num]
-                text = page.extract_text()
-                text_parts.append(f"=== PAGE {page_num + 1} ===\n{text}\n")
+        for page_num in range(start_page, min(end_page + 1, provider.page_count)):
+            text = provider.text(page_num + 1)
+            text_parts.append(f"=== PAGE {page_num + 1} ===\n{text}\n")
 
         return '\n'.join(text_parts)
 
@@ -317,44 +356,51 @@ class EAFMainProcessor:
         base_data['records'] = records
         return base_data
 
+    def _transform_chapter(self, chapter_result: Dict) -> Dict:
+        """Transform one processed chapter to the universal JSON schema and save it."""
+        # Load processed data
+        with open(chapter_result['processed_file'], 'r', encoding='utf-8') as f:
+            chapter_data = json.load(f)
+
+        # Transform to universal format
+        universal_chapter = {
+            'chapter_id': f"eaf_089_2025_ch_{chapter_result['chapter_idx']+1}",
+            'title': chapter_result['title'],
+            'content_type': chapter_result['content_type'],
+            'page_range': chapter_result['pages'],
+            'entities': self._extract_entities_from_records(chapter_data['records']),
+            'relationships': [],
+            'metadata': {
+                'processing_date': None,
+                'record_count': chapter_result['record_count']
+            }
+        }
+
+        # Save universal JSON for this chapter
+        chapter_name = f"chapter_{chapter_result['chapter_idx']+1}_{chapter_result['title'].lower().replace(' ', '_')}"
+        universal_file = self.output_dir / chapter_name / "universal_json" / f"{chapter_name}_universal.json"
+
+        with open(universal_file, 'w', encoding='utf-8') as f:
+            json.dump(universal_chapter, f, indent=2, ensure_ascii=False)
+
+        return universal_chapter
+
     def _transform_to_universal_json(self):
-        """Transform processed data to universal JSON schema."""
+        """Assemble the complete universal JSON from the streamed chapters."""
+        # Chapters complete out of order in parallel mode; keep document order
+        ordered = sorted(zip(self.results['chapters'], self.universal_chapters),
+                         key=lambda pair: pair[0]['chapter_idx'])
+        self.results['chapters'] = [result for result, _ in ordered]
+        self.universal_chapters = [chapter for _, chapter in ordered]
+
         universal_data = {
             'document_metadata': self.results['metadata'],
             'extraction_timestamp': None,
-            'chapters': [],
+            'chapters': self.universal_chapters,
             'cross_references': [],
             'entities': []
         }
 
-        for chapter_result in self.results['chapters']:
-            # Load processed data
-            with open(chapter_result['processed_file'], 'r', encoding='utf-8') as f:
-                chapter_data = json.load(f)
-
-            # Transform to universal format
-            universal_chapter = {
-                'chapter_id': f"eaf_089_2025_ch_{chapter_result['chapter_idx']+1}",
-                'title': chapter_result['title'],
-                'content_type': chapter_result['content_type'],
-                'page_range': chapter_result['pages'],
-                'entities': self._extract_entities_from_records(chapter_data['records']),
-                'relationships': [],
-                'metadata': {
-                    'processing_date': None,
-                    'record_count': chapter_result['record_count']
-                }
-            }
-
-            universal_data['chapters'].append(universal_chapter)
-
-            # Save universal JSON for this chapter
-            chapter_name = f"chapter_{chapter_result['chapter_idx']+1}_{chapter_result['title'].lower().replace(' ', '_')}"
-            universal_file = self.output_dir / chapter_name / "universal_json" / f"{chapter_name}_universal.json"
-
-            with open(universal_file, 'w', encoding='utf-8') as f:
-                json.dump(universal_chapter, f, indent=2, ensure_ascii=False)
-
         # Save complete universal JSON
         universal_file = self.output_dir / "eaf_089_2025_universal.json"
         with open(universal_file, 'w', encoding='utf-8') as f:
@@ -404,13 +450,11 @@ class EAFMainProcessor:
 
     def _generate_summary_report(self):
         """Generate processing summary report."""
-        total_records = sum(ch['record_count'] for ch in self.results['chapters'])
-
         summary = {
             'document': self.pdf_path.name,
             'total_pages': self.results['metadata']['total_pages'],
             'chapters_processed': len(self.results['chapters']),
-            'total_records_extracted': total_records,
+            'total_records_extracted': self.total_records,
             'processing_strategy': self.chapters_info['processing_strategy']['strategy'],
             'output_directory': str(self.output_dir)
         }
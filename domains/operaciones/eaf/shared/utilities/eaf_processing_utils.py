@@ -4,12 +4,16 @@ Common utilities for processing EAF documents across all chapters
 """
 
 import re
+import sys
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent / "shared" / "utilities"))
+from entity_gazetteer import EntityMention, get_gazetteer
+
 
 @dataclass
 class EAFIdentifier:
@@ -32,27 +36,9 @@ class EAFPatterns:
         re.compile(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})'),  # DD de MM de YYYY (Spanish)
     ]
 
-    # Equipment patterns
-    EQUIPMENT_PATTERNS = {
-        'transformer': re.compile(r'transformador\s+(?:N°\s*)?(\d+|\w+)', re.IGNORECASE),
-        'line': re.compile(r'línea\s+(?:de\s+)?(\d+\s*kV)', re.IGNORECASE),
-        'substation': re.compile(r'S/E\s+([A-Za-z\s]+)', re.IGNORECASE),
-        'interruptor': re.compile(r'interruptor\s+(\w+)', re.IGNORECASE),
-    }
-
-    # Company patterns (Chilean companies)
-    COMPANY_PATTERNS = [
-        re.compile(r'Enel\s+(?:Chile|Generación|Distribución)', re.IGNORECASE),
-        re.compile(r'Colbún\s+S\.A\.?', re.IGNORECASE),
-        re.compile(r'AES\s+Gener', re.IGNORECASE),
-        re.compile(r'ENGIE\s+(?:Chile|Energía)', re.IGNORECASE),
-        re.compile(r'Statkraft', re.IGNORECASE),
-    ]
-
-    # Voltage levels
-    VOLTAGE_PATTERN = re.compile(r'(\d+)\s*kV', re.IGNORECASE)
+    # Equipment, company, voltage and RUT mentions: see entity_gazetteer
 
-    # Chilean RUT pattern
+    # Chilean RUT pattern (format validation)
     RUT_PATTERN = re.compile(r'(\d{1,2}\.?\d{3}\.?\d{3}-[\dkK])')
 
 
@@ -125,72 +111,93 @@ class EAFParser:
         }
         return months.get(month_name.lower())
 
+    # Equipment type -> gazetteer entity type
+    EQUIPMENT_TYPES = {
+        'transformer': 'transformador',
+        'line': 'linea',
+        'substation': 'subestacion',
+        'interruptor': 'interruptor',
+    }
+
     @staticmethod
-    def extract_equipment(text: str) -> Dict[str, List[str]]:
+    def extract_entities(text: str) -> List[EntityMention]:
+        """
+        Extract every entity mention from text in a single gazetteer pass
+
+        Args:
+            text: Text to search for entities
+
+        Returns:
+            List of EntityMention (type, canonical name, offsets) in text order
+        """
+        return get_gazetteer().find(text)
+
+    @staticmethod
+    def extract_equipment(text: str, mentions: Optional[List[EntityMention]] = None) -> Dict[str, List[str]]:
         """
         Extract equipment mentions from text
 
         Args:
             text: Text to search for equipment
+            mentions: Mentions from extract_entities (avoids another pass)
 
         Returns:
             Dictionary with equipment types and found instances
         """
+        mentions = mentions if mentions is not None else EAFParser.extract_entities(text)
         equipment = {}
 
-        for eq_type, pattern in EAFPatterns.EQUIPMENT_PATTERNS.items():
-            matches = pattern.findall(text)
+        for eq_type, entity_type in EAFParser.EQUIPMENT_TYPES.items():
+            matches = [m.canonical for m in mentions if m.entity_type == entity_type]
             if matches:
                 equipment[eq_type] = matches
 
         return equipment
 
     @staticmethod
-    def extract_companies(text: str) -> List[str]:
+    def extract_companies(text: str, mentions: Optional[List[EntityMention]] = None) -> List[str]:
         """
         Extract company names from text
 
         Args:
             text: Text to search for companies
+            mentions: Mentions from extract_entities (avoids another pass)
 
         Returns:
-            List of company names found
+            List of canonical company names found
         """
-        companies = []
-
-        for pattern in EAFPatterns.COMPANY_PATTERNS:
-            matches = pattern.findall(text)
-            companies.extend(matches)
-
-        return list(set(companies))  # Remove duplicates
+        mentions = mentions if mentions is not None else EAFParser.extract_entities(text)
+        return list(dict.fromkeys(m.canonical for m in mentions if m.entity_type == 'empresa'))
 
     @staticmethod
-    def extract_voltage_levels(text: str) -> List[str]:
+    def extract_voltage_levels(text: str, mentions: Optional[List[EntityMention]] = None) -> List[str]:
         """
         Extract voltage levels from text
 
         Args:
             text: Text to search for voltage levels
+            mentions: Mentions from extract_entities (avoids another pass)
 
         Returns:
             List of voltage levels (e.g., ['220 kV', '66 kV'])
         """
-        matches = EAFPatterns.VOLTAGE_PATTERN.findall(text)
-        return [f"{voltage} kV" for voltage in matches]
+        mentions = mentions if mentions is not None else EAFParser.extract_entities(text)
+        return [m.canonical for m in mentions if m.entity_type == 'nivel_tension']
 
     @staticmethod
-    def extract_ruts(text: str) -> List[str]:
+    def extract_ruts(text: str, mentions: Optional[List[EntityMention]] = None) -> List[str]:
         """
         Extract Chilean RUTs from text
 
         Args:
             text: Text to search for RUTs
+            mentions: Mentions from extract_entities (avoids another pass)
 
         Returns:
             List of RUT strings
         """
-        matches = EAFPatterns.RUT_PATTERN.findall(text)
-        return matches
+        mentions = mentions if mentions is not None else EAFParser.extract_entities(text)
+        return [m.text for m in mentions if m.entity_type == 'rut']
 
 
 class EAFValidator:
@@ -0,0 +1 @@
+# Operaciones Shared Utilities Module
\ No newline at end of file
@@ -0,0 +1,595 @@
+"""
+Chapter Boundary Detection and Report Registry
+One engine to find chapter page ranges in EAF / Anexos EAF reports.
+
+Detection order:
+1. PDF outline (bookmarks): free, exact when the report ships with one.
+2. Font scan: only the top band of every page is read with PyMuPDF
+   ("dict" mode, clipped), and only large or bold lines that look like a
+   heading ("3. Estimación de ...", "ANEXO Nº 2", "INFORME DIARIO") count.
+   Page chunks are scanned in parallel worker processes.
+3. Gap fill: chapter numbers missing between two detected chapters are
+   searched again with a full-page scan, but only between those two pages.
+
+Detected ranges are persisted in a JSON registry keyed by document hash
+(data/report_registry.json), so a report is analysed once and every script
+(split_pdf_chapters, EXTRACT_ANY_CHAPTER, the parallel runner, the chapter
+detectors) reads the same ranges.
+
+Usage:
+    registry = get_report_registry()
+    entry = registry.resolve(pdf_path, report_id="EAF-089-2025")   # stored ranges, else detect
+    registry.resolve(pdf_path, report_id="EAF-089-2025", save=True)  # detect and persist
+    registry.chapter_pages("EAF-089-2025")   # {1: (1, 11), 2: (12, 90), ...}
+
+    result = ChapterBoundaryDetector(pdf_path).detect()             # no registry
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pdf_document_pool import DocumentPool, get_document_pool
+
+# Project root: utilities -> shared -> operaciones -> domains -> root
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
+DEFAULT_REGISTRY_PATH = PROJECT_ROOT / "data" / "report_registry.json"
+
+REGISTRY_VERSION = 1
+
+
+@dataclass(frozen=True)
+class HeadingPattern:
+    """A kind of chapter heading; `number` and `title` groups are optional"""
+    kind: str
+    regex: str
+    flags: int = 0
+
+    def compile(self):
+        return re.compile(self.regex, self.flags)
+
+
+# "3. Estimación de la energía no suministrada" (excludes "9.1 Subsección")
+NUMBERED_CHAPTER = HeadingPattern(
+    "chapter", r"^\s*(?P<number>\d{1,2})\.\s+(?P<title>[A-ZÁÉÍÓÚÑ][^\n]{3,150})$"
+)
+# "ANEXO Nº 2 Informes de empresas"
+ANEXO_SECTION = HeadingPattern(
+    "anexo", r"^\s*ANEXO\s*N[º°ªo]?\s*(?P<number>\d+)\b\s*(?P<title>.*)$", re.IGNORECASE
+)
+# "INFORME DIARIO" daily report title pages (unnumbered)
+INFORME_DIARIO = HeadingPattern(
+    "informe_diario", r"^\s*(?P<title>INFORME\s+DIARIO.*)$", re.IGNORECASE
+)
+
+EAF_PATTERNS = (NUMBERED_CHAPTER,)
+ANEXOS_PATTERNS = (ANEXO_SECTION, INFORME_DIARIO)
+
+# Table of contents lines: "3. Estimación ........ 91"
+TOC_LEADER = re.compile(r"(\.{3,}|…+|\s{3,})\s*\d{1,4}\s*$")
+SKIP_WORDS = ("página", "tabla", "cuadro", "figura")
+
+BOLD_FLAG = 16  # PyMuPDF span flag bit for bold
+
+
+@dataclass
+class HeadingCandidate:
+    """A heading-looking line found on a page"""
+    page: int                 # 1-indexed
+    kind: str
+    number: Optional[int]
+    title: str
+    size: float
+    bold: bool
+    y0: float
+
+
+@dataclass
+class ChapterRange:
+    """Inclusive 1-indexed page range of one chapter"""
+    chapter_id: str
+    kind: str
+    number: Optional[int]
+    title: str
+    start_page: int
+    end_page: int
+
+    @property
+    def page_count(self) -> int:
+        return self.end_page - self.start_page + 1
+
+
+@dataclass
+class DetectionResult:
+    """Chapters found in a document and how they were found"""
+    total_pages: int
+    source: str               # 'outline', 'fonts' or 'none'
+    chapters: List[ChapterRange] = field(default_factory=list)
+
+    def page_ranges(self, kind: str = "chapter") -> Dict[int, Tuple[int, int]]:
+        """{number: (start_page, end_page)} for numbered chapters of a kind"""
+        return {
+            chapter.number: (chapter.start_page, chapter.end_page)
+            for chapter in self.chapters
+            if chapter.kind == kind and chapter.number is not None
+        }
+
+
+def document_hash(pdf_path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents (registry key)"""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _line_style(line: Dict) -> Tuple[str, float, bool]:
+    """Joined text, max font size and boldness of a PyMuPDF dict line"""
+    spans = [span for span in line.get("spans", []) if span.get("text", "").strip()]
+    if not spans:
+        return "", 0.0, False
+    text = "".join(span["text"] for span in spans).strip()
+    size = max(span.get("size", 0.0) for span in spans)
+    bold = any((span.get("flags", 0) & BOLD_FLAG) or "bold" in span.get("font", "").lower()
+               for span in spans)
+    return text, size, bold
+
+
+def _match_heading(text: str, patterns) -> Optional[Tuple[str, Optional[int], str]]:
+    """(kind, number, title) when a line looks like a heading"""
+    if TOC_LEADER.search(text):
+        return None
+    for kind, pattern in patterns:
+        match = pattern.match(text)
+        if not match:
+            continue
+        groups = match.groupdict()
+        number = int(groups["number"]) if groups.get("number") else None
+        title = (groups.get("title") or text).strip()
+        if kind == NUMBERED_CHAPTER.kind and (
+                number is None or number > 20 or
+                any(word in title.lower() for word in SKIP_WORDS)):
+            continue
+        return kind, number, title
+    return None
+
+
+# Worker-local pool: forked workers must not use the fitz handles (and
+# refcounts) of the parent's pool
+_worker_pool: Optional[DocumentPool] = None
+
+
+def _init_worker() -> None:
+    global _worker_pool
+    _worker_pool = DocumentPool(max_documents=2)
+
+
+def _scan_pages(pdf_path: str, pages: List[int], top_fraction: float,
+                pattern_specs: List[Tuple[str, str, int]]) -> Tuple[List[HeadingCandidate], Dict[float, int]]:
+    """
+    Scan the top band of some pages for heading candidates
+
+    Runs in worker processes, so it only takes picklable arguments and opens
+    the document through the worker's own pool.
+
+    Returns:
+        (candidates, font size histogram weighted by characters)
+    """
+    import fitz  # PyMuPDF
+
+    patterns = [(kind, re.compile(regex, flags)) for kind, regex, flags in pattern_specs]
+    candidates: List[HeadingCandidate] = []
+    sizes: Counter = Counter()
+
+    pool = _worker_pool if _worker_pool is not None else get_document_pool()
+    with pool.lease(pdf_path) as doc:
+        for page_num in pages:
+            page = doc[page_num - 1]
+            rect = page.rect
+            clip = None
+            if top_fraction < 1.0:
+                clip = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + rect.height * top_fraction)
+
+            for block in page.get_text("dict", clip=clip)["blocks"]:
+                if block.get("type", 0) != 0:
+                    continue
+
+                lines = [(_line_style(line), line["bbox"][1]) for line in block.get("lines", [])]
+                for index, ((text, size, bold), y0) in enumerate(lines):
+                    if not text:
+                        continue
+                    sizes[round(size, 1)] += len(text)
+
+                    heading = _match_heading(text, patterns)
+                    if not heading:
+                        continue
+                    kind, number, title = heading
+
+                    # Wrapped headings continue on the next lines of the block in the same style
+                    for (next_text, next_size, next_bold), _ in lines[index + 1:index + 3]:
+                        if (not next_text or abs(next_size - size) > 0.5 or next_bold != bold or
+                                _match_heading(next_text, patterns)):
+                            break
+                        title = f"{title} {next_text}"
+
+                    candidates.append(HeadingCandidate(
+                        page=page_num, kind=kind, number=number, title=title,
+                        size=size, bold=bold, y0=y0
+                    ))
+
+    return candidates, dict(sizes)
+
+
+def build_chapter_ranges(headings: List[HeadingCandidate], total_pages: int) -> List[ChapterRange]:
+    """Each chapter ends where the next begins (same page: single-page chapter)"""
+    headings = sorted(headings, key=lambda h: (h.page, h.y0))
+    chapters = []
+    sequence: Counter = Counter()
+    for index, heading in enumerate(headings):
+        if index + 1 < len(headings):
+            next_start = headings[index + 1].page
+            end_page = heading.page if next_start == heading.page else next_start - 1
+        else:
+            end_page = total_pages
+
+        sequence[heading.kind] += 1
+        number = heading.number
+        if heading.kind == NUMBERED_CHAPTER.kind:
+            chapter_id = str(number)
+        else:
+            chapter_id = f"{heading.kind}_{number if number is not None else sequence[heading.kind]}"
+
+        chapters.append(ChapterRange(
+            chapter_id=chapter_id, kind=heading.kind, number=number, title=heading.title,
+            start_page=heading.page, end_page=end_page
+        ))
+    return chapters
+
+
+class ChapterBoundaryDetector:
+    """Finds chapter page ranges from the outline or from heading fonts."""
+
+    def __init__(self, pdf_path: str, patterns: Iterable[HeadingPattern] = EAF_PATTERNS,
+                 top_fraction: float = 0.35, min_size_ratio: float = 1.15,
+                 max_workers: Optional[int] = None, chunk_pages: int = 32,
+                 toc_threshold: int = 3):
+        """
+        Args:
+            pdf_path: Source PDF
+            patterns: Heading kinds to look for
+            top_fraction: Height fraction of each page that is scanned (1.0 = whole page)
+            min_size_ratio: Non-bold headings must be this much larger than body text
+            max_workers: Worker processes for the font scan (None = CPU count)
+            chunk_pages: Pages per worker task; documents up to two chunks are scanned in-process
+            toc_threshold: Pages with this many headings of one kind are a table of contents
+        """
+        self.pdf_path = str(pdf_path)
+        self.patterns = tuple(patterns)
+        self.top_fraction = top_fraction
+        self.min_size_ratio = min_size_ratio
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_pages = chunk_pages
+        self.toc_threshold = toc_threshold
+        self._pattern_specs = [(p.kind, p.regex, p.flags) for p in self.patterns]
+
+    def detect(self) -> DetectionResult:
+        """Outline first, then the font scan"""
+        import fitz  # PyMuPDF
+
+        with fitz.open(self.pdf_path) as doc:
+            total_pages = len(doc)
+            toc = doc.get_toc(simple=True)
+
+        headings = self._from_outline(toc)
+        if headings:
+            return DetectionResult(total_pages, "outline", build_chapter_ranges(headings, total_pages))
+
+        headings = self._from_fonts(total_pages)
+        if headings:
+            return DetectionResult(total_pages, "fonts", build_chapter_ranges(headings, total_pages))
+
+        return DetectionResult(total_pages, "none")
+
+    # ========== Outline ==========
+
+    def _from_outline(self, toc: List) -> List[HeadingCandidate]:
+        """Outline entries that match a heading pattern (at least two)"""
+        patterns = [(p.kind, p.compile()) for p in self.patterns]
+        headings = []
+        for level, title, page in toc:
+            if page < 1:
+                continue
+            heading = _match_heading(title.strip(), patterns)
+            if heading:
+                kind, number, clean_title = heading
+                headings.append(HeadingCandidate(page, kind, number, clean_title, 0.0, False, float(level)))
+
+        headings = self._select(headings)
+        return headings if len(headings) >= 2 else []
+
+    # ========== Font scan ==========
+
+    def _scan(self, pages: List[int], top_fraction: float) -> Tuple[List[HeadingCandidate], Counter]:
+        """Scan pages, in parallel chunks when there are enough of them"""
+        chunks = [pages[i:i + self.chunk_pages] for i in range(0, len(pages), self.chunk_pages)]
+        candidates: List[HeadingCandidate] = []
+        sizes: Counter = Counter()
+
+        if len(chunks) <= 2 or self.max_workers == 1:
+            results = [_scan_pages(self.pdf_path, chunk, top_fraction, self._pattern_specs) for chunk in chunks]
+        else:
+            workers = min(self.max_workers, len(chunks))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                futures = [
+                    executor.submit(_scan_pages, self.pdf_path, chunk, top_fraction, self._pattern_specs)
+                    for chunk in chunks
+                ]
+                results = [future.result() for future in futures]
+
+        for chunk_candidates, chunk_sizes in results:
+            candidates.extend(chunk_candidates)
+            sizes.update(chunk_sizes)
+        return candidates, sizes
+
+    def _from_fonts(self, total_pages: int) -> List[HeadingCandidate]:
+        candidates, sizes = self._scan(list(range(1, total_pages + 1)), self.top_fraction)
+        body_size = sizes.most_common(1)[0][0] if sizes else 0.0
+
+        headings = self._select(self._styled(candidates, body_size))
+
+        # Fill numbering gaps with a full-page scan between the neighbouring chapters
+        gap_pages = self._gap_pages(headings)
+        if gap_pages and self.top_fraction < 1.0:
+            extra, _ = self._scan(gap_pages, 1.0)
+            headings = self._select(headings + self._styled(extra, body_size))
+
+        return headings
+
+    def _styled(self, candidates: List[HeadingCandidate], body_size: float) -> List[HeadingCandidate]:
+        """Keep bold or larger-than-body candidates, drop table-of-contents pages"""
+        styled = [
+            c for c in candidates
+            if c.bold or not body_size or c.size >= body_size * self.min_size_ratio
+        ]
+
+        per_page = Counter((c.page, c.kind) for c in styled if c.number is not None)
+        toc_pages = {key for key, count in per_page.items() if count >= self.toc_threshold}
+        return [c for c in styled if (c.page, c.kind) not in toc_pages]
+
+    def _gap_pages(self, headings: List[HeadingCandidate]) -> List[int]:
+        """Pages between two numbered headings whose numbers are not consecutive"""
+        pages = set()
+        numbered: Dict[str, List[HeadingCandidate]] = {}
+        for heading in headings:
+            if heading.number is not None:
+                numbered.setdefault(heading.kind, []).append(heading)
+
+        for kind_headings in numbered.values():
+            kind_headings.sort(key=lambda h: h.number)
+            for previous, following in zip(kind_headings, kind_headings[1:]):
+                if following.number - previous.number > 1:
+                    pages.update(range(previous.page, following.page + 1))
+        return sorted(pages)
+
+    # ========== Selection ==========
+
+    @staticmethod
+    def _select(candidates: List[HeadingCandidate]) -> List[HeadingCandidate]:
+        """
+        One heading per chapter in reading order
+
+        Numbered kinds: for each number (ascending) the first candidate at or
+        after the previous chapter's position, so an early stray "7." cannot
+        shadow the real chapter 7. Unnumbered kinds: first candidate per page.
+        """
+        selected: List[HeadingCandidate] = []
+        by_kind: Dict[str, List[HeadingCandidate]] = {}
+        for candidate in candidates:
+            by_kind.setdefault(candidate.kind, []).append(candidate)
+
+        for kind, kind_candidates in by_kind.items():
+            kind_candidates.sort(key=lambda c: (c.page, c.y0))
+
+            if all(c.number is None for c in kind_candidates):
+                seen_pages = set()
+                for candidate in kind_candidates:
+                    if candidate.page not in seen_pages:
+                        seen_pages.add(candidate.page)
+                        selected.append(candidate)
+                continue
+
+            position = (0, -math.inf)
+            for number in sorted({c.number for c in kind_candidates if c.number is not None}):
+                for candidate in kind_candidates:
+                    if candidate.number == number and (candidate.page, candidate.y0) >= position:
+                        selected.append(candidate)
+                        position = (candidate.page, candidate.y0)
+                        break
+
+        return sorted(selected, key=lambda c: (c.page, c.y0))
+
+
+class ReportRegistry:
+    """JSON registry of chapter ranges per report, keyed by document hash."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else DEFAULT_REGISTRY_PATH
+        self._lock = threading.RLock()
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            data = {}
+        data.setdefault("version", REGISTRY_VERSION)
+        data.setdefault("reports", {})
+        data.setdefault("documents", {})
+        return data
+
+    def save(self) -> None:
+        """Atomic write (temp file + rename) so readers never see half a file"""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=".report_registry_", suffix=".json")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, indent=2, ensure_ascii=False)
+                    f.write("\n")
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    # ========== Lookups ==========
+
+    def reports(self) -> List[str]:
+        return sorted(self.data["reports"])
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        return self.data["reports"].get(report_id)
+
+    def find_by_hash(self, doc_hash: str) -> Optional[str]:
+        """Report ID registered for a document hash"""
+        return self.data["documents"].get(doc_hash)
+
+    def chapter_pages(self, report_id: str, kind: str = "chapter") -> Dict[int, Tuple[int, int]]:
+        """{chapter number: (start_page, end_page)} for a registered report"""
+        entry = self.get(report_id)
+        if not entry:
+            return {}
+        return {
+            int(chapter["number"]): (chapter["start_page"], chapter["end_page"])
+            for chapter in entry["chapters"].values()
+            if chapter.get("kind", "chapter") == kind and chapter.get("number") is not None
+        }
+
+    def chapter_titles(self, report_id: str, kind: str = "chapter") -> Dict[int, str]:
+        """{chapter number: title} for a registered report"""
+        entry = self.get(report_id)
+        if not entry:
+            return {}
+        return {
+            int(chapter["number"]): chapter.get("title") or f"Capítulo {chapter['number']}"
+            for chapter in entry["chapters"].values()
+            if chapter.get("kind", "chapter") == kind and chapter.get("number") is not None
+        }
+
+    # ========== Updates ==========
+
+    def register(self, report_id: str, pdf_path: str, result: DetectionResult,
+                 doc_hash: Optional[str] = None, save: bool = True) -> Dict:
+        """Store a detection result for a report and its document hash"""
+        doc_hash = doc_hash or document_hash(pdf_path)
+        entry = {
+            "document_hash": doc_hash,
+            "file_name": Path(pdf_path).name,
+            "total_pages": result.total_pages,
+            "source": result.source,
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "chapters": {chapter.chapter_id: asdict(chapter) for chapter in result.chapters}
+        }
+        with self._lock:
+            self.data["reports"][report_id] = entry
+            self.data["documents"][doc_hash] = report_id
+            if save:
+                self.save()
+        return entry
+
+    def resolve(self, pdf_path: str, report_id: Optional[str] = None, redetect: bool = False,
+                save: bool = False, **detector_options) -> Dict:
+        """
+        Chapter ranges for a PDF, detecting them only when unknown
+
+        Args:
+            pdf_path: Source PDF
+            report_id: Report identifier (defaults to the file stem)
+            redetect: Ignore the registry and run detection again
+            save: Write a new detection (or a manual entry bound to this
+                  file) to the registry file; otherwise it is only kept in
+                  memory for this process
+            **detector_options: Passed to ChapterBoundaryDetector
+
+        Returns:
+            The registry entry ({"chapters": {...}, "source": ..., ...})
+        """
+        report_id = report_id or Path(pdf_path).stem
+        doc_hash = document_hash(pdf_path)
+
+        with self._lock:
+            if not redetect:
+                known_report = self.find_by_hash(doc_hash)
+                if known_report and known_report in self.data["reports"]:
+                    return self.data["reports"][known_report]
+
+                # Hand-verified ranges without a document yet: bind them to this file
+                entry = self.get(report_id)
+                if entry and entry.get("source") == "manual" and not entry.get("document_hash"):
+                    entry["document_hash"] = doc_hash
+                    entry["file_name"] = Path(pdf_path).name
+                    self.data["documents"][doc_hash] = report_id
+                    if save:
+                        self.save()
+                    return entry
+
+        result = ChapterBoundaryDetector(pdf_path, **detector_options).detect()
+        if not result.chapters:
+            return {"document_hash": doc_hash, "total_pages": result.total_pages,
+                    "source": result.source, "chapters": {}}
+        return self.register(report_id, pdf_path, result, doc_hash=doc_hash, save=save)
+
+
+_default_registry: Optional[ReportRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_report_registry(path: Optional[Path] = None) -> ReportRegistry:
+    """Process-wide ReportRegistry for the default path (or a new one for `path`)"""
+    global _default_registry
+    if path is not None:
+        return ReportRegistry(path)
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ReportRegistry()
+        return _default_registry
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect chapter page ranges and store them in the report registry")
+    parser.add_argument("pdf", help="Path to source PDF")
+    parser.add_argument("--report", default=None, help="Report ID (default: file name)")
+    parser.add_argument("--anexos", action="store_true", help="Detect ANEXO / INFORME DIARIO sections")
+    parser.add_argument("--redetect", action="store_true", help="Ignore stored ranges")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for the font scan")
+    args = parser.parse_args()
+
+    entry = get_report_registry().resolve(
+        args.pdf, report_id=args.report, redetect=args.redetect,
+        patterns=ANEXOS_PATTERNS if args.anexos else EAF_PATTERNS,
+        max_workers=args.workers, save=True
+    )
+
+    print(f"📄 {Path(args.pdf).name}  |  source: {entry['source']}  |  pages: {entry['total_pages']}")
+    for chapter_id, chapter in entry["chapters"].items():
+        pages = chapter["end_page"] - chapter["start_page"] + 1
+        print(f"   {chapter_id:>16}: pages {chapter['start_page']:4d}-{chapter['end_page']:4d} "
+              f"({pages:3d})  {chapter.get('title') or ''}")
+
+
+if __name__ == "__main__":
+    main()
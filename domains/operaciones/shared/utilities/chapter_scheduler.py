@@ -0,0 +1,305 @@
+"""
+Chapter Scheduler
+Memory-aware, longest-processing-time-first scheduling of chapter
+extraction jobs over worker processes.
+
+FAST_process_parallel_ENHANCED used to run fixed batches ([1, 4, 5, 8],
+[2, 3, 10, 11], [6, 7, 9]) tuned to one report and join() every batch, so
+the fastest chapter of a batch idled until the slowest finished, and
+results were read with Queue.empty() after join(). The scheduler instead:
+
+- Estimates every chapter's cost from a quick PyMuPDF pre-scan (pages,
+  pages with table rulings, embedded images), a few milliseconds per page.
+- Keeps pending jobs in LPT order (largest cost first) and starts the
+  largest job that fits as soon as a worker slot frees up: no barriers.
+- Admits a job only while the memory of the running workers (the larger of
+  their estimate and their measured RSS) plus the job's estimate stays
+  within the budget: rss_budget_mb per worker slot, capped by the memory
+  available at start. A job larger than the whole budget runs alone.
+- Receives results through one pipe per worker, multiplexed with the
+  process sentinels in multiprocessing.connection.wait(): results are read
+  as they arrive, and a worker that dies without a result is reported
+  instead of being waited on.
+
+Usage:
+    jobs = [ChapterJob.from_pdf(n, pdf_path, args=(n, info)) for n, info in chapters.items()]
+    scheduler = ChapterScheduler(max_workers=4, rss_budget_mb=4000)
+    for outcome in scheduler.run(jobs, process_chapter):
+        print(outcome.key, outcome.ok, outcome.result, outcome.peak_rss_mb)
+
+The target receives job.args plus result_conn=<Connection> and sends its
+result with result_conn.send(...).
+"""
+
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from pdf_document_pool import get_document_pool
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+MB = 1024 * 1024
+
+# Drawing items (lines, rectangles) that make a page count as a table page
+TABLE_RULING_ITEMS = 12
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """
+    Relative cost (page equivalents) and memory estimate of a Docling job
+
+    Layout analysis is roughly constant per page; TableFormer runs per table
+    and picture description per picture, and Docling keeps every page of
+    the document in memory until export.
+    """
+    page_cost: float = 1.0
+    table_page_cost: float = 1.5
+    image_cost: float = 0.3
+    base_rss_mb: float = 2500.0
+    page_rss_mb: float = 12.0
+    table_page_rss_mb: float = 8.0
+
+    def cost(self, pages: int, table_pages: int, images: int) -> float:
+        return pages * self.page_cost + table_pages * self.table_page_cost + images * self.image_cost
+
+    def rss_mb(self, pages: int, table_pages: int) -> float:
+        return self.base_rss_mb + pages * self.page_rss_mb + table_pages * self.table_page_rss_mb
+
+
+DEFAULT_COST_MODEL = CostModel()
+
+
+@dataclass(frozen=True)
+class PageScan:
+    """Pre-scan counts of a PDF (or a page range of it)"""
+    pages: int
+    table_pages: int = 0
+    images: int = 0
+
+    @property
+    def table_density(self) -> float:
+        return self.table_pages / self.pages if self.pages else 0.0
+
+
+def prescan_pdf(pdf_path: str, page_range: Optional[Tuple[int, int]] = None) -> PageScan:
+    """
+    Pages, pages with table rulings and images of a PDF
+
+    Only vector drawings and the image list are read (no text extraction,
+    no rendering). page_range is 1-indexed and inclusive.
+    """
+    table_pages = images = 0
+    with get_document_pool().lease(str(pdf_path)) as doc:
+        first, last = page_range or (1, doc.page_count)
+        last = min(last, doc.page_count)
+        for page_index in range(first - 1, last):
+            page = doc[page_index]
+            drawings = page.get_cdrawings() if hasattr(page, 'get_cdrawings') else page.get_drawings()
+            if sum(len(drawing.get('items', ())) for drawing in drawings) >= TABLE_RULING_ITEMS:
+                table_pages += 1
+            images += len(page.get_images(full=False))
+    return PageScan(max(0, last - first + 1), table_pages, images)
+
+
+@dataclass
+class ChapterJob:
+    """One unit of work: target(*args, result_conn=...) with its estimates"""
+    key: Hashable
+    args: Tuple = ()
+    cost: float = 1.0
+    rss_mb: float = DEFAULT_COST_MODEL.base_rss_mb
+    scan: Optional[PageScan] = None
+
+    @classmethod
+    def from_scan(cls, key: Hashable, scan: PageScan, args: Tuple = (),
+                  model: CostModel = DEFAULT_COST_MODEL) -> "ChapterJob":
+        return cls(key, args, model.cost(scan.pages, scan.table_pages, scan.images),
+                   model.rss_mb(scan.pages, scan.table_pages), scan)
+
+    @classmethod
+    def from_pdf(cls, key: Hashable, pdf_path: Optional[Path], args: Tuple = (),
+                 page_range: Optional[Tuple[int, int]] = None, pages: Optional[int] = None,
+                 model: CostModel = DEFAULT_COST_MODEL) -> "ChapterJob":
+        """Estimate from a pre-scan; without a readable PDF, from the page count alone"""
+        if pdf_path is not None and Path(pdf_path).exists():
+            try:
+                return cls.from_scan(key, prescan_pdf(str(pdf_path), page_range), args, model)
+            except Exception as e:
+                print(f"⚠️  Pre-scan failed for {key}: {e}")
+        if pages is None and page_range:
+            pages = page_range[1] - page_range[0] + 1
+        return cls.from_scan(key, PageScan(pages or 1), args, model)
+
+
+@dataclass
+class JobOutcome:
+    """Result of a finished job: ok is False when the worker sent nothing"""
+    job: ChapterJob
+    result: Any = None
+    ok: bool = False
+    exitcode: Optional[int] = None
+    elapsed: float = 0.0
+    peak_rss_mb: float = 0.0
+
+    @property
+    def key(self) -> Hashable:
+        return self.job.key
+
+
+@dataclass
+class _Running:
+    job: ChapterJob
+    process: multiprocessing.Process
+    conn: Optional[Any]
+    started: float
+    result: Any = None
+    received: bool = False
+    peak_rss_mb: float = 0.0
+
+    @property
+    def reserved_mb(self) -> float:
+        return max(self.job.rss_mb, self.peak_rss_mb)
+
+
+def process_rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process (psutil, else /proc)"""
+    if PSUTIL_AVAILABLE:
+        try:
+            return psutil.Process(pid).memory_info().rss / MB
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def available_memory_mb() -> Optional[float]:
+    """Memory available for new processes (psutil, else /proc/meminfo)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.virtual_memory().available / MB
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class ChapterScheduler:
+    """LPT scheduler with memory admission and a non-blocking result channel"""
+
+    def __init__(self, max_workers: Optional[int] = None, rss_budget_mb: float = 4000.0,
+                 memory_limit_mb: Optional[float] = None, poll_interval: float = 2.0):
+        """
+        Args:
+            max_workers: Concurrent worker processes (default: CPU count)
+            rss_budget_mb: Memory budget per worker slot; the run may use
+                           max_workers * rss_budget_mb in total
+            memory_limit_mb: Hard cap on the total (default: 90% of the
+                             memory available at start)
+            poll_interval: Seconds between RSS samples of the running workers
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.rss_budget_mb = rss_budget_mb
+        if memory_limit_mb is None:
+            available = available_memory_mb()
+            memory_limit_mb = available * 0.9 if available else None
+        total = self.max_workers * rss_budget_mb
+        self.memory_budget_mb = min(total, memory_limit_mb) if memory_limit_mb else total
+        self.poll_interval = poll_interval
+
+    def _fits(self, job: ChapterJob, running: List[_Running]) -> bool:
+        if not running:
+            return True
+        if len(running) >= self.max_workers:
+            return False
+        return sum(entry.reserved_mb for entry in running) + job.rss_mb <= self.memory_budget_mb
+
+    def _start(self, job: ChapterJob, target: Callable) -> _Running:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=target, args=job.args, kwargs={'result_conn': sender})
+        process.start()
+        # Only the worker holds the sending end: its exit closes the pipe
+        sender.close()
+        return _Running(job, process, receiver, time.time())
+
+    @staticmethod
+    def _receive(entry: _Running) -> None:
+        """Read one message (the first one is the result) or close the pipe at EOF"""
+        try:
+            message = entry.conn.recv()
+            if not entry.received:
+                entry.result, entry.received = message, True
+        except (EOFError, OSError):
+            entry.conn.close()
+            entry.conn = None
+
+    def _finish(self, entry: _Running) -> JobOutcome:
+        entry.process.join()
+        # A result sent just before exit may still be buffered in the pipe
+        while entry.conn is not None and not entry.received and entry.conn.poll():
+            self._receive(entry)
+        if entry.conn is not None:
+            entry.conn.close()
+        return JobOutcome(entry.job, entry.result, entry.received, entry.process.exitcode,
+                          time.time() - entry.started, entry.peak_rss_mb)
+
+    def run(self, jobs: Iterable[ChapterJob], target: Callable,
+            on_start: Optional[Callable[[ChapterJob], None]] = None) -> Iterator[JobOutcome]:
+        """
+        Run every job and yield outcomes in completion order
+
+        Pending jobs are ordered by estimated cost (largest first); whenever
+        a slot frees up, the largest pending job that fits the memory budget
+        starts.
+        """
+        pending = sorted(jobs, key=lambda job: job.cost, reverse=True)
+        running: List[_Running] = []
+
+        while pending or running:
+            while pending and len(running) < self.max_workers:
+                job = next((job for job in pending if self._fits(job, running)), None)
+                if job is None:
+                    break
+                pending.remove(job)
+                if on_start:
+                    on_start(job)
+                running.append(self._start(job, target))
+
+            waitables = {entry.process.sentinel: entry for entry in running}
+            waitables.update({entry.conn: entry for entry in running if entry.conn is not None})
+            ready = wait(list(waitables), timeout=self.poll_interval)
+
+            finished = []
+            for handle in ready:
+                entry = waitables[handle]
+                if handle is entry.process.sentinel:
+                    finished.append(entry)
+                elif entry.conn is not None:
+                    self._receive(entry)
+
+            for entry in running:
+                rss = process_rss_mb(entry.process.pid)
+                if rss:
+                    entry.peak_rss_mb = max(entry.peak_rss_mb, rss)
+
+            for entry in finished:
+                running.remove(entry)
+                yield self._finish(entry)
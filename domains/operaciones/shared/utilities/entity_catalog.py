@@ -0,0 +1,352 @@
+"""
+Entity Resolution Catalog
+Canonical IDs for centrales and empresas, an alias table and fuzzy lookup.
+
+The same plant or company is written "Cerro Dominador", "CSP Cerro Dominador"
+or "Central Solar Cerro Dominador" depending on the anexo, and exact normalized matching
+(normalizar_nombre_chile) keeps them apart. The catalog stores one row per
+entity with a canonical ID (cen:central:*, cen:empresa:*) and every alias
+seen for it (data/entity_catalog.db, seeded from the entity gazetteer).
+
+Resolution of a name:
+1. Alias key: accent/case folded, punctuation removed, and generic words of
+   the entity type dropped ("PFV", "solar", "central", "S.A.", "SpA", ...),
+   so "CSP Cerro Dominador" and "Central Solar Cerro Dominador" share the
+   key "cerro dominador". Exact key hit -> score 1.0. Only exact hits
+   assign an ID.
+2. Fuzzy: Dice similarity of character trigrams against every alias key of
+   the same type, through an in-memory trigram -> aliases index (rebuilt
+   from the alias table at load, refreshed incrementally). Typical lookup
+   is well under a millisecond. A hit above min_score is returned as a
+   candidate (candidate_id, method 'fuzzy') but the name stays unresolved:
+   "Nehuenco II" scores above min_score against "Nehuenco" but is another
+   unit.
+3. With create=True every unresolved name (fuzzy candidates included)
+   becomes a new entity whose ID is the slug of its alias key (the same ID
+   provisional_id gives before ingestion). Fuzzy matches are never stored
+   as aliases.
+
+Usage:
+    catalog = get_entity_catalog()
+    catalog.resolve("CSP Cerro Dominador", "central")        # Resolution(entity_id='cen:central:cerro_dominador')
+    catalog.resolve_many(names, "empresa", create=True)     # {name: Resolution}
+    catalog.entity_id(name, "central")                       # canonical or provisional ID
+"""
+
+import re
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from entity_gazetteer import fold, get_gazetteer
+
+# Project root: utilities -> shared -> operaciones -> domains -> root
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
+DEFAULT_CATALOG_PATH = PROJECT_ROOT / "data" / "entity_catalog.db"
+
+# Entity types with canonical IDs (gazetteer types seeded into the catalog)
+CATALOG_TYPES = ("central", "empresa")
+
+# Words that do not identify an entity of the type (folded)
+GENERIC_TOKENS = {
+    "central": {
+        "central", "centrales", "planta", "parque", "complejo", "pfv", "pv", "fv", "pe", "cs", "csp",
+        "solar", "fotovoltaica", "fotovoltaico", "eolica", "eolico", "hidroelectrica", "hidro",
+        "termoelectrica", "termica", "geotermica", "biomasa", "de", "del", "el", "la", "los", "las",
+    },
+    "empresa": {
+        "s", "a", "sa", "spa", "ltda", "limitada", "sociedad", "compania", "cia", "chile",
+        "de", "del", "el", "la", "los", "las", "y",
+    },
+}
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS catalog_entities (
+    entity_id TEXT PRIMARY KEY,
+    entity_type TEXT NOT NULL,
+    canonical_name TEXT NOT NULL,
+    source TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS catalog_aliases (
+    id INTEGER PRIMARY KEY,
+    entity_id TEXT NOT NULL REFERENCES catalog_entities(entity_id) ON DELETE CASCADE,
+    entity_type TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    alias_key TEXT NOT NULL,
+    source TEXT,
+    UNIQUE (entity_type, alias_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_catalog_aliases_entity ON catalog_aliases(entity_id);
+"""
+
+
+def alias_key(name: str, entity_type: str) -> str:
+    """Matching key: folded words without punctuation and without generic words of the type"""
+    tokens = re.sub(r"[^0-9a-zñ]+", " ", fold(name)).split()
+    generic = GENERIC_TOKENS.get(entity_type, set())
+    specific = [token for token in tokens if token not in generic]
+    return " ".join(specific or tokens)
+
+
+def slugify(name: str) -> str:
+    """ID slug, same shape as normalizar_nombre_chile ("Colbún S.A." -> "colbun_sa")"""
+    folded = re.sub(r"[^a-z0-9\s]", "", fold(name).replace("ñ", "n"))
+    return re.sub(r"\s+", "_", folded.strip())
+
+
+def entity_id_for(name: str, entity_type: str) -> str:
+    """ID of a new entity: slug of its alias key ("Central Foo Solar" -> "cen:central:foo")"""
+    return f"cen:{entity_type}:{slugify(alias_key(name, entity_type))}"
+
+
+def trigrams(key: str) -> Counter:
+    padded = f"  {key} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """Outcome of resolving one name (entity_id only for exact and new)"""
+    name: str
+    entity_type: str
+    entity_id: Optional[str]
+    canonical_name: Optional[str]
+    score: float
+    method: str  # exact | fuzzy | new | unresolved
+    candidate_id: Optional[str] = None       # best fuzzy match, not an identity
+    candidate_name: Optional[str] = None
+
+    @property
+    def resolved(self) -> bool:
+        return self.entity_id is not None
+
+
+class EntityCatalog:
+    """Persistent entity catalog with exact and trigram fuzzy alias lookup"""
+
+    def __init__(self, db_path: Optional[Path] = None, min_score: float = 0.6, seed: bool = True):
+        self.db_path = Path(db_path) if db_path else DEFAULT_CATALOG_PATH
+        self.min_score = min_score
+        self._lock = threading.RLock()
+        self._schema_ready = False
+
+        # In-memory lookup structures (mirror of catalog_aliases)
+        self._last_alias_id = 0
+        self._names: Dict[str, str] = {}                         # entity_id -> canonical name
+        self._keys: Dict[Tuple[str, str], str] = {}              # (type, key) -> entity_id
+        self._alias_keys: List[Tuple[str, str, int]] = []        # (entity_id, key, trigram count)
+        self._postings: Dict[Tuple[str, str], List[int]] = {}    # (type, trigram) -> alias positions
+
+        if seed:
+            with self._transaction() as conn:
+                self._seed_from_gazetteer(conn)
+        self.refresh()
+
+    def connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._schema_ready:
+            conn.executescript(CATALOG_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Connection committed on success, rolled back on error, always closed"""
+        conn = self.connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ========== Catalog maintenance ==========
+
+    def _seed_from_gazetteer(self, conn: sqlite3.Connection):
+        """Load gazetteer centrales/empresas and aliases (again when its version changes)"""
+        gazetteer = get_gazetteer()
+        row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'gazetteer_version'").fetchone()
+        if row and row["value"] == str(gazetteer.version):
+            return
+
+        for entity_type in CATALOG_TYPES:
+            for entry in gazetteer.entities.get(entity_type, []):
+                self._insert_entity(conn, entity_type, entry["name"], entry.get("aliases", []), "gazetteer")
+        conn.execute(
+            "INSERT INTO catalog_meta (key, value) VALUES ('gazetteer_version', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (str(gazetteer.version),)
+        )
+
+    def _insert_entity(self, conn: sqlite3.Connection, entity_type: str, canonical_name: str,
+                       aliases: Iterable[str] = (), source: str = "manual") -> str:
+        """Insert an entity (or reuse the one owning its key) and its aliases; return its ID"""
+        key = alias_key(canonical_name, entity_type)
+        owner = conn.execute(
+            "SELECT entity_id FROM catalog_aliases WHERE entity_type = ? AND alias_key = ?",
+            (entity_type, key)
+        ).fetchone()
+        if owner:
+            entity_id = owner["entity_id"]
+        else:
+            entity_id = entity_id_for(canonical_name, entity_type)
+            conn.execute(
+                "INSERT OR IGNORE INTO catalog_entities (entity_id, entity_type, canonical_name, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (entity_id, entity_type, canonical_name, source, datetime.now().isoformat())
+            )
+
+        for alias in [canonical_name, *aliases]:
+            self._insert_alias(conn, entity_id, entity_type, alias, source)
+        return entity_id
+
+    @staticmethod
+    def _insert_alias(conn: sqlite3.Connection, entity_id: str, entity_type: str, alias: str, source: str):
+        conn.execute(
+            "INSERT OR IGNORE INTO catalog_aliases (entity_id, entity_type, alias, alias_key, source) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (entity_id, entity_type, alias, alias_key(alias, entity_type), source)
+        )
+
+    def add_entity(self, entity_type: str, canonical_name: str, aliases: Iterable[str] = (),
+                   source: str = "manual") -> str:
+        """Add an entity with aliases; returns its canonical ID"""
+        with self._transaction() as conn:
+            entity_id = self._insert_entity(conn, entity_type, canonical_name, aliases, source)
+        self.refresh()
+        return entity_id
+
+    def add_alias(self, entity_id: str, alias: str, source: str = "manual"):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT entity_type FROM catalog_entities WHERE entity_id = ?", (entity_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown entity: {entity_id}")
+            self._insert_alias(conn, entity_id, row["entity_type"], alias, source)
+        self.refresh()
+
+    def refresh(self):
+        """Index aliases added since the last refresh (also by other processes)"""
+        with self._lock, self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT a.id, a.entity_id, a.entity_type, a.alias_key, e.canonical_name "
+                "FROM catalog_aliases a JOIN catalog_entities e USING (entity_id) "
+                "WHERE a.id > ? ORDER BY a.id",
+                (self._last_alias_id,)
+            ).fetchall()
+            for row in rows:
+                self._last_alias_id = row["id"]
+                self._names[row["entity_id"]] = row["canonical_name"]
+                if (row["entity_type"], row["alias_key"]) in self._keys:
+                    continue
+                self._keys[(row["entity_type"], row["alias_key"])] = row["entity_id"]
+                grams = trigrams(row["alias_key"])
+                position = len(self._alias_keys)
+                self._alias_keys.append((row["entity_id"], row["alias_key"], sum(grams.values())))
+                for gram in grams:
+                    self._postings.setdefault((row["entity_type"], gram), []).append(position)
+
+    # ========== Resolution ==========
+
+    def _lookup(self, name: str, entity_type: str) -> Resolution:
+        key = alias_key(name, entity_type)
+        entity_id = self._keys.get((entity_type, key))
+        if entity_id:
+            return Resolution(name, entity_type, entity_id, self._names[entity_id], 1.0, "exact")
+
+        grams = trigrams(key)
+        shared = Counter()
+        for gram, count in grams.items():
+            for position in self._postings.get((entity_type, gram), ()):
+                shared[position] += count
+
+        best_score, best_position = 0.0, None
+        total = sum(grams.values())
+        for position, overlap in shared.items():
+            score = 2.0 * overlap / (total + self._alias_keys[position][2])
+            if score > best_score:
+                best_score, best_position = score, position
+
+        if best_position is not None and best_score >= self.min_score:
+            candidate_id = self._alias_keys[best_position][0]
+            return Resolution(name, entity_type, None, None, round(best_score, 3), "fuzzy",
+                              candidate_id, self._names[candidate_id])
+        return Resolution(name, entity_type, None, None, round(best_score, 3), "unresolved")
+
+    def resolve(self, name: str, entity_type: str, create: bool = False) -> Resolution:
+        return self.resolve_many([name], entity_type, create)[name]
+
+    def resolve_many(self, names: Iterable[str], entity_type: str, create: bool = False) -> Dict[str, Resolution]:
+        """
+        Resolve a batch of names of one entity type
+
+        Each distinct name is looked up once. With create=True unresolved
+        names, fuzzy candidates included, become new entities in one
+        transaction; fuzzy matches are never learned as aliases.
+        """
+        self.refresh()
+        results: Dict[str, Resolution] = {}
+        with self._lock:
+            for name in names:
+                if name and name not in results:
+                    results[name] = self._lookup(name, entity_type)
+
+        pending = [r for r in results.values() if not r.resolved]
+        if create and pending:
+            with self._transaction() as conn:
+                for resolution in pending:
+                    entity_id = self._insert_entity(conn, entity_type, resolution.name, source="extraction")
+                    results[resolution.name] = Resolution(resolution.name, entity_type, entity_id,
+                                                          resolution.name, 1.0, "new")
+            self.refresh()
+            for name, resolution in results.items():
+                if resolution.method == "new":
+                    results[name] = Resolution(name, entity_type, resolution.entity_id,
+                                               self._names[resolution.entity_id], 1.0, "new")
+        return results
+
+    def entity_id(self, name: str, entity_type: str) -> str:
+        """Canonical ID, or a provisional one built from the alias key when unresolved"""
+        resolution = self.resolve(name, entity_type)
+        return resolution.entity_id or self.provisional_id(name, entity_type)
+
+    @staticmethod
+    def provisional_id(name: str, entity_type: str) -> str:
+        """ID the name gets if it is later created (entity_id_for)"""
+        return entity_id_for(name, entity_type)
+
+    def canonical_name(self, entity_id: str) -> Optional[str]:
+        return self._names.get(entity_id)
+
+
+_default_catalog: Optional[EntityCatalog] = None
+_default_lock = threading.Lock()
+
+
+def get_entity_catalog(path: Optional[Path] = None) -> EntityCatalog:
+    """Process-wide entity catalog; a path opens a separate one"""
+    global _default_catalog
+    if path is not None:
+        return EntityCatalog(path)
+    with _default_lock:
+        if _default_catalog is None:
+            _default_catalog = EntityCatalog()
+        return _default_catalog
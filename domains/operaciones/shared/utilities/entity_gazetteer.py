@@ -0,0 +1,243 @@
+"""
+Entity Gazetteer for the Chilean Power System (SEN)
+Single-pass extraction of centrales, empresas, substations, regions,
+voltage levels, RUTs and equipment mentions.
+
+Entity extraction used to be one regex pass per entity kind
+(EAFParser.extract_equipment / extract_companies / extract_voltage_levels /
+extract_ruts) plus substring heuristics over json.dumps(data).lower() in
+esquema_universal_chileno. The gazetteer loads the versioned entity lists
+once (data/entity_gazetteer.json), folds every name and alias (case and
+accents: "Colbún" == "COLBUN"), and compiles them into one trie-shaped
+regular expression. The generic equipment / RUT / voltage patterns are
+alternatives of the same expression, so one scan over a text (or over each
+table cell) returns every mention with its offsets.
+
+Matching is leftmost-first, not leftmost-longest across alternatives: at
+each position the longest known name is tried first, and a known name wins
+over a generic pattern starting at the same position. A known name followed
+by a unit numeral ("Central Nehuenco II") is not matched, since the numbered
+unit is a different plant. A count prefix ("2x220 kV") does not hide the
+mention after it.
+
+Folding maps every character to exactly one character, so offsets in the
+folded text are offsets in the original text.
+
+Usage:
+    gazetteer = get_gazetteer()
+    for mention in gazetteer.find("Falla en S/E Alto Jahuel 220kV, Colbún S.A."):
+        print(mention.entity_type, mention.canonical, mention.start, mention.end)
+
+    gazetteer.find_in_rows(table_rows)        # mentions with (row, column)
+"""
+
+import json
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Project root: utilities -> shared -> operaciones -> domains -> root
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
+DEFAULT_GAZETTEER_PATH = PROJECT_ROOT / "data" / "entity_gazetteer.json"
+
+# Roman unit numeral after a known name ("Nehuenco II", "Ventanas IV")
+UNIT_NUMERAL = r"(?!\s+(?:i{1,3}|iv|vi{0,3}|ix)(?![0-9a-z]))"
+
+# Start of a mention: not inside a word, except after a count ("2x220 kv")
+MENTION_START = r"(?:(?<![0-9a-z])|(?<=\dx))"
+
+# Generic patterns, written against folded text (lowercase, no accents).
+# The `value` group is the reported value of the mention.
+PATTERNS = {
+    "subestacion": r"s/e\s+(?P<value>[a-z][a-z ]*[a-z])",
+    "transformador": r"transformador\s+(?:n°\s*)?(?P<value>\w+)",
+    "linea": r"linea\s+(?:de\s+)?(?P<value>(?:\d+x)?\d+\s*kv)",
+    # "interruptor 52K1" or a bare ANSI 52 breaker code ("52K1", "52JT")
+    "interruptor": r"(?:interruptor\s+|(?=52[a-z]))(?P<value>\w+)",
+    "circuito": r"circuito\s+(?:n°?\s*)?(?P<value>\d+)",
+    # "relé 21", "relés SEL", "protección 87L", "protecciones diferenciales"
+    "rele": r"reles?\s+(?P<value>[a-z0-9]+)",
+    "proteccion": r"proteccion(?:es)?\s+(?P<value>[a-z0-9]+)",
+    "nivel_tension": r"(?P<value>\d+(?:[.,]\d+)?)\s*kv",
+    "rut": r"(?P<value>\d{1,2}\.?\d{3}\.?\d{3}-[\dk])",
+}
+
+
+def _build_fold_table() -> Dict[int, str]:
+    """Lowercase and strip accents, one character in -> one character out"""
+    table = {}
+    for code in range(0x41, 0x250):
+        char = chr(code)
+        base = unicodedata.normalize("NFD", char)[0].lower()
+        if len(base) == 1 and base != char:
+            table[code] = base
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def fold(text: str) -> str:
+    """Case- and accent-folded text with the same length as the input"""
+    return text.translate(_FOLD_TABLE)
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """Regex alternation shaped like a trie (shared prefixes matched once, longest first)"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node: Dict) -> str:
+        optional = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if optional else body
+
+    return render(trie)
+
+
+@dataclass(frozen=True)
+class EntityMention:
+    """One entity mention; start/end are offsets into the scanned text"""
+    entity_type: str
+    canonical: str
+    text: str
+    start: int
+    end: int
+    source: str = "gazetteer"          # "gazetteer" (known name) or "pattern"
+    cell: Optional[Tuple[int, str]] = None  # (row index, column) for table scans
+
+
+class EntityGazetteer:
+    """Versioned entity lists compiled into one multi-pattern matcher"""
+
+    def __init__(self, entities: Dict[str, List[Dict]], version: int = 0):
+        self.version = version
+        self.entities = entities
+        # folded surface form -> [(entity type, canonical name)]
+        self.surface_forms: Dict[str, List[Tuple[str, str]]] = {}
+        self.entries: Dict[Tuple[str, str], Dict] = {}
+
+        for entity_type, entries in entities.items():
+            for entry in entries:
+                canonical = entry["name"]
+                self.entries[(entity_type, canonical)] = entry
+                for surface in self._surface_forms(entity_type, entry):
+                    targets = self.surface_forms.setdefault(fold(surface), [])
+                    if (entity_type, canonical) not in targets:
+                        targets.append((entity_type, canonical))
+
+        alternatives = []
+        if self.surface_forms:
+            alternatives.append("(?P<known>" + _trie_regex(self.surface_forms) + ")" + UNIT_NUMERAL)
+        for entity_type, pattern in PATTERNS.items():
+            alternatives.append(f"(?P<p_{entity_type}>" + pattern.replace("?P<value>", f"?P<v_{entity_type}>") + ")")
+        self.regex = re.compile(MENTION_START + "(?:" + "|".join(alternatives) + r")(?![0-9a-z])")
+
+    @staticmethod
+    def _surface_forms(entity_type: str, entry: Dict) -> List[str]:
+        forms = [entry["name"], *entry.get("aliases", [])]
+        if entity_type == "nivel_tension":
+            # "220 kV" also written "220kV" / "220 KV"
+            forms += [form.replace(" ", "") for form in forms]
+        elif entity_type == "subestacion":
+            # Known substations win over the generic "S/E <name>" pattern
+            forms += [f"{prefix} {form}" for form in forms for prefix in ("S/E", "SE", "Subestación")]
+        return forms
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "EntityGazetteer":
+        path = Path(path) if path else DEFAULT_GAZETTEER_PATH
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("entities", {}), version=data.get("version", 0))
+
+    # ========== Matching ==========
+
+    def find(self, text: str, types: Optional[Iterable[str]] = None) -> List[EntityMention]:
+        """All mentions in one pass over text, in text order"""
+        if not text:
+            return []
+        wanted = set(types) if types is not None else None
+        mentions = []
+
+        for match in self.regex.finditer(fold(text)):
+            if match.group("known") is not None:
+                found = [EntityMention(entity_type, canonical, text[match.start():match.end()],
+                                       match.start(), match.end())
+                         for entity_type, canonical in self.surface_forms[match.group("known")]]
+            else:
+                found = self._pattern_mentions(text, match)
+            mentions.extend(mention for mention in found if wanted is None or mention.entity_type in wanted)
+        return mentions
+
+    def _pattern_mentions(self, text: str, match: "re.Match") -> List[EntityMention]:
+        entity_type = match.lastgroup[2:]
+        value_start, value_end = match.span(f"v_{entity_type}")
+        value = text[value_start:value_end].strip()
+        found = [EntityMention(entity_type, self._pattern_canonical(entity_type, value),
+                               text[match.start():match.end()], match.start(), match.end(), source="pattern")]
+        # "línea 220 kV" is also a voltage level mention
+        if entity_type == "linea":
+            voltage = re.search(r"[\d.,]+(?=\s*kv)", value, flags=re.IGNORECASE)
+            voltage_start = value_start + voltage.start()
+            found.append(EntityMention("nivel_tension", self._pattern_canonical("nivel_tension", voltage.group()),
+                                       text[voltage_start:value_end], voltage_start, value_end, source="pattern"))
+        return found
+
+    def find_in_rows(self, rows: Iterable, types: Optional[Iterable[str]] = None) -> List[EntityMention]:
+        """Mentions in table cells (rows as dicts or lists); offsets are within the cell"""
+        mentions = []
+        for row_idx, row in enumerate(rows):
+            cells = row.items() if isinstance(row, dict) else enumerate(row)
+            for column, value in cells:
+                if isinstance(value, str):
+                    for mention in self.find(value, types):
+                        mentions.append(EntityMention(mention.entity_type, mention.canonical, mention.text,
+                                                      mention.start, mention.end, mention.source,
+                                                      cell=(row_idx, column)))
+        return mentions
+
+    def lookup(self, name: str, entity_type: Optional[str] = None) -> Optional[str]:
+        """Canonical name when the whole string is a known name or alias"""
+        for found_type, canonical in self.surface_forms.get(fold(name.strip()), []):
+            if entity_type is None or found_type == entity_type:
+                return canonical
+        return None
+
+    def entry(self, entity_type: str, canonical: str) -> Dict:
+        return self.entries.get((entity_type, canonical), {})
+
+    @staticmethod
+    def _pattern_canonical(entity_type: str, value: str) -> str:
+        if entity_type == "nivel_tension":
+            return value.replace(",", ".") + " kV"
+        if entity_type == "linea":
+            return re.sub(r"\s*kv$", " kV", value, flags=re.IGNORECASE)
+        if entity_type == "rut":
+            return value.upper()
+        return value
+
+
+_default_gazetteer: Optional[EntityGazetteer] = None
+_default_lock = threading.Lock()
+
+
+def get_gazetteer(path: Optional[Path] = None) -> EntityGazetteer:
+    """Process-wide gazetteer (loaded and compiled once); a path loads a separate one"""
+    global _default_gazetteer
+    if path is not None:
+        return EntityGazetteer.load(path)
+    with _default_lock:
+        if _default_gazetteer is None:
+            _default_gazetteer = EntityGazetteer.load()
+        return _default_gazetteer
@@ -0,0 +1,678 @@
+"""
+Event Timeline Store
+Time-indexed events of every report (Cronología, control center and SCADA
+logs, fault sequences) with window queries around the failure time.
+
+Timestamped events used to live as unsorted lists inside per-chapter JSON:
+
+    table_reextract eventos_hora     Hora | Centro de Control | Observación | ...
+    table_reextract scada_alarmas    History Logging Time | Station | Object Text | State Text
+    Capítulo 5 (Cronología)          text lines "15:16:30 Apertura interruptor 52J1 ..."
+    Capitulo01Processor              _extract_temporal_sequence entities
+
+They are normalized here into one row per event (timestamp, report,
+installation, event type, text) in data/event_timeline.db:
+
+    timeline_events     clustered on (ts, report_id, chapter, source, seq): a time
+                        window is one contiguous range scan; a second index
+                        on (report_id, ts) serves per-report windows
+    timeline_failures   failure time per report (metadata_date_extractor:
+                        origin.fecha_falla + origin.hora_falla)
+
+Timestamps are integer milliseconds of the local (Chile) wall-clock time
+since 1970-01-01, so offsets are plain subtractions. Table and Cronología
+rows that only carry a clock time are dated with the failure date; a clock
+that jumps back by more than 12 hours is taken as the next day.
+Installation cells (SCADA Station, eventos_hora Instalación) and the
+installation filter of the queries go through the entity gazetteer, so
+"CARDONES", "S/E Cardones" and "Cardones" are the same installation.
+
+A source is replaced per (report_id, chapter, source) on every append, so
+re-extracting a chapter never duplicates its events.
+
+Usage:
+    timeline = get_event_timeline()
+    timeline.append_layout_document(doc_dict, "EAF-089-2025", "capitulo_05")
+    timeline.around_failures(before=300, after=300)         # ±5 min, every report
+    timeline.window("2025-02-25 15:10", "2025-02-25 15:30", installation="Cardones")
+
+    python event_timeline.py --build                        # from data/layout.db
+    python event_timeline.py --around-failure 300
+"""
+
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from entity_gazetteer import fold, get_gazetteer
+from hourly_series_store import DayLike, parse_day
+
+# Project root: utilities -> shared -> operaciones -> domains -> root
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
+DEFAULT_TIMELINE_PATH = PROJECT_ROOT / "data" / "event_timeline.db"
+
+EPOCH = datetime(1970, 1, 1)
+
+# table_reextract extractors whose rows are timestamped events
+EVENT_TABLE_EXTRACTORS = ("eventos_hora", "scada_alarmas")
+
+# Chapters whose text lines are a chronology
+CRONOLOGIA_CHAPTERS = ("capitulo_05",)
+
+# Gazetteer types that name an installation, most specific first
+INSTALLATION_TYPES = ("subestacion", "central")
+
+CLOCK = r'(?P<hour>\d{1,2}):(?P<minute>\d{2})(?::(?P<second>\d{2})(?:[.,](?P<fraction>\d{1,3}))?)?'
+DATE_ISO = r'(?P<iso>\d{4}-\d{2}-\d{2})'
+DATE_DMY = r'(?P<dmy>\d{1,2}[-/]\d{1,2}[-/]\d{4})'
+
+TIMESTAMP_PATTERN = re.compile(rf'(?:(?:{DATE_ISO}|{DATE_DMY})[ T]+)?{CLOCK}')
+# "15:16:30 Apertura ...", "15:16 hrs. - Se produce ..."
+CRONOLOGIA_LINE = re.compile(
+    rf'^\s*(?:(?:{DATE_ISO}|{DATE_DMY})\s+)?{CLOCK}\s*(?:h(?:rs?)?\.?|horas)?\s*[-–:]?\s*(?P<text>\S.*)$',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Event type by keyword of the folded event text (first match wins)
+EVENT_KEYWORDS = (
+    ('falla', ('falla', 'cortocircuito', 'trip', 'disparo', 'fault')),
+    ('apertura', ('apertura', 'abre', 'abierto', 'open', 'desenergiza')),
+    ('cierre', ('cierre', 'cierra', 'cerrado', 'close', 'energiza')),
+    ('desconexion', ('desconexion', 'desconecta', 'perdida')),
+    ('normalizacion', ('normaliza', 'recupera', 'reposicion', 'repone', 'sincroniza')),
+    ('alarma', ('alarma', 'alarm', 'actuacion', 'opera')),
+)
+
+# _extract_temporal_sequence timings that are offsets, and their unit in seconds
+RELATIVE_TIMINGS = {
+    'automatic_reconnection': 1,
+    'power_oscillations': 1,
+    'north_island_collapse': 60,
+    'south_island_collapse': 1,
+}
+
+EVENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS timeline_events (
+    ts INTEGER NOT NULL,
+    report_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    chapter TEXT NOT NULL DEFAULT '',
+    installation TEXT,
+    event_type TEXT,
+    text TEXT,
+    precision TEXT NOT NULL DEFAULT 's',
+    PRIMARY KEY (ts, report_id, chapter, source, seq)
+) WITHOUT ROWID
+"""
+
+SCHEMA = EVENTS_TABLE + """;
+
+CREATE TABLE IF NOT EXISTS timeline_failures (
+    report_id TEXT PRIMARY KEY,
+    ts INTEGER,
+    fecha_falla TEXT,
+    hora_falla TEXT,
+    source TEXT,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_timeline_events_report ON timeline_events (report_id, ts);
+CREATE INDEX IF NOT EXISTS idx_timeline_events_source ON timeline_events (report_id, chapter, source);
+CREATE INDEX IF NOT EXISTS idx_timeline_failures_ts ON timeline_failures (ts);
+"""
+
+TimeLike = Union[datetime, date, str, int]
+
+
+def to_ms(moment: datetime) -> int:
+    return (moment - EPOCH) // timedelta(milliseconds=1)
+
+
+def from_ms(ts: int) -> datetime:
+    return EPOCH + timedelta(milliseconds=ts)
+
+
+def _match_ms(match: "re.Match", day: Optional[date]) -> Tuple[Optional[int], str]:
+    """(ms timestamp, precision) of a TIMESTAMP_PATTERN / CRONOLOGIA_LINE match"""
+    if match.group('iso'):
+        day = date.fromisoformat(match.group('iso'))
+    elif match.group('dmy'):
+        d, m, y = re.split(r'[-/]', match.group('dmy'))
+        day = date(int(y), int(m), int(d))
+    hour, minute = int(match.group('hour')), int(match.group('minute'))
+    if day is None or hour > 23 or minute > 59:
+        return None, ''
+    moment = datetime(day.year, day.month, day.day, hour, minute)
+    precision = 'min'
+    if match.group('second'):
+        moment += timedelta(seconds=int(match.group('second')))
+        precision = 's'
+        if match.group('fraction'):
+            moment += timedelta(milliseconds=int(match.group('fraction').ljust(3, '0')))
+            precision = 'ms'
+    return to_ms(moment), precision
+
+
+def parse_timestamp(value: str, day: Optional[DayLike] = None) -> Tuple[Optional[int], str]:
+    """
+    (ms timestamp, precision) of "2025-02-25 15:16:30.120", "25-02-2025 15:16",
+    or a bare clock "15:16:30" on day; (None, '') when there is no usable time
+    """
+    match = TIMESTAMP_PATTERN.search(value or '')
+    if not match:
+        return None, ''
+    return _match_ms(match, parse_day(day) if day else None)
+
+
+def parse_moment(value: TimeLike) -> int:
+    """ms timestamp of a datetime, a date (midnight), an ISO string or ms"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        return to_ms(value)
+    if isinstance(value, date):
+        return to_ms(datetime(value.year, value.month, value.day))
+    return to_ms(datetime.fromisoformat(value.strip()))
+
+
+def failure_ms(fecha_falla: Optional[str], hora_falla: Optional[str]) -> Optional[int]:
+    """Failure time from metadata_date_extractor ("25 de febrero de 2025", "15:16:30")"""
+    if not fecha_falla or not hora_falla:
+        return None
+    try:
+        ts, _ = parse_timestamp(hora_falla, fecha_falla)
+    except ValueError:
+        return None
+    return ts
+
+
+def classify_event(text: str, default: str = 'registro') -> str:
+    folded = fold(text or '')
+    for event_type, keywords in EVENT_KEYWORDS:
+        if any(keyword in folded for keyword in keywords):
+            return event_type
+    return default
+
+
+def find_installation(text: str) -> Optional[str]:
+    """Canonical substation / plant named in text (entity gazetteer)"""
+    mentions = get_gazetteer().find(text or '', INSTALLATION_TYPES)
+    for entity_type in INSTALLATION_TYPES:
+        for mention in mentions:
+            if mention.entity_type == entity_type:
+                return mention.canonical
+    return None
+
+
+def canonical_installation(name: Optional[str]) -> Optional[str]:
+    """Gazetteer name of an installation cell ("CARDONES" -> "Cardones"), else the cell as is"""
+    if not name or not name.strip():
+        return None
+    return find_installation(name) or ' '.join(name.split())
+
+
+def _roll_days(events: List[Dict]) -> None:
+    """Clock-only events in document order: a jump back of >12 h is the next day"""
+    shift = 0
+    previous = None
+    for event in events:
+        if not event.get('clock_only'):
+            previous = None
+            continue
+        ts = event['ts'] + shift
+        if previous is not None and previous - ts > 12 * 3600 * 1000:
+            shift += 24 * 3600 * 1000
+            ts += 24 * 3600 * 1000
+        event['ts'] = previous = ts
+
+
+def _column(headers: Sequence[str], *names: str) -> Optional[int]:
+    folded = [fold(header or '') for header in headers]
+    for name in names:
+        if name in folded:
+            return folded.index(name)
+    return None
+
+
+def _event_day(day: Optional[DayLike]) -> Optional[date]:
+    try:
+        return parse_day(day) if day else None
+    except ValueError:
+        return None
+
+
+def _timed_event(match: Optional["re.Match"], day: Optional[date], text: str,
+                 installation: Optional[str] = None, default_type: str = 'registro') -> Optional[Dict]:
+    """Event dict of a timestamp match; clock_only marks rows dated with day"""
+    if not match:
+        return None
+    ts, precision = _match_ms(match, day)
+    if ts is None:
+        return None
+    return {
+        'ts': ts, 'precision': precision,
+        'installation': canonical_installation(installation) or find_installation(text),
+        'event_type': classify_event(text, default_type), 'text': text,
+        'clock_only': not (match.group('iso') or match.group('dmy')),
+    }
+
+
+def events_from_table(data: Dict, day: Optional[DayLike]) -> List[Dict]:
+    """Events of an eventos_hora / scada_alarmas table_reextract result"""
+    extractor = data.get('extractor')
+    headers = data.get('headers') or []
+    day = _event_day(day)
+    events = []
+
+    if extractor == 'scada_alarmas':
+        # History Logging Time | Station | Object Text | State Text
+        for row in data.get('rows') or []:
+            row = list(row) + [''] * (4 - len(row))
+            text = ' '.join(part for part in (row[2], row[3]) if part)
+            events.append(_timed_event(TIMESTAMP_PATTERN.search(row[0]), day, text, row[1], 'alarma'))
+    elif extractor == 'eventos_hora':
+        # Hora | Centro de Control | Observación | Empresa | Instalación | Detalle
+        installation_col = _column(headers, 'instalacion')
+        text_cols = [idx for idx, header in enumerate(headers)
+                     if fold(header or '') in ('observacion', 'detalle')]
+        for row in data.get('rows') or []:
+            if not row:
+                continue
+            text = ' '.join(row[idx] for idx in text_cols if idx < len(row) and row[idx])
+            installation = row[installation_col] if installation_col is not None and installation_col < len(row) else None
+            events.append(_timed_event(TIMESTAMP_PATTERN.search(row[0]), day, text, installation))
+
+    events = [event for event in events if event]
+    _roll_days(events)
+    return events
+
+
+def events_from_lines(texts: Iterable[str], day: Optional[DayLike]) -> List[Dict]:
+    """Events of Cronología text items that start with a clock time"""
+    day = _event_day(day)
+    events = []
+    for text in texts:
+        match = CRONOLOGIA_LINE.match(text or '')
+        event = _timed_event(match, day, ' '.join(match.group('text').split())) if match else None
+        if event:
+            events.append(event)
+    _roll_days(events)
+    return events
+
+
+class EventTimeline:
+    """SQLite timeline of report events, clustered on the timestamp"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_TIMELINE_PATH
+        self._schema_ready = False
+
+    def connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._schema_ready:
+            self._upgrade_primary_key(conn)
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _upgrade_primary_key(conn: sqlite3.Connection) -> None:
+        """Rebuild timelines created before chapter was part of the primary key"""
+        pk = {row['name'] for row in conn.execute("PRAGMA table_info(timeline_events)") if row['pk']}
+        if not pk or 'chapter' in pk:
+            return
+        # One explicit transaction: sqlite3 would autocommit each DDL statement
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DROP INDEX IF EXISTS idx_timeline_events_report")
+            conn.execute("DROP INDEX IF EXISTS idx_timeline_events_source")
+            conn.execute("ALTER TABLE timeline_events RENAME TO timeline_events_old")
+            conn.execute(EVENTS_TABLE)
+            conn.execute("""
+                INSERT INTO timeline_events
+                SELECT ts, report_id, source, seq, chapter, installation, event_type, text, precision
+                FROM timeline_events_old
+            """)
+            conn.execute("DROP TABLE timeline_events_old")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    # ========== Writing ==========
+
+    @staticmethod
+    def _replace_source(conn: sqlite3.Connection, report_id: str, chapter: str, source: str,
+                        events: List[Dict]) -> int:
+        conn.execute("DELETE FROM timeline_events WHERE report_id = ? AND chapter = ? AND source = ?",
+                     (report_id, chapter, source))
+        conn.executemany("""
+            INSERT INTO timeline_events
+                (ts, report_id, source, seq, chapter, installation, event_type, text, precision)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, sorted(
+            (event['ts'], report_id, source, seq, chapter, event.get('installation') or None,
+             event.get('event_type'), event.get('text'), event.get('precision') or 's')
+            for seq, event in enumerate(events)
+        ))
+        return len(events)
+
+    @staticmethod
+    def _set_failure(conn: sqlite3.Connection, report_id: str, fecha_falla: Optional[str],
+                     hora_falla: Optional[str], source: str) -> Optional[int]:
+        """Upsert the failure time; a known time is never replaced by an unknown one"""
+        if not fecha_falla:
+            return None
+        ts = failure_ms(fecha_falla, hora_falla)
+        conn.execute("""
+            INSERT INTO timeline_failures (report_id, ts, fecha_falla, hora_falla, source, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (report_id) DO UPDATE SET
+                ts = excluded.ts, fecha_falla = excluded.fecha_falla, hora_falla = excluded.hora_falla,
+                source = excluded.source, updated_at = excluded.updated_at
+            WHERE excluded.ts IS NOT NULL OR timeline_failures.ts IS NULL
+        """, (report_id, ts, fecha_falla, hora_falla, source, datetime.now().isoformat()))
+        return ts
+
+    def set_failure(self, report_id: str, fecha_falla: Optional[str], hora_falla: Optional[str],
+                    source: str = 'metadata_date_extractor') -> Optional[int]:
+        conn = self.connect()
+        try:
+            with conn:
+                return self._set_failure(conn, report_id, fecha_falla, hora_falla, source)
+        finally:
+            conn.close()
+
+    def append_events(self, report_id: str, chapter: str, source: str, events: List[Dict]) -> int:
+        """Replace the events of one (report, chapter, source); events carry ts (ms) and text"""
+        conn = self.connect()
+        try:
+            with conn:
+                return self._replace_source(conn, report_id, chapter, source, events)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _document_events(document: Dict, chapter: str, day: Optional[str]) -> Dict[str, List[Dict]]:
+        by_source: Dict[str, List[Dict]] = {}
+        for table in document.get('tables') or []:
+            data = table.get('data')
+            if isinstance(data, dict) and data.get('extractor') in EVENT_TABLE_EXTRACTORS:
+                by_source.setdefault(data['extractor'], []).extend(events_from_table(data, day))
+        if chapter in CRONOLOGIA_CHAPTERS:
+            by_source['cronologia'] = events_from_lines(
+                (item.get('text') for item in document.get('texts') or []
+                 if item.get('label') not in ('page_header', 'page_footer')), day
+            )
+        return by_source
+
+    def append_layout_document(self, document: Dict, report_id: str, chapter: str) -> Dict[str, int]:
+        """
+        Failure time and events of one layout export (layout_WITH_PATCH.json)
+
+        Clock-only rows are dated with origin.fecha_falla.
+        """
+        origin = document.get('origin') or {}
+        fecha_falla = origin.get('fecha_falla')
+        by_source = self._document_events(document, chapter, fecha_falla)
+        conn = self.connect()
+        try:
+            with conn:
+                self._set_failure(conn, report_id, fecha_falla, origin.get('hora_falla'),
+                                  'metadata_date_extractor')
+                return {source: self._replace_source(conn, report_id, chapter, source, events)
+                        for source, events in by_source.items()}
+        finally:
+            conn.close()
+
+    def append_temporal_sequence(self, report_id: str, entities: Iterable[Dict],
+                                 fault_day: DayLike, fault_time: Optional[str] = None,
+                                 chapter: str = 'capitulo_01') -> int:
+        """
+        Capitulo01Processor._extract_temporal_sequence entities
+
+        fault_initiation carries the clock time; the other timings are
+        offsets (seconds, or minutes for the island collapse), placed after
+        the fault initiation (or fault_time when given).
+        """
+        entities = [entity for entity in entities if entity.get('type') == 'temporal_event']
+        anchor = None
+        if fault_time:
+            anchor, _ = parse_timestamp(fault_time, fault_day)
+        for entity in entities:
+            if entity.get('event_type') == 'fault_initiation' and anchor is None:
+                anchor, _ = parse_timestamp(entity.get('timing'), fault_day)
+        if anchor is None:
+            return 0
+
+        events = []
+        for entity in entities:
+            event_type, timing = entity.get('event_type'), str(entity.get('timing') or '')
+            if event_type == 'fault_initiation':
+                ts, precision = parse_timestamp(timing, fault_day)
+            elif event_type in RELATIVE_TIMINGS:
+                try:
+                    ts = anchor + int(float(timing) * RELATIVE_TIMINGS[event_type] * 1000)
+                except ValueError:
+                    continue
+                precision = 'relative'
+            else:
+                continue
+            if ts is not None:
+                events.append({'ts': ts, 'precision': precision, 'event_type': event_type,
+                               'text': event_type.replace('_', ' ')})
+
+        conn = self.connect()
+        try:
+            with conn:
+                if fault_time:
+                    self._set_failure(conn, report_id, str(parse_day(fault_day)), fault_time,
+                                      'capitulo_01_processor')
+                return self._replace_source(conn, report_id, chapter, 'temporal_sequence', events)
+        finally:
+            conn.close()
+
+    def build_from_layout(self, layout_db=None) -> Dict[str, int]:
+        """Failure times and events of every chapter ingested in the layout database"""
+        from layout_database import LayoutDatabase
+
+        layout_db = layout_db or LayoutDatabase()
+        source = layout_db.connect()
+        counts: Dict[str, int] = {}
+        conn = self.connect()
+        try:
+            chapters = source.execute(
+                "SELECT id, report_id, chapter, fecha_falla, hora_falla FROM layout_chapters ORDER BY id"
+            ).fetchall()
+            with conn:
+                for chapter in chapters:
+                    self._set_failure(conn, chapter['report_id'], chapter['fecha_falla'],
+                                      chapter['hora_falla'], 'metadata_date_extractor')
+                    document = {'tables': list(self._layout_tables(source, chapter['id']))}
+                    if chapter['chapter'] in CRONOLOGIA_CHAPTERS:
+                        document['texts'] = [dict(row) for row in source.execute(
+                            "SELECT label, text FROM layout_items WHERE chapter_pk = ? AND collection = 'texts' "
+                            "ORDER BY seq", (chapter['id'],)
+                        )]
+                    by_source = self._document_events(document, chapter['chapter'], chapter['fecha_falla'])
+                    for name, events in by_source.items():
+                        counts[name] = counts.get(name, 0) + self._replace_source(
+                            conn, chapter['report_id'], chapter['chapter'], name, events
+                        )
+        finally:
+            conn.close()
+            source.close()
+        return counts
+
+    @staticmethod
+    def _layout_tables(conn: sqlite3.Connection, chapter_pk: int):
+        """table_reextract grids of the event extractors, as {'extractor', 'headers', 'rows'}"""
+        tables = conn.execute("""
+            SELECT t.item_id, t.extractor FROM layout_tables t JOIN layout_items i ON i.id = t.item_id
+            WHERE i.chapter_pk = ? AND t.extractor IN ({})
+        """.format(','.join('?' * len(EVENT_TABLE_EXTRACTORS))), (chapter_pk, *EVENT_TABLE_EXTRACTORS))
+        for table in tables.fetchall():
+            grid: Dict[int, List[str]] = {}
+            for cell in conn.execute("SELECT row_idx, col_idx, text FROM layout_table_cells "
+                                     "WHERE item_id = ? ORDER BY row_idx, col_idx", (table['item_id'],)):
+                grid.setdefault(cell['row_idx'], []).append(cell['text'] or '')
+            yield {'data': {'extractor': table['extractor'], 'headers': grid.pop(0, []),
+                            'rows': [grid[idx] for idx in sorted(grid)]}}
+
+    # ========== Queries ==========
+
+    @staticmethod
+    def _filters(report_id: Optional[str], sources: Optional[Sequence[str]],
+                 installation: Optional[str], event_types: Optional[Sequence[str]]) -> Tuple[str, List]:
+        clauses, params = [], []
+        if report_id:
+            clauses.append("e.report_id = ?")
+            params.append(report_id)
+        if sources:
+            clauses.append(f"e.source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if event_types:
+            clauses.append(f"e.event_type IN ({','.join('?' * len(event_types))})")
+            params.extend(event_types)
+        if installation:
+            clauses.append("e.installation LIKE ?")
+            params.append(f"%{canonical_installation(installation)}%")
+        return ''.join(f" AND {clause}" for clause in clauses), params
+
+    @staticmethod
+    def _event(row: sqlite3.Row) -> Dict:
+        event = dict(row)
+        event['time'] = from_ms(event['ts']).isoformat(timespec='milliseconds')
+        if event.get('failure_ts') is not None:
+            event['failure_time'] = from_ms(event['failure_ts']).isoformat(timespec='seconds')
+            event['offset_s'] = (event['ts'] - event['failure_ts']) / 1000
+        return event
+
+    def window(self, start: TimeLike, end: TimeLike, report_id: Optional[str] = None,
+               sources: Optional[Sequence[str]] = None, installation: Optional[str] = None,
+               event_types: Optional[Sequence[str]] = None, limit: int = 10000) -> List[Dict]:
+        """Events with start <= time <= end, in time order (one range scan of the clustered key)"""
+        where, params = self._filters(report_id, sources, installation, event_types)
+        conn = self.connect()
+        try:
+            rows = conn.execute(f"""
+                SELECT e.* FROM timeline_events e
+                WHERE e.ts BETWEEN ? AND ?{where}
+                ORDER BY e.ts, e.report_id, e.source, e.seq LIMIT ?
+            """, (parse_moment(start), parse_moment(end), *params, limit)).fetchall()
+        finally:
+            conn.close()
+        return [self._event(row) for row in rows]
+
+    def around(self, moment: TimeLike, before: float = 300, after: float = 300, **filters) -> List[Dict]:
+        """Events within [moment - before s, moment + after s] across all reports"""
+        center = parse_moment(moment)
+        return self.window(center - int(before * 1000), center + int(after * 1000), **filters)
+
+    def around_failures(self, before: float = 300, after: float = 300, same_report: bool = True,
+                        report_id: Optional[str] = None, sources: Optional[Sequence[str]] = None,
+                        installation: Optional[str] = None,
+                        event_types: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Events within [failure - before s, failure + after s] of each report's failure time
+
+        Args:
+            same_report: Only the report's own events (default); False also
+                         returns other reports' events in the window
+            report_id: Restrict to the failure of one report
+
+        Each event carries failure_report, failure_time and offset_s.
+        """
+        where, params = self._filters(None, sources, installation, event_types)
+        failure_filter = "AND f.report_id = ?" if report_id else ""
+        join_report = "AND e.report_id = f.report_id" if same_report else ""
+        conn = self.connect()
+        try:
+            # CROSS JOIN keeps the failures as the outer loop: one index range seek per report
+            rows = conn.execute(f"""
+                SELECT f.report_id AS failure_report, f.ts AS failure_ts, e.*
+                FROM timeline_failures f
+                CROSS JOIN timeline_events e ON e.ts BETWEEN f.ts - ? AND f.ts + ? {join_report}
+                WHERE f.ts IS NOT NULL {failure_filter}{where}
+                ORDER BY f.ts, f.report_id, e.ts, e.report_id, e.source, e.seq
+            """, (int(before * 1000), int(after * 1000), *([report_id] if report_id else []), *params)).fetchall()
+        finally:
+            conn.close()
+        return [self._event(row) for row in rows]
+
+    def failures(self) -> List[Dict]:
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT * FROM timeline_failures ORDER BY ts IS NULL, ts, report_id").fetchall()
+        finally:
+            conn.close()
+        return [dict(row, failure_time=from_ms(row['ts']).isoformat() if row['ts'] is not None else None)
+                for row in rows]
+
+    def summary(self) -> Dict:
+        conn = self.connect()
+        try:
+            by_source = {row['source']: row['n'] for row in conn.execute(
+                "SELECT source, COUNT(*) AS n FROM timeline_events GROUP BY source")}
+            span = conn.execute("SELECT MIN(ts) AS first, MAX(ts) AS last FROM timeline_events").fetchone()
+            reports = conn.execute("SELECT COUNT(*) FROM timeline_failures WHERE ts IS NOT NULL").fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            'events': sum(by_source.values()),
+            'by_source': by_source,
+            'first': from_ms(span['first']).isoformat() if span['first'] is not None else None,
+            'last': from_ms(span['last']).isoformat() if span['last'] is not None else None,
+            'reports_with_failure_time': reports,
+        }
+
+
+_default_timeline: Optional[EventTimeline] = None
+_default_lock = threading.Lock()
+
+
+def get_event_timeline(path: Optional[Path] = None) -> EventTimeline:
+    """Process-wide timeline (data/event_timeline.db); a path opens a separate one"""
+    global _default_timeline
+    if path is not None:
+        return EventTimeline(path)
+    with _default_lock:
+        if _default_timeline is None:
+            _default_timeline = EventTimeline()
+        return _default_timeline
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Time-indexed event timeline of EAF reports")
+    parser.add_argument("--db", default=None, help=f"Timeline database (default: {DEFAULT_TIMELINE_PATH})")
+    parser.add_argument("--build", action="store_true", help="Load failure times and events from data/layout.db")
+    parser.add_argument("--around-failure", type=float, default=None, metavar="SECONDS",
+                        help="Events within ±SECONDS of each report's failure time")
+    parser.add_argument("--report", default=None, help="Restrict queries to one report")
+    args = parser.parse_args()
+
+    timeline = get_event_timeline(Path(args.db) if args.db else None)
+
+    if args.build:
+        print(f"✅ Events loaded: {timeline.build_from_layout()}")
+    if args.around_failure is not None:
+        for event in timeline.around_failures(args.around_failure, args.around_failure, report_id=args.report):
+            print(f"{event['failure_report']}  {event['offset_s']:+9.1f}s  {event['time']}  "
+                  f"{event['event_type'] or '':<14} {event['installation'] or '':<20} {event['text']}")
+    if not args.build and args.around_failure is None:
+        print(json.dumps(timeline.summary(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+"""
+Hourly Series Store
+Columnar store of 24-hour series (generation, costs, system metrics),
+partitioned by day, for vectorized queries across months.
+
+The anexo processors and table_reextract emit hourly data as nested JSON
+lists of strings ("2 569", "4,9", {"hour": 3, "value": "7654"}), so every
+analysis had to find and reparse the JSON files. Producers now append here:
+
+    anexo_01 processor          metricas_sistema     (generación total, costo marginal, ...)
+    anexo_02 processor          generacion_real      (per plant, MWh/h)
+                                resumen_sistema      (TOTAL SEN, demanda, pérdidas, ...)
+    table_reextract tables      programacion_diaria  (Concepto | 1-24 | Total)
+    (EXTRACT_ANY_CHAPTER --ingest) costos_horarios
+
+Layout (data/timeseries/):
+
+    dictionary.json     series dictionary: row i = {"dataset", "name", "unit"}
+    days/YYYY-MM-DD.npy float64 array (series x 24 hours), NaN = no value
+
+Readers memory-map the day files (np.load(mmap_mode='r')) and only touch the
+rows they ask for; a day written before a series existed simply has fewer
+rows. Writers hold a file lock, grow the day array and replace it
+atomically, so readers never see a partial file.
+
+Usage:
+    store = get_series_store()
+    store.append_series(date(2025, 2, 25), "generacion_real", "PFV-ELBOCO", values, unit="MWh")
+
+    cube = store.cube("2025-01-01", "2025-03-31", dataset="generacion_real")
+    cube.values.shape                           # (days, plants, 24)
+    totals = store.daily_totals("2025-01-01", "2025-03-31", dataset="generacion_real")
+    dev = store.deviation("2025-02-01", "2025-02-28")   # programacion_diaria vs generacion_real
+
+    python hourly_series_store.py --import-layout data/outputs
+    python hourly_series_store.py --summary
+"""
+
+import fcntl
+import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from entity_gazetteer import fold
+
+# Project root: utilities -> shared -> operaciones -> domains -> root
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
+DEFAULT_STORE_DIR = PROJECT_ROOT / "data" / "timeseries"
+
+HOURS = 24
+STORE_VERSION = 1
+
+# table_reextract extractors whose rows are Concepto | 1-24 | Total
+HOURLY_TABLE_EXTRACTORS = ("programacion_diaria", "costos_horarios")
+
+SPANISH_MONTHS = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6, 'julio': 7,
+    'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
+}
+
+DayLike = Union[date, datetime, str]
+
+
+def parse_day(value: DayLike) -> date:
+    """date from a date, 'YYYY-MM-DD', 'DD-MM-YYYY' or '25 de febrero de 2025'"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    match = re.search(r'(\d{1,2})\s+de\s+([A-Za-zÁÉÍÓÚáéíóú]+)\s+(?:de|del)\s+(\d{4})', text)
+    if match and fold(match.group(2)) in SPANISH_MONTHS:
+        return date(int(match.group(3)), SPANISH_MONTHS[fold(match.group(2))], int(match.group(1)))
+    raise ValueError(f"Unrecognized date: {value!r}")
+
+
+def parse_number(value) -> float:
+    """
+    Float from a table cell; NaN when empty or not a number
+
+    "2 569" -> 2569, "4,9" -> 4.9, "1.234,5" -> 1234.5 ('.' as thousands only
+    when a ',' decimal is present, as in the anexo processors)
+    """
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace(" ", "").replace("\xa0", "")
+    if "," in text and "." in text:
+        text = text.replace(".", "").replace(",", ".")
+    elif "," in text:
+        text = text.replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def hourly_vector(values: Iterable) -> np.ndarray:
+    """24 floats from a list of values or of {"hour", "value"} dicts (NaN where missing)"""
+    vector = np.full(HOURS, np.nan)
+    for position, value in enumerate(values):
+        if isinstance(value, dict):
+            hour = value.get('hour', position + 1)
+            value = value.get('value')
+        else:
+            hour = position + 1
+        if isinstance(hour, int) and 1 <= hour <= HOURS:
+            vector[hour - 1] = parse_number(value)
+    return vector
+
+
+def series_key(name: str) -> str:
+    """Name as matched across datasets: folded, alphanumerics only"""
+    return re.sub(r'[^0-9a-z]+', ' ', fold(name)).strip()
+
+
+@dataclass
+class SeriesSlice:
+    """Query result: values indexed by (day, series[, hour])"""
+    days: List[date]
+    series: List[Dict]
+    values: np.ndarray
+
+    @property
+    def names(self) -> List[str]:
+        return [entry['name'] for entry in self.series]
+
+
+class HourlySeriesStore:
+    """Day-partitioned hourly series with a shared series dictionary"""
+
+    def __init__(self, store_dir: Optional[Path] = None):
+        self.store_dir = Path(store_dir) if store_dir else DEFAULT_STORE_DIR
+        self.days_dir = self.store_dir / "days"
+        self.dictionary_path = self.store_dir / "dictionary.json"
+        self._series: List[Dict] = []
+        self._ids: Dict[Tuple[str, str], int] = {}     # (dataset, series_key(name)) -> row id
+        self._dictionary_signature: Optional[Tuple[int, int]] = None
+        self._maps: Dict[date, Tuple[Tuple[int, int], np.ndarray]] = {}
+
+    # ========== Dictionary ==========
+
+    def _load_dictionary(self) -> None:
+        """(Re)read the dictionary when another process has changed it"""
+        try:
+            stat = self.dictionary_path.stat()
+        except FileNotFoundError:
+            return
+        # Every save replaces the file, so the inode changes even within one mtime tick
+        signature = (stat.st_ino, stat.st_mtime_ns)
+        if signature == self._dictionary_signature:
+            return
+        with open(self.dictionary_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._series = data.get('series', [])
+        self._ids = {}
+        for idx, entry in enumerate(self._series):
+            self._ids.setdefault((entry['dataset'], series_key(entry['name'])), idx)
+        self._dictionary_signature = signature
+
+    def _save_dictionary(self) -> None:
+        _write_atomic(self.dictionary_path, json.dumps(
+            {'version': STORE_VERSION, 'series': self._series}, ensure_ascii=False, indent=1
+        ).encode('utf-8'))
+        stat = self.dictionary_path.stat()
+        self._dictionary_signature = (stat.st_ino, stat.st_mtime_ns)
+
+    def series(self, dataset: Optional[str] = None) -> List[Dict]:
+        """Dictionary entries (with their row id), optionally of one dataset"""
+        self._load_dictionary()
+        return [dict(entry, id=idx) for idx, entry in enumerate(self._series)
+                if dataset is None or entry['dataset'] == dataset]
+
+    def datasets(self) -> Dict[str, int]:
+        self._load_dictionary()
+        counts: Dict[str, int] = {}
+        for entry in self._series:
+            counts[entry['dataset']] = counts.get(entry['dataset'], 0) + 1
+        return counts
+
+    def _select(self, dataset: Optional[str], names: Optional[Sequence[str]]) -> List[int]:
+        """Row ids of a dataset, restricted to names (folded match) in the given order"""
+        self._load_dictionary()
+        candidates = [idx for idx, entry in enumerate(self._series)
+                      if dataset is None or entry['dataset'] == dataset]
+        if names is None:
+            return candidates
+        by_key: Dict[str, int] = {}
+        for idx in candidates:
+            by_key.setdefault(series_key(self._series[idx]['name']), idx)
+        return [by_key[series_key(name)] for name in names if series_key(name) in by_key]
+
+    # ========== Writing ==========
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        self.days_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.store_dir / ".lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append_day(self, day: DayLike, records: Iterable[Tuple[str, str, Iterable, Optional[str]]]) -> int:
+        """
+        Write series of one day: (dataset, name, 24 values, unit) records
+
+        Values may be numbers, strings in the documents' formats or
+        {"hour", "value"} dicts. Names are matched by series_key, so "PFV
+        ElBoco" and "pfv-elboco" share one row (named as first written). An
+        existing (day, series) is overwritten, so re-processing a page is
+        idempotent.
+
+        Returns:
+            Number of series written
+        """
+        day = parse_day(day)
+        rows = []
+        for dataset, name, values, unit in records:
+            name = " ".join(str(name).split())
+            vector = hourly_vector(values)
+            if name and not np.isnan(vector).all():
+                rows.append((dataset, name, vector, unit))
+        if not rows:
+            return 0
+
+        with self._write_lock():
+            self._load_dictionary()
+            ids, added = [], False
+            for dataset, name, _, unit in rows:
+                key = (dataset, series_key(name))
+                idx = self._ids.get(key)
+                if idx is None:
+                    idx = len(self._series)
+                    self._series.append({'dataset': dataset, 'name': name, 'unit': unit})
+                    self._ids[key] = idx
+                    added = True
+                ids.append(idx)
+            if added:
+                self._save_dictionary()
+
+            path = self._day_path(day)
+            array = np.full((len(self._series), HOURS), np.nan)
+            if path.exists():
+                existing = np.load(path)
+                array[:existing.shape[0]] = existing
+            for idx, (_, _, vector, _) in zip(ids, rows):
+                array[idx] = vector
+            _save_npy_atomic(path, array)
+        return len(rows)
+
+    def append_series(self, day: DayLike, dataset: str, name: str, values: Iterable,
+                      unit: Optional[str] = None) -> int:
+        return self.append_day(day, [(dataset, name, values, unit)])
+
+    def append_anexo_01(self, result: Dict) -> int:
+        """System metrics of an anexo_01 page extraction (date from upper_table.date_info)"""
+        upper = result.get('upper_table') or {}
+        date_info = upper.get('date_info') or {}
+        if not date_info.get('day'):
+            return 0
+        day = parse_day(f"{date_info['day']} de {date_info['month']} de {date_info['year']}")
+        return self.append_day(day, [
+            ("metricas_sistema", key, metric.get('hourly_data') or [], _unit(metric.get('full_title')))
+            for key, metric in (upper.get('system_metrics') or {}).items()
+        ])
+
+    def append_anexo_02(self, result: Dict) -> int:
+        """Plant generation and system summary series of an anexo_02 page extraction"""
+        operation_date = (result.get('document_metadata') or {}).get('operation_date')
+        if not operation_date:
+            return 0
+        records = [
+            ("generacion_real", record['plant_name'], record['data']['hourly_data'], "MWh")
+            for record in result.get('real_generation_records') or []
+            if record.get('data', {}).get('hourly_data')
+        ]
+        records.extend(
+            ("resumen_sistema", key, entry['hourly_data'], None)
+            for key, entry in (result.get('system_summary_data') or {}).items()
+            if entry.get('data_type') == 'hourly_series'
+        )
+        return self.append_day(operation_date, records)
+
+    def append_table(self, day: DayLike, data: Dict) -> int:
+        """Rows of a re-extracted Concepto | 1-24 | Total table (dataset = extractor name)"""
+        if not isinstance(data, dict) or data.get('extractor') not in HOURLY_TABLE_EXTRACTORS:
+            return 0
+        return self.append_day(day, [
+            (data['extractor'], row[0], row[1:HOURS + 1], None)
+            for row in data.get('rows') or [] if row and row[0]
+        ])
+
+    def append_layout_tables(self, document: Dict, day: Optional[DayLike] = None) -> int:
+        """Hourly tables of a layout export (day default: origin.fecha_falla)"""
+        day = day or (document.get('origin') or {}).get('fecha_falla')
+        if not day:
+            return 0
+        records = []
+        for table in document.get('tables') or []:
+            data = table.get('data')
+            if isinstance(data, dict) and data.get('extractor') in HOURLY_TABLE_EXTRACTORS:
+                records.extend((data['extractor'], row[0], row[1:HOURS + 1], None)
+                               for row in data.get('rows') or [] if row and row[0])
+        return self.append_day(day, records)
+
+    # ========== Reading ==========
+
+    def _day_path(self, day: date) -> Path:
+        return self.days_dir / f"{day.isoformat()}.npy"
+
+    def _open_day(self, day: date) -> np.ndarray:
+        """Memory-mapped day array, reopened only when the file was replaced"""
+        path = self._day_path(day)
+        stat = path.stat()
+        signature = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._maps.get(day)
+        if cached is None or cached[0] != signature:
+            cached = (signature, np.load(path, mmap_mode='r'))
+            self._maps[day] = cached
+        return cached[1]
+
+    def days(self, start: Optional[DayLike] = None, end: Optional[DayLike] = None) -> List[date]:
+        """Stored days in [start, end]"""
+        if not self.days_dir.exists():
+            return []
+        low = parse_day(start).isoformat() if start else ""
+        high = parse_day(end).isoformat() if end else "9999"
+        return [date.fromisoformat(path.stem) for path in sorted(self.days_dir.glob("*.npy"))
+                if low <= path.stem <= high]
+
+    def cube(self, start: DayLike, end: DayLike, dataset: Optional[str] = None,
+             names: Optional[Sequence[str]] = None, hours: Optional[Sequence[int]] = None) -> SeriesSlice:
+        """
+        Values of (day, series, hour) for stored days in [start, end]
+
+        Args:
+            dataset: Restrict to one dataset (e.g. "generacion_real")
+            names: Series names (accent/case-insensitive), in this order
+            hours: Hours 1-24 to keep (default: all)
+        """
+        ids = self._select(dataset, names)
+        days = self.days(start, end)
+        columns = [h - 1 for h in hours] if hours else list(range(HOURS))
+        values = np.full((len(days), len(ids), len(columns)), np.nan)
+        if ids:
+            index = np.asarray(ids)
+            # Series of one dataset are usually registered together: slice instead of gather
+            contiguous = bool(np.all(np.diff(index) == 1))
+            for d, day in enumerate(days):
+                array = self._open_day(day)
+                if contiguous:
+                    rows = array[index[0]:index[-1] + 1]
+                    values[d, :len(rows)] = rows[:, columns]
+                    continue
+                present = index < array.shape[0]
+                if present.any():
+                    values[d, present] = array[index[present]][:, columns]
+        return SeriesSlice(days, [dict(self._series[idx], id=idx) for idx in ids], values)
+
+    def daily_totals(self, start: DayLike, end: DayLike, dataset: Optional[str] = None,
+                     names: Optional[Sequence[str]] = None) -> SeriesSlice:
+        """Sum over the hours: values[day, series] (NaN when the day has no value)"""
+        cube = self.cube(start, end, dataset, names)
+        return SeriesSlice(cube.days, cube.series, _nansum(cube.values, axis=2))
+
+    def deviation(self, start: DayLike, end: DayLike, names: Optional[Sequence[str]] = None,
+                  programmed: str = "programacion_diaria", real: str = "generacion_real") -> Dict:
+        """
+        Programmed vs real per hour for series present in both datasets
+
+        Returns:
+            {'days', 'names', 'programmed', 'real', 'deviation' (real - programmed),
+             'deviation_pct' (relative to programmed; NaN where programmed is 0),
+             'daily_deviation' (sum over hours)}
+        """
+        self._load_dictionary()
+        real_keys = {series_key(entry['name']) for entry in self._series if entry['dataset'] == real}
+        common, seen = [], set()
+        for entry in self._series:
+            key = series_key(entry['name'])
+            if entry['dataset'] == programmed and key in real_keys and key not in seen:
+                seen.add(key)
+                common.append(entry['name'])
+        if names is not None:
+            wanted = {series_key(name) for name in names}
+            common = [name for name in common if series_key(name) in wanted]
+
+        planned = self.cube(start, end, programmed, common)
+        actual = self.cube(start, end, real, common)
+        difference = actual.values - planned.values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.where(planned.values != 0, difference / planned.values * 100.0, np.nan)
+        return {
+            'days': planned.days,
+            'names': planned.names,
+            'programmed': planned.values,
+            'real': actual.values,
+            'deviation': difference,
+            'deviation_pct': percent,
+            'daily_deviation': _nansum(difference, axis=2),
+        }
+
+    def summary(self) -> Dict:
+        days = self.days()
+        return {
+            'store': str(self.store_dir),
+            'days': len(days),
+            'first_day': days[0].isoformat() if days else None,
+            'last_day': days[-1].isoformat() if days else None,
+            'datasets': self.datasets(),
+        }
+
+
+def _unit(title: Optional[str]) -> Optional[str]:
+    """Last bracketed part of a metric title: "Costos Totales [kUSD]" -> "kUSD" """
+    match = re.search(r'\[([^\]]+)\]\s*$', title or "")
+    return match.group(1) if match else None
+
+
+def _nansum(values: np.ndarray, axis: int) -> np.ndarray:
+    """Sum ignoring NaN, but NaN where every value is NaN"""
+    empty = np.isnan(values).all(axis=axis)
+    return np.where(empty, np.nan, np.nansum(values, axis=axis))
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _save_npy_atomic(path: Path, array: np.ndarray) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".npy")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+_default_store: Optional[HourlySeriesStore] = None
+_default_lock = threading.Lock()
+
+
+def get_series_store(store_dir: Optional[Path] = None) -> HourlySeriesStore:
+    """Process-wide store (data/timeseries); a directory opens a separate one"""
+    global _default_store
+    if store_dir is not None:
+        return HourlySeriesStore(store_dir)
+    with _default_lock:
+        if _default_store is None:
+            _default_store = HourlySeriesStore()
+        return _default_store
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Day-partitioned hourly series store")
+    parser.add_argument("--store", default=None, help=f"Store directory (default: {DEFAULT_STORE_DIR})")
+    parser.add_argument("--import-layout", default=None,
+                        help="Outputs directory: hourly tables of every layout_WITH_PATCH.json")
+    parser.add_argument("--import-anexo01", default=None, help="Directory of anexo_01 page extractions")
+    parser.add_argument("--import-anexo02", default=None, help="Directory of anexo_02 extractions")
+    parser.add_argument("--summary", action="store_true", help="Print days and series per dataset")
+    args = parser.parse_args()
+
+    store = get_series_store(Path(args.store) if args.store else None)
+
+    if args.import_layout:
+        for json_path in sorted(Path(args.import_layout).rglob("layout_WITH_PATCH.json")):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                written = store.append_layout_tables(json.load(f))
+            if written:
+                print(f"✅ {json_path}: {written} series")
+    if args.import_anexo01:
+        for json_path in sorted(Path(args.import_anexo01).glob("*.json")):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                print(f"✅ {json_path.name}: {store.append_anexo_01(json.load(f))} series")
+    if args.import_anexo02:
+        for json_path in sorted(Path(args.import_anexo02).glob("*.json")):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            pages = data if isinstance(data, list) else [data]
+            print(f"✅ {json_path.name}: {sum(store.append_anexo_02(page) for page in pages)} series")
+    if args.summary or not (args.import_layout or args.import_anexo01 or args.import_anexo02):
+        print(json.dumps(store.summary(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
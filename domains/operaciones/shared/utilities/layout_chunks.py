@@ -0,0 +1,542 @@
+"""
+Layout Chunk Store
+Section-aligned, token-counted chunks of the layout database for AI consumers.
+
+An AI consumer should not have to pull a whole chapter JSON to answer a
+question. This module cuts every ingested chapter (layout_database.py) into
+chunks that follow the section tree built by
+apply_hierarchy_restructure_to_document ('hierarchy' edges) and stores
+them next to the layout tables:
+
+    layout_chunks       one row per chunk: heading path, markdown text,
+                        token count, item refs and page range (provenance)
+    layout_chunks_fts   FTS5 index over the chunk text (BM25 ranking)
+
+Chunking:
+    - Items are walked in reading order (the Docling body tree); every
+      section header opens a new section, so a chunk never spans two sections
+    - Each chunk starts with the section's heading path ("1. ... > 1.2 ..."),
+      so it reads on its own
+    - Tables are rendered as markdown from layout_table_cells, i.e. the
+      table_reextract grid when present; large tables are split by rows with
+      the header repeated
+    - Sections larger than max_tokens are split at item, then sentence
+      boundaries
+
+Token counts use tiktoken (cl100k_base) when installed, otherwise a
+word-piece estimate that errs on the high side.
+
+Chunks cascade from layout_chapters: re-ingesting a chapter drops its
+chunks, and build_chapter() (or EXTRACT_ANY_CHAPTER.py --ingest) rebuilds them.
+
+Usage:
+    store = LayoutChunkStore()                      # data/layout.db
+    store.build_all()                               # chapters without chunks
+    result = store.retrieve("apertura interruptor 52J1", token_budget=1500,
+                            report_id="EAF-089-2025")
+    print(store.to_context(result))
+
+    python layout_chunks.py --build
+    python layout_chunks.py --query "desconexión de carga" --budget 2000
+"""
+
+import json
+import math
+import re
+import sqlite3
+from typing import Dict, List, Optional
+
+from layout_database import LayoutDatabase
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+DEFAULT_MAX_TOKENS = 512
+
+# Layout furniture never goes into a chunk
+SKIPPED_LABELS = ('page_header', 'page_footer')
+
+SENTENCE_BREAK = re.compile(r'(?<=[.;:!?])\s+')
+WORD_PIECE = re.compile(r'\w+|[^\w\s]')
+
+CHUNK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS layout_chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chapter_pk INTEGER NOT NULL REFERENCES layout_chapters (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    section_ref TEXT,
+    heading_path TEXT,
+    depth INTEGER NOT NULL DEFAULT 0,
+    part INTEGER NOT NULL DEFAULT 0,
+    text TEXT NOT NULL,
+    token_count INTEGER NOT NULL,
+    has_table INTEGER NOT NULL DEFAULT 0,
+    item_refs TEXT NOT NULL,
+    page_start INTEGER,
+    page_end INTEGER,
+    report_page_start INTEGER,
+    report_page_end INTEGER,
+    UNIQUE (chapter_pk, seq)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS layout_chunks_fts USING fts5(
+    text,
+    content='layout_chunks',
+    content_rowid='id',
+    tokenize="unicode61 remove_diacritics 2"
+);
+
+CREATE TRIGGER IF NOT EXISTS layout_chunks_ai AFTER INSERT ON layout_chunks BEGIN
+    INSERT INTO layout_chunks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS layout_chunks_ad AFTER DELETE ON layout_chunks BEGIN
+    INSERT INTO layout_chunks_fts (layout_chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of text (tiktoken cl100k_base, or an upper-side estimate without it)"""
+    global _encoding
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    # ~4 characters per token for words, one per punctuation mark
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in WORD_PIECE.findall(text))
+
+
+def build_any_query(query: str) -> str:
+    """FTS5 MATCH expression where any term may match (BM25 ranks the overlap)"""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " OR ".join(f'"{term}"' for term in terms if term.strip('"'))
+
+
+def _cell(text: Optional[str]) -> str:
+    return " ".join((text or "").split()).replace("|", "\\|")
+
+
+def table_to_markdown(headers: List[str], rows: List[List[str]]) -> str:
+    """GitHub-style markdown table (placeholder headers when the grid has none)"""
+    num_cols = max([len(headers)] + [len(row) for row in rows])
+    if not num_cols:
+        return ""
+    if not any(h.strip() for h in headers):
+        headers = [f"Col {n}" for n in range(1, num_cols + 1)]
+    headers = list(headers) + [""] * (num_cols - len(headers))
+    lines = [
+        "| " + " | ".join(_cell(h) for h in headers) + " |",
+        "|" + "---|" * num_cols,
+    ]
+    for row in rows:
+        row = list(row) + [""] * (num_cols - len(row))
+        lines.append("| " + " | ".join(_cell(value) for value in row) + " |")
+    return "\n".join(lines)
+
+
+class LayoutChunkStore:
+    """Section-aligned chunks of the layout database with budgeted BM25 retrieval"""
+
+    def __init__(self, layout_db: Optional[LayoutDatabase] = None, max_tokens: int = DEFAULT_MAX_TOKENS):
+        """
+        Args:
+            layout_db: Layout database holding the chapters (default: data/layout.db)
+            max_tokens: Target upper bound of a chunk, heading path included
+        """
+        self.layout_db = layout_db or LayoutDatabase()
+        self.max_tokens = max_tokens
+        self._schema_ready = False
+
+    def connect(self) -> sqlite3.Connection:
+        conn = self.layout_db.connect()
+        if not self._schema_ready:
+            conn.executescript(CHUNK_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    # ========== Building ==========
+
+    def build_chapter(self, report_id: str, chapter: str) -> Dict:
+        """(Re)build the chunks of one ingested chapter in its own transaction"""
+        conn = self.connect()
+        try:
+            row = conn.execute(
+                "SELECT id FROM layout_chapters WHERE report_id = ? AND chapter = ?", (report_id, chapter)
+            ).fetchone()
+            if not row:
+                raise ValueError(f"{report_id} {chapter} is not in the layout database")
+            with conn:
+                return self._build(conn, row['id'], report_id, chapter)
+        finally:
+            conn.close()
+
+    def build_all(self, replace: bool = False) -> List[Dict]:
+        """Chunk every chapter without chunks (all chapters if replace)"""
+        conn = self.connect()
+        try:
+            chapters = conn.execute("""
+                SELECT c.id, c.report_id, c.chapter,
+                       EXISTS (SELECT 1 FROM layout_chunks k WHERE k.chapter_pk = c.id) AS chunked
+                FROM layout_chapters c ORDER BY c.report_id, c.chapter
+            """).fetchall()
+            results = []
+            for chapter in chapters:
+                if chapter['chunked'] and not replace:
+                    continue
+                with conn:
+                    results.append(self._build(conn, chapter['id'], chapter['report_id'], chapter['chapter']))
+            return results
+        finally:
+            conn.close()
+
+    def _build(self, conn: sqlite3.Connection, chapter_pk: int, report_id: str, chapter: str) -> Dict:
+        conn.execute("DELETE FROM layout_chunks WHERE chapter_pk = ?", (chapter_pk,))
+
+        chunks = []
+        for section in self._sections(conn, chapter_pk):
+            chunks.extend(self._chunk_section(section))
+
+        rows = []
+        for seq, chunk in enumerate(chunks):
+            pages = [p for p in chunk['pages'] if p is not None]
+            report_pages = [p for p in chunk['report_pages'] if p is not None]
+            rows.append((
+                chapter_pk, seq, chunk['section_ref'], chunk['heading_path'], chunk['depth'], chunk['part'],
+                chunk['text'], count_tokens(chunk['text']), int(chunk['has_table']),
+                json.dumps(chunk['item_refs']),
+                min(pages, default=None), max(pages, default=None),
+                min(report_pages, default=None), max(report_pages, default=None)
+            ))
+        conn.executemany("""
+            INSERT INTO layout_chunks (
+                chapter_pk, seq, section_ref, heading_path, depth, part, text, token_count, has_table,
+                item_refs, page_start, page_end, report_page_start, report_page_end
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+        return {
+            'report_id': report_id,
+            'chapter': chapter,
+            'chunks': len(rows),
+            'tokens': sum(row[7] for row in rows),
+            'tables': sum(row[8] for row in rows),
+        }
+
+    def _sections(self, conn: sqlite3.Connection, chapter_pk: int) -> List[Dict]:
+        """Sections in reading order: heading path plus their content blocks"""
+        items = {}
+        for row in conn.execute("""
+            SELECT i.id, i.self_ref, i.collection, i.seq, i.label, i.text, i.content_layer,
+                   p.page_no, p.report_page
+            FROM layout_items i
+            LEFT JOIN layout_prov p ON p.item_id = i.id AND p.prov_idx = 0
+            WHERE i.chapter_pk = ?
+        """, (chapter_pk,)):
+            items[row['self_ref']] = dict(row)
+
+        structure: Dict[str, List[str]] = {}
+        hierarchy: Dict[str, List[str]] = {}
+        for row in conn.execute("""
+            SELECT parent_ref, child_ref, relation FROM layout_edges
+            WHERE chapter_pk = ? ORDER BY parent_ref, position
+        """, (chapter_pk,)):
+            edges = hierarchy if row['relation'] == 'hierarchy' else structure
+            edges.setdefault(row['parent_ref'], []).append(row['child_ref'])
+
+        tables = {}
+        for row in conn.execute("""
+            SELECT c.item_id, c.row_idx, c.col_idx, c.text FROM layout_table_cells c
+            JOIN layout_items i ON i.id = c.item_id
+            WHERE i.chapter_pk = ? ORDER BY c.item_id, c.row_idx, c.col_idx
+        """, (chapter_pk,)):
+            grid = tables.setdefault(row['item_id'], {})
+            grid.setdefault(row['row_idx'], []).append(row['text'] or "")
+
+        # Ancestors of each header: the headers whose hierarchy range contains it,
+        # outermost (largest range) first
+        ancestors: Dict[str, List[str]] = {}
+        for header_ref in sorted(hierarchy, key=lambda ref: -len(hierarchy[ref])):
+            for child_ref in hierarchy[header_ref]:
+                child = items.get(child_ref)
+                if child and child['label'] == 'section_header':
+                    ancestors.setdefault(child_ref, []).append(header_ref)
+
+        sections = [{'section_ref': None, 'heading_path': [], 'depth': 0, 'blocks': []}]
+        for ref in self._reading_order(items, structure):
+            item = items[ref]
+            if item['content_layer'] == 'furniture' or item['label'] in SKIPPED_LABELS:
+                continue
+            if item['label'] == 'section_header':
+                path = [items[a]['text'] for a in ancestors.get(ref, []) if items[a]['text']]
+                path.append((item['text'] or "").strip())
+                sections.append({'section_ref': ref, 'heading_path': path, 'depth': len(path), 'blocks': []})
+                continue
+
+            block = self._block(item, tables)
+            if block:
+                sections[-1]['blocks'].append(block)
+
+        return [s for s in sections if s['blocks'] or s['section_ref']]
+
+    @staticmethod
+    def _reading_order(items: Dict[str, Dict], structure: Dict[str, List[str]]) -> List[str]:
+        """Depth-first walk of the body tree; items it does not reach follow in export order"""
+        order, seen = [], set()
+        stack = list(reversed(structure.get('#/body', [])))
+        while stack:
+            ref = stack.pop()
+            if ref in seen or ref not in items:
+                continue
+            seen.add(ref)
+            order.append(ref)
+            stack.extend(reversed(structure.get(ref, [])))
+
+        rest = [ref for ref in items if ref not in seen]
+        rest.sort(key=lambda ref: (items[ref]['collection'], items[ref]['seq']))
+        return order + rest
+
+    @staticmethod
+    def _block(item: Dict, tables: Dict[int, Dict[int, List[str]]]) -> Optional[Dict]:
+        """Renderable unit of one item: paragraph, list entry or markdown table"""
+        block = {
+            'ref': item['self_ref'],
+            'page': item['page_no'],
+            'report_page': item['report_page'],
+            'table': None,
+            'text': None,
+        }
+        if item['collection'] == 'tables':
+            grid = tables.get(item['id'])
+            if not grid:
+                return None
+            block['table'] = (grid.get(0, []), [grid[r] for r in sorted(grid) if r > 0])
+            return block
+
+        text = (item['text'] or "").strip()
+        if not text:
+            return None
+        block['text'] = f"- {text}" if item['label'] == 'list_item' else text
+        return block
+
+    def _chunk_section(self, section: Dict) -> List[Dict]:
+        """Pack a section's blocks into chunks of at most max_tokens (heading repeated)"""
+        heading = " > ".join(section['heading_path'])
+        prefix = f"## {heading}\n\n" if heading else ""
+        budget = max(self.max_tokens - count_tokens(prefix), 32)
+
+        pieces = []  # (text, block, is_table)
+        for block in section['blocks']:
+            if block['table'] is not None:
+                pieces.extend((text, block, True) for text in self._split_table(*block['table'], budget))
+            else:
+                pieces.extend((text, block, False) for text in self._split_text(block['text'], budget))
+
+        chunks, current, used = [], [], 0
+        for piece in pieces:
+            tokens = count_tokens(piece[0]) + 1
+            if current and used + tokens > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(piece)
+            used += tokens
+        if current or not chunks:
+            chunks.append(current)
+
+        result = []
+        for part, pieces in enumerate(chunks):
+            blocks = []
+            for _, block, _ in pieces:
+                if not blocks or blocks[-1] is not block:
+                    blocks.append(block)
+            body = "\n\n".join(text for text, _, _ in pieces)
+            result.append({
+                'section_ref': section['section_ref'],
+                'heading_path': heading,
+                'depth': section['depth'],
+                'part': part,
+                'text': (prefix + body).strip() or heading,
+                'has_table': any(is_table for _, _, is_table in pieces),
+                'item_refs': ([section['section_ref']] if section['section_ref'] else [])
+                             + [block['ref'] for block in blocks],
+                'pages': [block['page'] for block in blocks],
+                'report_pages': [block['report_page'] for block in blocks],
+            })
+        return result
+
+    @staticmethod
+    def _split_text(text: str, budget: int) -> List[str]:
+        """Text in pieces of at most budget tokens: whole, by sentences, then by words"""
+        if count_tokens(text) <= budget:
+            return [text]
+        pieces, current = [], ""
+        for sentence in SENTENCE_BREAK.split(text):
+            for part in ([sentence] if count_tokens(sentence) <= budget else sentence.split()):
+                candidate = f"{current} {part}" if current else part
+                if current and count_tokens(candidate) > budget:
+                    pieces.append(current)
+                    candidate = part
+                current = candidate
+        if current:
+            pieces.append(current)
+        return pieces
+
+    @staticmethod
+    def _split_table(headers: List[str], rows: List[List[str]], budget: int) -> List[str]:
+        """Markdown table, split into row groups with the header repeated when over budget"""
+        whole = table_to_markdown(headers, rows)
+        if count_tokens(whole) <= budget or len(rows) <= 1:
+            return [whole] if whole else []
+
+        header_tokens = count_tokens(table_to_markdown(headers, []))
+        pieces, group, used = [], [], header_tokens
+        for row in rows:
+            tokens = count_tokens(table_to_markdown([], [row]).split("\n", 2)[-1]) + 1
+            if group and used + tokens > budget:
+                pieces.append(table_to_markdown(headers, group))
+                group, used = [], header_tokens
+            group.append(row)
+            used += tokens
+        if group:
+            pieces.append(table_to_markdown(headers, group))
+        return pieces
+
+    # ========== Retrieval ==========
+
+    def retrieve(self, query: str, token_budget: int = 2000, report_id: Optional[str] = None,
+                 chapter: Optional[str] = None, candidates: int = 50, raw: bool = False,
+                 reading_order: bool = True) -> Dict:
+        """
+        Best chunks for a query that fit in a token budget
+
+        Args:
+            query: Free text (any term may match); an FTS5 expression if raw=True
+            token_budget: Maximum total token_count of the returned chunks
+            report_id: Restrict to one report
+            chapter: Restrict to one chapter key, e.g. "capitulo_03"
+            candidates: BM25 hits considered for packing
+            raw: Pass query to MATCH unchanged
+            reading_order: Return chunks in document order (otherwise best first)
+
+        Returns:
+            {'chunks': [...], 'tokens': used, 'token_budget', 'candidates': hits considered};
+            each chunk carries text, token_count, heading_path, score and provenance
+            (report_id, chapter, pages, item_refs)
+        """
+        conn = self.connect()
+        try:
+            return self.retrieve_with(conn, query, token_budget, report_id, chapter, candidates, raw, reading_order)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def retrieve_with(conn: sqlite3.Connection, query: str, token_budget: int = 2000,
+                      report_id: Optional[str] = None, chapter: Optional[str] = None, candidates: int = 50,
+                      raw: bool = False, reading_order: bool = True) -> Dict:
+        """retrieve() on a caller's connection (e.g. a read-only pool)"""
+        match = query if raw else build_any_query(query)
+        result = {'chunks': [], 'tokens': 0, 'token_budget': token_budget, 'candidates': 0}
+        if not match:
+            return result
+
+        filters, params = [], {'match': match, 'limit': candidates}
+        if report_id:
+            filters.append("c.report_id = :report_id")
+            params['report_id'] = report_id
+        if chapter:
+            filters.append("c.chapter = :chapter")
+            params['chapter'] = chapter
+        where = "".join(f" AND {condition}" for condition in filters)
+
+        hits = conn.execute(f"""
+            SELECT k.id, c.report_id, c.chapter, k.seq, k.heading_path, k.part, k.text,
+                   k.token_count, k.has_table, k.item_refs, k.page_start, k.page_end,
+                   k.report_page_start, k.report_page_end,
+                   bm25(layout_chunks_fts) AS score
+            FROM layout_chunks_fts
+            JOIN layout_chunks k ON k.id = layout_chunks_fts.rowid
+            JOIN layout_chapters c ON c.id = k.chapter_pk
+            WHERE layout_chunks_fts MATCH :match{where}
+            ORDER BY score
+            LIMIT :limit
+        """, params).fetchall()
+
+        # Greedy by score: a chunk that does not fit is skipped, smaller ones may still
+        packed, used = [], 0
+        for hit in hits:
+            if used + hit['token_count'] > token_budget:
+                continue
+            chunk = dict(hit)
+            chunk['item_refs'] = json.loads(chunk['item_refs'])
+            chunk['has_table'] = bool(chunk['has_table'])
+            packed.append(chunk)
+            used += hit['token_count']
+
+        if reading_order:
+            packed.sort(key=lambda chunk: (chunk['report_id'], chunk['chapter'], chunk['seq']))
+        result.update(chunks=packed, tokens=used, candidates=len(hits))
+        return result
+
+    @staticmethod
+    def to_context(result: Dict) -> str:
+        """Retrieved chunks as one markdown string, each with a provenance line"""
+        parts = []
+        for chunk in result['chunks']:
+            pages = (chunk['report_page_start'], chunk['report_page_end'])
+            if pages[0] is None:
+                pages = (chunk['page_start'], chunk['page_end'])
+            page_label = f"p.{pages[0]}" if pages[0] == pages[1] else f"pp.{pages[0]}-{pages[1]}"
+            parts.append(f"<!-- {chunk['report_id']} {chunk['chapter']} {page_label} -->\n{chunk['text']}")
+        return "\n\n---\n\n".join(parts)
+
+    def stats(self) -> Dict:
+        """Chunk counts and token totals"""
+        conn = self.connect()
+        try:
+            row = conn.execute("""
+                SELECT COUNT(*) AS chunks, COUNT(DISTINCT chapter_pk) AS chapters,
+                       COALESCE(SUM(token_count), 0) AS tokens, MAX(token_count) AS max_tokens
+                FROM layout_chunks
+            """).fetchone()
+        finally:
+            conn.close()
+        return dict(row)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and query token-budgeted layout chunks")
+    parser.add_argument("--db", default=None, help="Layout SQLite file (default: data/layout.db)")
+    parser.add_argument("--build", action="store_true", help="Chunk chapters that have no chunks yet")
+    parser.add_argument("--rebuild", action="store_true", help="Re-chunk every chapter")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS, help="Chunk size target")
+    parser.add_argument("--query", default=None, help="Retrieve chunks for a free-text query")
+    parser.add_argument("--budget", type=int, default=2000, help="Token budget for --query")
+    parser.add_argument("--report", default=None, help="Restrict --query to one report")
+    args = parser.parse_args()
+
+    store = LayoutChunkStore(LayoutDatabase(args.db), max_tokens=args.max_tokens)
+
+    if args.build or args.rebuild:
+        for stats in store.build_all(replace=args.rebuild):
+            print(f"✅ {stats['report_id']} {stats['chapter']}: {stats['chunks']} chunks, "
+                  f"{stats['tokens']} tokens ({stats['tables']} with tables)")
+        print(f"📦 {store.stats()}")
+
+    if args.query:
+        result = store.retrieve(args.query, token_budget=args.budget, report_id=args.report)
+        print(store.to_context(result))
+        print(f"\n🔎 {len(result['chunks'])} chunks, {result['tokens']}/{result['token_budget']} tokens "
+              f"from {result['candidates']} candidates")
+
+
+if __name__ == "__main__":
+    main()
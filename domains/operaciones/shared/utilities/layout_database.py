@@ -0,0 +1,952 @@
+"""
+Docling Layout Database
+Load native Docling layout JSON (layout_WITH_PATCH.json) into normalized
+SQLite tables.
+
+EXTRACT_ANY_CHAPTER.py exports each chapter with doc.export_to_dict() after
+the EAF patch and post-processors. This module loads one chapter file per
+transaction with executemany, streaming it: the file is read in chunks, the
+item collections are decoded one item at a time and inserted in batches, and
+the page images of pages{} are never kept, so memory stays bounded by a
+batch rather than the whole export:
+
+    layout_chapters     one row per (report_id, chapter), origin metadata
+    layout_items        texts / tables / pictures / groups (label, text, level)
+    layout_prov         provenance boxes per item (chapter page + report page)
+    layout_pages        page sizes per chapter (for top-left coordinates)
+    layout_rtree        R*Tree over the boxes: (chapter, page, x, y), y up
+    layout_edges        children[] references: 'structure' (Docling tree)
+                        and 'hierarchy' (apply_hierarchy_restructure_to_document)
+    layout_tables       table shape and extractor (table_reextract)
+    layout_table_cells  header row (row_idx 0) and data rows (1..n)
+    layout_search_docs  searchable text: item texts and one entry per table row,
+                        with report/chapter/page/label provenance
+    layout_fts          FTS5 index over layout_search_docs (accent folding)
+
+All child rows cascade from layout_chapters, so a re-extracted chapter is
+replaced in place (replace=True) without touching the rest of the database;
+triggers keep the FTS index in step with layout_search_docs.
+
+Spatial queries take (report_id, page): the report page, or the chapter page
+when chapter is given. Coordinates are Docling PDF points with a bottom-left
+origin; pass top_left=True for PyMuPDF-style coordinates.
+
+Search terms are folded like the index (unicode61, remove_diacritics 2), so
+"linea" matches "línea" and "S/E" matches "s/e" as a phrase.
+
+Usage:
+    db = LayoutDatabase()                                   # data/layout.db
+    db.ingest_layout_json("data/outputs/EAF-089-2025/capitulo_03/layout_WITH_PATCH.json",
+                          replace=True)
+    db.ingest_outputs("data/outputs")                       # every chapter, skip known
+    db.search("interruptor 52J1 S/E Cardones", report_id="EAF-089-2025")
+    db.items_at_point("EAF-089-2025", 95, x=120, y=640)
+    db.items_overlapping("EAF-089-2025", 95, (50, 700, 300, 600))
+
+    python layout_database.py data/outputs --replace
+"""
+
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[4] / "data" / "layout.db"
+
+LAYOUT_FILE_NAME = "layout_WITH_PATCH.json"
+
+# Collections of a DoclingDocument export that hold items with a self_ref
+ITEM_COLLECTIONS = ('texts', 'tables', 'pictures', 'groups', 'key_value_items', 'form_items')
+
+CHAPTER_DIR_PATTERN = re.compile(r'^capitulo_(\d+)$')
+
+# Items decoded and inserted per executemany batch
+ITEM_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS layout_chapters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id TEXT NOT NULL,
+    chapter TEXT NOT NULL,
+    chapter_number INTEGER,
+    page_offset INTEGER,
+    source_file TEXT,
+    document_name TEXT,
+    fecha_emision TEXT,
+    fecha_falla TEXT,
+    hora_falla TEXT,
+    item_count INTEGER DEFAULT 0,
+    ingested_at TEXT NOT NULL,
+    UNIQUE (report_id, chapter)
+);
+
+CREATE TABLE IF NOT EXISTS layout_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chapter_pk INTEGER NOT NULL REFERENCES layout_chapters (id) ON DELETE CASCADE,
+    self_ref TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    label TEXT,
+    text TEXT,
+    level INTEGER,
+    parent_ref TEXT,
+    content_layer TEXT,
+    UNIQUE (chapter_pk, self_ref)
+);
+
+CREATE TABLE IF NOT EXISTS layout_prov (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id INTEGER NOT NULL REFERENCES layout_items (id) ON DELETE CASCADE,
+    prov_idx INTEGER NOT NULL,
+    page_no INTEGER NOT NULL,
+    report_page INTEGER,
+    l REAL, t REAL, r REAL, b REAL,
+    coord_origin TEXT,
+    charspan_start INTEGER,
+    charspan_end INTEGER,
+    UNIQUE (item_id, prov_idx)
+);
+
+CREATE TABLE IF NOT EXISTS layout_pages (
+    chapter_pk INTEGER NOT NULL REFERENCES layout_chapters (id) ON DELETE CASCADE,
+    page_no INTEGER NOT NULL,
+    width REAL,
+    height REAL,
+    PRIMARY KEY (chapter_pk, page_no)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS layout_rtree USING rtree(
+    id,
+    min_chapter, max_chapter,
+    min_page, max_page,
+    min_x, max_x,
+    min_y, max_y
+);
+
+CREATE TRIGGER IF NOT EXISTS layout_prov_ad AFTER DELETE ON layout_prov BEGIN
+    DELETE FROM layout_rtree WHERE id = old.id;
+END;
+
+CREATE TABLE IF NOT EXISTS layout_edges (
+    chapter_pk INTEGER NOT NULL REFERENCES layout_chapters (id) ON DELETE CASCADE,
+    parent_ref TEXT NOT NULL,
+    child_ref TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    relation TEXT NOT NULL,
+    PRIMARY KEY (chapter_pk, parent_ref, position)
+);
+
+CREATE TABLE IF NOT EXISTS layout_tables (
+    item_id INTEGER PRIMARY KEY REFERENCES layout_items (id) ON DELETE CASCADE,
+    extractor TEXT,
+    num_rows INTEGER,
+    num_cols INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS layout_table_cells (
+    item_id INTEGER NOT NULL REFERENCES layout_tables (item_id) ON DELETE CASCADE,
+    row_idx INTEGER NOT NULL,
+    col_idx INTEGER NOT NULL,
+    text TEXT,
+    is_header INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (item_id, row_idx, col_idx)
+);
+
+CREATE TABLE IF NOT EXISTS layout_search_docs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chapter_pk INTEGER NOT NULL REFERENCES layout_chapters (id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL REFERENCES layout_items (id) ON DELETE CASCADE,
+    row_idx INTEGER,
+    label TEXT,
+    page_no INTEGER,
+    report_page INTEGER,
+    text TEXT NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS layout_fts USING fts5(
+    text,
+    content='layout_search_docs',
+    content_rowid='id',
+    tokenize="unicode61 remove_diacritics 2"
+);
+
+CREATE TRIGGER IF NOT EXISTS layout_search_docs_ai AFTER INSERT ON layout_search_docs BEGIN
+    INSERT INTO layout_fts (rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS layout_search_docs_ad AFTER DELETE ON layout_search_docs BEGIN
+    INSERT INTO layout_fts (layout_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+
+CREATE INDEX IF NOT EXISTS idx_layout_items_label ON layout_items (label);
+CREATE INDEX IF NOT EXISTS idx_layout_prov_page ON layout_prov (page_no);
+CREATE INDEX IF NOT EXISTS idx_layout_prov_report_page ON layout_prov (report_page);
+CREATE INDEX IF NOT EXISTS idx_layout_edges_child ON layout_edges (chapter_pk, child_ref);
+CREATE INDEX IF NOT EXISTS idx_layout_search_docs_chapter ON layout_search_docs (chapter_pk);
+"""
+
+
+def _ref(value) -> Optional[str]:
+    """'#/texts/3' from {'$ref': '#/texts/3'} (or None)"""
+    if isinstance(value, dict):
+        return value.get('$ref') or value.get('cref')
+    return value if isinstance(value, str) else None
+
+
+def _label(item: Dict) -> Optional[str]:
+    label = item.get('label')
+    return label.lower() if isinstance(label, str) else label
+
+
+def infer_chapter_location(json_path: Path) -> Tuple[Optional[str], Optional[str]]:
+    """(report_id, chapter) from .../<report_id>/capitulo_NN/[outputs/]layout_WITH_PATCH.json"""
+    for folder in json_path.parents:
+        if CHAPTER_DIR_PATTERN.match(folder.name):
+            report_id = folder.parent.name if folder.parent != folder else None
+            return report_id, folder.name
+    return None, None
+
+
+def build_match_query(query: str) -> str:
+    """
+    FTS5 MATCH expression for free text: every whitespace-separated term is
+    a quoted phrase, all terms required ("S/E" -> phrase "s e", no syntax errors)
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term.strip('"'))
+
+
+def table_grid(data) -> Tuple[List[str], List[List[str]], Optional[str]]:
+    """
+    Headers, data rows and extractor name of a table's data
+
+    Handles both shapes found in layout JSON: the simplified
+    {"headers", "rows", "extractor"} written by table_reextract, and native
+    Docling {"table_cells", "num_rows", "num_cols"} (first row = headers, as
+    in the tableformer keeper).
+    """
+    if not isinstance(data, dict):
+        return [], [], None
+
+    if 'rows' in data or 'headers' in data:
+        headers = [str(h) if h is not None else "" for h in data.get('headers') or []]
+        rows = []
+        for row in data.get('rows') or []:
+            values = row.values() if isinstance(row, dict) else row
+            rows.append([str(v) if v is not None else "" for v in values])
+        return headers, rows, data.get('extractor')
+
+    cells = data.get('table_cells') or []
+    num_rows = data.get('num_rows') or 0
+    num_cols = data.get('num_cols') or 0
+    if not cells or not num_rows or not num_cols:
+        return [], [], None
+
+    grid = [["" for _ in range(num_cols)] for _ in range(num_rows)]
+    for cell in cells:
+        row = cell.get('start_row_offset_idx', 0)
+        col = cell.get('start_col_offset_idx', 0)
+        if 0 <= row < num_rows and 0 <= col < num_cols:
+            grid[row][col] = (cell.get('text') or "").strip()
+    return grid[0], grid[1:], 'docling'
+
+
+class _JsonStream:
+    """
+    Incremental JSON reader over a text file
+
+    members() / elements() walk an object / array one member at a time;
+    value() decodes one complete value with json.JSONDecoder.raw_decode.
+    Only the value being decoded is buffered. A member the caller does not
+    read is skipped.
+    """
+
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r'\s*')
+    _number_tail = re.compile(r'[0-9.eE+-]*')
+
+    def __init__(self, f, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0         # characters dropped before buffer
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        """Append at least size characters (drops the consumed prefix); False at end of file"""
+        chunk = self.f.read(max(size, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self.pos = self._whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.chunk_size):
+                raise ValueError("Unexpected end of JSON input")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the JSON buffer")
+        self.pos += 1
+
+    def value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Incomplete value: read as much again as is buffered (linear overall)
+                if not self._fill(len(self.buffer) - self.pos):
+                    raise
+                continue
+            # A number cut at the buffer end ("2." of "2.5e3") may continue in the next chunk
+            if (isinstance(value, (int, float)) and not self.eof and
+                    self._number_tail.fullmatch(self.buffer, end) and self._fill(self.chunk_size)):
+                continue
+            self.pos = end
+            return value
+
+    def _close(self, closing: str) -> bool:
+        """After a member: True at the closing bracket, False after a comma"""
+        char = self._peek()
+        self.pos += 1
+        if char == closing:
+            return True
+        if char != ',':
+            raise ValueError(f"Expected ',' or {closing!r} in JSON input")
+        return False
+
+    def members(self) -> Iterator[str]:
+        """Keys of an object; read the member value (value/elements/members) before resuming"""
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            start = self.offset + self.pos
+            yield key
+            if self.offset + self.pos == start:
+                self.value()
+            if self._close('}'):
+                return
+
+    def elements(self) -> Iterator:
+        """Values of an array, decoded one at a time"""
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._close(']'):
+                return
+
+    def is_null(self) -> bool:
+        """Consume a null value"""
+        if self._peek() == 'n':
+            self.value()
+            return True
+        return False
+
+
+class LayoutDatabase:
+    """Normalized SQLite store of Docling layout exports."""
+
+    def __init__(self, db_path: Optional[str] = None, registry=None):
+        """
+        Args:
+            db_path: SQLite file (default: data/layout.db)
+            registry: ReportRegistry used to map chapter pages to report pages
+                      (default: the shared registry, loaded on first use)
+        """
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self._registry = registry
+        self._schema_ready = False
+
+    def connect(self) -> sqlite3.Connection:
+        """Read/write connection with the layout schema in place"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    # ========== Ingestion ==========
+
+    def ingest_layout_json(self, json_path: str, report_id: Optional[str] = None,
+                           chapter: Optional[str] = None, replace: bool = False) -> Dict:
+        """
+        Load one layout_WITH_PATCH.json
+
+        Args:
+            json_path: Layout export of one chapter
+            report_id: Report ID (default: inferred from the output folder)
+            chapter: Chapter key, e.g. "capitulo_03" (default: inferred)
+            replace: Delete and reload the chapter if already present;
+                     otherwise an existing chapter is left as is
+
+        Returns:
+            Counts of inserted rows (status 'skipped' when already present)
+        """
+        json_path = Path(json_path)
+        inferred_report, inferred_chapter = infer_chapter_location(json_path)
+        report_id = report_id or inferred_report
+        chapter = chapter or inferred_chapter
+        if not report_id or not chapter:
+            raise ValueError(f"Cannot infer report/chapter from {json_path}; pass them explicitly")
+
+        conn = self.connect()
+        try:
+            return self._ingest_chapter(conn, json_path, report_id, chapter, replace)
+        finally:
+            conn.close()
+
+    def ingest_outputs(self, outputs_dir: str, replace: bool = False) -> List[Dict]:
+        """Ingest every <report_id>/capitulo_NN/layout_WITH_PATCH.json below outputs_dir"""
+        results = []
+        conn = self.connect()
+        try:
+            for json_path in sorted(Path(outputs_dir).rglob(LAYOUT_FILE_NAME)):
+                report_id, chapter = infer_chapter_location(json_path)
+                if report_id:
+                    results.append(self._ingest_chapter(conn, json_path, report_id, chapter, replace))
+        finally:
+            conn.close()
+        return results
+
+    def _ingest_chapter(self, conn: sqlite3.Connection, json_path: Path, report_id: str,
+                        chapter: str, replace: bool) -> Dict:
+        """Load one chapter in its own transaction"""
+        existing = conn.execute(
+            "SELECT id FROM layout_chapters WHERE report_id = ? AND chapter = ?",
+            (report_id, chapter)
+        ).fetchone()
+        if existing and not replace:
+            return {'report_id': report_id, 'chapter': chapter, 'status': 'skipped'}
+
+        with open(json_path, 'r', encoding='utf-8') as f, conn:
+            # Cascades to items, provenance, edges, tables and cells
+            if existing:
+                conn.execute("DELETE FROM layout_chapters WHERE id = ?", (existing['id'],))
+            return self._insert_document(conn, _JsonStream(f), report_id, chapter, str(json_path))
+
+    def _page_offset(self, report_id: str, chapter: str) -> Tuple[Optional[int], Optional[int]]:
+        """(chapter number, report page of chapter page 1 minus one) from the registry"""
+        match = CHAPTER_DIR_PATTERN.match(chapter)
+        if not match:
+            return None, None
+        number = int(match.group(1))
+
+        if self._registry is None:
+            from chapter_boundaries import get_report_registry
+            self._registry = get_report_registry()
+        pages = self._registry.chapter_pages(report_id).get(number)
+        return number, (pages[0] - 1 if pages else None)
+
+    def _insert_document(self, conn: sqlite3.Connection, stream: _JsonStream, report_id: str,
+                         chapter: str, source_file: str) -> Dict:
+        """Insert one export member by member; metadata is filled in once the whole file is read"""
+        chapter_number, page_offset = self._page_offset(report_id, chapter)
+        cursor = conn.execute("""
+            INSERT INTO layout_chapters (
+                report_id, chapter, chapter_number, page_offset, source_file, ingested_at
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (report_id, chapter, chapter_number, page_offset, source_file, datetime.now().isoformat()))
+        chapter_pk = cursor.lastrowid
+
+        counts = {'items': 0, 'prov': 0, 'edges': 0, 'tables': 0, 'cells': 0}
+        metadata: Dict = {}
+        for key in stream.members():
+            if key in ITEM_COLLECTIONS:
+                if not stream.is_null():
+                    self._insert_items(conn, chapter_pk, key, stream.elements(), page_offset, counts)
+            elif key in ('body', 'furniture'):
+                counts['edges'] += self._insert_edges(conn, chapter_pk, [stream.value() or {}])
+            elif key == 'pages':
+                if not stream.is_null():
+                    conn.executemany(
+                        "INSERT INTO layout_pages (chapter_pk, page_no, width, height) VALUES (?, ?, ?, ?)",
+                        list(self._iter_pages(stream, chapter_pk))
+                    )
+            elif key in ('name', 'origin'):
+                metadata[key] = stream.value()
+
+        origin = metadata.get('origin') or {}
+        conn.execute("""
+            UPDATE layout_chapters
+            SET document_name = ?, fecha_emision = ?, fecha_falla = ?, hora_falla = ?, item_count = ?
+            WHERE id = ?
+        """, (metadata.get('name'), origin.get('fecha_emision'), origin.get('fecha_falla'),
+              origin.get('hora_falla'), counts['items'], chapter_pk))
+
+        self._index_boxes(conn, chapter_pk)
+        self._index_search_docs(conn, chapter_pk)
+
+        return {'report_id': report_id, 'chapter': chapter, 'chapter_pk': chapter_pk,
+                **counts, 'status': 'ingested'}
+
+    def _insert_items(self, conn: sqlite3.Connection, chapter_pk: int, collection: str,
+                      items: Iterator[Dict], page_offset: Optional[int], counts: Dict) -> None:
+        """Items of one collection with their boxes, edges and table cells, ITEM_BATCH_SIZE at a time"""
+        batch: List[Tuple[Tuple, Dict]] = []
+        for seq, item in enumerate(items):
+            batch.append((self._item_row(collection, seq, item), item))
+            if len(batch) >= ITEM_BATCH_SIZE:
+                self._insert_item_batch(conn, chapter_pk, batch, page_offset, counts)
+                batch = []
+        if batch:
+            self._insert_item_batch(conn, chapter_pk, batch, page_offset, counts)
+
+    def _insert_item_batch(self, conn: sqlite3.Connection, chapter_pk: int,
+                           batch: List[Tuple[Tuple, Dict]], page_offset: Optional[int], counts: Dict) -> None:
+        # Items: one executemany, then map self_ref -> row id for the child tables
+        conn.executemany("""
+            INSERT INTO layout_items (
+                chapter_pk, self_ref, collection, seq, label, text, level, parent_ref, content_layer
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(chapter_pk,) + row for row, _ in batch])
+        collection, first_seq, last_seq = batch[0][0][1], batch[0][0][2], batch[-1][0][2]
+        item_ids = {
+            row['self_ref']: row['id']
+            for row in conn.execute(
+                "SELECT id, self_ref FROM layout_items WHERE chapter_pk = ? AND collection = ? AND seq BETWEEN ? AND ?",
+                (chapter_pk, collection, first_seq, last_seq)
+            )
+        }
+
+        prov_rows = []
+        for (self_ref, *_), item in batch:
+            for prov_idx, prov in enumerate(item.get('prov') or []):
+                bbox = prov.get('bbox') or {}
+                charspan = prov.get('charspan') or [None, None]
+                page_no = prov.get('page_no')
+                prov_rows.append((
+                    item_ids[self_ref], prov_idx, page_no,
+                    page_no + page_offset if page_offset is not None and page_no is not None else None,
+                    bbox.get('l'), bbox.get('t'), bbox.get('r'), bbox.get('b'), bbox.get('coord_origin'),
+                    charspan[0], charspan[1] if len(charspan) > 1 else None
+                ))
+        conn.executemany("""
+            INSERT INTO layout_prov (
+                item_id, prov_idx, page_no, report_page, l, t, r, b, coord_origin,
+                charspan_start, charspan_end
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, prov_rows)
+
+        table_rows, cell_rows = [], []
+        if collection == 'tables':
+            for (self_ref, *_), table in batch:
+                item_id = item_ids[self_ref]
+                headers, rows, extractor = table_grid(table.get('data'))
+                num_cols = max([len(headers)] + [len(row) for row in rows])
+                table_rows.append((item_id, extractor, len(rows), num_cols))
+                cell_rows.extend((item_id, 0, col, text, 1) for col, text in enumerate(headers))
+                for row_idx, row in enumerate(rows, 1):
+                    cell_rows.extend((item_id, row_idx, col, text, 0) for col, text in enumerate(row))
+            conn.executemany(
+                "INSERT INTO layout_tables (item_id, extractor, num_rows, num_cols) VALUES (?, ?, ?, ?)",
+                table_rows
+            )
+            conn.executemany(
+                "INSERT INTO layout_table_cells (item_id, row_idx, col_idx, text, is_header) VALUES (?, ?, ?, ?, ?)",
+                cell_rows
+            )
+
+        counts['items'] += len(batch)
+        counts['prov'] += len(prov_rows)
+        counts['edges'] += self._insert_edges(conn, chapter_pk, [item for _, item in batch])
+        counts['tables'] += len(table_rows)
+        counts['cells'] += len(cell_rows)
+
+    def _insert_edges(self, conn: sqlite3.Connection, chapter_pk: int, nodes: List[Dict]) -> int:
+        edge_rows = list(self._iter_edges(nodes, chapter_pk))
+        conn.executemany("""
+            INSERT OR IGNORE INTO layout_edges (chapter_pk, parent_ref, child_ref, position, relation)
+            VALUES (?, ?, ?, ?, ?)
+        """, edge_rows)
+        return len(edge_rows)
+
+    @staticmethod
+    def _index_boxes(conn: sqlite3.Connection, chapter_pk: Optional[int] = None) -> None:
+        """R*Tree entries for one chapter's boxes (or all), y flipped to bottom-left when needed"""
+        scope = "AND i.chapter_pk = :chapter_pk" if chapter_pk is not None else ""
+        flip = "UPPER(p.coord_origin) = 'TOPLEFT' AND pg.height IS NOT NULL"
+        conn.execute(f"""
+            INSERT INTO layout_rtree (id, min_chapter, max_chapter, min_page, max_page, min_x, max_x, min_y, max_y)
+            SELECT id, chapter_pk, chapter_pk, page_no, page_no,
+                   MIN(l, r), MAX(l, r), MIN(top, bottom), MAX(top, bottom)
+            FROM (
+                SELECT p.id, i.chapter_pk, p.page_no, p.l, p.r,
+                       CASE WHEN {flip} THEN pg.height - p.t ELSE p.t END AS top,
+                       CASE WHEN {flip} THEN pg.height - p.b ELSE p.b END AS bottom
+                FROM layout_prov p
+                JOIN layout_items i ON i.id = p.item_id
+                LEFT JOIN layout_pages pg ON pg.chapter_pk = i.chapter_pk AND pg.page_no = p.page_no
+                WHERE p.l IS NOT NULL AND p.t IS NOT NULL AND p.r IS NOT NULL AND p.b IS NOT NULL {scope}
+            )
+        """, {'chapter_pk': chapter_pk})
+
+    def rebuild_spatial_index(self) -> int:
+        """Rebuild the R*Tree from layout_prov (databases loaded before the index)"""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM layout_rtree")
+                self._index_boxes(conn)
+            return conn.execute("SELECT COUNT(*) FROM layout_rtree").fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _index_search_docs(conn: sqlite3.Connection, chapter_pk: Optional[int] = None) -> None:
+        """Searchable rows for one chapter (or all): item texts and table rows, first box as provenance"""
+        scope = "AND i.chapter_pk = :chapter_pk" if chapter_pk is not None else ""
+        conn.execute(f"""
+            INSERT INTO layout_search_docs (chapter_pk, item_id, row_idx, label, page_no, report_page, text)
+            SELECT i.chapter_pk, i.id, NULL, i.label, p.page_no, p.report_page, i.text
+            FROM layout_items i
+            LEFT JOIN layout_prov p ON p.item_id = i.id AND p.prov_idx = 0
+            WHERE TRIM(COALESCE(i.text, '')) != '' {scope}
+        """, {'chapter_pk': chapter_pk})
+
+        # One entry per table row, cells joined in column order
+        conn.execute(f"""
+            INSERT INTO layout_search_docs (chapter_pk, item_id, row_idx, label, page_no, report_page, text)
+            SELECT i.chapter_pk, i.id, r.row_idx,
+                   CASE WHEN r.is_header THEN 'table_header' ELSE 'table_row' END,
+                   p.page_no, p.report_page, r.text
+            FROM (
+                SELECT item_id, row_idx, MAX(is_header) AS is_header, GROUP_CONCAT(text, ' | ') AS text
+                FROM (SELECT * FROM layout_table_cells WHERE TRIM(COALESCE(text, '')) != ''
+                      ORDER BY item_id, row_idx, col_idx)
+                GROUP BY item_id, row_idx
+            ) r
+            JOIN layout_items i ON i.id = r.item_id
+            LEFT JOIN layout_prov p ON p.item_id = i.id AND p.prov_idx = 0
+            WHERE 1 {scope}
+        """, {'chapter_pk': chapter_pk})
+
+    def rebuild_search_index(self) -> int:
+        """Rebuild layout_search_docs + FTS from the stored items (databases loaded before the index)"""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM layout_search_docs")
+                conn.execute("INSERT INTO layout_fts (layout_fts) VALUES ('delete-all')")
+                self._index_search_docs(conn)
+                conn.execute("INSERT INTO layout_fts (layout_fts) VALUES ('optimize')")
+            return conn.execute("SELECT COUNT(*) FROM layout_search_docs").fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _item_row(collection: str, seq: int, item: Dict) -> Tuple:
+        """(self_ref, collection, seq, label, text, level, parent_ref, layer)"""
+        self_ref = item.get('self_ref') or f"#/{collection}/{seq}"
+        level = item.get('level')
+        return (
+            self_ref, collection, seq, _label(item), item.get('text'),
+            level if isinstance(level, int) else None,
+            _ref(item.get('parent')), item.get('content_layer')
+        )
+
+    @staticmethod
+    def _iter_pages(stream: _JsonStream, chapter_pk: int) -> Iterator[Tuple]:
+        """(chapter_pk, page_no, width, height) from the export's pages{}, skipping page images"""
+        for key in stream.members():
+            page_no, size = None, {}
+            for field in stream.members():
+                if field == 'page_no':
+                    page_no = stream.value()
+                elif field == 'size':
+                    size = stream.value() or {}
+            yield chapter_pk, page_no or int(key), size.get('width'), size.get('height')
+
+    @staticmethod
+    def _iter_edges(nodes: List[Dict], chapter_pk: int) -> Iterator[Tuple]:
+        """children[] references; section headers' children come from the hierarchy post-processor"""
+        for node in nodes:
+            parent_ref = node.get('self_ref')
+            if not parent_ref:
+                continue
+            relation = 'hierarchy' if _label(node) == 'section_header' else 'structure'
+            for position, child in enumerate(node.get('children') or []):
+                child_ref = _ref(child)
+                if child_ref:
+                    yield chapter_pk, parent_ref, child_ref, position, relation
+
+    # ========== Queries ==========
+
+    def search(self, query: str, limit: int = 20, report_id: Optional[str] = None,
+               labels: Optional[List[str]] = None, raw: bool = False) -> List[Dict]:
+        """
+        Ranked full-text search with provenance
+
+        Args:
+            query: Free text (all terms required); an FTS5 expression if raw=True
+            limit: Maximum hits
+            report_id: Restrict to one report
+            labels: Restrict to item labels, e.g. ['section_header', 'table_row']
+            raw: Pass query to MATCH unchanged (OR, NEAR, prefix*)
+
+        Returns:
+            Hits, best first: report_id, chapter, page_no, report_page, label,
+            self_ref, row_idx, snippet ([match] marked) and bm25 score
+        """
+        conn = self.connect()
+        try:
+            return self.search_with(conn, query, limit, report_id, labels, raw)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def search_with(conn: sqlite3.Connection, query: str, limit: int = 20, report_id: Optional[str] = None,
+                    labels: Optional[List[str]] = None, raw: bool = False) -> List[Dict]:
+        """search() on a caller's connection (e.g. a read-only pool)"""
+        match = query if raw else build_match_query(query)
+        if not match:
+            return []
+
+        filters, params = [], {'match': match, 'limit': limit}
+        if report_id:
+            filters.append("c.report_id = :report_id")
+            params['report_id'] = report_id
+        if labels:
+            placeholders = []
+            for n, label in enumerate(labels):
+                params[f'label{n}'] = label
+                placeholders.append(f":label{n}")
+            filters.append(f"d.label IN ({', '.join(placeholders)})")
+        where = "".join(f" AND {condition}" for condition in filters)
+
+        rows = conn.execute(f"""
+            SELECT c.report_id, c.chapter, d.page_no, d.report_page, d.label,
+                   i.self_ref, d.row_idx,
+                   snippet(layout_fts, 0, '[', ']', '…', 12) AS snippet,
+                   bm25(layout_fts) AS score
+            FROM layout_fts
+            JOIN layout_search_docs d ON d.id = layout_fts.rowid
+            JOIN layout_chapters c ON c.id = d.chapter_pk
+            JOIN layout_items i ON i.id = d.item_id
+            WHERE layout_fts MATCH :match{where}
+            ORDER BY score
+            LIMIT :limit
+        """, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def items_at_point(self, report_id: str, page: int, x: float, y: float,
+                       chapter: Optional[str] = None, top_left: bool = False) -> List[Dict]:
+        """Items whose box contains (x, y), innermost (smallest) first"""
+        return self._spatial_query(report_id, page, (x, y, x, y), 'point', chapter, top_left)
+
+    def items_in_rect(self, report_id: str, page: int, bbox: Tuple[float, float, float, float],
+                      chapter: Optional[str] = None, top_left: bool = False) -> List[Dict]:
+        """Items entirely inside bbox (l, t, r, b), in reading order"""
+        return self._spatial_query(report_id, page, bbox, 'within', chapter, top_left)
+
+    def items_overlapping(self, report_id: str, page: int, bbox: Tuple[float, float, float, float],
+                          chapter: Optional[str] = None, top_left: bool = False) -> List[Dict]:
+        """Items whose box intersects bbox (l, t, r, b), in reading order"""
+        return self._spatial_query(report_id, page, bbox, 'overlap', chapter, top_left)
+
+    def overlapping_pairs(self, report_id: str, page: int, chapter: Optional[str] = None) -> List[Dict]:
+        """Pairs of items on a page whose boxes intersect (layout review)"""
+        conn = self.connect()
+        try:
+            pairs = []
+            for chapter_pk, page_no, _ in self._page_keys(conn, report_id, page, chapter):
+                rows = conn.execute("""
+                    SELECT a.id AS a_id, b.id AS b_id,
+                           (MIN(a.max_x, b.max_x) - MAX(a.min_x, b.min_x)) *
+                           (MIN(a.max_y, b.max_y) - MAX(a.min_y, b.min_y)) AS overlap_area
+                    FROM layout_rtree a, layout_rtree b
+                    WHERE a.min_chapter = :chapter_pk AND a.min_page = :page_no
+                      AND b.min_chapter = :chapter_pk AND b.min_page = :page_no
+                      AND b.id > a.id
+                      AND b.max_x > a.min_x AND b.min_x < a.max_x
+                      AND b.max_y > a.min_y AND b.min_y < a.max_y
+                """, {'chapter_pk': chapter_pk, 'page_no': page_no}).fetchall()
+                if not rows:
+                    continue
+                boxes = self._boxes(conn, {row['a_id'] for row in rows} | {row['b_id'] for row in rows})
+                pairs.extend({
+                    'a': boxes[row['a_id']],
+                    'b': boxes[row['b_id']],
+                    'overlap_area': row['overlap_area']
+                } for row in rows)
+        finally:
+            conn.close()
+        return sorted(pairs, key=lambda pair: -pair['overlap_area'])
+
+    @staticmethod
+    def _page_keys(conn: sqlite3.Connection, report_id: str, page: int,
+                   chapter: Optional[str]) -> List[Tuple[int, int, Optional[float]]]:
+        """(chapter_pk, chapter page, page height) for a report page, or a chapter page if chapter is given"""
+        if chapter:
+            keys = conn.execute(
+                "SELECT id, :page FROM layout_chapters WHERE report_id = :report_id AND chapter = :chapter",
+                {'report_id': report_id, 'chapter': chapter, 'page': page}
+            ).fetchall()
+        else:
+            keys = conn.execute("""
+                SELECT id, :page - page_offset FROM layout_chapters
+                WHERE report_id = :report_id AND page_offset IS NOT NULL AND :page - page_offset >= 1
+            """, {'report_id': report_id, 'page': page}).fetchall()
+
+        result = []
+        for chapter_pk, page_no in keys:
+            height = conn.execute(
+                "SELECT height FROM layout_pages WHERE chapter_pk = ? AND page_no = ?", (chapter_pk, page_no)
+            ).fetchone()
+            result.append((chapter_pk, page_no, height[0] if height else None))
+        return result
+
+    def _spatial_query(self, report_id: str, page: int, bbox: Tuple[float, float, float, float],
+                       mode: str, chapter: Optional[str], top_left: bool) -> List[Dict]:
+        l, t, r, b = bbox
+        conditions = {
+            'point': "min_x <= :l AND max_x >= :r AND min_y <= :b AND max_y >= :t",
+            'within': "min_x >= :l AND max_x <= :r AND min_y >= :b AND max_y <= :t",
+            'overlap': "max_x >= :l AND min_x <= :r AND max_y >= :b AND min_y <= :t",
+        }[mode]
+
+        conn = self.connect()
+        try:
+            ids = []
+            for chapter_pk, page_no, height in self._page_keys(conn, report_id, page, chapter):
+                if top_left:
+                    if height is None:
+                        continue
+                    ys = (height - t, height - b)
+                else:
+                    ys = (t, b)
+                # R*Tree bounds are float32, rounded outwards: widen 'within' by a hair
+                slack = 1e-3 if mode == 'within' else 0.0
+                params = {
+                    'chapter_pk': chapter_pk, 'page_no': page_no,
+                    'l': min(l, r) - slack, 'r': max(l, r) + slack,
+                    'b': min(ys) - slack, 't': max(ys) + slack
+                }
+                ids.extend(row[0] for row in conn.execute(f"""
+                    SELECT id FROM layout_rtree
+                    WHERE min_chapter = :chapter_pk AND max_chapter = :chapter_pk
+                      AND min_page = :page_no AND max_page = :page_no
+                      AND {conditions}
+                """, params))
+            boxes = self._boxes(conn, ids)
+        finally:
+            conn.close()
+
+        items = [boxes[box_id] for box_id in ids]
+        if mode == 'point':
+            return sorted(items, key=lambda item: item['area'])
+        return sorted(items, key=lambda item: (-item['bbox'][1], item['bbox'][0]))
+
+    @staticmethod
+    def _boxes(conn: sqlite3.Connection, ids) -> Dict[int, Dict]:
+        """Item details for R*Tree ids; bbox is (l, t, r, b) with a bottom-left origin"""
+        ids = list(ids)
+        boxes = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f"""
+                SELECT rt.id, c.report_id, c.chapter, p.page_no, p.report_page,
+                       i.self_ref, i.label, i.text,
+                       rt.min_x, rt.max_y, rt.max_x, rt.min_y
+                FROM layout_rtree rt
+                JOIN layout_prov p ON p.id = rt.id
+                JOIN layout_items i ON i.id = p.item_id
+                JOIN layout_chapters c ON c.id = i.chapter_pk
+                WHERE rt.id IN ({', '.join('?' * len(chunk))})
+            """, chunk).fetchall()
+            for row in rows:
+                bbox = (row['min_x'], row['max_y'], row['max_x'], row['min_y'])
+                boxes[row['id']] = {
+                    'report_id': row['report_id'],
+                    'chapter': row['chapter'],
+                    'page_no': row['page_no'],
+                    'report_page': row['report_page'],
+                    'self_ref': row['self_ref'],
+                    'label': row['label'],
+                    'text': row['text'],
+                    'bbox': bbox,
+                    'area': (bbox[2] - bbox[0]) * (bbox[1] - bbox[3])
+                }
+        return boxes
+
+    def chapters(self) -> List[Dict]:
+        """Ingested chapters with their item counts"""
+        conn = self.connect()
+        try:
+            rows = conn.execute("""
+                SELECT report_id, chapter, chapter_number, page_offset, item_count, ingested_at
+                FROM layout_chapters ORDER BY report_id, chapter
+            """).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load Docling layout JSON into the layout database")
+    parser.add_argument("path", nargs="?", help=f"{LAYOUT_FILE_NAME} file or an outputs directory")
+    parser.add_argument("--report", default=None, help="Report ID (single file; default: inferred)")
+    parser.add_argument("--chapter", default=None, help="Chapter key, e.g. capitulo_03 (single file)")
+    parser.add_argument("--db", default=None, help=f"SQLite file (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--replace", action="store_true", help="Replace chapters already in the database")
+    parser.add_argument("--rebuild-search", action="store_true", help="Rebuild the full-text index")
+    parser.add_argument("--rebuild-spatial", action="store_true", help="Rebuild the R*Tree box index")
+    parser.add_argument("--search", default=None, help="Full-text query (e.g. \"interruptor 52J1 S/E Cardones\")")
+    parser.add_argument("--limit", type=int, default=10, help="Search hits to show")
+    args = parser.parse_args()
+
+    db = LayoutDatabase(args.db)
+
+    if args.rebuild_search:
+        print(f"✅ Search index rebuilt: {db.rebuild_search_index()} entries")
+    if args.rebuild_spatial:
+        print(f"✅ Spatial index rebuilt: {db.rebuild_spatial_index()} boxes")
+    if args.search:
+        for hit in db.search(args.search, limit=args.limit, report_id=args.report):
+            page = hit['report_page'] or hit['page_no']
+            print(f"{hit['score']:8.2f}  {hit['report_id']} {hit['chapter']} p.{page} "
+                  f"[{hit['label']}] {hit['snippet']}")
+    if not args.path:
+        return
+
+    path = Path(args.path)
+    if path.is_dir():
+        results = db.ingest_outputs(str(path), replace=args.replace)
+    else:
+        results = [db.ingest_layout_json(str(path), args.report, args.chapter, replace=args.replace)]
+
+    for result in results:
+        if result['status'] == 'skipped':
+            print(f"⏭  {result['report_id']} {result['chapter']}: already ingested (use --replace)")
+        else:
+            print(f"✅ {result['report_id']} {result['chapter']}: {result['items']} items, "
+                  f"{result['prov']} boxes, {result['edges']} edges, "
+                  f"{result['tables']} tables ({result['cells']} cells)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Batched Tesseract OCR
+Packs many small image crops (table rows, text blocks) and whole pages into
+one multi-page TIFF and runs a single tesseract process over all of them.
+
+pytesseract starts a new tesseract process for every call, so OCR-ing hundreds
+of small cells per report is dominated by process start-up and model loading.
+TesseractBatch stacks crops vertically on shared canvas pages (separated by a
+white gutter), writes the canvases as one multi-page TIFF, calls
+``image_to_data`` once and maps every word back to its original crop using the
+recorded canvas offsets.
+
+Stacking is only for line and region crops. A whole page is added with
+own_page=True and gets a canvas page to itself, so layout-dependent page
+segmentation sees exactly one page, as with a per-page image_to_data call.
+
+Usage:
+    batch = TesseractBatch(lang='spa+eng', config='--psm 6')
+    batch.add('generacion_total', row_image)
+    batch.add('costo_marginal', other_row_image)
+    batch.add(('page', 3), page_image, own_page=True)
+    results = batch.run()
+    results['generacion_total']['text']      # image_to_data-style columns
+    TesseractBatch.data_to_text(results['costo_marginal'])
+"""
+
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import pytesseract
+from PIL import Image
+
+
+# Columns returned per crop, same names as pytesseract.Output.DICT
+DATA_COLUMNS = [
+    'level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+    'left', 'top', 'width', 'height', 'conf', 'text'
+]
+
+
+@dataclass
+class OCRCrop:
+    """A crop registered in a batch and its placement on a canvas page"""
+    key: Hashable
+    image: Image.Image
+    own_page: bool = False
+    canvas_index: int = -1
+    x_offset: int = 0
+    y_offset: int = 0
+
+    @property
+    def width(self) -> int:
+        return self.image.width
+
+    @property
+    def height(self) -> int:
+        return self.image.height
+
+
+@dataclass
+class CanvasPage:
+    """One TIFF page holding vertically stacked crops"""
+    width: int = 0
+    height: int = 0
+    crops: List[OCRCrop] = field(default_factory=list)
+
+
+class TesseractBatch:
+    """Collects image crops and OCRs all of them with one tesseract invocation."""
+
+    def __init__(self, lang: str = 'spa+eng', config: str = '--psm 6',
+                 dpi: int = 144, gutter: int = 24, max_canvas_height: int = 8000):
+        """
+        Args:
+            lang: Tesseract language string
+            config: Extra tesseract options (page segmentation mode, etc.)
+            dpi: Resolution the crops were rendered at (written into the TIFF)
+            gutter: White separation in pixels between stacked crops
+            max_canvas_height: Height at which a new canvas page is started
+        """
+        self.lang = lang
+        self.config = config
+        self.dpi = dpi
+        self.gutter = gutter
+        self.max_canvas_height = max_canvas_height
+        self.crops: List[OCRCrop] = []
+        self._keys = set()
+
+    def __len__(self) -> int:
+        return len(self.crops)
+
+    def add(self, key: Hashable, image: Any, own_page: bool = False) -> Hashable:
+        """
+        Register a crop for the next run
+
+        Args:
+            key: Identifier used to return the crop's words (must be unique)
+            image: PIL image or NumPy array (grayscale or RGB)
+            own_page: Put the image alone on its canvas page (whole pages)
+
+        Returns:
+            The key, for chaining
+        """
+        if key in self._keys:
+            raise ValueError(f"Duplicate OCR crop key: {key!r}")
+
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
+        if image.mode != 'L':
+            image = image.convert('L')
+
+        self.crops.append(OCRCrop(key=key, image=image, own_page=own_page))
+        self._keys.add(key)
+        return key
+
+    def run(self) -> Dict[Hashable, Dict[str, List]]:
+        """
+        OCR every registered crop in a single tesseract process
+
+        Returns:
+            Dictionary keyed by crop key with image_to_data-style columns
+            (word level only), coordinates relative to the crop
+        """
+        results = {crop.key: {column: [] for column in DATA_COLUMNS} for crop in self.crops}
+        if not self.crops:
+            return results
+
+        canvases = self._pack()
+        data = self._ocr_canvases(canvases)
+
+        for i in range(len(data['text'])):
+            text = str(data['text'][i]).strip()
+            if not text:
+                continue
+
+            canvas = canvases[int(data['page_num'][i]) - 1]
+            left, top = int(data['left'][i]), int(data['top'][i])
+            width, height = int(data['width'][i]), int(data['height'][i])
+
+            crop = self._crop_at(canvas, left + width / 2, top + height / 2)
+            if crop is None:
+                continue
+
+            word = results[crop.key]
+            for column in DATA_COLUMNS:
+                word[column].append(data[column][i])
+            word['page_num'][-1] = 1
+            word['left'][-1] = left - crop.x_offset
+            word['top'][-1] = top - crop.y_offset
+
+        self.crops = []
+        self._keys = set()
+        return results
+
+    def _pack(self) -> List[CanvasPage]:
+        """Stack crops top to bottom, starting a new canvas page when full or for an own_page crop"""
+        canvases: List[CanvasPage] = []
+        current = CanvasPage(height=self.gutter)
+
+        for crop in self.crops:
+            needed = crop.height + self.gutter
+            full = current.height + needed > self.max_canvas_height
+            follows_own_page = current.crops and current.crops[0].own_page
+            if current.crops and (full or crop.own_page or follows_own_page):
+                canvases.append(current)
+                current = CanvasPage(height=self.gutter)
+
+            crop.canvas_index = len(canvases)
+            crop.x_offset = self.gutter
+            crop.y_offset = current.height
+            current.crops.append(crop)
+            current.height += needed
+            current.width = max(current.width, crop.width + 2 * self.gutter)
+
+        canvases.append(current)
+        return canvases
+
+    def _render(self, canvas: CanvasPage) -> Image.Image:
+        image = Image.new('L', (canvas.width, canvas.height), 255)
+        for crop in canvas.crops:
+            image.paste(crop.image, (crop.x_offset, crop.y_offset))
+        return image
+
+    def _ocr_canvases(self, canvases: List[CanvasPage]) -> Dict[str, List]:
+        """Write canvases as one multi-page TIFF and run image_to_data on it"""
+        pages = [self._render(canvas) for canvas in canvases]
+
+        fd, tiff_path = tempfile.mkstemp(suffix='.tif', prefix='ocr_batch_')
+        os.close(fd)
+        try:
+            pages[0].save(tiff_path, save_all=True, append_images=pages[1:],
+                          dpi=(self.dpi, self.dpi))
+            return pytesseract.image_to_data(
+                tiff_path,
+                lang=self.lang,
+                config=self.config,
+                output_type=pytesseract.Output.DICT
+            )
+        finally:
+            os.remove(tiff_path)
+
+    @staticmethod
+    def _crop_at(canvas: CanvasPage, x: float, y: float) -> Optional[OCRCrop]:
+        """Find the crop containing a canvas point (crops never overlap)"""
+        for crop in canvas.crops:
+            if (crop.x_offset <= x < crop.x_offset + crop.width and
+                    crop.y_offset <= y < crop.y_offset + crop.height):
+                return crop
+        return None
+
+    @staticmethod
+    def data_to_text(data: Dict[str, List], line_tolerance: int = 10) -> str:
+        """
+        Rebuild plain text from image_to_data-style columns
+
+        Args:
+            data: Columns for one crop as returned by run()
+            line_tolerance: Max vertical distance (px) between words on the same line
+
+        Returns:
+            Text with one OCR line per text line
+        """
+        words: List[Tuple[int, int, str]] = [
+            (int(data['top'][i]), int(data['left'][i]), str(data['text'][i]).strip())
+            for i in range(len(data['text']))
+            if str(data['text'][i]).strip()
+        ]
+        words.sort()
+
+        lines: List[List[Tuple[int, int, str]]] = []
+        for word in words:
+            if lines and abs(word[0] - lines[-1][0][0]) <= line_tolerance:
+                lines[-1].append(word)
+            else:
+                lines.append([word])
+
+        return '\n'.join(
+            ' '.join(text for _, _, text in sorted(line, key=lambda w: w[1]))
+            for line in lines
+        )
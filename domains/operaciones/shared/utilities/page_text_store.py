@@ -0,0 +1,205 @@
+"""
+Shared Page Text Store
+Extract the text of every page once, in parallel, into a file that any
+process can read.
+
+PyPDF2 text extraction is pure Python and GIL-bound, so threads do not help
+and every chapter worker that opens the PDF pays the parse again. The store
+splits the document into page shards, extracts them in a process pool and
+writes all pages into one UTF-8 blob plus an offset index:
+
+    <name>.bin        concatenated page texts
+    <name>.idx.json   source fingerprint, engine and byte offsets per page
+
+Readers memory-map the blob, so chapter workers in other processes share the
+OS page cache instead of copies. A store is reused while the source file
+(size + mtime) and engine are unchanged.
+
+Pages are 1-indexed, like PageTextProvider.
+
+Usage:
+    store = PageTextStore.open_or_build(pdf_path, store_dir, engine='pypdf2')
+    store.text(12)
+    store.texts(12, 90)
+
+    # Stores pickle by path, so they can be passed to worker processes
+    executor.submit(work, store, 12, 90)
+"""
+
+import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pdf_document_pool import DocumentPool, get_text_provider
+
+STORE_VERSION = 1
+
+
+def _source_fingerprint(pdf_path: str, engine: str) -> Dict:
+    stat = Path(pdf_path).stat()
+    return {
+        'source': str(Path(pdf_path).resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'engine': engine,
+        'version': STORE_VERSION
+    }
+
+
+# Worker-local pool: forked workers must not share the parent's open file
+# handles (and their seek positions) with each other
+_worker_pool: Optional[DocumentPool] = None
+
+
+def _init_worker() -> None:
+    global _worker_pool
+    _worker_pool = DocumentPool(max_documents=2)
+
+
+def _extract_shard(pdf_path: str, engine: str, pages: List[int]) -> List[str]:
+    """Worker: text of some 1-indexed pages"""
+    if _worker_pool is not None:
+        provider = _worker_pool.get_text_provider(pdf_path, engine=engine)
+    else:
+        provider = get_text_provider(pdf_path, engine=engine)
+    texts = []
+    for page_num in pages:
+        try:
+            texts.append(provider.text(page_num))
+        except Exception:
+            texts.append("")
+    return texts
+
+
+class PageTextStore:
+    """Read-only, memory-mapped page texts of one document."""
+
+    def __init__(self, store_path: str):
+        """
+        Args:
+            store_path: Store path without suffix (<store_path>.bin / .idx.json)
+        """
+        self.store_path = str(store_path)
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.offsets: List[int] = self.index['offsets']
+        self._file = None
+        self._map = None
+
+    @property
+    def blob_path(self) -> str:
+        return f"{self.store_path}.bin"
+
+    @property
+    def index_path(self) -> str:
+        return f"{self.store_path}.idx.json"
+
+    @property
+    def page_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def _buffer(self):
+        if self._map is None:
+            self._file = open(self.blob_path, 'rb')
+            if os.fstat(self._file.fileno()).st_size == 0:
+                self._map = b""
+            else:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def text(self, page_num: int) -> str:
+        """Text of a 1-indexed page ("" outside the document)"""
+        if not 1 <= page_num <= self.page_count:
+            return ""
+        start, end = self.offsets[page_num - 1], self.offsets[page_num]
+        return self._buffer()[start:end].decode('utf-8')
+
+    def texts(self, start_page: int, end_page: int) -> List[str]:
+        """Texts for an inclusive 1-indexed page range (clipped to the document)"""
+        last = min(end_page, self.page_count)
+        return [self.text(page_num) for page_num in range(max(1, start_page), last + 1)]
+
+    def close(self) -> None:
+        if self._map is not None and not isinstance(self._map, bytes):
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = None
+        self._file = None
+
+    # Pickle by path: worker processes reopen (and re-map) the same files
+    def __getstate__(self):
+        return {'store_path': self.store_path}
+
+    def __setstate__(self, state):
+        self.__init__(state['store_path'])
+
+    def is_current(self, pdf_path: str, engine: str) -> bool:
+        """True when the store was built from this file version and engine"""
+        fingerprint = _source_fingerprint(pdf_path, engine)
+        return all(self.index.get(key) == value for key, value in fingerprint.items())
+
+    @classmethod
+    def build(cls, pdf_path: str, store_path: str, engine: str = 'pypdf2',
+              max_workers: Optional[int] = None, shard_pages: int = 25) -> 'PageTextStore':
+        """
+        Extract every page in parallel shards and write the store
+
+        Args:
+            pdf_path: Source PDF
+            store_path: Store path without suffix
+            engine: 'pypdf2' or 'pymupdf' (see PageTextProvider)
+            max_workers: Worker processes (None = CPU count)
+            shard_pages: Pages per worker task
+
+        Returns:
+            The opened store
+        """
+        page_count = get_text_provider(str(pdf_path), engine=engine).page_count
+        pages = list(range(1, page_count + 1))
+        shards = [pages[i:i + shard_pages] for i in range(0, len(pages), shard_pages)]
+        workers = min(max_workers or os.cpu_count() or 1, max(1, len(shards)))
+
+        if workers <= 1 or len(shards) <= 1:
+            shard_texts = [_extract_shard(str(pdf_path), engine, shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                shard_texts = list(executor.map(
+                    _extract_shard, [str(pdf_path)] * len(shards), [engine] * len(shards), shards
+                ))
+
+        Path(store_path).parent.mkdir(parents=True, exist_ok=True)
+        offsets = [0]
+        blob_tmp = f"{store_path}.bin.tmp"
+        with open(blob_tmp, 'wb') as f:
+            for texts in shard_texts:
+                for text in texts:
+                    data = text.encode('utf-8')
+                    f.write(data)
+                    offsets.append(offsets[-1] + len(data))
+
+        index = _source_fingerprint(str(pdf_path), engine)
+        index['offsets'] = offsets
+        index_tmp = f"{store_path}.idx.json.tmp"
+        with open(index_tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+
+        # Blob first, index last: a readable index always points at a complete blob
+        os.replace(blob_tmp, f"{store_path}.bin")
+        os.replace(index_tmp, f"{store_path}.idx.json")
+        return cls(store_path)
+
+    @classmethod
+    def open_or_build(cls, pdf_path: str, store_dir: str, engine: str = 'pypdf2',
+                      max_workers: Optional[int] = None) -> 'PageTextStore':
+        """Reuse an up-to-date store in store_dir, or build it"""
+        store_path = str(Path(store_dir) / f"{Path(pdf_path).stem}.{engine}")
+        if Path(f"{store_path}.idx.json").exists() and Path(f"{store_path}.bin").exists():
+            store = cls(store_path)
+            if store.is_current(str(pdf_path), engine):
+                return store
+            store.close()
+        return cls.build(pdf_path, store_path, engine=engine, max_workers=max_workers)
@@ -0,0 +1,278 @@
+"""
+PDF Document Pool and Page Text Provider
+Process-wide cache of open PDF handles plus memoized per-page text access.
+
+Every processor used to open the source PDF on its own (PyPDF2 PdfReader per
+call, fitz.open per instance), so the xref table of a 400-page report was
+parsed again and again. DocumentPool keeps an LRU of open documents keyed by
+(path, mtime, backend); PageTextProvider sits on top of it and memoizes plain
+text, the fitz "dict" layout and word lists per page.
+
+Pages are 1-indexed throughout, like the chapter processors.
+
+Usage:
+    provider = get_text_provider(pdf_path)              # PyMuPDF text
+    provider.text(5)
+    provider.dict(5)["blocks"]
+    provider.words(5)
+
+    legacy = get_text_provider(pdf_path, engine='pypdf2')  # PyPDF2 text
+    legacy.text(5)
+
+Returned dicts and lists are shared between callers and must be treated as
+read-only. fitz documents are not thread-safe: a provider serializes its own
+page reads on the document, but only cache bookkeeping holds the provider
+lock, so memoized pages are served to other threads while a page is parsed.
+Code that reads a pooled document directly guards it itself.
+
+Handles are checked out: get_fitz() / get_pypdf() keep the document open
+until release(); everything else takes `with pool.lease(path) as doc:` or
+`with provider.page(n) as page:`, so no handle outlives its use. LRU
+eviction never closes a handle that is checked out; it is closed on its last
+release instead.
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+ENGINES = ('pymupdf', 'pypdf2')
+
+
+def _document_key(pdf_path: str, backend: str) -> Tuple[str, int, str]:
+    """(resolved path, mtime in ns, backend): a rewritten file gets a new handle"""
+    path = Path(pdf_path).resolve()
+    return str(path), path.stat().st_mtime_ns, backend
+
+
+class _LRU:
+    """Minimal ordered LRU cache with an eviction callback"""
+
+    def __init__(self, capacity: int, on_evict=None):
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.items: 'OrderedDict[Hashable, Any]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            old_key, old_value = self.items.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key: Hashable) -> Any:
+        return self.items.pop(key, None)
+
+    def clear(self) -> None:
+        while self.items:
+            old_key, old_value = self.items.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(old_key, old_value)
+
+
+class DocumentPool:
+    """LRU pool of open PDF documents shared by all processors in the process."""
+
+    def __init__(self, max_documents: int = 8):
+        self._lock = threading.RLock()
+        self._documents = _LRU(max_documents, on_evict=self._evict)
+        self._refs: Dict[int, int] = {}          # id(document) -> checkouts not yet released
+        self._detached: Dict[int, Any] = {}      # evicted while checked out, closed on last release
+        self._providers: Dict[Tuple[str, int, str], 'PageTextProvider'] = {}
+
+    @staticmethod
+    def _close(document) -> None:
+        close = getattr(document, 'close', None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def _evict(self, key, document) -> None:
+        if self._refs.get(id(document)):
+            self._detached[id(document)] = document
+        else:
+            self._close(document)
+
+    def _get(self, pdf_path: str, backend: str):
+        """Check out a pooled document (one release() per call)"""
+        key = _document_key(pdf_path, backend)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                document = self._open(key[0], backend)
+                self._documents.put(key, document)
+            self._refs[id(document)] = self._refs.get(id(document), 0) + 1
+            return document
+
+    def release(self, document) -> None:
+        """Return a checked-out document; closes it if it was evicted meanwhile"""
+        with self._lock:
+            refs = self._refs.get(id(document), 0) - 1
+            if refs > 0:
+                self._refs[id(document)] = refs
+                return
+            self._refs.pop(id(document), None)
+            detached = self._detached.pop(id(document), None)
+        if detached is not None:
+            self._close(detached)
+
+    @contextmanager
+    def lease(self, pdf_path: str, backend: str = 'pymupdf'):
+        """Document checked out for the duration of a with block"""
+        document = self._get(pdf_path, backend)
+        try:
+            yield document
+        finally:
+            self.release(document)
+
+    @staticmethod
+    def _open(path: str, backend: str):
+        if backend == 'pymupdf':
+            import fitz  # PyMuPDF
+            return fitz.open(path)
+        if backend == 'pypdf2':
+            from PyPDF2 import PdfReader
+            return PdfReader(path)
+        raise ValueError(f"Unknown PDF backend: {backend}")
+
+    def get_fitz(self, pdf_path: str):
+        """Check out (open or reuse) a PyMuPDF document; open until release()"""
+        return self._get(pdf_path, 'pymupdf')
+
+    def get_pypdf(self, pdf_path: str):
+        """Check out (open or reuse) a PyPDF2 PdfReader; open until release()"""
+        return self._get(pdf_path, 'pypdf2')
+
+    def get_text_provider(self, pdf_path: str, engine: str = 'pymupdf') -> 'PageTextProvider':
+        """Shared PageTextProvider for a file, so memoized pages are reused"""
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown text engine: {engine}")
+        key = _document_key(pdf_path, engine)
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is None:
+                # Drop providers of older versions of the same file
+                for old_key in [k for k in self._providers if k[0] == key[0] and k[2] == engine]:
+                    del self._providers[old_key]
+                provider = PageTextProvider(pdf_path, engine=engine, pool=self)
+                self._providers[key] = provider
+            return provider
+
+    def close_all(self) -> None:
+        """Close every pooled document, checked out or not, and drop all memoized pages"""
+        with self._lock:
+            self._refs.clear()
+            self._documents.clear()
+            for document in self._detached.values():
+                self._close(document)
+            self._detached.clear()
+            self._providers.clear()
+
+
+class PageTextProvider:
+    """Uniform, memoized per-page access to text, layout dict and words."""
+
+    def __init__(self, pdf_path: str, engine: str = 'pymupdf',
+                 pool: Optional[DocumentPool] = None, max_cached_pages: int = 256):
+        """
+        Args:
+            pdf_path: Source PDF
+            engine: 'pymupdf' or 'pypdf2' for text(); dict() and words() always use PyMuPDF
+            pool: Document pool (defaults to the process-wide pool)
+            max_cached_pages: Memoized page results kept per provider
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown text engine: {engine}")
+        self.pdf_path = str(pdf_path)
+        self.engine = engine
+        self.pool = pool or get_document_pool()
+        self._lock = threading.Lock()           # cache bookkeeping only
+        self._read_lock = threading.Lock()      # page reads on the shared handle
+        self._cache = _LRU(max_cached_pages)
+
+    @contextmanager
+    def document(self):
+        """Leased pooled fitz.Document (drawings, images, pixmaps, tables) for a with block"""
+        with self.pool.lease(self.pdf_path) as document:
+            yield document
+
+    @property
+    def page_count(self) -> int:
+        backend = 'pypdf2' if self.engine == 'pypdf2' else 'pymupdf'
+        with self.pool.lease(self.pdf_path, backend) as document:
+            return len(document.pages) if backend == 'pypdf2' else len(document)
+
+    @contextmanager
+    def page(self, page_num: int):
+        """fitz.Page for a 1-indexed page number, valid inside the with block"""
+        with self.document() as document:
+            yield document[page_num - 1]
+
+    def _memoized(self, kind: str, page_num: int, compute):
+        key = (kind, page_num)
+        with self._lock:
+            value = self._cache.get(key)
+        if value is None:
+            value = compute()
+            with self._lock:
+                self._cache.put(key, value)
+        return value
+
+    def _read(self, backend: str, read):
+        """read(document) on a leased handle, one page read at a time"""
+        with self.pool.lease(self.pdf_path, backend) as document, self._read_lock:
+            return read(document)
+
+    def text(self, page_num: int) -> str:
+        """Plain text of a 1-indexed page using the provider's engine"""
+        if self.engine == 'pypdf2':
+            def compute():
+                return self._read('pypdf2', lambda reader: reader.pages[page_num - 1].extract_text() or "")
+        else:
+            def compute():
+                return self._read('pymupdf', lambda doc: doc[page_num - 1].get_text())
+        return self._memoized('text', page_num, compute)
+
+    def dict(self, page_num: int) -> Dict:
+        """PyMuPDF get_text("dict") of a 1-indexed page"""
+        return self._memoized('dict', page_num, lambda: self._read(
+            'pymupdf', lambda doc: doc[page_num - 1].get_text("dict")))
+
+    def words(self, page_num: int) -> List[Tuple]:
+        """PyMuPDF get_text("words") of a 1-indexed page"""
+        return self._memoized('words', page_num, lambda: self._read(
+            'pymupdf', lambda doc: doc[page_num - 1].get_text("words")))
+
+    def texts(self, start_page: int, end_page: int) -> List[str]:
+        """Plain text for an inclusive 1-indexed page range (clipped to the document)"""
+        last = min(end_page, self.page_count)
+        return [self.text(page_num) for page_num in range(start_page, last + 1)]
+
+
+_default_pool: Optional[DocumentPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_document_pool() -> DocumentPool:
+    """Process-wide DocumentPool (created on first use)"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DocumentPool()
+        return _default_pool
+
+
+def get_text_provider(pdf_path: str, engine: str = 'pymupdf') -> PageTextProvider:
+    """Shared PageTextProvider from the process-wide pool"""
+    return get_document_pool().get_text_provider(pdf_path, engine=engine)
@@ -0,0 +1,242 @@
+"""
+Pipeline Profiles
+Docling pipeline settings tuned per machine, persisted by fingerprint.
+
+check_gpu.py / check_gpu_vram() only pick between two hard-coded profiles
+(ACCURATE + SmolVLM with >= 3 GB VRAM, FAST otherwise), and our CPU nodes
+have no GPU at all. AUTOTUNE_PIPELINE.py calibrates on a sample of pages
+and stores the fastest settings here:
+
+- threads:         torch intra-op threads per conversion (AcceleratorOptions
+                   num_threads, OMP_NUM_THREADS, torch.set_num_threads)
+- workers:         parallel conversion processes (threads * workers <= CPUs)
+- page_batch_size: Docling settings.perf.page_batch_size
+- table_mode:      TableFormer FAST or ACCURATE
+
+The machine fingerprint covers the CPU model, usable CPUs, memory, GPU
+presence and the torch / docling versions, so a profile is re-tuned after
+an upgrade or on a different node type instead of being applied blindly.
+Profiles live in data/pipeline_profiles.json (machine-local, not tracked).
+
+Usage:
+    profile = get_profile_store().current()      # None until tuned
+    if profile:
+        apply_profile(pipeline_options, profile)
+"""
+
+import hashlib
+import json
+import os
+import platform
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Project root: utilities -> shared -> operaciones -> domains -> root
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
+DEFAULT_PROFILES_PATH = PROJECT_ROOT / "data" / "pipeline_profiles.json"
+
+PROFILES_VERSION = 1
+
+
+def _package_version(name: str) -> Optional[str]:
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return None
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def usable_cpus() -> int:
+    """CPUs this process may run on (affinity / cgroup cpuset), else cpu_count"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", 'r') as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _memory_gb() -> Optional[float]:
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return round(int(line.split()[1]) / (1024 * 1024), 1)
+    except OSError:
+        pass
+    return None
+
+
+def _has_gpu() -> bool:
+    try:
+        import torch
+        return bool(torch.cuda.is_available())
+    except ImportError:
+        return False
+
+
+def machine_fingerprint() -> Dict:
+    """What the throughput of a Docling conversion depends on"""
+    return {
+        'cpu_model': _cpu_model(),
+        'cpus': usable_cpus(),
+        'memory_gb': _memory_gb(),
+        'system': platform.system(),
+        'machine': platform.machine(),
+        'gpu': _has_gpu(),
+        'torch': _package_version('torch'),
+        'docling': _package_version('docling'),
+    }
+
+
+def fingerprint_key(fingerprint: Optional[Dict] = None) -> str:
+    fingerprint = fingerprint or machine_fingerprint()
+    return hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+@dataclass
+class PipelineProfile:
+    """Tuned Docling settings and the throughput they reached"""
+    threads: int
+    workers: int = 1
+    page_batch_size: int = 4
+    table_mode: str = "accurate"           # "fast" | "accurate"
+    device: str = "cpu"                    # "cpu" | "auto"
+    pages_per_second: float = 0.0
+    peak_rss_mb: float = 0.0
+    sample_pages: int = 0
+    tuned_at: str = ""
+    trials: List[Dict] = field(default_factory=list)
+
+    def describe(self) -> str:
+        return (f"{self.workers} worker(s) x {self.threads} thread(s), batch {self.page_batch_size}, "
+                f"TableFormer {self.table_mode.upper()}, {self.pages_per_second:.2f} pages/s")
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PipelineProfile":
+        known = {name for name in cls.__dataclass_fields__}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+class ProfileStore:
+    """JSON store of pipeline profiles keyed by machine fingerprint"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else DEFAULT_PROFILES_PATH
+        self._lock = threading.RLock()
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            data = {}
+        data.setdefault("version", PROFILES_VERSION)
+        data.setdefault("machines", {})
+        return data
+
+    def save(self) -> None:
+        """Atomic write (temp file + rename) so readers never see half a file"""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=".pipeline_profiles_", suffix=".json")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, indent=2, ensure_ascii=False)
+                    f.write("\n")
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def get(self, key: str) -> Optional[PipelineProfile]:
+        entry = self.data["machines"].get(key)
+        return PipelineProfile.from_dict(entry["profile"]) if entry else None
+
+    def current(self) -> Optional[PipelineProfile]:
+        """Profile of this machine, or None if it was never tuned"""
+        return self.get(fingerprint_key())
+
+    def put(self, profile: PipelineProfile, fingerprint: Optional[Dict] = None) -> str:
+        fingerprint = fingerprint or machine_fingerprint()
+        key = fingerprint_key(fingerprint)
+        if not profile.tuned_at:
+            profile.tuned_at = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self.data["machines"][key] = {'fingerprint': fingerprint, 'profile': asdict(profile)}
+            self.save()
+        return key
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_profile_store(path: Optional[Path] = None) -> ProfileStore:
+    """Process-wide store (data/pipeline_profiles.json unless path is given)"""
+    global _default_store
+    if path is not None:
+        return ProfileStore(path)
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ProfileStore()
+        return _default_store
+
+
+def set_thread_count(threads: int) -> None:
+    """Intra-op threads of this process: OpenMP/MKL environment and torch"""
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def apply_profile(pipeline_options, profile: PipelineProfile) -> None:
+    """
+    Apply a profile to PdfPipelineOptions and to this process
+
+    Threads, device and TableFormer mode go into pipeline_options; the page
+    batch size is a process-wide Docling setting.
+    """
+    from docling.datamodel.pipeline_options import TableFormerMode
+    try:
+        from docling.datamodel.accelerator_options import AcceleratorDevice, AcceleratorOptions
+    except ImportError:
+        from docling.datamodel.pipeline_options import AcceleratorDevice, AcceleratorOptions
+    from docling.datamodel.settings import settings
+
+    set_thread_count(profile.threads)
+    device = AcceleratorDevice.CPU if profile.device == "cpu" else AcceleratorDevice.AUTO
+    pipeline_options.accelerator_options = AcceleratorOptions(num_threads=profile.threads, device=device)
+    pipeline_options.table_structure_options.mode = (
+        TableFormerMode.FAST if profile.table_mode == "fast" else TableFormerMode.ACCURATE
+    )
+    settings.perf.page_batch_size = profile.page_batch_size
+
+
+if __name__ == "__main__":
+    fingerprint = machine_fingerprint()
+    print(json.dumps(fingerprint, indent=2))
+    profile = get_profile_store().current()
+    print(f"Key: {fingerprint_key(fingerprint)}")
+    print(f"Profile: {profile.describe() if profile else 'not tuned (run AUTOTUNE_PIPELINE.py)'}")
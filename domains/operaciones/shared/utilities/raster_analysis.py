@@ -0,0 +1,243 @@
+"""
+Raster Analysis Utilities
+Vectorized color and line analysis over rendered PDF pages.
+
+A PageRaster wraps a PyMuPDF Pixmap as a zero-copy NumPy view of its sample
+buffer and lazily caches the derived images (RGB, BGR, grayscale, Otsu and
+adaptive thresholds, ink mask) so that several analyses over the same render
+do not each re-encode the pixmap (PNG/PPM round trips) or re-convert it.
+
+Color statistics pack every RGB pixel into one integer (0xRRGGBB) and count
+them with np.unique; legend colors are matched with broadcasting instead of
+per-pixel Python loops.
+"""
+
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def pack_rgb(rgb: np.ndarray) -> np.ndarray:
+    """Pack an (..., 3) uint8 RGB array into (...) uint32 0xRRGGBB values"""
+    rgb = rgb.astype(np.uint32, copy=False)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def unpack_rgb(packed: np.ndarray) -> np.ndarray:
+    """Inverse of pack_rgb: (...) uint32 -> (..., 3) int32"""
+    packed = np.asarray(packed, dtype=np.uint32)
+    return np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=-1).astype(np.int32)
+
+
+def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
+    """Convert '#RRGGBB' to an (r, g, b) tuple"""
+    value = hex_color.lstrip('#')
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
+def packed_to_hex(packed: int) -> str:
+    """Convert a 0xRRGGBB integer to '#rrggbb' (same format as the processors)"""
+    return f"#{int(packed):06x}"
+
+
+def detect_lines(image: np.ndarray, orientation: str, kernel_length: int = 40,
+                 min_length: int = 100, max_thickness: int = 10) -> List[Tuple[int, int, int, int]]:
+    """
+    Detect straight ruling lines with a morphological opening
+
+    Args:
+        image: Single-channel image; PageRaster passes the grayscale render,
+            as the per-processor detectors did (contours of any nonzero area)
+        orientation: 'horizontal' or 'vertical'
+        kernel_length: Length of the structuring element in pixels
+        min_length: Minimum line length to keep
+        max_thickness: Maximum line thickness to keep
+
+    Returns:
+        List of (x0, y0, x1, y1) line boxes in pixel coordinates, in contour order
+    """
+    if orientation == 'horizontal':
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_length, 1))
+    elif orientation == 'vertical':
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, kernel_length))
+    else:
+        raise ValueError(f"Unknown line orientation: {orientation}")
+
+    opened = cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel)
+    contours, _ = cv2.findContours(opened, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    lines = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        length, thickness = (w, h) if orientation == 'horizontal' else (h, w)
+        if length > min_length and thickness < max_thickness:
+            lines.append((x, y, x + w, y + h))
+
+    return lines
+
+
+class PageRaster:
+    """Zero-copy NumPy view over a rendered page with cached derived images."""
+
+    def __init__(self, pix):
+        """
+        Args:
+            pix: fitz.Pixmap (RGB, RGBA or grayscale). A reference is kept so the
+                 sample buffer stays alive as long as the views do.
+        """
+        self.pix = pix
+        self.width = pix.width
+        self.height = pix.height
+        self.channels = pix.n
+        self._adaptive_cache: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_page(cls, page, zoom: float = 2.0, clip=None) -> 'PageRaster':
+        """Render a fitz page (optionally a clip rect) at the given zoom"""
+        import fitz  # PyMuPDF
+        return cls(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip))
+
+    @cached_property
+    def pixels(self) -> np.ndarray:
+        """(H, W, n) uint8 view over the pixmap samples, no copy"""
+        buffer = getattr(self.pix, 'samples_mv', None)
+        if buffer is None:
+            buffer = self.pix.samples
+        flat = np.frombuffer(buffer, dtype=np.uint8)
+        rows = flat.reshape(self.height, self.pix.stride)
+        return rows[:, :self.width * self.channels].reshape(self.height, self.width, self.channels)
+
+    @cached_property
+    def rgb(self) -> np.ndarray:
+        """(H, W, 3) RGB view (alpha dropped, gray broadcast without copying)"""
+        if self.channels >= 3:
+            return self.pixels[:, :, :3]
+        return np.broadcast_to(self.pixels[:, :, :1], (self.height, self.width, 3))
+
+    @cached_property
+    def bgr(self) -> np.ndarray:
+        """Contiguous BGR image for OpenCV code that expects it"""
+        return np.ascontiguousarray(self.rgb[:, :, ::-1])
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        """Grayscale image (H, W)"""
+        if self.channels == 1:
+            return self.pixels[:, :, 0]
+        return cv2.cvtColor(np.ascontiguousarray(self.rgb), cv2.COLOR_RGB2GRAY)
+
+    @cached_property
+    def otsu_binary(self) -> np.ndarray:
+        """Otsu threshold, text black on white (as used before OCR)"""
+        _, binary = cv2.threshold(self.gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+    @cached_property
+    def ink_mask(self) -> np.ndarray:
+        """Inverted Otsu threshold: ink 255, background 0 (for morphology)"""
+        return cv2.bitwise_not(self.otsu_binary)
+
+    def adaptive_threshold(self, block_size: int = 11, c: int = 2) -> np.ndarray:
+        """Gaussian adaptive threshold, cached per (block_size, c)"""
+        key = (block_size, c)
+        if key not in self._adaptive_cache:
+            self._adaptive_cache[key] = cv2.adaptiveThreshold(
+                self.gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block_size, c
+            )
+        return self._adaptive_cache[key]
+
+    @cached_property
+    def horizontal_lines(self) -> List[Tuple[int, int, int, int]]:
+        """Horizontal ruling lines (x0, y0, x1, y1) in pixel coordinates"""
+        return detect_lines(self.gray, 'horizontal')
+
+    @cached_property
+    def vertical_lines(self) -> List[Tuple[int, int, int, int]]:
+        """Vertical ruling lines (x0, y0, x1, y1) in pixel coordinates"""
+        return detect_lines(self.gray, 'vertical')
+
+    def sampled_rgb(self, step: int = 1) -> np.ndarray:
+        """RGB pixels on a regular grid (every `step` pixels), as a view"""
+        return self.rgb[::step, ::step]
+
+    def color_histogram(self, step: int = 1, white_threshold: Optional[int] = 240,
+                        black_threshold: Optional[int] = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count colors on the page
+
+        Args:
+            step: Sampling step in pixels (1 = every pixel)
+            white_threshold: Skip pixels with r, g and b all above this (background)
+            black_threshold: Skip pixels with r, g and b all below this (text)
+
+        Returns:
+            (packed_colors, counts) ordered by count descending, ties in
+            first-seen (row-major) order
+        """
+        pixels = self.sampled_rgb(step).reshape(-1, 3)
+
+        keep = np.ones(len(pixels), dtype=bool)
+        if white_threshold is not None:
+            keep &= ~np.all(pixels > white_threshold, axis=1)
+        if black_threshold is not None:
+            keep &= ~np.all(pixels < black_threshold, axis=1)
+
+        packed = pack_rgb(pixels[keep])
+        if packed.size == 0:
+            return packed, np.zeros(0, dtype=np.int64)
+
+        colors, first_index, counts = np.unique(packed, return_index=True, return_counts=True)
+        order = np.lexsort((first_index, -counts))
+        return colors[order], counts[order]
+
+    def dominant_colors(self, top: int = 10, min_count: int = 50, step: int = 1,
+                        white_threshold: Optional[int] = 240,
+                        black_threshold: Optional[int] = 20,
+                        histogram: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[str]:
+        """
+        Most frequent non-background, non-text colors as '#rrggbb' strings
+
+        histogram: (colors, counts) already computed by color_histogram with
+        the same step and thresholds, to avoid counting the page twice
+        """
+        colors, counts = histogram if histogram is not None else self.color_histogram(
+            step, white_threshold, black_threshold)
+        return [packed_to_hex(color) for color, count in zip(colors[:top], counts[:top]) if count > min_count]
+
+    def legend_coverage(self, legend: Dict[str, str], tolerance: int = 30,
+                        step: int = 1) -> Dict[str, int]:
+        """
+        Count pixels matching each legend color
+
+        Every sampled color is assigned to its nearest legend color (Euclidean
+        RGB distance) when that distance is within `tolerance`.
+
+        Args:
+            legend: Mapping of legend name -> '#RRGGBB'
+            tolerance: Maximum RGB distance for a pixel to count
+            step: Sampling step in pixels
+
+        Returns:
+            Mapping of legend name -> matched pixel count (zero-count names kept)
+        """
+        names = list(legend.keys())
+        if not names:
+            return {}
+
+        colors, counts = self.color_histogram(step, white_threshold=None, black_threshold=None)
+        coverage = {name: 0 for name in names}
+        if colors.size == 0:
+            return coverage
+
+        palette = np.array([hex_to_rgb(legend[name]) for name in names], dtype=np.int32)
+        distances = np.linalg.norm(unpack_rgb(colors)[:, None, :] - palette[None, :, :], axis=2)
+
+        nearest = np.argmin(distances, axis=1)
+        matched = distances[np.arange(len(colors)), nearest] <= tolerance
+        totals = np.bincount(nearest[matched], weights=counts[matched], minlength=len(names))
+
+        for name, total in zip(names, totals):
+            coverage[name] = int(total)
+        return coverage
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+CPU THROUGHPUT AUTO-TUNER - Docling pipeline settings for THIS machine
+
+Runs a short calibration on a sample of chapter pages and stores the best
+profile for the machine fingerprint (data/pipeline_profiles.json).
+EXTRACT_ANY_CHAPTER.py and FAST_process_parallel_ENHANCED.py load it
+automatically.
+
+Search (one stage at a time, each stage keeps the best of the previous):
+    1. workers x threads   (workers * threads = usable CPUs)
+    2. page batch size     (1, 2, 4, 8)
+    3. TableFormer mode    ACCURATE is kept unless it is more than
+                           --max-accurate-slowdown times slower than FAST
+
+Every trial runs in freshly spawned worker processes (thread settings
+only apply before torch is initialised, and the parent has already
+imported torch for the GPU fingerprint, so workers are not forked),
+converts one page to load the models, then times the sample with
+the EAF patch applied. Throughput is the sum of the workers' pages/s;
+peak RSS is the sum of the workers' peaks (ChapterScheduler sampling).
+
+Usage:
+    # Calibrate on 6 pages of the first chapter PDF found in data/inputs
+    python3 AUTOTUNE_PIPELINE.py
+
+    # Calibrate on a table-heavy chapter, 8 sample pages
+    python3 AUTOTUNE_PIPELINE.py --pdf data/inputs/EAF-089-2025/capitulos/capitulo_06.pdf --pages 8
+
+    # Show this machine's fingerprint and profile
+    python3 AUTOTUNE_PIPELINE.py --show
+"""
+import sys
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+# Profiles + scheduler shared with the operaciones domain
+sys.path.append(str(Path(__file__).parent.parent.parent / "domains" / "operaciones" / "shared" / "utilities"))
+from pipeline_profiles import (PipelineProfile, apply_profile, fingerprint_key, get_profile_store,
+                               machine_fingerprint, set_thread_count, usable_cpus)
+from chapter_scheduler import ChapterJob, ChapterScheduler, DEFAULT_COST_MODEL, available_memory_mb
+
+DEFAULT_INPUT_DIR = Path(__file__).parent.parent.parent / "data" / "inputs"
+
+BATCH_SIZES = (1, 2, 4, 8)
+
+
+def calibration_trial(sample_pdf, threads, page_batch_size, table_mode, device, result_conn=None):
+    """Worker: time one conversion of the sample with the given settings"""
+    try:
+        # Spawned worker: torch is not imported yet, so the thread count applies
+        set_thread_count(threads)
+
+        sys.path.insert(0, str(Path(__file__).parent / "eaf_patch"))
+        import fitz
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from docling.datamodel.pipeline_options import PdfPipelineOptions
+        from core.eaf_patch_engine import apply_universal_patch_with_pdf
+
+        pipeline_options = PdfPipelineOptions()
+        pipeline_options.do_ocr = False
+        pipeline_options.do_table_structure = True
+        pipeline_options.force_backend_text = True
+        apply_profile(pipeline_options, PipelineProfile(threads=threads, page_batch_size=page_batch_size,
+                                                        table_mode=table_mode, device=device))
+
+        apply_universal_patch_with_pdf(sample_pdf)
+        converter = DocumentConverter(
+            format_options={
+                "pdf": PdfFormatOption(pipeline_options=pipeline_options)
+            }
+        )
+        with fitz.open(sample_pdf) as pdf:
+            pages = pdf.page_count
+
+        # Warm-up: model loading is not part of the per-page throughput
+        converter.convert(sample_pdf, page_range=(1, 1))
+
+        apply_universal_patch_with_pdf(sample_pdf)
+        start = time.time()
+        converter.convert(sample_pdf)
+        result_conn.send({'pages': pages, 'seconds': time.time() - start})
+    except Exception as e:
+        result_conn.send({'error': str(e)})
+
+
+def run_trial(sample_pdf, workers, threads, page_batch_size, table_mode, device="cpu"):
+    """Aggregate pages/s and peak RSS of `workers` concurrent calibration workers"""
+    jobs = [ChapterJob(key=index, args=(sample_pdf, threads, page_batch_size, table_mode, device))
+            for index in range(workers)]
+    scheduler = ChapterScheduler(max_workers=workers, rss_budget_mb=DEFAULT_COST_MODEL.base_rss_mb * 4,
+                                 poll_interval=0.5)
+    pages_per_second = 0.0
+    peak_rss_mb = 0.0
+    failed = False
+    # Drain every outcome so no worker outlives the trial
+    for outcome in scheduler.run(jobs, calibration_trial):
+        if not outcome.ok or 'error' in outcome.result:
+            error = outcome.result.get('error') if outcome.ok else f"exit code {outcome.exitcode}"
+            print(f"      ❌ Worker {outcome.key}: {error}")
+            failed = True
+            continue
+        pages_per_second += outcome.result['pages'] / max(outcome.result['seconds'], 1e-6)
+        peak_rss_mb += outcome.peak_rss_mb
+    if failed:
+        return None
+
+    trial = {'workers': workers, 'threads': threads, 'page_batch_size': page_batch_size,
+             'table_mode': table_mode, 'pages_per_second': round(pages_per_second, 3),
+             'peak_rss_mb': round(peak_rss_mb)}
+    print(f"   {workers:2d} x {threads:2d} threads, batch {page_batch_size}, {table_mode:8s}: "
+          f"{pages_per_second:6.2f} pages/s, peak {peak_rss_mb / 1024:.1f} GB")
+    return trial
+
+
+def build_sample(pdf_path: Path, pages: int, output_dir: Path) -> Path:
+    """Evenly spaced pages of pdf_path as a small PDF"""
+    import fitz
+
+    with fitz.open(str(pdf_path)) as pdf:
+        count = pdf.page_count
+        step = max(1, count // pages)
+        selected = list(range(0, count, step))[:pages]
+        pdf.select(selected)
+        sample_path = output_dir / f"autotune_sample_{pdf_path.stem}.pdf"
+        pdf.save(str(sample_path))
+    print(f"📄 Sample: {len(selected)} pages of {pdf_path.name} ({', '.join(str(p + 1) for p in selected)})")
+    return sample_path
+
+
+def default_pdf() -> Path:
+    candidates = sorted(DEFAULT_INPUT_DIR.glob("*/capitulos/capitulo_*.pdf"))
+    if not candidates:
+        print(f"❌ No chapter PDFs under {DEFAULT_INPUT_DIR}; use --pdf")
+        sys.exit(1)
+    return candidates[0]
+
+
+def autotune(pdf_path: Path, sample_pages: int = 6, max_accurate_slowdown: float = 1.5) -> PipelineProfile:
+    """Calibrate and return the best profile (not saved)"""
+    cpus = usable_cpus()
+    memory_mb = available_memory_mb()
+    # GPU nodes keep Docling's device choice; the search still tunes the CPU side
+    device = "auto" if machine_fingerprint()['gpu'] else "cpu"
+    trials = []
+
+    with tempfile.TemporaryDirectory(prefix="autotune_") as tmp:
+        sample_pdf = str(build_sample(pdf_path, sample_pages, Path(tmp)))
+
+        # Stage 1: split the CPUs between workers and intra-op threads
+        print("\n🔧 Stage 1: workers x threads")
+        best = None
+        workers = 1
+        while workers <= cpus:
+            threads = max(1, cpus // workers)
+            if memory_mb and workers * DEFAULT_COST_MODEL.base_rss_mb > memory_mb * 0.8:
+                print(f"   {workers:2d} workers: skipped (~{workers * DEFAULT_COST_MODEL.base_rss_mb / 1024:.1f} GB "
+                      f"> 80% of {memory_mb / 1024:.1f} GB available)")
+                break
+            trial = run_trial(sample_pdf, workers, threads, 4, "fast", device)
+            if trial:
+                trials.append(trial)
+                if best is None or trial['pages_per_second'] > best['pages_per_second']:
+                    best = trial
+            workers *= 2
+        if best is None:
+            print("❌ No calibration trial succeeded")
+            sys.exit(1)
+
+        # Stage 2: page batch size
+        print("\n🔧 Stage 2: page batch size")
+        for page_batch_size in BATCH_SIZES:
+            if page_batch_size == best['page_batch_size']:
+                continue
+            trial = run_trial(sample_pdf, best['workers'], best['threads'], page_batch_size, "fast", device)
+            if trial:
+                trials.append(trial)
+                if trial['pages_per_second'] > best['pages_per_second']:
+                    best = trial
+
+        # Stage 3: TableFormer mode (ACCURATE unless too slow)
+        print("\n🔧 Stage 3: TableFormer mode")
+        accurate = run_trial(sample_pdf, best['workers'], best['threads'], best['page_batch_size'], "accurate", device)
+        if accurate:
+            trials.append(accurate)
+            if accurate['pages_per_second'] * max_accurate_slowdown >= best['pages_per_second']:
+                best = accurate
+
+    return PipelineProfile(
+        threads=best['threads'],
+        workers=best['workers'],
+        page_batch_size=best['page_batch_size'],
+        table_mode=best['table_mode'],
+        device=device,
+        pages_per_second=best['pages_per_second'],
+        peak_rss_mb=best['peak_rss_mb'],
+        sample_pages=sample_pages,
+        trials=trials,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate Docling pipeline settings for this machine')
+    parser.add_argument('--pdf', type=str, default=None,
+                        help='Chapter PDF to sample (default: first data/inputs/*/capitulos/capitulo_*.pdf)')
+    parser.add_argument('--pages', type=int, default=6, help='Sample pages (default: 6)')
+    parser.add_argument('--max-accurate-slowdown', type=float, default=1.5,
+                        help='Keep ACCURATE tables unless FAST is this many times faster (default: 1.5)')
+    parser.add_argument('--show', action='store_true', help="Show this machine's fingerprint and profile")
+    args = parser.parse_args()
+
+    fingerprint = machine_fingerprint()
+    store = get_profile_store()
+
+    if args.show:
+        print(json.dumps(fingerprint, indent=2))
+        profile = store.current()
+        print(f"Key: {fingerprint_key(fingerprint)}")
+        print(f"Profile: {profile.describe() if profile else 'not tuned'}")
+        return
+
+    print("=" * 80)
+    print("⚙️  DOCLING PIPELINE AUTO-TUNE")
+    print("=" * 80)
+    print(f"🖥️  {fingerprint['cpu_model']} - {fingerprint['cpus']} CPUs, {fingerprint['memory_gb']} GB, "
+          f"GPU: {fingerprint['gpu']}")
+
+    pdf_path = Path(args.pdf) if args.pdf else default_pdf()
+    profile = autotune(pdf_path, args.pages, args.max_accurate_slowdown)
+    key = store.put(profile, fingerprint)
+
+    print()
+    print("=" * 80)
+    print(f"✅ Profile {key}: {profile.describe()}")
+    print(f"   Peak RSS: {profile.peak_rss_mb / 1024:.1f} GB")
+    print(f"   Saved: {store.path}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    # Workers must start without the parent's initialised torch (thread pools)
+    multiprocessing.set_start_method('spawn', force=True)
+    main()
@@ -14,9 +14,32 @@ Usage:
 
     # Custom page range
     python3 EXTRACT_ANY_CHAPTER.py 1 --pages 1-50
+
+    # Large chapter as 4 parallel page shards (merged + cross-page stitched)
+    python3 EXTRACT_ANY_CHAPTER.py 11 --report EAF-477-2025 --shards 4
+
+    # Large chapter on a shared 16 GB node (page windows spilled to disk)
+    python3 EXTRACT_ANY_CHAPTER.py 11 --report EAF-477-2025 --stream --memory-ceiling-mb 12000
+
+    # Plain single-column text pages laid out from PyMuPDF lines (no layout model)
+    python3 EXTRACT_ANY_CHAPTER.py 10 --fast-layout
+
+    # Table-heavy chapter on CPU: Docling emits table bboxes only, tables are
+    # re-extracted; TableFormer runs on the crop of tables without an extractor
+    python3 EXTRACT_ANY_CHAPTER.py 6 --bbox-tables --lazy-tableformer
+
+    # Per-table engine (no model / TableFormer FAST / ACCURATE on the crop),
+    # decision counts and timings in <output>/metrics.json
+    python3 EXTRACT_ANY_CHAPTER.py 6 --table-policy adaptive
+
+    # Threads / page batch / TableFormer mode come from this machine's
+    # AUTOTUNE_PIPELINE.py profile when one exists; ignore it with
+    python3 EXTRACT_ANY_CHAPTER.py 6 --no-profile
 """
 import sys
+import time
 import argparse
+import multiprocessing
 from pathlib import Path
 
 # Add eaf_patch to path
@@ -26,45 +49,30 @@ sys.path.insert(0, str(eaf_patch_path))
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
 from core.eaf_patch_engine import apply_universal_patch_with_pdf
+from core.shard_conversion import convert_sharded, MIN_SHARD_PAGES
+from core.streaming_conversion import convert_streaming, DEFAULT_MEMORY_CEILING_MB
+from core.fast_layout import apply_fast_layout_patch, get_fast_layout_stats
 from post_processors.core import apply_enumerated_item_fix_to_document, apply_table_reextract_to_document, apply_table_continuation_merger_to_document, apply_hierarchy_restructure_to_document, apply_date_extraction_to_document
+from post_processors.core.table_reextract.mode_policy import new_metrics
 import json
 import fitz
 
+# Chapter boundary engine + report registry shared with the operaciones domain
+sys.path.append(str(Path(__file__).parent.parent.parent / "domains" / "operaciones" / "shared" / "utilities"))
+from chapter_boundaries import get_report_registry
+from layout_database import LayoutDatabase
+from layout_chunks import LayoutChunkStore
+from hourly_series_store import get_series_store
+from event_timeline import get_event_timeline
+from pipeline_profiles import apply_profile, get_profile_store
+
 # Default paths (relative to project root)
 DEFAULT_INPUT_DIR = Path(__file__).parent.parent.parent / "data" / "inputs"
 DEFAULT_OUTPUT_DIR = Path(__file__).parent.parent.parent / "data" / "outputs"
 
-# Chapter definitions per report (page ranges)
-REPORT_CHAPTERS = {
-    "EAF-089-2025": {
-        1: (1, 11),
-        2: (12, 90),
-        3: (91, 152),
-        4: (153, 159),
-        5: (160, 171),
-        6: (172, 265),
-        7: (266, 347),
-        8: (348, 348),
-        9: (349, 381),
-        10: (382, 392),
-        11: (393, 399),
-    },
-    "EAF-477-2025": {
-        1: (1, 3),
-        2: (4, 4),
-        3: (5, 5),
-        4: (6, 6),
-        5: (7, 7),
-        6: (7, 7),
-        7: (8, 10),
-        8: (11, 11),
-        9: (12, 12),
-        10: (12, 12),
-        11: (13, 155),
-        12: (156, 156),
-        13: (156, 162),
-    },
-}
+# Chapter page ranges per report: data/report_registry.json (keyed by document
+# hash). New reports are added by split_pdf_chapters.py (outline / heading detection).
+REPORT_REGISTRY = get_report_registry()
 
 # Color scheme for annotated PDFs
 COLORS = {
@@ -79,7 +87,7 @@ COLORS = {
 }
 
 
-def generate_annotated_pdf(doc, result, pdf_path, output_path, label):
+def generate_annotated_pdf(doc, pdf_path, output_path, label):
     """Generate an annotated PDF with bounding boxes."""
     print(f"🎨 Generating {label} annotated PDF...")
 
@@ -104,7 +112,7 @@ def generate_annotated_pdf(doc, result, pdf_path, output_path, label):
         if hasattr(item, 'label') and item.label.name.lower() == 'table':
             if hasattr(item, 'prov') and item.prov:
                 prov = item.prov[0]
-                page = result.document.pages[prov.page_no]
+                page = doc.pages[prov.page_no]
                 bbox = prov.bbox
                 bbox_tl = bbox.to_top_left_origin(page_height=page.size.height)
                 table_boxes.append({'page': prov.page_no, 'bbox': bbox_tl})
@@ -118,7 +126,7 @@ def generate_annotated_pdf(doc, result, pdf_path, output_path, label):
             continue
 
         prov = item.prov[0]
-        page = result.document.pages[prov.page_no]
+        page = doc.pages[prov.page_no]
         bbox = prov.bbox
         bbox_tl = bbox.to_top_left_origin(page_height=page.size.height)
 
@@ -165,7 +173,11 @@ def generate_annotated_pdf(doc, result, pdf_path, output_path, label):
 
 def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
                     input_dir: Path = None, output_dir: Path = None,
-                    custom_pages: str = None, force_pymupdf: bool = True):
+                    custom_pages: str = None, force_pymupdf: bool = True, ingest: bool = False,
+                    shards: int = 1, stream: bool = False,
+                    memory_ceiling_mb: float = DEFAULT_MEMORY_CEILING_MB, fast_layout: bool = False,
+                    bbox_tables: bool = False, lazy_tableformer: bool = False,
+                    table_policy: str = "global", use_profile: bool = True):
     """
     Extract a single chapter with EAF monkey patch
 
@@ -175,6 +187,28 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
         input_dir: Directory containing input PDFs
         output_dir: Directory for output files
         custom_pages: Optional custom page range like "1-50"
+        ingest: Replace this chapter in the layout database (data/layout.db),
+                rebuild its retrieval chunks, store its hourly tables and
+                load its timestamped events into the event timeline
+        shards: Convert the chapter as this many parallel page shards
+                (merged and stitched before the post-processors); chapters
+                shorter than 2 * MIN_SHARD_PAGES pages run serially
+        stream: Convert page windows one at a time, spilling each to disk,
+                so RSS stays under memory_ceiling_mb (takes precedence
+                over shards)
+        fast_layout: Lay out simple single-column text pages from PyMuPDF
+                     lines and keep the layout model for complex pages
+        bbox_tables: Run Docling without table structure (TableFormer); the
+                     table re-extractors are the only table-content engine
+        lazy_tableformer: With bbox_tables, run TableFormer on the crop of
+                          tables the re-extractors cannot handle
+        table_policy: "global" (one TableFormer mode for the chapter) or
+                      "adaptive" (bbox-only conversion, then no model,
+                      FAST or ACCURATE per table; counts and timings in
+                      metrics.json)
+        use_profile: Apply this machine's tuned pipeline profile (threads,
+                     page batch size, TableFormer mode, shard workers)
+                     from data/pipeline_profiles.json if it was tuned
     """
     # Set defaults
     if input_dir is None:
@@ -186,14 +220,16 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
     if custom_pages:
         start, end = map(int, custom_pages.split('-'))
     else:
-        if report_id not in REPORT_CHAPTERS:
-            print(f"❌ Report {report_id} not defined in REPORT_CHAPTERS")
-            print(f"   Available: {list(REPORT_CHAPTERS.keys())}")
+        report_chapters = REPORT_REGISTRY.chapter_pages(report_id)
+        if not report_chapters:
+            print(f"❌ Report {report_id} not found in the report registry")
+            print(f"   Available: {REPORT_REGISTRY.reports()}")
+            print(f"   Run split_pdf_chapters.py <pdf> --report {report_id} to detect its chapters")
             sys.exit(1)
-        if chapter_num not in REPORT_CHAPTERS[report_id]:
+        if chapter_num not in report_chapters:
             print(f"❌ Chapter {chapter_num} not defined for {report_id}")
             sys.exit(1)
-        start, end = REPORT_CHAPTERS[report_id][chapter_num]
+        start, end = report_chapters[chapter_num]
 
     # Paths - look in capitulos/ subfolder
     pdf_path = input_dir / report_id / "capitulos" / f"capitulo_{chapter_num:02d}.pdf"
@@ -224,45 +260,83 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
     print("=" * 80)
     print()
 
+    # Adaptive table policy decides the TableFormer mode per table, after layout
+    if table_policy == "adaptive":
+        bbox_tables = True
+
     # Configure pipeline (optimized for accuracy with 4GB GPU)
     pipeline_options = PdfPipelineOptions()
     pipeline_options.do_ocr = False
-    pipeline_options.do_table_structure = True
+    pipeline_options.do_table_structure = not bbox_tables  # bbox_tables: layout bboxes only
     pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE
     pipeline_options.force_backend_text = True  # Use PDF text layer (faster, more accurate)
 
+    # Tuned settings for this machine (AUTOTUNE_PIPELINE.py)
+    profile = get_profile_store().current() if use_profile else None
+    if profile:
+        apply_profile(pipeline_options, profile)
+
     print("⚙️  Configuration:")
     print(f"   - OCR: {pipeline_options.do_ocr}")
-    print(f"   - Tables: {pipeline_options.table_structure_options.mode}")
+    if table_policy == "adaptive":
+        print("   - Tables: bboxes only, per-table policy (none / FAST / ACCURATE crops)")
+    elif bbox_tables:
+        print(f"   - Tables: bboxes only, re-extracted{' + lazy TableFormer crops' if lazy_tableformer else ''}")
+    else:
+        print(f"   - Tables: {pipeline_options.table_structure_options.mode}")
     print(f"   - Text extraction: PDF text layer (force_backend_text=True)")
+    if profile:
+        print(f"   - Profile: {profile.describe()}")
+    elif use_profile:
+        print("   - Profile: none for this machine (run AUTOTUNE_PIPELINE.py)")
     print(f"   - VRAM: ~1.0 GB peak (safe for 4GB GPU)")
     print()
 
-    # Apply monkey patch
-    print("🐵 Applying EAF monkey patch...")
-    apply_universal_patch_with_pdf(str(pdf_path))
-    print("✅ Monkey patch applied")
-    print()
-
-    # Extract with Docling
-    print("🚀 Starting Docling extraction...")
-    print(f"   (~{(end - start + 1) * 6 / 60:.1f} minutes for {end - start + 1} pages)")
-    print()
-
-    converter = DocumentConverter(
-        format_options={
-            "pdf": PdfFormatOption(pipeline_options=pipeline_options)
-        }
-    )
+    conversion_start = time.time()
+    if stream:
+        # One converter, page windows spilled to <output>/_spill and released
+        print("🚀 Starting streaming Docling extraction...")
+        print()
+        doc, _ = convert_streaming(str(pdf_path), pipeline_options, chapter_output_dir / "_spill",
+                                   memory_ceiling_mb=memory_ceiling_mb, fast_layout=fast_layout)
+    elif shards > 1 and end - start + 1 >= 2 * MIN_SHARD_PAGES:
+        # Every shard worker applies the monkey patch to its own page range
+        print(f"🚀 Starting sharded Docling extraction ({shards} shards)...")
+        print()
+        doc, _ = convert_sharded(str(pdf_path), pipeline_options, shards=shards,
+                                 max_workers=profile.workers if profile else None, fast_layout=fast_layout)
+    else:
+        # Apply monkey patch
+        print("🐵 Applying EAF monkey patch...")
+        apply_universal_patch_with_pdf(str(pdf_path))
+        if fast_layout:
+            apply_fast_layout_patch(str(pdf_path))
+        print("✅ Monkey patch applied")
+        print()
+
+        # Extract with Docling
+        print("🚀 Starting Docling extraction...")
+        print(f"   (~{(end - start + 1) * 6 / 60:.1f} minutes for {end - start + 1} pages)")
+        print()
+
+        converter = DocumentConverter(
+            format_options={
+                "pdf": PdfFormatOption(pipeline_options=pipeline_options)
+            }
+        )
 
-    result = converter.convert(str(pdf_path))
+        result = converter.convert(str(pdf_path))
+        doc = result.document
+        if fast_layout:
+            stats = get_fast_layout_stats()
+            print(f"⚡ Layout: {stats['fast']} page(s) from PyMuPDF, {stats['model']} page(s) from the model")
 
+    conversion_seconds = time.time() - conversion_start
     print()
     print("✅ Extraction completed")
     print()
 
     # Check for main title
-    doc = result.document
     print("🔍 Checking for main chapter title...")
     title_found = False
     for item in doc.texts[:20]:
@@ -278,7 +352,7 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
 
     # Generate DOCLING PDF (before post-processors)
     pdf_docling = chapter_output_dir / f"chapter{chapter_num:02d}_DOCLING.pdf"
-    generate_annotated_pdf(doc, result, pdf_path, pdf_docling, "DOCLING")
+    generate_annotated_pdf(doc, pdf_path, pdf_docling, "DOCLING")
     print()
 
     # Apply post-processors
@@ -287,7 +361,12 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
     print(f"✅ Smart reclassification fixes (10 parts): {enum_count}")
 
     # Re-extract tables with specialized extractors
-    table_count = apply_table_reextract_to_document(doc, str(pdf_path), force_pymupdf=force_pymupdf)
+    table_metrics = new_metrics()
+    table_count = apply_table_reextract_to_document(doc, str(pdf_path), force_pymupdf=force_pymupdf,
+                                                    table_structure=not bbox_tables,
+                                                    lazy_tableformer=lazy_tableformer,
+                                                    table_policy=table_policy,
+                                                    metrics=table_metrics)
     print(f"✅ Table re-extraction: {table_count} tables processed")
 
     # Merge table continuations
@@ -321,6 +400,19 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
     with open(json_output, 'w', encoding='utf-8') as f:
         json.dump(doc_dict, f, indent=2, ensure_ascii=False)
 
+    # Conversion metrics (table modes only filled by the adaptive policy)
+    metrics_output = chapter_output_dir / "metrics.json"
+    with open(metrics_output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'report_id': report_id,
+            'chapter': chapter_num,
+            'pages': end - start + 1,
+            'conversion_seconds': round(conversion_seconds, 1),
+            'table_policy': table_policy,
+            'profile': profile.describe() if profile else None,
+            'table_modes': table_metrics,
+        }, f, indent=2, ensure_ascii=False)
+
     # Count elements for summary
     element_count = 0
     if 'body' in doc_dict and 'children' in doc_dict['body']:
@@ -338,9 +430,28 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
     print(f"   Total elements: {element_count}")
     print()
 
+    # Replace only this chapter's rows in the layout database
+    if ingest:
+        layout_db = LayoutDatabase()
+        stats = layout_db.ingest_layout_json(
+            str(json_output), report_id=report_id, chapter=f"capitulo_{chapter_num:02d}", replace=True
+        )
+        print(f"🗄️  Layout DB: {stats['items']} items, {stats['tables']} tables ({stats['cells']} cells)")
+        chunks = LayoutChunkStore(layout_db).build_chapter(report_id, f"capitulo_{chapter_num:02d}")
+        print(f"📦 Chunks: {chunks['chunks']} ({chunks['tokens']} tokens)")
+        # programacion_diaria / costos_horarios rows, dated by the failure date
+        series = get_series_store().append_layout_tables(doc_dict)
+        if series:
+            print(f"📈 Series store: {series} hourly rows")
+        # eventos_hora / scada_alarmas / Cronología events and the failure time
+        events = get_event_timeline().append_layout_document(doc_dict, report_id, f"capitulo_{chapter_num:02d}")
+        if events:
+            print(f"🕒 Event timeline: {sum(events.values())} events {events}")
+        print()
+
     # Generate FINAL PDF (after post-processors)
     pdf_final = chapter_output_dir / f"chapter{chapter_num:02d}_FINAL.pdf"
-    generate_annotated_pdf(doc, result, pdf_path, pdf_final, "FINAL")
+    generate_annotated_pdf(doc, pdf_path, pdf_final, "FINAL")
     print()
 
     # Summary
@@ -350,6 +461,7 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
     print()
     print("📁 Output files:")
     print(f"   JSON:   {json_output}")
+    print(f"   METRICS: {metrics_output}")
     print(f"   DOCLING: {pdf_docling}")
     print(f"   FINAL:   {pdf_final}")
     print()
@@ -375,6 +487,9 @@ def extract_chapter(chapter_num: int, report_id: str = "EAF-089-2025",
 
 
 if __name__ == "__main__":
+    # Shard workers must start without this process's initialised torch (thread pools, CUDA)
+    multiprocessing.set_start_method('spawn', force=True)
+
     parser = argparse.ArgumentParser(description='Extract any chapter with EAF monkey patch')
     parser.add_argument('chapter', type=int, help='Chapter number (1-11)')
     parser.add_argument('--report', type=str, default='EAF-089-2025',
@@ -387,6 +502,24 @@ if __name__ == "__main__":
                         help='Custom page range (e.g., "1-50")')
     parser.add_argument('--force-pymupdf', action='store_true',
                         help='Force PyMuPDF extraction for all tables (skip TableFormer)')
+    parser.add_argument('--ingest', action='store_true',
+                        help='Replace this chapter in the layout database (and its chunks) after export')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Convert as N parallel page shards (default: 1, serial)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Bounded-memory mode: convert page windows, spill them to disk, assemble at the end')
+    parser.add_argument('--memory-ceiling-mb', type=float, default=DEFAULT_MEMORY_CEILING_MB,
+                        help=f'RSS ceiling for --stream (default: {DEFAULT_MEMORY_CEILING_MB})')
+    parser.add_argument('--fast-layout', action='store_true',
+                        help='Skip the layout model on simple single-column text pages (PyMuPDF lines)')
+    parser.add_argument('--bbox-tables', action='store_true',
+                        help='Skip TableFormer: Docling emits table bboxes, re-extractors fill them')
+    parser.add_argument('--lazy-tableformer', action='store_true',
+                        help='With --bbox-tables: TableFormer on the crop of tables without an extractor')
+    parser.add_argument('--table-policy', choices=['global', 'adaptive'], default='global',
+                        help='global: one TableFormer mode; adaptive: none/FAST/ACCURATE per table')
+    parser.add_argument('--no-profile', action='store_true',
+                        help="Ignore this machine's AUTOTUNE_PIPELINE.py profile")
 
     args = parser.parse_args()
 
@@ -399,5 +532,14 @@ if __name__ == "__main__":
         input_dir=input_dir,
         output_dir=output_dir,
         custom_pages=args.pages,
-        force_pymupdf=args.force_pymupdf
+        force_pymupdf=args.force_pymupdf,
+        ingest=args.ingest,
+        shards=args.shards,
+        stream=args.stream,
+        memory_ceiling_mb=args.memory_ceiling_mb,
+        fast_layout=args.fast_layout,
+        bbox_tables=args.bbox_tables,
+        lazy_tableformer=args.lazy_tableformer,
+        table_policy=args.table_policy,
+        use_profile=not args.no_profile
     )
@@ -1,40 +1,64 @@
 #!/usr/bin/env python3
 """
 ⚡ ENHANCED PARALLEL PROCESSING - Production Quality
-Process 4 chapters simultaneously with:
+Process chapters in parallel worker processes with:
 - ✅ EAF Monkey Patch (domain-specific enhancements)
 - ✅ Post-processors (zona_fix, etc.)
 - ✅ Annotated PDFs with ALL clusters visualization
 - ✅ Optimized Safe mode (ACCURATE tables + SmolVLM)
 - ✅ Comprehensive validation and reporting
 
+Chapters are scheduled by chapter_scheduler.ChapterScheduler: longest
+estimated chapter first (PyMuPDF pre-scan of pages, table pages and
+images), a new chapter as soon as a worker frees up, and only while the
+workers' memory fits the RSS budget.
+
+Usage:
+    python FAST_process_parallel_ENHANCED.py
+    python FAST_process_parallel_ENHANCED.py --workers 3 --worker-rss-mb 5000 --chapters 2,6,7
+
+    # TableFormer mode per table instead of per run (see table_reextract.mode_policy)
+    python FAST_process_parallel_ENHANCED.py --table-policy adaptive
+
+When AUTOTUNE_PIPELINE.py has tuned this machine, every worker uses the
+profile's threads, page batch size and TableFormer mode (replacing the
+VRAM-based mode), and --workers defaults to the profile's worker count.
+--no-profile keeps the VRAM-based settings.
+
 12 hours → 3 hours
 """
+import argparse
 import json
 import sys
+from collections import Counter
 from pathlib import Path
 from datetime import datetime
 import multiprocessing
-from multiprocessing import Process, Queue
 import time
 
 # CUDA requires spawn method for multiprocessing
 multiprocessing.set_start_method('spawn', force=True)
 
-# Chapter definitions with corrected page ranges
-CHAPTERS = {
-    1: {"name": "Descripción de la Perturbación", "pages": (1, 11)},
-    2: {"name": "Equipamiento Afectado", "pages": (12, 90)},
-    3: {"name": "Energía No Suministrada", "pages": (91, 153)},
-    4: {"name": "Configuraciones de Falla", "pages": (154, 159)},
-    5: {"name": "Cronología de Eventos", "pages": (160, 171)},
-    6: {"name": "Normalización del Servicio", "pages": (172, 265)},
-    7: {"name": "Análisis de Causas de Falla", "pages": (266, 347)},
-    8: {"name": "Detalle de Información", "pages": (348, 348)},
-    9: {"name": "Análisis de Protecciones", "pages": (349, 381)},
-    10: {"name": "Pronunciamiento Técnico", "pages": (382, 392)},
-    11: {"name": "Recomendaciones", "pages": (393, 399)},
-}
+# Chapter boundary engine + report registry shared with the operaciones domain
+sys.path.append(str(Path(__file__).parent.parent.parent / "domains" / "operaciones" / "shared" / "utilities"))
+from chapter_boundaries import get_report_registry
+from chapter_scheduler import ChapterJob, ChapterScheduler
+from pipeline_profiles import apply_profile, get_profile_store
+
+REPORT_ID = "EAF-089-2025"
+
+
+def load_chapters(report_id: str = REPORT_ID) -> dict:
+    """Chapter names and page ranges from data/report_registry.json"""
+    registry = get_report_registry()
+    titles = registry.chapter_titles(report_id)
+    return {
+        chapter_num: {"name": titles[chapter_num], "pages": pages}
+        for chapter_num, pages in sorted(registry.chapter_pages(report_id).items())
+    }
+
+
+CHAPTERS = load_chapters()
 
 # Color scheme for annotated PDFs (RGB 0-1 scale)
 COLORS = {
@@ -52,13 +76,44 @@ COLORS = {
 
 BASE_DIR = Path(__file__).parent
 
-def process_chapter(chapter_num, chapter_info, result_queue, use_optimized_safe=True):
+# Source PDFs (individual chapter PDFs)
+CHAPTER_PDF_DIR = Path("/home/alonso/Documentos/Github/Proyecto Dark Data CEN/shared_platform/utils/outputs/claude_ocr")
+
+# Memory budget per worker process: Docling models + pages of one chapter
+DEFAULT_WORKER_RSS_MB = 4000
+
+
+def chapter_pdf_path(chapter_num, chapter_info):
+    """
+    Individual chapter PDF produced by split_pdf_chapters
+
+    The page range in the file name is the one used at split time, which can
+    differ by a page from the registry (chapter 3: registry 91-152, file
+    _pages_91-153.pdf), so the file is looked up rather than rebuilt.
+    """
+    chapter_dir = CHAPTER_PDF_DIR / f"capitulo_{chapter_num:02d}"
+    found = sorted(chapter_dir.glob(f"{REPORT_ID}_capitulo_{chapter_num:02d}_pages_*.pdf"))
+    if found:
+        return found[0]
+    start_page, end_page = chapter_info["pages"]
+    return chapter_dir / f"{REPORT_ID}_capitulo_{chapter_num:02d}_pages_{start_page}-{end_page}.pdf"
+
+
+def process_chapter(chapter_num, chapter_info, use_optimized_safe=True, table_policy="vram", use_profile=True,
+                    result_conn=None):
     """
     Process a single chapter with FULL methodology:
     - EAF monkey patch applied
     - Post-processors executed
     - Annotated PDF generated with ALL clusters
     - Optimized Safe mode (or fallback to lightweight)
+    - table_policy "adaptive": bbox-only tables, then no model / FAST /
+      ACCURATE per table; decisions and timings in outputs/metrics.json
+    - use_profile: tuned profile of this machine (threads, page batch,
+      TableFormer mode, replacing the VRAM-based mode), if
+      AUTOTUNE_PIPELINE.py was run
+
+    Sends (chapter_num, success, elapsed, elements, zona_fixes) on result_conn.
     """
     try:
         # Add eaf_patch to path
@@ -69,6 +124,8 @@ def process_chapter(chapter_num, chapter_info, result_queue, use_optimized_safe=
         from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
         from core.eaf_patch_engine import apply_universal_patch_with_pdf
         from core.post_processors import apply_zona_fix_to_document
+        from post_processors.core import apply_table_reextract_to_document
+        from post_processors.core.table_reextract.mode_policy import new_metrics
         import fitz  # PyMuPDF
 
         chapter_name = chapter_info["name"]
@@ -87,15 +144,14 @@ def process_chapter(chapter_num, chapter_info, result_queue, use_optimized_safe=
 
         if json_path.exists() and pdf_path_output.exists():
             print(f"[Ch {chapter_num}] ⏭️  Already processed, skipping")
-            result_queue.put((chapter_num, True, 0, 0, 0))
+            result_conn.send((chapter_num, True, 0, 0, 0))
             return
 
-        # Source PDF path (individual chapter PDFs)
-        pdf_path = Path(f"/home/alonso/Documentos/Github/Proyecto Dark Data CEN/shared_platform/utils/outputs/claude_ocr/capitulo_{chapter_num:02d}/EAF-089-2025_capitulo_{chapter_num:02d}_pages_{start_page}-{end_page}.pdf")
+        pdf_path = chapter_pdf_path(chapter_num, chapter_info)
 
         if not pdf_path.exists():
             print(f"[Ch {chapter_num}] ❌ PDF not found: {pdf_path}")
-            result_queue.put((chapter_num, False, 0, 0, 0))
+            result_conn.send((chapter_num, False, 0, 0, 0))
             return
 
         # Configure pipeline - Optimized Safe mode
@@ -121,6 +177,17 @@ def process_chapter(chapter_num, chapter_info, result_queue, use_optimized_safe=
             print(f"[Ch {chapter_num}]    - Tables: FAST (90-95%)")
             print(f"[Ch {chapter_num}]    - VRAM: ~1.5 GB")
 
+        # Tuned settings for this machine (AUTOTUNE_PIPELINE.py)
+        profile = get_profile_store().current() if use_profile else None
+        if profile:
+            apply_profile(pipeline_options, profile)
+            print(f"[Ch {chapter_num}]    - Profile: {profile.describe()}")
+
+        if table_policy == "adaptive":
+            # Layout emits table bboxes; the mode is chosen per table afterwards
+            pipeline_options.do_table_structure = False
+            print(f"[Ch {chapter_num}]    - Tables: adaptive per table (none / FAST / ACCURATE crops)")
+
         # Apply EAF monkey patch
         print(f"[Ch {chapter_num}] 🐵 Applying EAF monkey patch...")
         apply_universal_patch_with_pdf(str(pdf_path))
@@ -144,6 +211,15 @@ def process_chapter(chapter_num, chapter_info, result_queue, use_optimized_safe=
         zona_fixes = apply_zona_fix_to_document(doc)
         print(f"[Ch {chapter_num}] ✅ Post-processors applied (zona fixes: {zona_fixes})")
 
+        if table_policy == "adaptive":
+            table_metrics = new_metrics()
+            apply_table_reextract_to_document(doc, str(pdf_path), table_structure=False,
+                                              table_policy="adaptive", metrics=table_metrics)
+            with open(output_dir / "metrics.json", 'w', encoding='utf-8') as f:
+                json.dump({'chapter': chapter_num, 'table_policy': table_policy,
+                           'table_modes': table_metrics}, f, indent=2, ensure_ascii=False)
+            print(f"[Ch {chapter_num}] ✅ Table modes: {table_metrics['tables']}")
+
         # Export to JSON using native Docling format
         # This includes all monkey patch and post-processor modifications
         print(f"[Ch {chapter_num}] 💾 Exporting to native Docling JSON format...")
@@ -262,15 +338,16 @@ def process_chapter(chapter_num, chapter_info, result_queue, use_optimized_safe=
 
         print(f"[Ch {chapter_num}] ✅ Annotated PDF saved ({pdf_size_mb:.1f} MB)")
         print(f"[Ch {chapter_num}] 🎉 COMPLETE in {elapsed/60:.1f} min")
-        print(f"[Ch {chapter_num}] 📊 Element counts: {type_counts}")
+        type_counts = Counter(elem['type'] for elem in annotation_elements)
+        print(f"[Ch {chapter_num}] 📊 Element counts: {dict(type_counts)}")
 
-        result_queue.put((chapter_num, True, elapsed, len(elements), zona_fixes))
+        result_conn.send((chapter_num, True, elapsed, element_count, zona_fixes))
 
     except Exception as e:
         import traceback
         print(f"[Ch {chapter_num}] ❌ Error: {e}")
         print(f"[Ch {chapter_num}] {traceback.format_exc()}")
-        result_queue.put((chapter_num, False, 0, 0, 0))
+        result_conn.send((chapter_num, False, 0, 0, 0))
 
 
 def check_gpu_vram():
@@ -292,6 +369,19 @@ def check_gpu_vram():
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Parallel chapter extraction with the EAF patch")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Maximum concurrent chapter workers (default: tuned profile, else 4)')
+    parser.add_argument('--worker-rss-mb', type=float, default=DEFAULT_WORKER_RSS_MB,
+                        help=f'Memory budget per worker in MB (default: {DEFAULT_WORKER_RSS_MB})')
+    parser.add_argument('--table-policy', choices=['vram', 'adaptive'], default='vram',
+                        help='vram: one TableFormer mode from the GPU VRAM; adaptive: none/FAST/ACCURATE per table')
+    parser.add_argument('--chapters', type=lambda value: [int(n) for n in value.split(',')], default=None,
+                        help='Comma-separated chapter numbers (default: all)')
+    parser.add_argument('--no-profile', action='store_true',
+                        help="Ignore this machine's AUTOTUNE_PIPELINE.py profile (VRAM-based settings)")
+    args = parser.parse_args()
+
     print("=" * 80)
     print("⚡ ENHANCED PARALLEL PROCESSING - Production Quality")
     print("=" * 80)
@@ -313,56 +403,58 @@ def main():
     print("   ✅ Annotated PDFs (Docling + monkey patch + post-processor clusters)")
     print()
 
-    print("🚀 Processing strategy: 4 chapters simultaneously")
-    print("⏱️  Estimated time: 3-4 hours")
-    print()
-
-    # Group chapters into batches
-    chapter_batches = [
-        [1, 4, 5, 8],     # Batch 1: Small chapters (~30 pages each)
-        [2, 3, 10, 11],   # Batch 2: Medium chapters (~40-80 pages)
-        [6, 7, 9],        # Batch 3: Large chapters (~80-95 pages, only 3)
+    # Estimate every chapter (pages, table pages, images) and schedule LPT-first
+    chapter_nums = [n for n in (args.chapters or sorted(CHAPTERS)) if n in CHAPTERS]
+    jobs = [
+        ChapterJob.from_pdf(
+            ch_num, chapter_pdf_path(ch_num, CHAPTERS[ch_num]),
+            args=(ch_num, CHAPTERS[ch_num], use_optimized_safe, args.table_policy, not args.no_profile),
+            pages=CHAPTERS[ch_num]["pages"][1] - CHAPTERS[ch_num]["pages"][0] + 1
+        )
+        for ch_num in chapter_nums
     ]
+    profile = None if args.no_profile else get_profile_store().current()
+    if profile:
+        print(f"⚙️  Tuned profile: {profile.describe()}")
+    elif not args.no_profile:
+        print("⚙️  No tuned profile for this machine (run AUTOTUNE_PIPELINE.py)")
+    workers = args.workers or (profile.workers if profile else 4)
+    scheduler = ChapterScheduler(max_workers=workers, rss_budget_mb=args.worker_rss_mb)
+
+    print(f"🚀 Processing strategy: up to {scheduler.max_workers} chapters at a time, "
+          f"longest first, {scheduler.memory_budget_mb / 1024:.1f} GB memory budget")
+    print()
+    print("📋 Chapter estimates (longest first):")
+    for job in sorted(jobs, key=lambda job: job.cost, reverse=True):
+        print(f"   Ch {job.key:2d}: {job.scan.pages:3d} pages, {job.scan.table_density:4.0%} table pages, "
+              f"{job.scan.images:3d} images → cost {job.cost:6.1f}, ~{job.rss_mb / 1024:.1f} GB")
+    print()
 
     total_start = time.time()
     completed = []
     results = {}
 
-    for batch_num, chapter_nums in enumerate(chapter_batches, 1):
-        print(f"🔄 BATCH {batch_num}/{len(chapter_batches)}")
-        print("-" * 80)
-
-        # Create queue for results
-        result_queue = Queue()
-
-        # Start processes
-        processes = []
-        for ch_num in chapter_nums:
-            if ch_num in CHAPTERS:
-                p = Process(
-                    target=process_chapter,
-                    args=(ch_num, CHAPTERS[ch_num], result_queue, use_optimized_safe)
-                )
-                p.start()
-                processes.append((ch_num, p))
-                print(f"   ▶️  Started: Chapter {ch_num} - {CHAPTERS[ch_num]['name']}")
-
-        # Wait for all to complete
-        for ch_num, p in processes:
-            p.join()
-
-        # Collect results
-        while not result_queue.empty():
-            ch_num, success, elapsed, elem_count, zona_fixes = result_queue.get()
-            if success:
-                completed.append(ch_num)
-                results[ch_num] = {
-                    'elapsed': elapsed,
-                    'elements': elem_count,
-                    'zona_fixes': zona_fixes
-                }
+    def on_start(job):
+        print(f"   ▶️  Started: Chapter {job.key} - {CHAPTERS[job.key]['name']} "
+              f"({time.time() - total_start:.0f}s)")
+
+    # Results arrive as each chapter finishes; a worker that dies is reported, not waited on
+    for outcome in scheduler.run(jobs, process_chapter, on_start=on_start):
+        if not outcome.ok:
+            print(f"   ❌ Chapter {outcome.key}: worker exited with code {outcome.exitcode} and no result")
+            continue
+        ch_num, success, elapsed, elem_count, zona_fixes = outcome.result
+        print(f"   {'✅' if success else '❌'} Finished: Chapter {ch_num} "
+              f"({outcome.elapsed / 60:.1f} min, peak {outcome.peak_rss_mb / 1024:.1f} GB)")
+        if success:
+            completed.append(ch_num)
+            results[ch_num] = {
+                'elapsed': elapsed,
+                'elements': elem_count,
+                'zona_fixes': zona_fixes
+            }
 
-        print()
+    print()
 
     total_elapsed = time.time() - total_start
 
@@ -370,7 +462,7 @@ def main():
     print("=" * 80)
     print("✅ ENHANCED PARALLEL PROCESSING COMPLETE")
     print("=" * 80)
-    print(f"📊 Processed: {len(completed)}/{len(CHAPTERS)} chapters")
+    print(f"📊 Processed: {len(completed)}/{len(jobs)} chapters")
     print(f"⏱️  Total time: {total_elapsed/3600:.2f} hours ({total_elapsed/60:.1f} min)")
     print()
 
@@ -397,6 +489,21 @@ def main():
     print(f"   TOTAL: {total_elements} elements, {total_zona_fixes} zona fixes")
     print()
 
+    if args.table_policy == "adaptive":
+        # Per-chapter decisions written by the workers
+        mode_tables, mode_seconds = Counter(), Counter()
+        for ch_num in sorted(completed):
+            metrics_path = BASE_DIR / f"capitulo_{ch_num:02d}" / "outputs" / "metrics.json"
+            if metrics_path.exists():
+                with open(metrics_path, 'r', encoding='utf-8') as f:
+                    table_modes = json.load(f)['table_modes']
+                mode_tables.update(table_modes['tables'])
+                mode_seconds.update(table_modes['seconds'])
+        print("🧮 Table modes (adaptive policy):")
+        for mode in ('none', 'fast', 'accurate'):
+            print(f"   {mode:8s}: {mode_tables[mode]:4d} tables, {mode_seconds[mode]:7.1f}s")
+        print()
+
     print("🎨 Annotated PDF Color Legend:")
     print("   🔴 Red     = section_header / title")
     print("   🔵 Blue    = text paragraphs")
@@ -26,6 +26,7 @@ missed them during initial extraction.
 """
 import re
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 
 # Add project to path
@@ -49,6 +50,10 @@ _PDF_PATH = None
 # Global variable to store last cluster from previous page (for cross-page list detection)
 _LAST_PAGE_LAST_CLUSTER = None
 
+# Per-page record of the cross-page list inputs (1-based page number -> first
+# list-item and last cluster), replayed on shard boundaries by shard_conversion
+_PAGE_BOUNDARIES = {}
+
 # Store original method
 _original_process_regular = LayoutPostprocessor._process_regular_clusters
 
@@ -1055,6 +1060,18 @@ def _patched_process_regular_clusters(self):
     else:
         print("⚠️  [PATCH] No list-items found on this page")
 
+    # Record this page's first list-item for the shard stitch pass
+    page_boundary = _PAGE_BOUNDARIES.setdefault(self.page.page_no + 1, {})
+    page_boundary['first_list_item'] = None
+    if len(list_items) > 0:
+        first_bbox = list_items[0]['cluster'].bbox
+        page_boundary['first_list_item'] = {
+            'text': list_items[0]['text'],
+            'marker_type': list_items[0]['marker_type'],
+            'isolated_header': list_items[0]['cluster'].label == DocItemLabel.SECTION_HEADER,
+            'bbox': (first_bbox.l, first_bbox.t, first_bbox.r, first_bbox.b),
+        }
+
     print("=" * 80 + "\n")
 
     # ========================================================================
@@ -1074,8 +1091,14 @@ def _patched_process_regular_clusters(self):
     # Note: global declaration already at top of function
     if len(final_clusters) > 0:
         _LAST_PAGE_LAST_CLUSTER = final_clusters[-1]
+        last_text = _LAST_PAGE_LAST_CLUSTER.text.strip() if hasattr(_LAST_PAGE_LAST_CLUSTER, 'text') and _LAST_PAGE_LAST_CLUSTER.text else ''
+        page_boundary['last_cluster'] = {
+            'is_list_item': hasattr(_LAST_PAGE_LAST_CLUSTER, 'label') and _LAST_PAGE_LAST_CLUSTER.label == DocItemLabel.LIST_ITEM,
+            'marker_type': get_marker_type(last_text, _LAST_PAGE_LAST_CLUSTER),
+        }
     else:
         _LAST_PAGE_LAST_CLUSTER = None
+        page_boundary['last_cluster'] = None
 
     print("=" * 80 + "\n")
 
@@ -1177,9 +1200,38 @@ def set_pdf_path(pdf_path):
     global _PDF_PATH, _LAST_PAGE_LAST_CLUSTER
     _PDF_PATH = str(pdf_path)
     _LAST_PAGE_LAST_CLUSTER = None  # Reset cross-page state for new document
+    _PAGE_BOUNDARIES.clear()
     print(f"📄 [PATCH] PDF path set: {pdf_path}")
 
 
+def get_page_boundaries():
+    """
+    Cross-page list inputs recorded per page since set_pdf_path()
+
+    Returns:
+        dict: {page_no (1-based): {'first_list_item': {...} | None,
+                                   'last_cluster': {...} | None}}
+    """
+    return {page_no: dict(entry) for page_no, entry in _PAGE_BOUNDARIES.items()}
+
+
+@contextmanager
+def patch_suspended():
+    """
+    Temporarily restore Docling's original cluster processing
+
+    For conversions of other documents while the patch is applied (e.g. a
+    single-table crop): the patch reads the PDF set by set_pdf_path() by
+    page number and would inject that document's lines.
+    """
+    patched = LayoutPostprocessor._process_regular_clusters
+    LayoutPostprocessor._process_regular_clusters = _original_process_regular
+    try:
+        yield
+    finally:
+        LayoutPostprocessor._process_regular_clusters = patched
+
+
 def apply_universal_patch_with_pdf(pdf_path):
     """
     Apply the universal patch with PDF extraction
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Fast Layout Path
+PyMuPDF-only layout for simple text pages, model inference for the rest
+
+Many EAF pages (chapter 10-11 recommendations, most of the chapter 1
+narrative) are plain single-column text with numbered headers: no
+drawings, no images. The layout model adds nothing there but its cost.
+
+1. TRIAGE PRE-PASS - every page of the PDF is classified once:
+   - No images or drawings outside the header/footer margins
+   - Enough body lines, and no two lines side by side (single column)
+   - Regular line pitch inside every text block
+2. FAST PAGES - LayoutModel.__call__ is wrapped: simple pages get clusters
+   built from PyMuPDF lines (SECTION_HEADER via EAFTitleDetector,
+   LIST_ITEM via the list markers of the patch engine, PAGE_HEADER /
+   PAGE_FOOTER inside the margins, TEXT otherwise)
+3. SAME PIPELINE - those clusters go through the (patched)
+   LayoutPostprocessor like model clusters, so the EAF patch, its
+   cross-page list state, cell assignment and document assembly are
+   unchanged; pages without table clusters never reach TableFormer.
+   Consecutive complex pages are passed to the model as one batch.
+
+Usage:
+    apply_universal_patch_with_pdf(pdf_path)
+    apply_fast_layout_patch(pdf_path)      # after the EAF patch
+    result = converter.convert(pdf_path)
+    print(get_fast_layout_stats())
+"""
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Import from same package using parent directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from core.eaf_title_detector import EAFTitleDetector
+
+# Header/footer band (points), same margin as EAFPageDetector
+MARGIN = 100
+
+# Fewer body lines than this: not worth a fast path (cover, blank, scanned)
+MIN_BODY_LINES = 4
+
+# Largest / smallest line pitch inside one block for "regular spacing"
+MAX_PITCH_RATIO = 1.6
+
+# Bullets (-, •, *, ·, ●, ▪) and enumerations (a), 1), iv)) opening a list item
+LIST_MARKER = re.compile(r'^\s*([-•*·●▪]|[a-zA-Z0-9]{1,3}\))\s+')
+
+_TITLE_DETECTOR = EAFTitleDetector()
+
+# Layout model call replaced by the wrapper
+_ORIGINAL_LAYOUT_CALL = None
+
+# Triage of the current PDF: 0-based page number -> (simple, reason)
+_TRIAGE: Dict[int, Tuple[bool, str]] = {}
+
+# PyMuPDF lines of the simple pages, kept from the triage pass
+_LINES: Dict[int, List[Dict]] = {}
+
+_PDF_PATH: Optional[str] = None
+
+_STATS = {'fast': 0, 'model': 0}
+
+
+def _body_lines(page) -> List[Dict]:
+    """Text lines of a page with their block; 'margin' marks the header/footer band"""
+    height = page.rect.height
+    lines = []
+    for block_index, block in enumerate(page.get_text("dict")["blocks"]):
+        if block['type'] != 0:
+            continue
+        for line in block.get('lines', []):
+            text = ' '.join(span['text'].strip() for span in line.get('spans', []) if span['text'].strip())
+            if not text:
+                continue
+            x0, y0, x1, y1 = line['bbox']
+            lines.append({
+                'text': text,
+                'bbox': {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1},
+                'block': block_index,
+                'margin': y1 <= MARGIN or y0 >= height - MARGIN,
+            })
+    return lines
+
+
+def triage_page(page) -> Tuple[bool, str]:
+    """
+    Decide whether a PyMuPDF page can skip the layout model
+
+    Returns:
+        (simple, reason): reason names the first failed check, or 'simple'
+    """
+    simple, reason, _ = _triage_page(page)
+    return simple, reason
+
+
+def _triage_page(page) -> Tuple[bool, str, List[Dict]]:
+    """triage_page plus the page lines it parsed (empty before the text checks)"""
+    import fitz
+
+    height = page.rect.height
+
+    def in_margin(rect) -> bool:
+        return rect.y1 <= MARGIN or rect.y0 >= height - MARGIN
+
+    for info in page.get_image_info():
+        if not in_margin(fitz.Rect(info['bbox'])):
+            return False, 'image', []
+    drawings = page.get_cdrawings() if hasattr(page, 'get_cdrawings') else page.get_drawings()
+    for drawing in drawings:
+        if not in_margin(fitz.Rect(drawing['rect'])):
+            return False, 'drawing', []
+
+    lines = _body_lines(page)
+    body = [line for line in lines if not line['margin']]
+    if len(body) < MIN_BODY_LINES:
+        return False, 'sparse', lines
+
+    # Single column: no two lines share a baseline band side by side
+    body.sort(key=lambda line: line['bbox']['y0'])
+    for i, line in enumerate(body):
+        a = line['bbox']
+        for other in body[i + 1:]:
+            b = other['bbox']
+            if b['y0'] >= a['y1']:
+                break
+            overlap = min(a['y1'], b['y1']) - max(a['y0'], b['y0'])
+            if overlap > 0.5 * min(a['y1'] - a['y0'], b['y1'] - b['y0']) and (b['x0'] >= a['x1'] or a['x0'] >= b['x1']):
+                return False, 'columns', lines
+
+    # Regular spacing: line pitch inside each block stays within MAX_PITCH_RATIO
+    by_block: Dict[int, List[float]] = {}
+    for line in body:
+        by_block.setdefault(line['block'], []).append(line['bbox']['y0'])
+    for tops in by_block.values():
+        pitches = [b - a for a, b in zip(tops, tops[1:]) if b - a > 0.5]
+        if len(pitches) >= 2 and max(pitches) > MAX_PITCH_RATIO * min(pitches):
+            return False, 'spacing', lines
+
+    return True, 'simple', lines
+
+
+def triage_pdf(pdf_path: str, lines: Optional[Dict[int, List[Dict]]] = None) -> Dict[int, Tuple[bool, str]]:
+    """
+    Triage every page (0-based page number -> (simple, reason))
+
+    If lines is given, the parsed lines of every simple page are stored in
+    it, so the fast path builds clusters without reopening the PDF.
+    """
+    import fitz
+
+    triage = {}
+    with fitz.open(str(pdf_path)) as doc:
+        for page_no in range(doc.page_count):
+            try:
+                simple, reason, page_lines = _triage_page(doc[page_no])
+            except Exception as e:
+                simple, reason, page_lines = False, f'error: {e}', []
+            triage[page_no] = (simple, reason)
+            if simple and lines is not None:
+                lines[page_no] = page_lines
+    return triage
+
+
+def build_clusters(page, page_no: int, lines: Optional[List[Dict]] = None) -> list:
+    """
+    Layout clusters of a simple page from its PyMuPDF lines
+
+    A new cluster starts at every block, title line and list marker; other
+    lines continue the current TEXT / LIST_ITEM cluster. lines (from the
+    triage pass) avoids parsing the page again; page may then be None.
+    """
+    from docling.datamodel.base_models import BoundingBox, Cluster
+    from docling.datamodel.document import DocItemLabel
+
+    groups = []                     # [label, bbox dict, block]
+    for line in (lines if lines is not None else _body_lines(page)):
+        bbox = line['bbox']
+        if line['margin']:
+            # Page numbers ("Página 172 de 399") and running headers/footers
+            label = DocItemLabel.PAGE_HEADER if bbox['y1'] <= MARGIN else DocItemLabel.PAGE_FOOTER
+            groups.append([label, dict(bbox), line['block']])
+            continue
+
+        if _TITLE_DETECTOR.should_create_cluster(line['text'], bbox, page_no):
+            groups.append([DocItemLabel.SECTION_HEADER, dict(bbox), line['block']])
+            continue
+        if LIST_MARKER.match(line['text']):
+            groups.append([DocItemLabel.LIST_ITEM, dict(bbox), line['block']])
+            continue
+
+        current = groups[-1] if groups else None
+        if (current is not None and current[2] == line['block']
+                and current[0] in (DocItemLabel.TEXT, DocItemLabel.LIST_ITEM)):
+            box = current[1]
+            box['x0'], box['y0'] = min(box['x0'], bbox['x0']), min(box['y0'], bbox['y0'])
+            box['x1'], box['y1'] = max(box['x1'], bbox['x1']), max(box['y1'], bbox['y1'])
+        else:
+            groups.append([DocItemLabel.TEXT, dict(bbox), line['block']])
+
+    return [
+        Cluster(
+            id=index,
+            label=label,
+            bbox=BoundingBox(l=box['x0'], t=box['y0'], r=box['x1'], b=box['y1']),
+            confidence=1.0,
+            cells=[],
+        )
+        for index, (label, box, _) in enumerate(groups)
+    ]
+
+
+def _fast_layout_page(model, page):
+    """Layout prediction of a simple page without the layout model"""
+    from docling.datamodel.base_models import LayoutPrediction
+    from docling.utils.layout_postprocessor import LayoutPostprocessor
+
+    # Lines parsed by the triage pass: no reopening of the PDF per page
+    clusters = build_clusters(None, page.page_no + 1, lines=_LINES[page.page_no])
+    clusters, _ = LayoutPostprocessor(page, clusters, model.options).postprocess()
+    page.predictions.layout = LayoutPrediction(clusters=clusters)
+    _STATS['fast'] += 1
+    print(f"⚡ [FAST LAYOUT] Page {page.page_no + 1}: {len(clusters)} clusters from PyMuPDF lines")
+    return page
+
+
+def _patched_layout_call(self, conv_res, page_batch):
+    """LayoutModel.__call__ with simple pages routed to the PyMuPDF builder"""
+    # Other documents (e.g. table crops) keep the model: the triage is per PDF
+    if _PDF_PATH is None or Path(str(conv_res.input.file)).name != Path(_PDF_PATH).name:
+        yield from _ORIGINAL_LAYOUT_CALL(self, conv_res, page_batch)
+        return
+
+    complex_pages = []
+    for page in page_batch:
+        is_valid = page._backend is not None and page._backend.is_valid()
+        if is_valid and _TRIAGE.get(page.page_no, (False, ''))[0]:
+            if complex_pages:
+                _STATS['model'] += len(complex_pages)
+                yield from _ORIGINAL_LAYOUT_CALL(self, conv_res, complex_pages)
+                complex_pages = []
+            yield _fast_layout_page(self, page)
+        else:
+            complex_pages.append(page)
+    if complex_pages:
+        _STATS['model'] += len(complex_pages)
+        yield from _ORIGINAL_LAYOUT_CALL(self, conv_res, complex_pages)
+
+
+def apply_fast_layout_patch(pdf_path):
+    """
+    Triage pdf_path and route its simple pages around the layout model
+
+    Call after apply_universal_patch_with_pdf(pdf_path) and before convert().
+
+    Returns:
+        dict: 0-based page number -> (simple, reason)
+    """
+    global _ORIGINAL_LAYOUT_CALL, _PDF_PATH
+    from docling.models.layout_model import LayoutModel
+
+    _PDF_PATH = str(pdf_path)
+    _TRIAGE.clear()
+    _LINES.clear()
+    _TRIAGE.update(triage_pdf(_PDF_PATH, lines=_LINES))
+    _STATS.update(fast=0, model=0)
+
+    if _ORIGINAL_LAYOUT_CALL is None:
+        _ORIGINAL_LAYOUT_CALL = LayoutModel.__call__
+        LayoutModel.__call__ = _patched_layout_call
+
+    simple = sum(1 for is_simple, _ in _TRIAGE.values() if is_simple)
+    reasons = {}
+    for is_simple, reason in _TRIAGE.values():
+        if not is_simple:
+            reasons[reason] = reasons.get(reason, 0) + 1
+    print(f"⚡ [FAST LAYOUT] {simple}/{len(_TRIAGE)} simple page(s) skip the layout model "
+          f"(complex: {reasons})")
+    return dict(_TRIAGE)
+
+
+def get_fast_layout_stats() -> Dict[str, int]:
+    """Pages laid out by the PyMuPDF builder ('fast') and by the model ('model')"""
+    return dict(_STATS)
+
+
+# ============================================================================
+# USAGE EXAMPLE
+# ============================================================================
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python3 fast_layout.py <chapter.pdf>")
+        sys.exit(1)
+
+    triage = triage_pdf(sys.argv[1])
+    for page_no, (is_simple, reason) in sorted(triage.items()):
+        print(f"   Page {page_no + 1:4d}: {'⚡ fast ' if is_simple else '🧠 model'} ({reason})")
+    print(f"\n{sum(1 for s, _ in triage.values() if s)}/{len(triage)} simple pages")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Page-Sharded Conversion
+Converts a large chapter as page shards in parallel Docling workers and
+merges them back into one DoclingDocument.
+
+A chapter like EAF-477 chapter 11 (143 pages) or EAF-089 chapter 6 (94
+pages) used to be one serial Docling job. Every shard here converts the
+same chapter PDF restricted to a page range (DocumentConverter.convert
+page_range), so page numbers, provenance and the patch engine's PDF
+lookups are exactly those of a serial run.
+
+The only cross-page dependency in the patch engine is _LAST_PAGE_LAST_CLUSTER:
+the first list-item of a page counts as "sequential" when the previous
+page ended with a list-item of the same marker type. The first page of a
+shard has no previous page, so an isolated first list-item ending in ':'
+may have been turned into a section header. Each worker returns the
+engine's page boundary log (get_page_boundaries), and the stitch pass
+replays the rule on every shard start:
+
+    previous page's last cluster is a list-item  and
+    same marker type as this page's first list-item  and
+    that first list-item was reclassified as isolated
+        -> the item is a list-item again (what the serial run keeps)
+
+Merge: shard exports (export_to_dict) are concatenated collection by
+collection, with every "$ref" / "self_ref" shifted by the items of the
+previous shards, then validated into a DoclingDocument. Document-level
+post-processors run afterwards, on the merged document.
+
+Shards are scheduled by chapter_scheduler.ChapterScheduler (largest
+first, memory admission, results as they arrive).
+
+Usage:
+    document, stats = convert_sharded(pdf_path, pipeline_options, shards=4)
+"""
+import re
+import sys
+import traceback
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Chapter scheduler shared with the parallel runner (utilities -> root: 4 levels up)
+sys.path.append(str(Path(__file__).resolve().parents[4] / "domains" / "operaciones" / "shared" / "utilities"))
+from chapter_scheduler import ChapterJob, ChapterScheduler
+
+# Smallest shard worth a Docling worker (model loading costs ~a few pages)
+MIN_SHARD_PAGES = 12
+
+# Collections of a DoclingDocument export that hold items with a self_ref
+ITEM_COLLECTIONS = ('texts', 'tables', 'pictures', 'groups', 'key_value_items', 'form_items')
+
+REF_PATTERN = re.compile(r'^#/(' + '|'.join(ITEM_COLLECTIONS) + r')/(\d+)$')
+
+# Tolerance (points) when matching a recorded cluster box to a document item
+BBOX_TOLERANCE = 2.0
+
+
+def plan_shards(page_count: int, shards: int, min_pages: int = MIN_SHARD_PAGES) -> List[Tuple[int, int]]:
+    """
+    Contiguous, balanced 1-based page ranges
+
+    Args:
+        page_count: Pages of the chapter PDF
+        shards: Requested shards (reduced so every shard has min_pages)
+    """
+    shards = max(1, min(shards, page_count // max(1, min_pages)))
+    size, extra = divmod(page_count, shards)
+    ranges = []
+    start = 1
+    for index in range(shards):
+        end = start + size - 1 + (1 if index < extra else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def convert_shard(pdf_path: str, page_range: Tuple[int, int], pipeline_options, fast_layout: bool = False,
+                  result_conn=None):
+    """
+    Worker: convert one page range with the EAF patch
+
+    Sends {'page_range', 'document' (export_to_dict), 'boundaries'} or
+    {'page_range', 'error'} on result_conn.
+    """
+    try:
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from core.eaf_patch_engine import apply_universal_patch_with_pdf, get_page_boundaries
+
+        print(f"[Shard {page_range[0]}-{page_range[1]}] 🚀 Starting Docling extraction")
+        apply_universal_patch_with_pdf(pdf_path)
+        if fast_layout:
+            from core.fast_layout import apply_fast_layout_patch
+            apply_fast_layout_patch(pdf_path)
+        converter = DocumentConverter(
+            format_options={
+                "pdf": PdfFormatOption(pipeline_options=pipeline_options)
+            }
+        )
+        result = converter.convert(pdf_path, page_range=page_range)
+        result_conn.send({
+            'page_range': page_range,
+            'document': result.document.export_to_dict(),
+            'boundaries': get_page_boundaries(),
+        })
+        print(f"[Shard {page_range[0]}-{page_range[1]}] ✅ Done")
+    except Exception as e:
+        print(f"[Shard {page_range[0]}-{page_range[1]}] ❌ Error: {e}")
+        result_conn.send({'page_range': page_range, 'error': traceback.format_exc()})
+
+
+def _shift_ref(ref: str, offsets: Dict[str, int]) -> str:
+    match = REF_PATTERN.match(ref)
+    if not match:
+        return ref                      # "#/body", "#/furniture"
+    return f"#/{match.group(1)}/{int(match.group(2)) + offsets[match.group(1)]}"
+
+
+def _remap(node, offsets: Dict[str, int]):
+    """Copy of node with every "$ref" / "self_ref" shifted by the collection offsets"""
+    if isinstance(node, dict):
+        return {
+            key: _shift_ref(value, offsets) if key in ('$ref', 'self_ref') and isinstance(value, str)
+            else _remap(value, offsets)
+            for key, value in node.items()
+        }
+    if isinstance(node, list):
+        return [_remap(value, offsets) for value in node]
+    return node
+
+
+def merge_document_dicts(shards: Iterable[Dict]) -> Dict:
+    """
+    One DoclingDocument export from shard exports in page order
+
+    shards may be a generator (e.g. spill files loaded one at a time): each
+    export is only referenced while it is being appended.
+    """
+    merged = None
+    pages = {}
+
+    for shard in shards:
+        if merged is None:
+            merged = {key: value for key, value in shard.items()
+                      if key not in ITEM_COLLECTIONS and key not in ('body', 'furniture', 'pages')}
+            for collection in ITEM_COLLECTIONS:
+                merged[collection] = []
+            merged['body'] = dict(shard['body'], children=[])
+            if 'furniture' in shard:
+                merged['furniture'] = dict(shard['furniture'], children=[])
+        offsets = {collection: len(merged[collection]) for collection in ITEM_COLLECTIONS}
+        for collection in ITEM_COLLECTIONS:
+            merged[collection].extend(_remap(shard.get(collection) or [], offsets))
+        for tree in ('body', 'furniture'):
+            if tree in merged and tree in shard:
+                merged[tree]['children'].extend(_remap(shard[tree].get('children') or [], offsets))
+        pages.update(shard.get('pages') or {})
+
+    if merged is None:
+        raise ValueError("No document exports to merge")
+    merged['pages'] = {key: pages[key] for key in sorted(pages, key=int)}
+    return merged
+
+
+def _item_at(document, page_no: int, bbox: Tuple[float, float, float, float], label):
+    """Text item with label on page_no whose box center lies in bbox (top-left origin)"""
+    page = document.pages.get(page_no)
+    if page is None:
+        return None
+    l, t, r, b = bbox
+    for item in document.texts:
+        if item.label != label:
+            continue
+        for prov in item.prov:
+            if prov.page_no != page_no:
+                continue
+            box = prov.bbox.to_top_left_origin(page_height=page.size.height)
+            x, y = (box.l + box.r) / 2, (box.t + box.b) / 2
+            if l - BBOX_TOLERANCE <= x <= r + BBOX_TOLERANCE and t - BBOX_TOLERANCE <= y <= b + BBOX_TOLERANCE:
+                return item
+    return None
+
+
+def stitch_shard_boundaries(document, boundaries: Dict[int, Dict], shard_starts: Iterable[int]) -> int:
+    """
+    Replay the patch engine's cross-page list rule on every shard start
+
+    Returns:
+        int: Items relabeled section_header -> list_item
+    """
+    from docling_core.types.doc import DocItemLabel
+
+    stitched = 0
+    for page_no in shard_starts:
+        first = (boundaries.get(page_no) or {}).get('first_list_item')
+        if not first or not first['isolated_header']:
+            continue
+        # The page processed just before this one in a serial run
+        previous_page = max((n for n in boundaries if n < page_no), default=None)
+        previous = (boundaries.get(previous_page) or {}).get('last_cluster') if previous_page else None
+        if not previous or not previous['is_list_item'] or previous['marker_type'] != first['marker_type']:
+            continue
+
+        item = _item_at(document, page_no, first['bbox'], DocItemLabel.SECTION_HEADER)
+        if item is not None:
+            print(f"   🔗 [STITCH] Page {page_no}: list continues from page {previous_page}, "
+                  f"'{first['text'][:60]}' stays list-item")
+            item.label = DocItemLabel.LIST_ITEM
+            stitched += 1
+    return stitched
+
+
+def convert_sharded(pdf_path: str, pipeline_options, shards: int = 4, max_workers: Optional[int] = None,
+                    rss_budget_mb: float = 4000.0, min_pages: int = MIN_SHARD_PAGES,
+                    fast_layout: bool = False):
+    """
+    Convert pdf_path as parallel page shards, merge and stitch them
+
+    Args:
+        pdf_path: Chapter PDF
+        pipeline_options: PdfPipelineOptions for every shard
+        shards: Requested shards (fewer when the chapter is small)
+        max_workers: Concurrent shard workers (default: one per shard)
+        rss_budget_mb: Memory budget per worker (ChapterScheduler)
+        fast_layout: Route simple text pages around the layout model
+                     (core.fast_layout) in every shard
+
+    Returns:
+        (DoclingDocument, stats): stats has 'shards' and 'stitched'
+    """
+    import fitz
+    from docling_core.types.doc import DoclingDocument
+
+    pdf_path = str(pdf_path)
+    with fitz.open(pdf_path) as pdf:
+        page_count = pdf.page_count
+    ranges = plan_shards(page_count, shards, min_pages)
+
+    print(f"🧩 Sharded conversion: {len(ranges)} shard(s) "
+          f"{', '.join(f'{start}-{end}' for start, end in ranges)}")
+
+    jobs = [ChapterJob.from_pdf(page_range, pdf_path, args=(pdf_path, page_range, pipeline_options, fast_layout),
+                                page_range=page_range)
+            for page_range in ranges]
+    scheduler = ChapterScheduler(max_workers=max_workers or len(ranges), rss_budget_mb=rss_budget_mb)
+
+    payloads = {}
+    for outcome in scheduler.run(jobs, convert_shard):
+        if not outcome.ok:
+            raise RuntimeError(f"Shard {outcome.key} exited with code {outcome.exitcode} and no result")
+        if 'error' in outcome.result:
+            raise RuntimeError(f"Shard {outcome.key} failed:\n{outcome.result['error']}")
+        payloads[outcome.key] = outcome.result
+        print(f"   ✅ Shard {outcome.key[0]}-{outcome.key[1]} converted in {outcome.elapsed / 60:.1f} min")
+
+    ordered = [payloads[page_range] for page_range in ranges]
+    document = DoclingDocument.model_validate(merge_document_dicts([payload['document'] for payload in ordered]))
+
+    boundaries = {}
+    for payload in ordered:
+        boundaries.update({int(page_no): entry for page_no, entry in payload['boundaries'].items()})
+    stitched = stitch_shard_boundaries(document, boundaries, [start for start, _ in ranges[1:]])
+    print(f"✅ Shards merged: {len(document.texts)} texts, {len(document.tables)} tables, "
+          f"{stitched} cross-page list fix(es)")
+
+    return document, {'shards': ranges, 'stitched': stitched}
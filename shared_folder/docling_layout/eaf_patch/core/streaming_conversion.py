@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Streaming Conversion
+Bounded-memory conversion of a long chapter: page windows are converted
+one after the other, spilled to disk and released before the next one.
+
+A single converter.convert() keeps the page backends, clusters and
+predictions of every page until it returns, so peak RSS grows with the
+chapter (EAF-477 chapter 11: 143 pages). Here one DocumentConverter (models
+loaded once) converts the chapter PDF window by window with page_range:
+
+    for each window of pages:
+        convert -> export_to_dict -> spill (JSON) -> drop result
+        gc + malloc_trim, measure RSS, size the next window
+
+The patch engine is applied once and pages are processed in order, so its
+cross-page state (previous page's last cluster) carries across windows:
+no stitch pass is needed, unlike sharded conversion.
+
+Memory ceiling: every window is sized so the measured RSS plus the
+estimated growth of its pages stays under memory_ceiling_mb. The growth per
+page starts from the scheduler's CostModel and is replaced by the largest
+growth measured on previous windows. A one-page window that ends above the
+ceiling raises MemoryError instead of letting the node swap.
+
+The document is assembled at the end by loading the spills one at a time
+(merge_document_dicts accepts a generator), so only the merged export and
+one spill are in memory while assembling.
+
+Usage:
+    document, stats = convert_streaming(pdf_path, pipeline_options, spill_dir,
+                                        memory_ceiling_mb=12000)
+"""
+import ctypes
+import gc
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Chapter scheduler cost model (utilities -> root: 4 levels up)
+sys.path.append(str(Path(__file__).resolve().parents[4] / "domains" / "operaciones" / "shared" / "utilities"))
+from core.shard_conversion import merge_document_dicts
+from chapter_scheduler import DEFAULT_COST_MODEL, CostModel, prescan_pdf, process_rss_mb
+
+# Shared 16 GB CPU nodes: leave room for the OS and the post-processors
+DEFAULT_MEMORY_CEILING_MB = 12000
+
+# Upper bound of a window, so a generous ceiling still streams
+MAX_WINDOW_PAGES = 24
+
+
+def release_memory() -> None:
+    """Collect garbage and return freed heap pages to the OS (glibc)"""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def iter_spills(spill_paths: List[Path]) -> Iterator[Dict]:
+    """Window exports, loaded one at a time"""
+    for spill_path in spill_paths:
+        with open(spill_path, 'r', encoding='utf-8') as f:
+            yield json.load(f)
+
+
+def convert_streaming(pdf_path: str, pipeline_options, spill_dir: Path,
+                      memory_ceiling_mb: float = DEFAULT_MEMORY_CEILING_MB,
+                      window_pages: Optional[int] = None, keep_spills: bool = False,
+                      model: CostModel = DEFAULT_COST_MODEL, fast_layout: bool = False):
+    """
+    Convert pdf_path window by window under a memory ceiling
+
+    Args:
+        pdf_path: Chapter PDF
+        pipeline_options: PdfPipelineOptions
+        spill_dir: Directory for the window exports (removed afterwards
+                   unless keep_spills)
+        memory_ceiling_mb: Process RSS the conversion must stay under
+        window_pages: Fixed window size (default: sized from the ceiling)
+        fast_layout: Route simple text pages around the layout model
+                     (core.fast_layout)
+
+    Returns:
+        (DoclingDocument, stats): stats has 'windows' and 'peak_rss_mb'
+        (largest RSS measured between windows)
+    """
+    import fitz
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling_core.types.doc import DoclingDocument
+    from core.eaf_patch_engine import apply_universal_patch_with_pdf
+
+    pdf_path = str(pdf_path)
+    spill_dir = Path(spill_dir)
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    with fitz.open(pdf_path) as pdf:
+        page_count = pdf.page_count
+
+    scan = prescan_pdf(pdf_path)
+    page_growth_mb = model.page_rss_mb + model.table_page_rss_mb * scan.table_density
+
+    apply_universal_patch_with_pdf(pdf_path)
+    if fast_layout:
+        from core.fast_layout import apply_fast_layout_patch
+        apply_fast_layout_patch(pdf_path)
+    converter = DocumentConverter(
+        format_options={
+            "pdf": PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+
+    print(f"🌊 Streaming conversion: {page_count} pages, ceiling {memory_ceiling_mb:.0f} MB")
+
+    spill_paths = []
+    windows = []
+    peak_rss = 0.0
+    start = 1
+    while start <= page_count:
+        rss_before = process_rss_mb(os.getpid()) or 0.0
+        # Models are not loaded before the first convert(): reserve them
+        baseline = rss_before if windows else max(rss_before, model.base_rss_mb)
+        if window_pages:
+            size = window_pages
+        else:
+            size = int((memory_ceiling_mb - baseline) // page_growth_mb)
+            size = max(1, min(size, MAX_WINDOW_PAGES))
+        end = min(page_count, start + size - 1)
+
+        window_start = time.time()
+        result = converter.convert(pdf_path, page_range=(start, end))
+        spill_path = spill_dir / f"pages_{start:04d}-{end:04d}.json"
+        with open(spill_path, 'w', encoding='utf-8') as f:
+            json.dump(result.document.export_to_dict(), f, ensure_ascii=False)
+        del result
+        release_memory()
+
+        rss_after = process_rss_mb(os.getpid()) or 0.0
+        peak_rss = max(peak_rss, rss_after)
+        if windows and rss_after > rss_before:
+            page_growth_mb = max(page_growth_mb, (rss_after - rss_before) / (end - start + 1))
+        spill_paths.append(spill_path)
+        windows.append((start, end))
+        print(f"   💾 Pages {start}-{end}: {time.time() - window_start:.1f}s, "
+              f"RSS {rss_after:.0f} MB, spill {spill_path.stat().st_size / (1024*1024):.1f} MB")
+
+        if rss_after > memory_ceiling_mb:
+            if end - start == 0:
+                raise MemoryError(f"RSS {rss_after:.0f} MB above the {memory_ceiling_mb:.0f} MB ceiling "
+                                  f"after a single page ({start})")
+            print("   ⚠️  Above the memory ceiling: next windows are single pages")
+            window_pages = 1
+        start = end + 1
+
+    del converter
+    release_memory()
+
+    document = DoclingDocument.model_validate(merge_document_dicts(iter_spills(spill_paths)))
+    release_memory()
+    if not keep_spills:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    print(f"✅ Streamed {len(windows)} window(s), peak RSS {peak_rss:.0f} MB")
+    return document, {'windows': windows, 'peak_rss_mb': peak_rss}
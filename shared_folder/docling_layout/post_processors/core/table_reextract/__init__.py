@@ -10,6 +10,7 @@ specialized extractors based on table type.
 
 import time
 from .classifier import classify_table
+from . import mode_policy
 from .extractors import pymupdf, tableformer, line_based, position_based
 from .custom import (
     costos_horarios,
@@ -67,7 +68,9 @@ EXTRACTORS = {
 }
 
 
-def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
+def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False,
+                                      table_structure=True, lazy_tableformer=False,
+                                      table_policy=None, metrics=None):
     """
     Re-extract tables using appropriate extractors based on table type.
 
@@ -75,6 +78,16 @@ def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
         document: The Docling document object
         pdf_path: Path to the source PDF file
         force_pymupdf: If True, always use PyMuPDF extraction instead of TableFormer
+        table_structure: False when Docling ran without TableFormer (bbox-only
+                         tables): the extractors are the only content engine
+        lazy_tableformer: In bbox-only mode, run TableFormer on the crop of
+                          tables the classifier has no extractor for
+                          ("default") or whose extractor fails
+        table_policy: "adaptive" (bbox-only mode): choose per table between
+                      no model, TableFormer FAST and ACCURATE on the crop
+                      (see mode_policy)
+        metrics: Dict from mode_policy.new_metrics(), filled with the
+                 adaptive decision counts and per-mode timings
 
     Returns:
         int: Number of tables re-extracted
@@ -82,7 +95,13 @@ def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
     start_time = time.time()
 
     print("\n" + "=" * 80)
-    mode = "PyMuPDF only" if force_pymupdf else "Smart classification"
+    adaptive = not table_structure and table_policy == "adaptive"
+    if adaptive:
+        mode = "Bboxes only, adaptive per-table TableFormer"
+    elif not table_structure:
+        mode = "Bboxes only" + (", lazy TableFormer crops" if lazy_tableformer else "")
+    else:
+        mode = "PyMuPDF only" if force_pymupdf else "Smart classification"
     print(f"📊 [TABLE REEXTRACT] Re-extracting tables ({mode})")
     print("=" * 80)
 
@@ -94,6 +113,8 @@ def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
     total_tables = len(document.tables)
     reextracted = 0
     kept = 0
+    lazy = not table_structure and lazy_tableformer
+    cropped = 0
 
     print(f"📋 [TABLE REEXTRACT] Processing {total_tables} tables...")
 
@@ -102,6 +123,38 @@ def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
         page_no = table.prov[0].page_no if table.prov else "?"
         current_cells = len(table.data.table_cells) if hasattr(table.data, 'table_cells') else 0
 
+        if adaptive:
+            policy_start = time.time()
+            table_mode, table_type, reason = mode_policy.decide_table_mode(table, pdf_path)
+            new_data = None
+            if table_mode != "none":
+                try:
+                    new_data = tableformer.extract_crop(table, pdf_path, mode=table_mode)
+                except Exception as e:
+                    print(f"   Table {i} (p.{page_no}): ⚠ TableFormer crop failed: {str(e)[:50]}")
+                if not new_data:
+                    table_type = "sin_lineas_generico"
+                    reason = f"{reason}; no TableFormer table, position-based"
+            if not new_data and table_type != "skip":
+                try:
+                    new_data = EXTRACTORS.get(table_type, EXTRACTORS["default"])(table, pdf_path)
+                except Exception as e:
+                    print(f"   Table {i} (p.{page_no}): ❌ Error: {str(e)[:50]}")
+            mode_policy.record(metrics, i, page_no, table_mode, reason, time.time() - policy_start)
+
+            if new_data:
+                table.data = new_data
+                reextracted += 1
+                new_rows = len(new_data.get('rows', []))
+                new_cols = len(new_data.get('headers', []))
+                print(f"   Table {i} (p.{page_no}): ↻ [{table_mode}] ({new_rows}x{new_cols}) - {reason}")
+            elif table_type == "skip":
+                print(f"   Table {i} (p.{page_no}): ⏭ Skipped - {reason}")
+            else:
+                kept += 1
+                print(f"   Table {i} (p.{page_no}): ⚠ Extraction failed, kept original")
+            continue
+
         # Classify table type
         if force_pymupdf:
             # Force PyMuPDF extraction, but still classify for custom extractors
@@ -121,6 +174,21 @@ def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
             print(f"   Table {i} (p.{page_no}): ⏭ Skipped - {reason}")
             continue
 
+        if lazy and table_type == "default":
+            # No specific extractor: TableFormer on the crop first
+            try:
+                new_data = tableformer.extract_crop(table, pdf_path)
+            except Exception as e:
+                new_data = None
+                print(f"   Table {i} (p.{page_no}): ⚠ TableFormer crop failed: {str(e)[:50]}")
+            if new_data:
+                table.data = new_data
+                reextracted += 1
+                cropped += 1
+                print(f"   Table {i} (p.{page_no}): ↻ TableFormer crop "
+                      f"({new_data['num_rows']}x{new_data['num_cols']}) - {reason}")
+                continue
+
         if table_type == "tableformer_ok":
             # Keep original TableFormer result but convert to simplified structure
             try:
@@ -137,6 +205,13 @@ def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
             try:
                 new_data = extractor(table, pdf_path)
 
+                if not new_data and lazy and table_type != "default":
+                    # Specialized extractor gave nothing: TableFormer on the crop
+                    new_data = tableformer.extract_crop(table, pdf_path)
+                    if new_data:
+                        cropped += 1
+                        reason = f"{reason}; extractor failed, TableFormer crop"
+
                 if new_data:
                     # Replace table data with new structure
                     table.data = new_data
@@ -156,6 +231,12 @@ def apply_table_reextract_to_document(document, pdf_path, force_pymupdf=False):
     elapsed = time.time() - start_time
 
     print(f"\n✅ [TABLE REEXTRACT] Re-extracted: {reextracted}, Kept: {kept}")
+    if lazy:
+        print(f"🧮 [TABLE REEXTRACT] TableFormer crops: {cropped}/{total_tables} tables")
+    if adaptive and metrics is not None:
+        for table_mode in mode_policy.MODES:
+            print(f"🧮 [TABLE REEXTRACT] {table_mode:8s}: {metrics['tables'][table_mode]} tables, "
+                  f"{metrics['seconds'][table_mode]:.2f}s")
     print(f"⏱️  [TABLE REEXTRACT] Processing time: {elapsed:.3f} seconds")
     print("=" * 80 + "\n")
 
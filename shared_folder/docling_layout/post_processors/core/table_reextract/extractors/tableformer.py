@@ -3,8 +3,21 @@ TableFormer Keeper
 
 Keeps the original TableFormer extraction when it's good enough.
 Converts to simplified structure for consistency.
+
+In bbox-only mode (Docling run without table structure) tables have no
+TableFormer cells; extract_crop() runs TableFormer lazily on a one-page
+PDF cropped to the table, only for the tables that need it.
 """
 
+import contextlib
+from io import BytesIO
+
+# Converters for table crops by TableFormer mode, built on first use
+_CROP_CONVERTERS = {}
+
+# Padding (points) around the table bbox in a crop
+CROP_PADDING = 4
+
 
 def keep(table, pdf_path):
     """
@@ -49,3 +62,85 @@ def keep(table, pdf_path):
         "num_cols": num_cols,
         "extractor": "tableformer"
     }
+
+
+def _crop_converter(mode="accurate"):
+    """TableFormer converter for crops (models load on the first crop of each mode)"""
+    if mode not in _CROP_CONVERTERS:
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
+
+        pipeline_options = PdfPipelineOptions()
+        pipeline_options.do_ocr = False
+        pipeline_options.do_table_structure = True
+        pipeline_options.table_structure_options.mode = (
+            TableFormerMode.FAST if mode == "fast" else TableFormerMode.ACCURATE
+        )
+        pipeline_options.force_backend_text = True
+        _CROP_CONVERTERS[mode] = DocumentConverter(
+            format_options={
+                "pdf": PdfFormatOption(pipeline_options=pipeline_options)
+            }
+        )
+    return _CROP_CONVERTERS[mode]
+
+
+def _patch_suspended():
+    """The EAF layout patch reads the chapter PDF: keep it out of crop conversions"""
+    try:
+        from core.eaf_patch_engine import patch_suspended
+    except ImportError:
+        return contextlib.nullcontext()
+    return patch_suspended()
+
+
+def extract_crop(table, pdf_path, mode="accurate"):
+    """
+    Run TableFormer on just this table's crop.
+
+    Args:
+        table: Docling table object (bbox only, no TableFormer cells)
+        pdf_path: Path to the PDF file
+        mode: TableFormer mode, "accurate" or "fast"
+
+    Returns:
+        dict: Simplified table structure, or None if no table was found
+    """
+    import fitz
+    from docling.datamodel.base_models import DocumentStream
+
+    if not table.prov:
+        return None
+
+    prov = table.prov[0]
+    source = fitz.open(pdf_path)
+    crop = fitz.open()
+    crop.insert_pdf(source, from_page=prov.page_no - 1, to_page=prov.page_no - 1)
+    source.close()
+
+    # Docling bbox is bottom-left origin; PyMuPDF crop box is top-left
+    page = crop[0]
+    page_height = page.rect.height
+    bbox = prov.bbox
+    rect = fitz.Rect(
+        bbox.l - CROP_PADDING,
+        page_height - bbox.t - CROP_PADDING,
+        bbox.r + CROP_PADDING,
+        page_height - bbox.b + CROP_PADDING
+    ) & page.mediabox
+    page.set_cropbox(rect)
+    stream = DocumentStream(name=f"table_crop_p{prov.page_no}.pdf", stream=BytesIO(crop.tobytes()))
+    crop.close()
+
+    with _patch_suspended():
+        result = _crop_converter(mode).convert(stream)
+
+    tables = [t for t in result.document.tables if hasattr(t.data, 'table_cells') and t.data.table_cells]
+    if not tables:
+        return None
+
+    best = max(tables, key=lambda t: len(t.data.table_cells))
+    data = keep(best, pdf_path)
+    if data:
+        data["extractor"] = f"tableformer_crop_{mode}"
+    return data
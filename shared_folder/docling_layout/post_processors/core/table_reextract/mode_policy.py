@@ -0,0 +1,135 @@
+"""
+Table Mode Policy
+
+Per-table choice of the table-content engine, instead of one TableFormer
+mode for the whole chapter (ACCURATE in EXTRACT_ANY_CHAPTER, FAST/ACCURATE
+by VRAM in FAST_process_parallel_ENHANCED).
+
+Runs on bbox-only documents (Docling without table structure). A cheap
+pre-classification with PyMuPDF decides, per table:
+
+- none:     a known table family (classifier keywords), a drawn grid
+            (line_based), or a narrow table: the re-extractors handle it
+- fast:     few columns and sparse text: TableFormer FAST on the crop
+- accurate: many columns or dense text: TableFormer ACCURATE on the crop
+
+Decision counts and per-mode timings are accumulated in a metrics dict:
+
+    {'tables': {'none': 12, 'fast': 3, 'accurate': 2},
+     'seconds': {'none': 0.41, 'fast': 2.9, 'accurate': 6.3},
+     'decisions': [{'table': 0, 'page': 5, 'mode': 'none', 'reason': ...}, ...]}
+"""
+
+import fitz
+
+from .classifier import classify_table
+
+# Classifier types whose content the re-extractors handle without a model
+EXTRACTOR_TYPES = {
+    "programacion_diaria", "costos_horarios", "demanda_generacion", "horario_tecnologia",
+    "movimientos_despacho", "registro_operacion_sen", "reporte_desconexion",
+    "centrales_desvio", "centrales_grandes", "hidroelectricas", "indicador_compacto",
+    "eventos_hora", "scada_alarmas", "infraestructura_sen", "line_based",
+}
+
+MODES = ("none", "fast", "accurate")
+
+# Tables up to this many columns are re-extracted by position (no model)
+NARROW_MAX_COLUMNS = 2
+
+# FAST is enough up to this many columns ...
+FAST_MAX_COLUMNS = 5
+
+# ... and this text density (characters per 1000 pt² of table area)
+FAST_MAX_DENSITY = 12.0
+
+# Horizontal gap (points) that separates two cells on one text line
+CELL_GAP = 8.0
+
+
+def new_metrics():
+    """Empty metrics dict for apply_table_reextract_to_document(metrics=...)"""
+    return {
+        'tables': {mode: 0 for mode in MODES},
+        'seconds': {mode: 0.0 for mode in MODES},
+        'decisions': [],
+    }
+
+
+def table_features(table, pdf_path):
+    """
+    Columns (median cells per text line) and text density of a table bbox.
+
+    Returns:
+        dict: {'columns': int, 'density': float, 'chars': int}
+    """
+    bbox = table.prov[0].bbox
+    page_no = table.prov[0].page_no
+
+    doc = fitz.open(pdf_path)
+    try:
+        page = doc[page_no - 1]
+        page_height = page.rect.height
+        rect = fitz.Rect(bbox.l, page_height - bbox.t, bbox.r, page_height - bbox.b)
+        words = page.get_text("words", clip=rect)
+    finally:
+        doc.close()
+
+    lines = {}
+    for x0, y0, x1, y1, text, block_no, line_no, word_no in words:
+        lines.setdefault((block_no, line_no), []).append((x0, x1))
+
+    cells_per_line = []
+    for spans in lines.values():
+        spans.sort()
+        cells = 1
+        for (_, prev_x1), (x0, _) in zip(spans, spans[1:]):
+            if x0 - prev_x1 > CELL_GAP:
+                cells += 1
+        cells_per_line.append(cells)
+
+    # Median over lines: titles and notes inside the bbox are single-cell lines
+    cells_per_line.sort()
+    columns = cells_per_line[len(cells_per_line) // 2] if cells_per_line else 0
+
+    chars = sum(len(word[4]) for word in words)
+    area = max(rect.width * rect.height, 1.0)
+    return {'columns': columns, 'density': chars * 1000.0 / area, 'chars': chars}
+
+
+def decide_table_mode(table, pdf_path):
+    """
+    Decide the engine for one bbox-only table.
+
+    Returns:
+        tuple: (mode, table_type, reason) with mode in MODES
+    """
+    table_type, confidence, reason = classify_table(table, pdf_path)
+
+    if table_type == "skip":
+        return ("none", table_type, reason)
+    if table_type in EXTRACTOR_TYPES:
+        return ("none", table_type, f"Extractor family: {reason}")
+
+    try:
+        features = table_features(table, pdf_path)
+    except Exception as e:
+        return ("accurate", table_type, f"No features ({str(e)[:40]})")
+
+    columns, density = features['columns'], features['density']
+    summary = f"{columns} cols, {density:.1f} chars/kpt²"
+    if columns <= NARROW_MAX_COLUMNS:
+        return ("none", table_type, f"Narrow table ({summary})")
+    if columns <= FAST_MAX_COLUMNS and density <= FAST_MAX_DENSITY:
+        return ("fast", table_type, f"Simple table ({summary})")
+    return ("accurate", table_type, f"Complex table ({summary})")
+
+
+def record(metrics, index, page_no, mode, reason, seconds):
+    """Add one table decision and its time to metrics (if given)"""
+    if metrics is None:
+        return
+    metrics['tables'][mode] += 1
+    metrics['seconds'][mode] = round(metrics['seconds'][mode] + seconds, 3)
+    metrics['decisions'].append({'table': index, 'page': page_no, 'mode': mode,
+                                 'reason': reason, 'seconds': round(seconds, 3)})
@@ -3,127 +3,70 @@
 PDF Chapter Splitter - Divide un PDF en capítulos
 
 Usage:
-    # Con rangos predefinidos
+    # Con rangos del registro (data/report_registry.json)
     python3 split_pdf_chapters.py /ruta/EAF-089-2025.pdf --report EAF-089-2025
 
-    # Detección automática de capítulos
+    # Detección automática de capítulos (outline / títulos en negrita), se guarda en el registro
     python3 split_pdf_chapters.py /ruta/nuevo.pdf --report EAF-477-2025 --auto
 """
 import argparse
+import sys
 from pathlib import Path
 import fitz  # PyMuPDF
-import re
 
+# Chapter boundary engine + report registry shared with the operaciones domain
+sys.path.append(str(Path(__file__).parent.parent.parent / "domains" / "operaciones" / "shared" / "utilities"))
+from chapter_boundaries import get_report_registry
 
-def detect_chapters_automatically(pdf_path: str):
+
+def detect_chapters_automatically(pdf_path: str, report_id: str = None, redetect: bool = True):
     """
     Automatically detect chapter boundaries in a PDF.
 
-    Looks for patterns like "1. ", "2. ", etc. at the start of lines.
+    Uses the PDF outline when present, otherwise a parallel scan of the large /
+    bold headings at the top of each page ("1. Descripción...", excluding
+    subsections like "9.1"). The result is stored in the report registry.
 
     Args:
         pdf_path: Path to the PDF file
+        report_id: Report identifier used in the registry (default: file name)
+        redetect: Ignore ranges already stored for this document
 
     Returns:
         dict: Chapter number -> (start_page, end_page) mapping
     """
-    doc = fitz.open(pdf_path)
-    total_pages = len(doc)
-
-    # Pattern to match chapter headings: "1. Descripción..." (number + capitalized word)
-    # Excludes subsections like "9.1" by requiring space after the period
-    # and excluding matches where the period is followed by another digit
-    chapter_pattern = re.compile(r'^\s*(\d{1,2})\.\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+', re.MULTILINE)
-
-    # Also exclude subsection patterns like "9.1 Incumplimiento"
-    subsection_pattern = re.compile(r'^\s*\d+\.\d+\s+', re.MULTILINE)
-
-    # Find all chapter starts
-    chapter_starts = {}  # chapter_num -> page_num (1-indexed)
-
-    for page_num in range(total_pages):
-        page = doc[page_num]
-        text = page.get_text()
-
-        # Look for chapter headings in full page text
-        for match in chapter_pattern.finditer(text):
-            chapter_num = int(match.group(1))
-            match_text = match.group(0)[:50].replace('\n', ' ')
+    registry = get_report_registry()
+    entry = registry.resolve(pdf_path, report_id=report_id, redetect=redetect, save=True)
 
-            # Only record first occurrence of each chapter
-            if chapter_num not in chapter_starts:
-                chapter_starts[chapter_num] = page_num + 1  # Convert to 1-indexed
-                print(f"   📍 Chapter {chapter_num} found on page {page_num + 1}: \"{match_text}...\"")
-            else:
-                # Show duplicate detections for debugging
-                if page_num + 1 != chapter_starts[chapter_num]:
-                    print(f"   ⚠️  Chapter {chapter_num} also on page {page_num + 1} (keeping page {chapter_starts[chapter_num]})")
+    chapters = {
+        int(chapter["number"]): (chapter["start_page"], chapter["end_page"])
+        for chapter in entry["chapters"].values()
+        if chapter.get("kind", "chapter") == "chapter" and chapter.get("number") is not None
+    }
 
-    doc.close()
-
-    if not chapter_starts:
+    if not chapters:
         print("⚠️  No chapters detected automatically")
         return {}
 
-    # Sort chapters and validate
-    sorted_chapters = sorted(chapter_starts.keys())
+    print(f"   📍 Source: {entry['source']}")
+    for chapter_num in sorted(chapters):
+        title = (entry["chapters"][str(chapter_num)].get("title") or "")[:50]
+        print(f"   📍 Chapter {chapter_num} found on page {chapters[chapter_num][0]}: \"{title}...\"")
 
     # Check for gaps
-    expected = list(range(1, max(sorted_chapters) + 1))
-    missing = set(expected) - set(sorted_chapters)
-
+    sorted_chapters = sorted(chapters)
+    missing = set(range(1, max(sorted_chapters) + 1)) - set(sorted_chapters)
     if missing:
         print(f"⚠️  Missing chapters detected: {sorted(missing)}")
         print(f"   Found chapters: {sorted_chapters}")
-        # Continue anyway, but warn user
-
-    # Build chapter ranges
-    chapters = {}
-    for i, chapter_num in enumerate(sorted_chapters):
-        start_page = chapter_starts[chapter_num]
-
-        # End page is start of next chapter - 1, or end of document
-        if i + 1 < len(sorted_chapters):
-            next_chapter = sorted_chapters[i + 1]
-            next_start = chapter_starts[next_chapter]
-
-            # If next chapter is on same page, this chapter gets only this page
-            if next_start == start_page:
-                end_page = start_page
-            else:
-                end_page = next_start - 1
-        else:
-            end_page = total_pages
-
-        chapters[chapter_num] = (start_page, end_page)
 
     return chapters
 
 # Default output directory (relative to project root)
 DEFAULT_OUTPUT_DIR = Path(__file__).parent.parent.parent / "data" / "inputs"
 
-# Chapter definitions per report (page ranges - 1-indexed)
-REPORT_CHAPTERS = {
-    "EAF-089-2025": {
-        1: (1, 11),
-        2: (12, 90),
-        3: (91, 152),
-        4: (153, 159),
-        5: (160, 171),
-        6: (172, 265),
-        7: (266, 347),
-        8: (348, 348),
-        9: (349, 381),
-        10: (382, 392),
-        11: (393, 399),
-    },
-    # Add new reports here:
-    # "EAF-090-2026": {
-    #     1: (1, 20),
-    #     2: (21, 100),
-    #     ...
-    # },
-}
+# Chapter page ranges per report live in data/report_registry.json (keyed by
+# document hash); new reports are detected on first use and added there.
 
 
 def split_pdf_into_chapters(pdf_path: str, report_id: str, output_dir: Path = None, auto_detect: bool = False):
@@ -146,19 +89,20 @@ def split_pdf_into_chapters(pdf_path: str, report_id: str, output_dir: Path = No
         print(f"❌ PDF not found: {pdf_path}")
         return False
 
-    # Get chapter definitions
-    if auto_detect or report_id not in REPORT_CHAPTERS:
+    # Get chapter definitions (registry first, detection for unknown documents)
+    registry = get_report_registry()
+    if auto_detect or not registry.chapter_pages(report_id):
         if not auto_detect:
-            print(f"ℹ️  Report {report_id} not in REPORT_CHAPTERS, using auto-detection...")
+            print(f"ℹ️  Report {report_id} not in the report registry, using auto-detection...")
         print(f"🔍 Auto-detecting chapters in {pdf_path.name}...")
-        chapters = detect_chapters_automatically(str(pdf_path))
+        chapters = detect_chapters_automatically(str(pdf_path), report_id=report_id, redetect=auto_detect)
         if not chapters:
             print("❌ Could not detect chapters automatically")
             return False
         print(f"✅ Detected {len(chapters)} chapters")
         print()
     else:
-        chapters = REPORT_CHAPTERS[report_id]
+        chapters = registry.chapter_pages(report_id)
 
     # Create output directory
     report_output_dir = output_dir / report_id / "capitulos"